@@ -0,0 +1,66 @@
+"""hot query indexes (round-scoped composite + partial indexes)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+ฐานข้อมูลเดิมสร้างจาก db.sql / init_tables.py (create_all) จึงเริ่มนับ revision แรกจากตรงนี้
+ทุก index สร้างแบบ CONCURRENTLY เพื่อไม่ให้ล็อกตาราง tickets ระหว่างเปิดรับแทง
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (ชื่อ index, คำสั่งสร้าง) - ใช้ร่วมกับ check_query_plans.py
+HOT_INDEXES = [
+    # read_history: ลูกค้าดูโพยตัวเองตามงวด เรียงเวลาล่าสุด
+    ("ix_tickets_user_round_created",
+     "ON tickets (user_id, round_date, created_at DESC)"),
+    # get_shop_tickets: แอดมินดูโพยทั้งร้านตามงวด
+    ("ix_tickets_shop_round_created",
+     "ON tickets (shop_id, round_date, created_at DESC)"),
+    # process_reward_background: ดึงบิลของงวดที่จะตรวจรางวัล (ไม่สนบิลที่ยกเลิก)
+    ("ix_tickets_lotto_round_active",
+     "ON tickets (lotto_type_id, round_date) WHERE status <> 'CANCELLED'"),
+    # stats range / performance: กรองร้าน + ช่วงเวลา แล้วรวมยอด (index-only scan)
+    ("ix_tickets_shop_created_cover",
+     "ON tickets (shop_id, created_at) INCLUDE (status, total_amount, commission_amount)"),
+    # ยอดรอผล (PENDING) ต่อร้านต่องวด
+    ("ix_tickets_pending_shop_round",
+     "ON tickets (shop_id, round_date) INCLUDE (total_amount) WHERE status = 'PENDING'"),
+    # JOIN ticket_items เพื่อรวมยอดจ่าย (แทน ix_ticket_item_ticket_id เดิม)
+    ("ix_ticket_items_ticket_cover",
+     "ON ticket_items (ticket_id) INCLUDE (status, winning_amount)"),
+    # submit_ticket: เลขอั้นของหวย + ร้าน + วัน
+    ("ix_number_risks_lotto_shop_created",
+     "ON number_risks (lotto_type_id, shop_id, created_at)"),
+    # risks/daily/all: เลขอั้นทั้งร้านของวัน
+    ("ix_number_risks_shop_created",
+     "ON number_risks (shop_id, created_at)"),
+    # reward/daily: ผลรางวัลทั้งหมดของวัน
+    ("ix_lotto_results_round_date",
+     "ON lotto_results (round_date)"),
+    # ตรวจรางวัล/ประวัติผล: หาหวยรหัสเดียวกันจากทุกร้าน
+    ("ix_lotto_types_code",
+     "ON lotto_types (code)"),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY ใช้ใน transaction ไม่ได้
+    with op.get_context().autocommit_block():
+        for name, definition in HOT_INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_ticket_item_ticket_id")
+        for table in ("tickets", "ticket_items", "number_risks", "lotto_results", "lotto_types"):
+            op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ticket_item_ticket_id ON ticket_items (ticket_id)")
+        for name, _ in reversed(HOT_INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
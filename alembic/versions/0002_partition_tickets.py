@@ -0,0 +1,164 @@
+"""partition tickets / ticket_items by month of round_date
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+แปลง tickets / ticket_items เป็น Declarative Range Partitioning รายเดือนตาม round_date
+- PK เปลี่ยนเป็น (id, round_date) และ ticket_items มี round_date ของบิลแม่ (FK แบบ composite)
+- ย้ายข้อมูลเดิมทั้งหมดภายใน Transaction เดียว (ล็อกตาราง → ควรรันช่วงปิดรับแทง)
+- partition เดือนถัดๆ ไปสร้างโดย app/db/partitions.py (Thread ตอน Start Server / manage_partitions.py)
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+TICKET_INDEXES = [
+    ("ix_ticket_created_shop_status", "ON tickets (created_at, shop_id, status)"),
+    ("ix_tickets_user_round_created", "ON tickets (user_id, round_date, created_at DESC)"),
+    ("ix_tickets_shop_round_created", "ON tickets (shop_id, round_date, created_at DESC)"),
+    ("ix_tickets_lotto_round_active", "ON tickets (lotto_type_id, round_date) WHERE status <> 'CANCELLED'"),
+    ("ix_tickets_shop_created_cover", "ON tickets (shop_id, created_at) INCLUDE (status, total_amount, commission_amount)"),
+    ("ix_tickets_pending_shop_round", "ON tickets (shop_id, round_date) INCLUDE (total_amount) WHERE status = 'PENDING'"),
+]
+ITEM_INDEXES = [
+    ("ix_ticket_item_number_status", "ON ticket_items (number, status)"),
+    ("ix_ticket_items_ticket_cover", "ON ticket_items (ticket_id) INCLUDE (status, winning_amount)"),
+]
+
+
+def _add_months(d: date, months: int) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def _move_aside(conn, table: str, new_name: str) -> None:
+    """เปลี่ยนชื่อตารางเดิม + ลบ index รอง + เปลี่ยนชื่อ PK (ชื่อ index ต้องไม่ชนกับตารางใหม่)"""
+    op.execute(f"ALTER TABLE {table} RENAME TO {new_name}")
+    index_names = conn.execute(sa.text("""
+        SELECT i.indexname FROM pg_indexes i
+        WHERE i.tablename = :t
+          AND i.indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:t))
+    """), {"t": new_name}).scalars().all()
+    for name in index_names:
+        op.execute(f'DROP INDEX "{name}"')
+    pkey = conn.execute(sa.text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:t) AND contype = 'p'"
+    ), {"t": new_name}).scalar()
+    if pkey:
+        op.execute(f'ALTER TABLE {new_name} RENAME CONSTRAINT "{pkey}" TO {new_name}_pkey')
+
+
+def _create_indexes(indexes) -> None:
+    for name, definition in indexes:
+        op.execute(f"CREATE INDEX {name} {definition}")
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # 1. round_date เป็น Partition Key จึงห้าม NULL (บิลเก่าใช้วันที่กดแทงตามเวลาไทย)
+    op.execute("""
+        UPDATE tickets SET round_date = (created_at AT TIME ZONE 'Asia/Bangkok')::date
+        WHERE round_date IS NULL
+    """)
+
+    _move_aside(conn, "ticket_items", "ticket_items_legacy")
+    _move_aside(conn, "tickets", "tickets_legacy")
+
+    # 2. ตารางหลักแบบ partition (LIKE = ได้คอลัมน์/ค่า Default ครบตามของเดิม)
+    op.execute("CREATE TABLE tickets (LIKE tickets_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (round_date)")
+    op.execute("ALTER TABLE tickets ALTER COLUMN round_date SET NOT NULL")
+    op.execute("ALTER TABLE tickets ADD PRIMARY KEY (id, round_date)")
+
+    op.execute("""
+        CREATE TABLE ticket_items (LIKE ticket_items_legacy INCLUDING DEFAULTS, round_date DATE NOT NULL)
+        PARTITION BY RANGE (round_date)
+    """)
+    op.execute("ALTER TABLE ticket_items ADD PRIMARY KEY (id, round_date)")
+
+    # 3. partition รายเดือน: ตั้งแต่เดือนแรกที่มีข้อมูล ถึงล่วงหน้า MONTHS_AHEAD เดือน + DEFAULT
+    first_round = conn.execute(sa.text("SELECT min(round_date) FROM tickets_legacy")).scalar()
+    this_month = date.today().replace(day=1)
+    month = (first_round or this_month).replace(day=1)
+    last_month = _add_months(this_month, MONTHS_AHEAD)
+    while month <= last_month:
+        nxt = _add_months(month, 1)
+        suffix = f"y{month.year}m{month.month:02d}"
+        for table in ("tickets", "ticket_items"):
+            op.execute(
+                f"CREATE TABLE {table}_{suffix} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{nxt.isoformat()}')"
+            )
+        month = nxt
+    op.execute("CREATE TABLE tickets_default PARTITION OF tickets DEFAULT")
+    op.execute("CREATE TABLE ticket_items_default PARTITION OF ticket_items DEFAULT")
+
+    # 4. ย้ายข้อมูล (ticket_items เอา round_date จากบิลแม่)
+    op.execute("INSERT INTO tickets SELECT * FROM tickets_legacy")
+    op.execute("""
+        INSERT INTO ticket_items
+        SELECT li.*, t.round_date FROM ticket_items_legacy li JOIN tickets_legacy t ON t.id = li.ticket_id
+    """)
+    for table in ("tickets", "ticket_items"):
+        old_count = conn.execute(sa.text(f"SELECT count(*) FROM {table}_legacy")).scalar()
+        new_count = conn.execute(sa.text(f"SELECT count(*) FROM {table}")).scalar()
+        if old_count != new_count:
+            raise RuntimeError(f"{table}: copied {new_count} of {old_count} rows, aborting")
+
+    # 5. FK + Index สร้างหลังย้ายข้อมูล (เร็วกว่าตรวจทีละแถว)
+    op.execute("ALTER TABLE tickets ADD FOREIGN KEY (shop_id) REFERENCES shops(id)")
+    op.execute("ALTER TABLE tickets ADD FOREIGN KEY (user_id) REFERENCES users(id)")
+    op.execute("ALTER TABLE tickets ADD FOREIGN KEY (lotto_type_id) REFERENCES lotto_types(id)")
+    op.execute("""
+        ALTER TABLE ticket_items ADD FOREIGN KEY (ticket_id, round_date)
+        REFERENCES tickets (id, round_date) ON DELETE CASCADE
+    """)
+    _create_indexes(TICKET_INDEXES)
+    _create_indexes(ITEM_INDEXES)
+
+    op.execute("DROP TABLE ticket_items_legacy")
+    op.execute("DROP TABLE tickets_legacy")
+    op.execute("ANALYZE tickets")
+    op.execute("ANALYZE ticket_items")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    _move_aside(conn, "ticket_items", "ticket_items_part")
+    _move_aside(conn, "tickets", "tickets_part")
+
+    op.execute("CREATE TABLE tickets (LIKE tickets_part INCLUDING DEFAULTS)")
+    op.execute("ALTER TABLE tickets ALTER COLUMN round_date DROP NOT NULL")
+    op.execute("INSERT INTO tickets SELECT * FROM tickets_part")
+    op.execute("ALTER TABLE tickets ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE tickets ADD FOREIGN KEY (shop_id) REFERENCES shops(id)")
+    op.execute("ALTER TABLE tickets ADD FOREIGN KEY (user_id) REFERENCES users(id)")
+    op.execute("ALTER TABLE tickets ADD FOREIGN KEY (lotto_type_id) REFERENCES lotto_types(id)")
+
+    op.execute("CREATE TABLE ticket_items (LIKE ticket_items_part INCLUDING DEFAULTS)")
+    op.execute("ALTER TABLE ticket_items DROP COLUMN round_date")
+    columns = conn.execute(sa.text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = 'ticket_items' ORDER BY ordinal_position
+    """)).scalars().all()
+    col_list = ", ".join(f'"{c}"' for c in columns)
+    op.execute(f"INSERT INTO ticket_items ({col_list}) SELECT {col_list} FROM ticket_items_part")
+    op.execute("ALTER TABLE ticket_items ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE ticket_items ADD FOREIGN KEY (ticket_id) REFERENCES tickets(id)")
+
+    _create_indexes(TICKET_INDEXES)
+    _create_indexes(ITEM_INDEXES)
+
+    # DROP ตารางหลักแบบ partition = ลบทุก partition ไปด้วย
+    op.execute("DROP TABLE ticket_items_part")
+    op.execute("DROP TABLE tickets_part")
@@ -0,0 +1,60 @@
+"""cold archive table for settled rounds
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+หนึ่งแถวต่อหนึ่งบิล รายการเลขรวมเป็น JSONB (items_packed) ย้ายข้อมูลโดย app/core/archiver.py
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ticket_archives",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("shops.id"), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("lotto_type_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("lotto_types.id")),
+        sa.Column("round_date", sa.Date(), nullable=False),
+        sa.Column("note", sa.String()),
+        sa.Column("total_amount", sa.DECIMAL(10, 2), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("winning_amount", sa.Numeric(10, 2)),
+        sa.Column("commission_amount", sa.DECIMAL(10, 2)),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("items_packed", postgresql.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_ticket_archives_user_round_created", "ticket_archives",
+                    ["user_id", "round_date", sa.text("created_at DESC")])
+    op.create_index("ix_ticket_archives_shop_round_created", "ticket_archives",
+                    ["shop_id", "round_date", sa.text("created_at DESC")])
+    op.create_index("ix_ticket_archives_shop_created", "ticket_archives", ["shop_id", "created_at"])
+    op.create_index("ix_ticket_archives_lotto_round", "ticket_archives", ["lotto_type_id", "round_date"])
+    op.create_index("ix_ticket_archives_round_date", "ticket_archives", ["round_date"])
+
+
+def downgrade() -> None:
+    # ย้ายบิลใน archive กลับเข้า tickets / ticket_items ก่อนลบตาราง (ประวัติไม่หาย)
+    op.execute("""
+        INSERT INTO tickets (id, shop_id, user_id, lotto_type_id, round_date, note, total_amount,
+                             status, winning_amount, commission_amount, created_at)
+        SELECT id, shop_id, user_id, lotto_type_id, round_date, note, total_amount,
+               status, winning_amount, commission_amount, created_at
+        FROM ticket_archives
+    """)
+    op.execute("""
+        INSERT INTO ticket_items (id, ticket_id, round_date, number, bet_type, amount, reward_rate, winning_amount, status)
+        SELECT (e->>0)::uuid, a.id, a.round_date, e->>1, e->>2,
+               (e->>3)::numeric, (e->>4)::numeric, (e->>5)::numeric, e->>6
+        FROM ticket_archives a CROSS JOIN LATERAL jsonb_array_elements(a.items_packed) e
+    """)
+    op.drop_table("ticket_archives")
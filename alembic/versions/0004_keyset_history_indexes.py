@@ -0,0 +1,60 @@
+"""keyset pagination indexes for history (created_at DESC, id DESC)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+รองรับ cursor ของ /play/history และ /play/shop_history (ดู app/core/pagination.py)
+tickets เป็น partition → CREATE INDEX CONCURRENTLY บนตารางหลักไม่ได้
+จึงสร้าง index ON ONLY ตารางหลัก แล้วสร้างทีละ partition แบบ CONCURRENTLY ค่อย ATTACH (ไม่ล็อกการแทง)
+partition ที่สร้างทีหลังได้ index อัตโนมัติจากตารางหลัก
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# (ชื่อ index, ตาราง, คอลัมน์, ชื่อท้ายของ index ใน partition)
+KEYSET_INDEXES = [
+    ("ix_tickets_user_created_id", "tickets", "(user_id, created_at DESC, id DESC)", "user_created_id_idx"),
+    ("ix_tickets_shop_created_id", "tickets", "(shop_id, created_at DESC, id DESC)", "shop_created_id_idx"),
+]
+ARCHIVE_INDEXES = [
+    ("ix_ticket_archives_user_created_id", "ON ticket_archives (user_id, created_at DESC, id DESC)"),
+    ("ix_ticket_archives_shop_created_id", "ON ticket_archives (shop_id, created_at DESC, id DESC)"),
+]
+
+
+def _partitions(conn, table: str):
+    return conn.execute(sa.text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:t) ORDER BY c.relname
+    """), {"t": table}).scalars().all()
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        for name, table, columns, suffix in KEYSET_INDEXES:
+            partitions = _partitions(conn, table)
+            if not partitions:
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {columns}")
+                continue
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {columns}")
+            for part in partitions:
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {part}_{suffix} ON {part} {columns}")
+                op.execute(f"ALTER INDEX {name} ATTACH PARTITION {part}_{suffix}")
+        for name, definition in ARCHIVE_INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}")
+
+
+def downgrade() -> None:
+    # DROP INDEX ของตารางหลักแบบ partition = ลบ index ทุก partition ไปด้วย (ใช้ CONCURRENTLY ไม่ได้)
+    for name, _, _, _ in reversed(KEYSET_INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(ARCHIVE_INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,68 @@
+"""daily rollups for stats endpoints
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+ยอดสรุปรายวันต่อ (ร้าน, วันที่กดแทง, ลูกค้า, หวย, งวด) อัปเดตต่อเนื่องโดย app/core/rollups.py
+คำนวณยอดเริ่มต้นจาก tickets + ticket_archives ในตัว (คำนวณใหม่ภายหลังได้ด้วย python rebuild_rollups.py)
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+AMOUNT = sa.Numeric(14, 2)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_rollups",
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("stat_date", sa.Date(), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("lotto_type_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("round_date", sa.Date(), nullable=False),
+        sa.Column("bill_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cancelled_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sales_amount", AMOUNT, nullable=False, server_default="0"),
+        sa.Column("commission_amount", AMOUNT, nullable=False, server_default="0"),
+        sa.Column("pending_amount", AMOUNT, nullable=False, server_default="0"),
+        sa.Column("cancelled_amount", AMOUNT, nullable=False, server_default="0"),
+        sa.Column("payout_amount", AMOUNT, nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("shop_id", "stat_date", "user_id", "lotto_type_id", "round_date"),
+    )
+    op.create_index("ix_daily_rollups_stat_date", "daily_rollups", ["stat_date"])
+
+    # ยอดเริ่มต้น (เงื่อนไขเดียวกับ app/core/rollups.py)
+    op.execute("""
+        INSERT INTO daily_rollups (stat_date, shop_id, user_id, lotto_type_id, round_date,
+                                   bill_count, cancelled_count, sales_amount, commission_amount,
+                                   pending_amount, cancelled_amount, payout_amount)
+        SELECT (created_at AT TIME ZONE 'Asia/Bangkok')::date, shop_id, user_id, lotto_type_id, round_date,
+               count(*),
+               count(*) FILTER (WHERE status = 'CANCELLED'),
+               coalesce(sum(total_amount) FILTER (WHERE status <> 'CANCELLED'), 0),
+               coalesce(sum(commission_amount) FILTER (WHERE status <> 'CANCELLED'), 0),
+               coalesce(sum(total_amount) FILTER (WHERE status = 'PENDING'), 0),
+               coalesce(sum(total_amount) FILTER (WHERE status = 'CANCELLED'), 0),
+               coalesce(sum(winning_amount) FILTER (WHERE status = 'WIN'), 0)
+        FROM (
+            SELECT created_at, shop_id, user_id, lotto_type_id, round_date, status, total_amount, commission_amount, winning_amount
+            FROM tickets WHERE lotto_type_id IS NOT NULL
+            UNION ALL
+            SELECT created_at, shop_id, user_id, lotto_type_id, round_date, status, total_amount, commission_amount, winning_amount
+            FROM ticket_archives WHERE lotto_type_id IS NOT NULL
+        ) t
+        GROUP BY 1, 2, 3, 4, 5
+    """)
+    op.execute("ANALYZE daily_rollups")
+
+
+def downgrade() -> None:
+    op.drop_table("daily_rollups")
@@ -0,0 +1,50 @@
+"""code-level lotto results (one row per code per round)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+ผลรางวัลของ Code หวย (ทุกร้านใช้ร่วมกัน) เขียนครั้งเดียวต่อการออกผล โดย /reward/issue
+ให้กระดานผลรายวัน (/reward/daily) และประวัติผล (/reward/history) อ่านแถวเดียวต่อ Code ต่องวด
+ยกผลเดิมมาจาก lotto_results (งวดละแถวต่อ Code เอาอันที่บันทึกล่าสุด)
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "code_results",
+        sa.Column("code", sa.String(20), nullable=False),
+        sa.Column("round_date", sa.Date(), nullable=False),
+        sa.Column("top_3", sa.String()),
+        sa.Column("bottom_2", sa.String()),
+        sa.Column("reward_data", postgresql.JSONB(), nullable=False, server_default="{}"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("code", "round_date"),
+    )
+    op.create_index("ix_code_results_round_date", "code_results", ["round_date"])
+
+    op.execute("""
+        INSERT INTO code_results (code, round_date, top_3, bottom_2, reward_data, created_at, updated_at)
+        SELECT DISTINCT ON (l.code, r.round_date) l.code, r.round_date,
+               COALESCE(NULLIF(r.top_3, ''), r.reward_data->>'top'),
+               COALESCE(NULLIF(r.bottom_2, ''), r.reward_data->>'bottom'),
+               r.reward_data, r.created_at, r.created_at
+        FROM lotto_results r
+        JOIN lotto_types l ON l.id = r.lotto_type_id
+        WHERE l.code IS NOT NULL
+        ORDER BY l.code, r.round_date, r.created_at DESC
+    """)
+    op.execute("ANALYZE code_results")
+
+
+def downgrade() -> None:
+    op.drop_table("code_results")
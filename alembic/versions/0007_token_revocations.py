@@ -0,0 +1,30 @@
+"""refresh token revocation list
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+รายการเพิกถอน Refresh Token (POST /auth/refresh) ที่ทุก worker ถือไว้ใน RAM และเขียนลงเป็นชุดโดย app/core/token_revocation.py
+1 แถวต่อ Session (sid:<session> - หมุน Token / Logout) หรือผู้ใช้ (user:<id> - เปลี่ยนรหัส / ปิดบัญชี)
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "token_revocations",
+        sa.Column("key", sa.String(80), primary_key=True),
+        sa.Column("revoked_before", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_token_revocations_expires_at", "token_revocations", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("token_revocations")
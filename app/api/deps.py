@@ -1,46 +1,42 @@
 # app/api/deps.py
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-import jwt  # [แก้ไข] เปลี่ยนจาก jose เป็น PyJWT
-from app.core.config import settings
+from app.core.security import decode_token
 from app.models.user import User, UserRole
 from app.db.session import get_db
+from app.core.principal_cache import Principal, get_principal
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
-# 1. ดึง User จาก Token
-async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_db)) -> User:
+# 1. ดึง User จาก Token (ได้ Principal จาก Cache - ต้องการแถว User เต็มๆ เช่นยอดเงิน ให้โหลดจาก DB เอง)
+async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_db)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
     )
-    try:
-        # [แก้ไข] PyJWT ไม่ต้องการ algorithms เป็น list ในการเรียกเบื้องต้น แต่ใส่ไว้เพื่อความปลอดภัย
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except (jwt.PyJWTError, Exception): # [แก้ไข] เปลี่ยน JWTError เป็น PyJWTError
+    # ตรวจลายเซ็น/วันหมดอายุ (Token ที่เคยผ่านแล้วตอบจาก Cache ใน security.decode_token)
+    payload = decode_token(token)
+    # Refresh Token ใช้แทน Access Token ไม่ได้ (ใช้ได้แค่ที่ /auth/refresh)
+    if payload is None or payload.get("typ") == "refresh":
+        raise credentials_exception
+    user_id: str = payload.get("sub")
+    if user_id is None:
         raise credentials_exception
         
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_principal(user_id, lambda uid: db.query(User).filter(User.id == uid).first())
     if user is None:
         raise credentials_exception
     return user
 
 # 2. ตรวจสอบว่า Active อยู่ไหม
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 # 3. Role Factory
 def check_role(allowed_roles: list[UserRole]):
-    def role_checker(current_user: User = Depends(get_current_active_user)):
+    def role_checker(current_user: Principal = Depends(get_current_active_user)):
         if current_user.role not in allowed_roles:
              raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -1,17 +1,19 @@
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from app.core import security
+from app.core import security, token_revocation
 from app.core.config import settings, get_thai_now
 from app.db.session import get_db
 from app.models.user import User
-from app.schemas import UserCreate, UserResponse, UserRole, Token
+from app.schemas import UserCreate, UserResponse, UserRole, Token, RefreshTokenRequest
 from app.core.security import get_password_hash
 from app.models.shop import Shop
 from app.core.limiter import limiter
+from app.core.principal_cache import get_principal
 
 router = APIRouter()
 
@@ -19,16 +21,9 @@ router = APIRouter()
 MAX_FAILED_ATTEMPTS = 5       # จำนวนครั้งที่ให้ผิดได้
 LOCKOUT_DURATION_MINUTES = 15 # ระยะเวลาที่ล็อค (นาที)
 
-@router.post("/login", response_model=Token)
-@limiter.limit("10/minute")
-def login_access_token(
-    request: Request,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    form_data: OAuth2PasswordRequestForm = Depends()
-) -> Any:
+def _load_login_user(db: Session, username: str) -> Tuple[User, str]:
     # 1. ค้นหา User
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = db.query(User).filter(User.username == username).first()
     
     # ถ้าไม่เจอ User (Return 401 ทันที)
     if not user:
@@ -55,8 +50,14 @@ def login_access_token(
             db.commit()
             db.refresh(user)
 
-    # 3. ตรวจสอบรหัสผ่าน
-    if not security.verify_password(form_data.password, user.password_hash):
+    # คืน Connection ให้ Pool ก่อนรอ bcrypt (~200ms) - _finish_login อ่านแถวนี้ใหม่เอง (ได้ค่าล่าสุดด้วย)
+    password_hash = user.password_hash
+    db.commit()
+    return user, password_hash
+
+def _finish_login(db: Session, user: User, valid: bool, new_hash: Optional[str]) -> dict:
+    # 3. ผลตรวจรหัสผ่าน
+    if not valid:
         # --- รหัสผิด ---
         user.failed_attempts = (user.failed_attempts or 0) + 1
         
@@ -90,9 +91,12 @@ def login_access_token(
             raise HTTPException(status_code=400, detail="Shop is suspended. Contact support.")
 
     # 5. [Success] รหัสถูก -> รีเซ็ตค่าความผิดพลาดเป็น 0 (ถ้ามีค้างอยู่)
-    if user.failed_attempts > 0 or user.locked_until is not None:
+    #    + เก็บ Hash ใหม่ถ้า PASSWORD_BCRYPT_ROUNDS เปลี่ยน (เขียนครั้งเดียวกัน)
+    if user.failed_attempts > 0 or user.locked_until is not None or new_hash:
         user.failed_attempts = 0
         user.locked_until = None
+        if new_hash:
+            user.password_hash = new_hash
         db.add(user)
         db.commit()
         db.refresh(user)
@@ -103,15 +107,99 @@ def login_access_token(
     token = security.create_access_token(
         subject=user.id, 
         role=user.role.value, 
-        expires_delta=access_token_expires
+        expires_delta=access_token_expires,
+        shop_id=user.shop_id
     )
+    # 7. Refresh Token: ต่ออายุที่ /auth/refresh ได้โดยไม่ต้องใส่รหัส (ไม่ต้อง bcrypt / ไม่เขียน users)
+    refresh_token, _ = security.create_refresh_token(user.id)
 
     return {
         "access_token": token,
         "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+@router.post("/login", response_model=Token)
+@limiter.limit("10/minute")
+async def login_access_token(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    form_data: OAuth2PasswordRequestForm = Depends()
+) -> Any:
+    """
+    async: งาน DB วิ่งใน Threadpool ทีละช่วงสั้นๆ ส่วน bcrypt (~200ms) รอใน Process Pool โดยไม่ถือ Thread
+    → คน Login พร้อมกันตอนเปิดงวดไม่แย่ง Threadpool ของ Endpoint อื่น
+    """
+    user, password_hash = await run_in_threadpool(_load_login_user, db, form_data.username)
+
+    try:
+        valid, new_hash = await security.verify_password_async(form_data.password, password_hash)
+    except security.PasswordPoolBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="มีผู้เข้าสู่ระบบพร้อมกันจำนวนมาก กรุณาลองใหม่อีกครั้ง",
+            headers={"Retry-After": "1"},
+        )
+
+    return await run_in_threadpool(_finish_login, db, user, valid, new_hash)
+
+
+@router.post("/refresh", response_model=Token)
+@limiter.limit("60/minute")
+def refresh_access_token(
+    request: Request,
+    body: RefreshTokenRequest,
+    db: Session = Depends(get_db)
+) -> Any:
+    """
+    ต่ออายุ Session ด้วย Refresh Token (ไม่ต้อง bcrypt / ไม่เขียน users)
+    ได้ Access Token + Refresh Token ใบใหม่ ใบเดิมใช้ไม่ได้อีก - ถูกเพิกถอน / ใช้ใบเดิมซ้ำ → 401 ต้อง Login ใหม่
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+    )
+    # 1. ลายเซ็น / วันหมดอายุ + รายการเพิกถอนใน RAM (ใบที่หมุนทิ้งแล้วถูกส่งซ้ำ = ปิดทั้ง Session)
+    claims = security.decode_refresh_token(body.refresh_token)
+    if claims is None or not token_revocation.check_refresh(claims):
+        raise credentials_exception
+
+    # 2. สถานะ User (Cache เดียวกับ get_current_user) / Shop
+    user = get_principal(claims["sub"], lambda uid: db.query(User).filter(User.id == uid).first())
+    if user is None:
+        raise credentials_exception
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    if user.shop_id and db.query(Shop.is_active).filter(Shop.id == user.shop_id).scalar() is False:
+        raise HTTPException(status_code=400, detail="Shop is suspended. Contact support.")
+
+    # 3. หมุน Token: ใบใหม่อายุนับจากตอนนี้ (ไม่เกินเพดานนับจาก Login) / ใบเดิมเข้ารายการเพิกถอน (เขียนลง DB เป็นชุด)
+    refresh_token, new_claims = security.create_refresh_token(
+        user.id, session_id=claims["sid"], auth_time=claims.get("auth"), issued_after=claims["iat"]
+    )
+    if not token_revocation.rotate(claims, new_claims):
+        # อีก Request ใช้ใบเดียวกันหมุนไปก่อนแล้ว (ส่งซ้ำพร้อมกัน) → ถือเป็น Reuse: ทั้ง Session ถูกปิดแล้ว
+        raise credentials_exception
+
+    return {
+        "access_token": security.create_access_token(subject=user.id, role=user.role.value, shop_id=user.shop_id),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
     }
 
 
+@router.post("/logout")
+def logout(body: RefreshTokenRequest):
+    """
+    ปิด Session ของ Refresh Token นี้ (ทุก worker) - Access Token ที่ออกไปแล้วใช้ได้จนหมดอายุ (ACCESS_TOKEN_EXPIRE_MINUTES)
+    """
+    claims = security.decode_refresh_token(body.refresh_token)
+    if claims is not None:
+        token_revocation.revoke_session(claims)
+    return {"status": "success"}
+
+
 @router.post("/register", response_model=UserResponse)
 @limiter.limit("5/minute")
 def register(
@@ -2,7 +2,7 @@ import os
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from app.api import deps
-from app.models.user import User, UserRole
+from app.models.user import UserRole
 from app.core.config import settings
 from supabase import create_client
 
@@ -11,7 +11,7 @@ router = APIRouter()
 # --- 1. ดึงรายชื่อรูป (GET) ---
 @router.get("/flags")
 def get_flag_library(
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.admin, UserRole.superadmin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -42,7 +42,7 @@ def get_flag_library(
 @router.post("/flags")
 async def upload_flag(
     file: UploadFile = File(...),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.admin, UserRole.superadmin]:
         raise HTTPException(status_code=403, detail="Permission denied")
@@ -77,7 +77,7 @@ async def upload_flag(
 @router.delete("/flags")
 def delete_flag(
     name: str, # รับชื่อไฟล์ เช่น "th.png"
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.admin, UserRole.superadmin]:
         raise HTTPException(status_code=403, detail="Permission denied")
@@ -1,9 +1,12 @@
 from fastapi import APIRouter
-from . import config, tickets, stats, risk 
+from . import config, tickets, stats, risk, templates, stream, export
 
 router = APIRouter()
 
 router.include_router(config.router)
 router.include_router(tickets.router)
 router.include_router(stats.router)
-router.include_router(risk.router)
\ No newline at end of file
+router.include_router(risk.router)
+router.include_router(templates.router)
+router.include_router(stream.router)
+router.include_router(export.router)
\ No newline at end of file
@@ -2,7 +2,7 @@ from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 from sqlalchemy.orm import Session, joinedload
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy import func, String, text
 
 from app.api import deps
@@ -14,8 +14,8 @@ from app.schemas import (
 )
 from app.db.session import get_db
 from app.models.lotto import LottoType, RateProfile, LottoCategory
-from app.models.user import User, UserRole
-from app.core import lotto_cache
+from app.models.user import UserRole
+from app.core import lotto_cache, config_cache, http_cache, timeseries, top_numbers, result_history
 from app.core.config import settings
 
 from supabase import create_client, Client
@@ -49,18 +49,21 @@ def parse_time(t_str: str):
 # --- Rate Profiles ---
 @router.get("/rates", response_model=List[RateProfileResponse])
 def get_rate_profiles(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
-    return db.query(RateProfile).filter(
-        (RateProfile.shop_id == current_user.shop_id) | (RateProfile.shop_id == None)
-    ).all()
+    shop_id = current_user.shop_id
+    rates = config_cache.get_rates(f"shop:{shop_id or 'NONE'}", lambda: db.query(RateProfile).filter(
+        (RateProfile.shop_id == shop_id) | (RateProfile.shop_id == None)
+    ).all())
+    return http_cache.respond(request, rates)
 
 @router.post("/rates", response_model=RateProfileResponse)
 def create_rate_profile(
     profile_in: RateProfileCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -74,6 +77,7 @@ def create_rate_profile(
     )
     db.add(new_profile)
     db.commit()
+    config_cache.invalidate_rates()
     db.refresh(new_profile)
     return new_profile
 
@@ -82,7 +86,7 @@ def update_rate_profile(
     profile_id: UUID,
     profile_in: RateProfileCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -100,6 +104,7 @@ def update_rate_profile(
     profile.rates = profile_in.rates
     
     db.commit()
+    config_cache.invalidate_rates()
     db.refresh(profile)
     return profile
 
@@ -107,7 +112,7 @@ def update_rate_profile(
 def delete_rate_profile(
     profile_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -122,37 +127,38 @@ def delete_rate_profile(
 
     db.delete(profile)
     db.commit()
+    config_cache.invalidate_rates()
     return {"status": "success", "message": "Deleted successfully"}
 
 # --- Categories ---
 @router.get("/categories", response_model=List[CategoryResponse])
 def get_categories(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
-    if current_user.role == UserRole.admin:
-        if not current_user.shop_id: return [] 
-        query = db.query(LottoCategory).filter(
-            (LottoCategory.shop_id == current_user.shop_id) | 
+    shop_id = current_user.shop_id
+    if current_user.role == UserRole.admin and not shop_id:
+        return http_cache.respond(request, http_cache.EMPTY_ARRAY)
+
+    if current_user.role == UserRole.superadmin:
+        key = "all"
+        fetch = lambda: db.query(LottoCategory).order_by(LottoCategory.shop_id, LottoCategory.order_index.asc()).all()
+    elif shop_id:
+        key = f"shop:{shop_id}"
+        fetch = lambda: db.query(LottoCategory).filter(
+            (LottoCategory.shop_id == shop_id) | 
             (LottoCategory.shop_id == None)
-        )
-        return query.order_by(LottoCategory.order_index.asc()).all()
-    elif current_user.role == UserRole.superadmin:
-        return db.query(LottoCategory).order_by(LottoCategory.shop_id, LottoCategory.order_index.asc()).all()
+        ).order_by(LottoCategory.order_index.asc()).all()
     else:
-        if current_user.shop_id:
-            query = db.query(LottoCategory).filter(
-                (LottoCategory.shop_id == current_user.shop_id) | 
-                (LottoCategory.shop_id == None)
-            )
-        else:
-            query = db.query(LottoCategory).filter(LottoCategory.shop_id == None)
-        return query.order_by(LottoCategory.order_index.asc()).all()
+        key = "global"
+        fetch = lambda: db.query(LottoCategory).filter(LottoCategory.shop_id == None).order_by(LottoCategory.order_index.asc()).all()
+    return http_cache.respond(request, config_cache.get_categories(key, fetch))
 
 @router.post("/categories/init_defaults")
 def init_default_categories(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -176,13 +182,14 @@ def init_default_categories(
             added_count += 1
     
     db.commit()
+    config_cache.invalidate_categories()
     return {"message": f"เพิ่มหมวดหมู่สำเร็จ {added_count} รายการ", "added": added_count}
 
 @router.post("/categories", response_model=CategoryResponse)
 def create_category(
     cat_in: CategoryCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -201,6 +208,7 @@ def create_category(
     )
     db.add(new_cat)
     db.commit()
+    config_cache.invalidate_categories()
     db.refresh(new_cat)
     return new_cat
 
@@ -209,7 +217,7 @@ def update_category(
     cat_id: UUID,
     cat_in: CategoryCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -228,6 +236,7 @@ def update_category(
         category.order_index = cat_in.order_index
         
     db.commit()
+    config_cache.invalidate_categories()
     db.refresh(category)
     return category
 
@@ -235,7 +244,7 @@ def update_category(
 def delete_category(
     cat_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -270,69 +279,54 @@ def delete_category(
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail="ไม่สามารถลบหมวดหมู่นี้ได้")
+    config_cache.invalidate_categories()
     
     return {"status": "success", "message": "ลบหมวดหมู่เรียบร้อยแล้ว"}
 
+def _fetch_all_lottos(db: Session):
+    return db.query(LottoType).order_by(LottoType.id).all()
+
 # -------------------------------------------------------------------
 # ✅ [เพิ่มใหม่] ดึงข้อมูลแม่แบบ (ต้องวางไว้ก่อน get_lotto_detail)
 # -------------------------------------------------------------------
 @router.get("/lottos/templates", response_model=List[LottoResponse])
 def get_lotto_templates(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # อนุญาตเฉพาะ Admin / Superadmin
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
-        
-    # ดึงเฉพาะที่เป็น Template (is_template = True)
-    query = db.query(LottoType).filter(LottoType.is_template == True)
-    
-    # ถ้าเป็น Admin ร้าน ให้เห็น Template ของตัวเอง + ของระบบกลาง (Shop ID = None)
+
+    # เฉพาะที่เป็น Template จาก Cache: Admin ร้านเห็น Template ของตัวเอง + ของระบบกลาง (Shop ID = None)
     if current_user.role == UserRole.admin:
-        query = query.filter(
-            (LottoType.shop_id == current_user.shop_id) | 
-            (LottoType.shop_id == None)
-        )
-        
-    return query.all()
+        view, shop_id = lotto_cache.VIEW_TEMPLATES, current_user.shop_id
+    else:
+        view, shop_id = lotto_cache.VIEW_ALL_TEMPLATES, None
+    return http_cache.respond(request, lotto_cache.get_lottos_view(lambda: _fetch_all_lottos(db), view, shop_id))
 
 # --- Lottos ---
 @router.get("/lottos", response_model=List[LottoResponse])
 def get_lottos(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
-    def fetch_all_lottos():
-        return db.query(LottoType).order_by(LottoType.id).all()
-
-    all_lottos = lotto_cache.get_cached_lottos(fetch_all_lottos)
-    filtered_lottos = []
-    
-    for lotto in all_lottos:
-        lotto_shop_id = str(lotto.get('shop_id')) if lotto.get('shop_id') else None
-        user_shop_id = str(current_user.shop_id) if current_user.shop_id else None
-
-        if current_user.role == UserRole.member:
-            if lotto.get('is_template') is False:
-                if user_shop_id:
-                    if lotto_shop_id == user_shop_id:
-                        filtered_lottos.append(lotto)
-                else:
-                    filtered_lottos.append(lotto)
-        elif current_user.role == UserRole.admin:
-            if lotto_shop_id == user_shop_id:
-                filtered_lottos.append(lotto)
-        else:
-            filtered_lottos.append(lotto)
-            
-    return filtered_lottos
+    # มุมมองของแต่ละ Role ถูกกรอง + แปลงเป็น JSON ไว้แล้วตอนโหลด Cache (lotto_cache)
+    if current_user.role == UserRole.member:
+        view = lotto_cache.VIEW_MEMBER
+    elif current_user.role == UserRole.admin:
+        view = lotto_cache.VIEW_SHOP
+    else:
+        view = lotto_cache.VIEW_ALL
+    return http_cache.respond(request, lotto_cache.get_lottos_view(lambda: _fetch_all_lottos(db), view, current_user.shop_id))
 
 @router.get("/lottos/{lotto_id}", response_model=None)
 def get_lotto_detail(
     lotto_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     lotto = db.query(LottoType).options(
         joinedload(LottoType.rate_profile),
@@ -378,7 +372,7 @@ def get_lotto_detail(
 def create_lotto(
     lotto_in: LottoCreate, 
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -424,7 +418,7 @@ def update_lotto(
     lotto_id: UUID,
     lotto_in: LottoCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -465,7 +459,7 @@ def update_lotto(
 def toggle_lotto_status(
     lotto_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -494,7 +488,7 @@ def toggle_lotto_status(
 def delete_lotto(
     lotto_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -513,10 +507,13 @@ def delete_lotto(
             db.execute(text("DELETE FROM ticket_items WHERE ticket_id IN (SELECT id FROM tickets WHERE lotto_type_id IN (SELECT id FROM lotto_types WHERE code = :code))"), {"code": target_code})
             # 2. ลบโพยหลักทุกร้าน
             db.execute(text("DELETE FROM tickets WHERE lotto_type_id IN (SELECT id FROM lotto_types WHERE code = :code)"), {"code": target_code})
+            db.execute(text("DELETE FROM ticket_archives WHERE lotto_type_id IN (SELECT id FROM lotto_types WHERE code = :code)"), {"code": target_code})
+            db.execute(text("DELETE FROM daily_rollups WHERE lotto_type_id IN (SELECT id FROM lotto_types WHERE code = :code)"), {"code": target_code})
             # 3. ลบเลขอั้นทุกร้าน
             db.execute(text("DELETE FROM number_risks WHERE lotto_type_id IN (SELECT id FROM lotto_types WHERE code = :code)"), {"code": target_code})
             # 4. ลบผลรางวัลทุกร้าน
             db.execute(text("DELETE FROM lotto_results WHERE lotto_type_id IN (SELECT id FROM lotto_types WHERE code = :code)"), {"code": target_code})
+            db.execute(text("DELETE FROM code_results WHERE code = :code"), {"code": target_code})
             # 5. ลบตัวหวย (รวมถึงแม่แบบและลูกๆ ทั้งหมด)
             db.execute(text("DELETE FROM lotto_types WHERE code = :code"), {"code": target_code})
 
@@ -526,12 +523,19 @@ def delete_lotto(
         else:
             db.execute(text("DELETE FROM ticket_items WHERE ticket_id IN (SELECT id FROM tickets WHERE lotto_type_id = :lid)"), {"lid": lotto.id})
             db.execute(text("DELETE FROM tickets WHERE lotto_type_id = :lid"), {"lid": lotto.id})
+            db.execute(text("DELETE FROM ticket_archives WHERE lotto_type_id = :lid"), {"lid": lotto.id})
+            db.execute(text("DELETE FROM daily_rollups WHERE lotto_type_id = :lid"), {"lid": lotto.id})
             db.execute(text("DELETE FROM number_risks WHERE lotto_type_id = :lid"), {"lid": lotto.id})
             db.execute(text("DELETE FROM lotto_results WHERE lotto_type_id = :lid"), {"lid": lotto.id})
+            if lotto.code:
+                result_history.prune_code_results(db, ":code", {"code": lotto.code})
             db.delete(lotto)
 
         db.commit()
         lotto_cache.invalidate_lotto_cache()
+        timeseries.clear_timeseries()
+        top_numbers.clear_top_numbers()
+        result_history.clear_result_history()
         
     except Exception as e:
         db.rollback()
@@ -547,7 +551,7 @@ class ImportTemplateRequest(BaseModel):
 def import_default_lottos(
     request: ImportTemplateRequest, # ✅ รับค่า ID ที่เลือกมาจากหน้าเว็บ
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role != UserRole.admin or not current_user.shop_id:
         raise HTTPException(status_code=403, detail="Only Shop Admin can import")
@@ -607,7 +611,7 @@ def import_default_lottos(
 def bulk_update_lotto_rates(
     body: BulkRateRequest, 
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -0,0 +1,66 @@
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.db.session import get_db, engine
+from app.models.user import UserRole
+from app.core import export
+
+router = APIRouter()
+
+EXPORT_MAX_DAYS = 93  # ~1 ไตรมาส ต่อไฟล์
+
+@router.get("/export")
+def export_tickets(
+    start_date: str,
+    end_date: str,
+    format: str = "csv",
+    include_items: bool = False,
+    gzip: bool = False,
+    lotto_type_id: Optional[UUID] = None,
+    user_id: Optional[UUID] = None,
+    shop_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Export บิลตามงวด (round_date) เป็น CSV / NDJSON แบบ Stream (include_items=true = 1 แถวต่อเลข)
+    Admin ได้เฉพาะร้านตัวเอง / SuperAdmin ระบุ shop_id ได้ (ไม่ระบุ = ทุกร้าน)
+    """
+    if current_user.role not in [UserRole.admin, UserRole.superadmin]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    try:
+        s_date, e_date = export.round_range(start_date, end_date, EXPORT_MAX_DAYS)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date range (YYYY-MM-DD, max {EXPORT_MAX_DAYS} days)")
+
+    if current_user.role == UserRole.admin:
+        # Admin ที่ไม่มีร้าน → shop_id=None จะกลายเป็น "ทุกร้าน"
+        if current_user.shop_id is None:
+            raise HTTPException(status_code=403, detail="Admin is not assigned to a shop")
+        shop_id = current_user.shop_id
+
+    # คืน Connection ของ Request ก่อนเริ่ม Stream (ไฟล์ใหญ่ใช้เวลานาน ไม่ถือ 2 Connection)
+    db.close()
+
+    def body():
+        # Connection ของตัวเอง เปิดค้างจนส่งครบ (Server-side Cursor) / Snapshot เดียวทั้งไฟล์
+        with engine.connect().execution_options(isolation_level=export.ISOLATION_LEVEL) as conn:
+            yield from export.iter_export(
+                conn, s_date, e_date,
+                shop_id=shop_id, lotto_type_id=lotto_type_id, user_id=user_id,
+                include_items=include_items, fmt=format, compress=gzip,
+            )
+
+    filename = export.export_filename(s_date, e_date, include_items, format, gzip)
+    return StreamingResponse(
+        body(),
+        media_type="application/gzip" if gzip else export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
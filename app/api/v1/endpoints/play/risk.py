@@ -8,7 +8,7 @@ from app.api import deps
 from app.schemas import NumberRiskCreate, NumberRiskResponse, BulkRiskCreate
 from app.db.session import get_db
 from app.models.lotto import NumberRisk
-from app.models.user import User, UserRole
+from app.models.user import UserRole
 from app.core.risk_cache import invalidate_cache
 
 router = APIRouter()
@@ -17,7 +17,7 @@ router = APIRouter()
 def create_bulk_risks(
     payload: BulkRiskCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -78,7 +78,7 @@ def clear_risks_by_date(
     lotto_id: UUID,
     date: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -109,7 +109,7 @@ def clear_risks_by_date(
 def get_all_daily_risks(
     date: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if date:
         try:
@@ -152,7 +152,7 @@ def get_risks(
     lotto_id: UUID,
     date: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if date:
         try:
@@ -175,7 +175,7 @@ def get_risks(
 def add_risk(
     risk_in: NumberRiskCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -208,7 +208,7 @@ def add_risk(
 def delete_risk(
     risk_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -1,25 +1,37 @@
-from decimal import Decimal
 from typing import Optional
-from datetime import datetime, time, date, timedelta
+from uuid import UUID
+from datetime import datetime, time, timedelta
 from sqlalchemy.orm import Session, joinedload
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, desc, extract, case
+from sqlalchemy import func, desc
 
 from app.api import deps
 from app.db.session import get_db
-from app.models.lotto import Ticket, TicketItem, TicketStatus
+from app.models.lotto import Ticket, TicketItem
 from app.models.user import User, UserRole
 
 from app.core.stats_cache import get_or_set_stats_cache
+from app.core.cache import shop_tag
+from app.db.partitions import round_date_filters
+from app.core import archiver, rollups, timeseries, top_numbers
+from app.core.config import get_thai_now, get_round_date
 
 router = APIRouter()
 
+def _shop_scope(current_user: deps.Principal):
+    """ร้านที่ดูสถิติได้: Admin = ร้านตัวเอง / Superadmin = None (ทุกร้าน)"""
+    if current_user.role != UserRole.admin:
+        return None
+    if not current_user.shop_id:
+        raise HTTPException(status_code=400, detail="User has no shop")
+    return current_user.shop_id
+
 @router.get("/stats/range") 
 def get_stats_range(
     start_date: str, 
     end_date: str,   
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -29,71 +41,42 @@ def get_stats_range(
     cache_key = f"stats_range_{shop_prefix}_{start_date}_{end_date}"
 
     # 🌟 2. หุ้มด้วย fetch_data
-    def fetch_data():
+    def fetch_data(db: Session):
         try:
             s_date = datetime.strptime(start_date, "%Y-%m-%d").date()
             e_date = datetime.strptime(end_date, "%Y-%m-%d").date()
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format")
 
-        start_utc = datetime.combine(s_date, time.min) - timedelta(hours=7)
-        end_utc = datetime.combine(e_date, time.max) - timedelta(hours=7)
+        # 📊 อ่านยอดระดับวันจาก daily_rollups (รวมบิลใน archive แล้ว) แทนการรวมบิลทีละใบ
+        totals = rollups.rollup_totals(db, s_date, e_date, shop_id=_shop_scope(current_user))
 
-        base_filters = [
-            Ticket.created_at >= start_utc,
-            Ticket.created_at <= end_utc
-        ]
-        if current_user.role == UserRole.admin:
-            base_filters.append(Ticket.shop_id == current_user.shop_id)
-
-        # 🚀 ลบ else_=0 ออกทั้งหมด เพื่อแก้บั๊ก Type Mismatch ของ PostgreSQL
-        summary = db.query(
-            func.count(Ticket.id).label("total_tickets"),
-            func.sum(case((Ticket.status != TicketStatus.CANCELLED, Ticket.total_amount))).label("total_sales"),
-            func.sum(case((Ticket.status != TicketStatus.CANCELLED, Ticket.commission_amount))).label("total_commission"),
-            func.sum(case((Ticket.status == TicketStatus.PENDING, Ticket.total_amount))).label("total_pending"),
-            func.sum(case((Ticket.status == TicketStatus.CANCELLED, 1))).label("total_cancelled")
-        ).filter(*base_filters).first()
-
-        payout_query = db.query(func.sum(TicketItem.winning_amount))\
-            .join(Ticket)\
-            .filter(*base_filters)\
-            .filter(Ticket.status != TicketStatus.CANCELLED)\
-            .filter(TicketItem.status == 'WIN')
-        total_payout = payout_query.scalar() or 0
-
-        # ✅ ดักจับกันเหนียว กรณีไม่พบบิลเลย (ป้องกัน NoneType Error)
-        if summary:
-            total_sales = summary.total_sales or 0
-            total_pending = summary.total_pending or 0
-            total_commission = summary.total_commission or 0
-            total_tickets = summary.total_tickets or 0
-            total_cancelled = summary.total_cancelled or 0
-        else:
-            total_sales = total_pending = total_commission = total_tickets = total_cancelled = 0
-            
+        total_sales = totals["sales_amount"]
+        total_pending = totals["pending_amount"]
+        total_commission = totals["commission_amount"]
+        total_payout = totals["payout_amount"]
         profit = total_sales - total_payout - total_pending - total_commission
 
         return {
             "start_date": start_date,
             "end_date": end_date,
             "total_sales": total_sales,
-            "total_tickets": total_tickets,
+            "total_tickets": totals["bill_count"],
             "total_payout": total_payout,
             "total_pending": total_pending, 
-            "total_cancelled": total_cancelled,
+            "total_cancelled": totals["cancelled_count"],
             "total_commission": total_commission,
             "profit": profit
         }
 
     # 🌟 3. สั่งรันผ่าน Cache
-    return get_or_set_stats_cache(cache_key, fetch_data)
+    return get_or_set_stats_cache(cache_key, fetch_data, db, tags=[shop_tag(current_user.shop_id)])
 
 @router.get("/stats/summary")
 def get_summary_stats(
     period: str = "today",
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -103,33 +86,20 @@ def get_summary_stats(
     cache_key = f"stats_summary_{shop_prefix}_{period}"
 
     # 🌟 2. หุ้มด้วย fetch_data
-    def fetch_data():
-        today = date.today()
-        filters = []
+    def fetch_data(db: Session):
+        today = (datetime.utcnow() + timedelta(hours=7)).date()
+        s_date = e_date = None  # period อื่นๆ = ทั้งหมด
 
         if period == "today":
-            filters.append(func.date(Ticket.created_at) == today)
+            s_date = e_date = today
         elif period == "yesterday":
-            yesterday = today - timedelta(days=1)
-            filters.append(func.date(Ticket.created_at) == yesterday)
+            s_date = e_date = today - timedelta(days=1)
         elif period == "this_month":
-            filters.append(extract('month', Ticket.created_at) == today.month)
-            filters.append(extract('year', Ticket.created_at) == today.year)
-
-        filters.append(Ticket.status != TicketStatus.CANCELLED)
-
-        if current_user.role == UserRole.admin:
-            if not current_user.shop_id:
-                raise HTTPException(status_code=400, detail="User has no shop")
-            filters.append(Ticket.shop_id == current_user.shop_id)
+            s_date, e_date = today.replace(day=1), today
 
-        total_sales = db.query(func.sum(Ticket.total_amount)).filter(*filters).scalar() or 0
-
-        payout_query = db.query(func.sum(TicketItem.winning_amount))\
-            .join(Ticket)\
-            .filter(*filters)\
-            .filter(TicketItem.status == 'WIN')
-        total_payout = payout_query.scalar() or 0
+        totals = rollups.rollup_totals(db, s_date, e_date, shop_id=_shop_scope(current_user))
+        total_sales = totals["sales_amount"]
+        total_payout = totals["payout_amount"]
 
         return {
             "period": period,
@@ -139,25 +109,43 @@ def get_summary_stats(
         }
     
     # 🌟 3. สั่งรันผ่าน Cache
-    return get_or_set_stats_cache(cache_key, fetch_data)
+    return get_or_set_stats_cache(cache_key, fetch_data, db, tags=[shop_tag(current_user.shop_id)])
 
 @router.get("/stats/top_numbers")
 def get_top_numbers(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     limit: int = 200,
+    lotto_type_id: Optional[UUID] = None,
+    round_date: Optional[str] = None,
+    bet_type: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
+    """
+    เลขที่ถูกแทงมากสุด แยกตาม (เลข, ประเภทแทง)
+    - ส่ง lotto_type_id (+ round_date, ไม่ส่ง = งวดวันนี้) โดยไม่ส่งช่วงวันที่ → นับสดจาก RAM (app/core/top_numbers.py)
+    - ส่งช่วงวันที่ → รวมจาก ticket_items (+ archive) ตามวันที่กดแทง (Cache 60 วิ)
+    """
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
 
+    # ⚡ งวดที่กำลังขาย: ไม่แตะ DB (ยกเว้นครั้งแรกที่ตั้งต้นตัวนับ)
+    if lotto_type_id and not (start_date or end_date):
+        try:
+            r_date = datetime.strptime(round_date, "%Y-%m-%d").date() if round_date else get_round_date(get_thai_now())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format")
+        return top_numbers.get_live_top(
+            db, lotto_type_id, r_date, shop_id=_shop_scope(current_user), bet_type=bet_type, limit=limit
+        )
+
     # 🌟 1. สร้าง Cache Key 
     shop_prefix = f"shop_{current_user.shop_id}" if current_user.shop_id else "shop_ALL"
-    cache_key = f"top_numbers_{shop_prefix}_{start_date}_{end_date}_{limit}"
+    cache_key = f"top_numbers_{shop_prefix}_{start_date}_{end_date}_{limit}_{lotto_type_id}_{bet_type}"
 
     # 🌟 2. หุ้มด้วย fetch_data
-    def fetch_data():
+    def fetch_data(db: Session):
         today = (datetime.utcnow() + timedelta(hours=7)).date()
         if start_date and end_date:
             try:
@@ -173,33 +161,56 @@ def get_top_numbers(
         
         query = db.query(
             TicketItem.number,
+            TicketItem.bet_type,
             func.sum(TicketItem.amount).label("total_amount"),
             func.count(TicketItem.id).label("frequency")
         ).join(Ticket).filter(
             Ticket.created_at >= start_utc,
             Ticket.created_at <= end_utc,
-            Ticket.status != 'CANCELLED'
+            Ticket.status != 'CANCELLED',
+            *round_date_filters(s_date, e_date, Ticket.round_date, TicketItem.round_date)
         )
 
         if current_user.role == UserRole.admin:
             query = query.filter(Ticket.shop_id == current_user.shop_id)
+        if lotto_type_id:
+            query = query.filter(Ticket.lotto_type_id == lotto_type_id)
+        if bet_type:
+            query = query.filter(TicketItem.bet_type == bet_type)
+        query = query.group_by(TicketItem.number, TicketItem.bet_type)
+
+        # 🧊 ช่วงวันที่ย้อนไปถึง archive → รวมยอดรายเลขทั้ง 2 ที่ก่อนค่อยตัด Top N
+        if archiver.created_range_in_archive(db, s_date):
+            shop_id = current_user.shop_id if current_user.role == UserRole.admin else None
+            merged = archiver.archive_number_totals(
+                db, start_utc, end_utc, shop_id=shop_id, lotto_type_id=lotto_type_id, bet_type=bet_type
+            )
+            for r in query.all():
+                entry = merged.setdefault((r.number, r.bet_type), {"total_amount": 0, "frequency": 0})
+                entry["total_amount"] += r.total_amount
+                entry["frequency"] += r.frequency
+            top = sorted(merged.items(), key=lambda kv: kv[1]["total_amount"], reverse=True)[:limit]
+            return [
+                {"number": number, "bet_type": bt, "total_amount": v["total_amount"], "frequency": v["frequency"]}
+                for (number, bt), v in top
+            ]
             
-        results = query.group_by(TicketItem.number).order_by(desc("total_amount")).limit(limit).all()
+        results = query.order_by(desc("total_amount")).limit(limit).all()
             
         return [
-            {"number": r.number, "total_amount": r.total_amount, "frequency": r.frequency}
+            {"number": r.number, "bet_type": r.bet_type, "total_amount": r.total_amount, "frequency": r.frequency}
             for r in results
         ]
         
     # 🌟 3. สั่งรันผ่าน Cache
-    return get_or_set_stats_cache(cache_key, fetch_data)
+    return get_or_set_stats_cache(cache_key, fetch_data, db, tags=[shop_tag(current_user.shop_id)])
 
 @router.get("/stats/members")
 def get_member_stats(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -207,7 +218,7 @@ def get_member_stats(
     shop_prefix = f"shop_{current_user.shop_id}" if current_user.shop_id else "shop_ALL"
     cache_key = f"members_{shop_prefix}_{start_date}_{end_date}"
 
-    def fetch_data():
+    def fetch_data(db: Session):
         try:
             if start_date and end_date:
                 s_date = datetime.strptime(start_date, "%Y-%m-%d").date()
@@ -217,60 +228,83 @@ def get_member_stats(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format")
 
-        start_utc = datetime.combine(s_date, time.min) - timedelta(hours=7)
-        end_utc = datetime.combine(e_date, time.max) - timedelta(hours=7)
-
-        base_filters = [
-            Ticket.created_at >= start_utc,
-            Ticket.created_at <= end_utc
-        ]
-        if current_user.role == UserRole.admin:
-            base_filters.append(Ticket.shop_id == current_user.shop_id)
-
-        ticket_stats = db.query(
-            User.id.label("user_id"),
-            User.username,
-            User.full_name,
-            User.role,
-            User.commission_percent,
-            func.count(Ticket.id).label("bill_count"),
-            func.sum(case((Ticket.status != TicketStatus.CANCELLED, Ticket.total_amount))).label("total_bet"),
-            func.sum(case((Ticket.status == TicketStatus.CANCELLED, Ticket.total_amount))).label("cancelled_amount"),
-            func.sum(case((Ticket.status == TicketStatus.PENDING, Ticket.total_amount))).label("pending_amount"),
-            func.sum(case((Ticket.status != TicketStatus.CANCELLED, Ticket.commission_amount))).label("total_commission")
-        ).join(Ticket, User.id == Ticket.user_id).filter(*base_filters).group_by(
-            User.id, User.username, User.full_name, User.role, User.commission_percent
-        ).all()
-
-        win_stats = db.query(
-            Ticket.user_id,
-            func.sum(TicketItem.winning_amount).label("total_win")
-        ).join(Ticket, Ticket.id == TicketItem.ticket_id).filter(
-            *base_filters,
-            Ticket.status == TicketStatus.WIN,
-            TicketItem.status == 'WIN'
-        ).group_by(Ticket.user_id).all()
-
-        win_map = {str(w.user_id): w.total_win or Decimal(0) for w in win_stats}
+        # 📊 ยอดต่อสมาชิกจาก daily_rollups (รวมบิลใน archive แล้ว)
+        by_user = rollups.rollup_totals(db, s_date, e_date, shop_id=_shop_scope(current_user), group_by="user_id")
+        users = db.query(User).filter(User.id.in_(list(by_user))).all() if by_user else []
 
         results = []
-        for t in ticket_stats:
-            uid_str = str(t.user_id)
+        for u in users:
+            t = by_user[u.id]
             results.append({
-                "user_id": uid_str,
-                "username": t.username,
-                "full_name": t.full_name or "-",
-                "role": t.role.value,
-                "total_bet": t.total_bet or Decimal(0),
-                "total_win": win_map.get(uid_str, Decimal(0)),
-                "pending_amount": t.pending_amount or Decimal(0),
-                "cancelled_amount": t.cancelled_amount or Decimal(0),
-                "total_commission": t.total_commission or Decimal(0),
-                "commission_percent": float(t.commission_percent or 0),
-                "bill_count": t.bill_count or 0
+                "user_id": str(u.id),
+                "username": u.username,
+                "full_name": u.full_name or "-",
+                "role": u.role.value,
+                "total_bet": t["sales_amount"],
+                "total_win": t["payout_amount"],
+                "pending_amount": t["pending_amount"],
+                "cancelled_amount": t["cancelled_amount"],
+                "total_commission": t["commission_amount"],
+                "commission_percent": float(u.commission_percent or 0),
+                "bill_count": t["bill_count"]
             })
 
         results.sort(key=lambda x: x["total_bet"], reverse=True)
         return results
 
-    return get_or_set_stats_cache(cache_key, fetch_data)
\ No newline at end of file
+    return get_or_set_stats_cache(cache_key, fetch_data, db, tags=[shop_tag(current_user.shop_id)])
+
+
+# ช่วงวันที่สูงสุดต่อครั้ง (กันกราฟรายนาทีย้อนหลังทั้งเดือน)
+TIMESERIES_MAX_DAYS = {"minute": 2, "hour": 31}
+
+@router.get("/stats/timeseries")
+def get_stats_timeseries(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    interval: str = "minute",
+    lotto_type_id: Optional[UUID] = None,
+    shop_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    ยอดขาย + จำนวนบิล รายนาที/รายชั่วโมง ต่อ (ร้าน, หวย) - ไม่รวมบิลที่ยกเลิก
+    วันนี้อ่านจาก Ring Buffer ใน RAM / วันก่อนหน้าใช้ date_trunc บนตารางบิล (Cache 60 วิ)
+    """
+    if current_user.role not in [UserRole.superadmin, UserRole.admin]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if interval not in timeseries.INTERVALS:
+        raise HTTPException(status_code=400, detail="interval must be 'minute' or 'hour'")
+
+    today = (datetime.utcnow() + timedelta(hours=7)).date()
+    try:
+        s_date = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else today
+        e_date = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else s_date
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    if e_date < s_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (e_date - s_date).days + 1 > TIMESERIES_MAX_DAYS[interval]:
+        raise HTTPException(status_code=400, detail=f"Range too long for interval '{interval}' (max {TIMESERIES_MAX_DAYS[interval]} days)")
+
+    # Admin ดูได้แค่ร้านตัวเอง / Superadmin เลือกร้านได้ (ไม่ส่ง = ทุกร้าน)
+    scope = _shop_scope(current_user) or shop_id
+
+    rows = []
+    past_end = min(e_date, today - timedelta(days=1))
+    if s_date <= past_end:
+        cache_key = f"timeseries_shop_{scope or 'ALL'}_{lotto_type_id}_{s_date}_{past_end}_{interval}"
+        rows += get_or_set_stats_cache(cache_key, lambda session: timeseries.read_history(
+            session, s_date, past_end, interval, shop_id=scope, lotto_type_id=lotto_type_id,
+            include_archive=archiver.created_range_in_archive(session, s_date),
+        ), db, tags=[shop_tag(scope)])
+    if s_date <= today <= e_date:
+        rows += timeseries.read_today(db, shop_id=scope, lotto_type_id=lotto_type_id)
+
+    return {
+        "start_date": s_date.isoformat(),
+        "end_date": e_date.isoformat(),
+        "interval": interval,
+        "series": timeseries.build_series(rows, interval),
+    }
@@ -0,0 +1,62 @@
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+
+from app.api import deps
+from app.db.session import SessionLocal
+from app.models.user import UserRole
+from app.core import pubsub
+
+router = APIRouter()
+
+# EventSource ของ Browser ใส่ Header ไม่ได้ → รับ Token จาก ?token= ได้ด้วย
+optional_oauth2 = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login", auto_error=False)
+
+async def _authorize(token: str, shop_id: UUID) -> None:
+    """ตรวจสิทธิ์ด้วย Session ชั่วคราว (ไม่ถือ Connection DB ค้างไว้ตลอดอายุ Stream)"""
+    db = SessionLocal()
+    try:
+        user = await deps.get_current_user(token=token, db=db)
+    finally:
+        db.close()
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    if user.role == UserRole.superadmin:
+        return
+    if user.role != UserRole.admin or user.shop_id != shop_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+@router.get("/stream/{shop_id}")
+async def stream_shop_events(
+    shop_id: UUID,
+    token: Optional[str] = None,
+    header_token: Optional[str] = Depends(optional_oauth2),
+):
+    """
+    Server-Sent Events ของร้าน: ticket / sales / exposure / cancel / settlement
+    ได้ event "resync" เมื่ออ่านไม่ทัน (ให้ดึงยอดจาก /play/stats/* ใหม่)
+    """
+    access_token = header_token or token
+    if not access_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    await _authorize(access_token, shop_id)
+
+    async def event_stream():
+        # Subscribe ตอนเริ่มส่งจริง → Client หลุดก่อน Response เริ่ม = ไม่มี Queue ค้าง
+        sub = pubsub.subscribe(shop_id)
+        try:
+            yield b"retry: 3000\nevent: ready\ndata: {}\n\n"
+            # Client ปิดสายเมื่อไหร่ Starlette จะยกเลิก Generator นี้เอง (Heartbeat ของ Channel ทำให้รู้ภายใน 15 วิ)
+            while True:
+                yield await pubsub.read(sub)
+        finally:
+            pubsub.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
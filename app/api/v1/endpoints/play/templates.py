@@ -0,0 +1,91 @@
+from typing import List
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.schemas import BetTemplateCreate, BetTemplateResponse
+from app.db.session import get_db
+from app.models.lotto import BetTemplate
+from app.core import template_cache
+
+router = APIRouter()
+
+def _to_response(tmpl: BetTemplate) -> dict:
+    return {
+        "id": tmpl.id,
+        "name": tmpl.name,
+        "lotto_type_id": tmpl.lotto_type_id,
+        "items": [
+            {"number": n, "bet_type": bt, "amount": a}
+            for n, bt, a in template_cache.parse_items(tmpl.items)
+        ],
+        "created_at": tmpl.created_at
+    }
+
+def _get_own_template(db: Session, template_id: UUID, current_user: deps.Principal) -> BetTemplate:
+    tmpl = db.query(BetTemplate).filter(BetTemplate.id == template_id).first()
+    # ไม่บอกว่ามีอยู่จริงถ้าไม่ใช่เจ้าของ (กันการเดา ID)
+    if not tmpl or tmpl.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="ไม่พบโพยสำเร็จรูป")
+    return tmpl
+
+@router.get("/bet_templates", response_model=List[BetTemplateResponse])
+def list_bet_templates(
+    db: Session = Depends(get_db),
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    templates = db.query(BetTemplate).filter(
+        BetTemplate.user_id == current_user.id
+    ).order_by(BetTemplate.created_at.desc()).all()
+    return [_to_response(t) for t in templates]
+
+@router.post("/bet_templates", response_model=BetTemplateResponse)
+def create_bet_template(
+    tmpl_in: BetTemplateCreate,
+    db: Session = Depends(get_db),
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    # 🚀 validate รายการเลขผ่าน Pydantic แค่ครั้งเดียวตอนบันทึก แล้วเก็บแบบย่อ
+    new_tmpl = BetTemplate(
+        user_id=current_user.id,
+        shop_id=current_user.shop_id,
+        lotto_type_id=tmpl_in.lotto_type_id,
+        name=tmpl_in.name,
+        items=template_cache.pack_items(tmpl_in.items)
+    )
+    db.add(new_tmpl)
+    db.commit()
+    db.refresh(new_tmpl)
+    return _to_response(new_tmpl)
+
+@router.put("/bet_templates/{template_id}", response_model=BetTemplateResponse)
+def update_bet_template(
+    template_id: UUID,
+    tmpl_in: BetTemplateCreate,
+    db: Session = Depends(get_db),
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    tmpl = _get_own_template(db, template_id, current_user)
+
+    tmpl.name = tmpl_in.name
+    tmpl.lotto_type_id = tmpl_in.lotto_type_id
+    tmpl.items = template_cache.pack_items(tmpl_in.items)
+
+    db.commit()
+    template_cache.invalidate_template(str(template_id))
+    db.refresh(tmpl)
+    return _to_response(tmpl)
+
+@router.delete("/bet_templates/{template_id}")
+def delete_bet_template(
+    template_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    tmpl = _get_own_template(db, template_id, current_user)
+
+    db.delete(tmpl)
+    db.commit()
+    template_cache.invalidate_template(str(template_id))
+    return {"status": "deleted"}
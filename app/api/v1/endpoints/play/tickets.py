@@ -5,36 +5,97 @@ from uuid import UUID
 from sqlalchemy.orm import Session, joinedload, selectinload, noload
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from sqlalchemy import desc
-from app.core.limiter import limiter
+from app.core.limiter import limiter, user_key, shop_key
 from app.api import deps
 from app.schemas import TicketCreate, TicketResponse
 from app.db.session import get_db
-from app.models.lotto import Ticket, TicketItem, LottoType, TicketStatus, NumberRisk
+from app.models.lotto import Ticket, TicketItem, LottoType, TicketStatus, NumberRisk, BetTemplate, TicketArchive
 from app.models.user import User, UserRole
 from app.core.config import get_thai_now, get_round_date, settings
 import hashlib
 import json
 from app.core.history_cache import get_or_set_history
+from app.core.cache import shop_tag, user_tag
+from app.core import template_cache, archiver, pagination, rollups, timeseries, top_numbers, pubsub
 
 router = APIRouter()
 
+def _ticket_event(ticket) -> dict:
+    """ข้อมูลบิลสำหรับ Event (เก็บก่อน commit - หลัง commit ค่าใน ORM หมดอายุ อ่านอีกทีจะยิง SELECT)"""
+    return {"id": ticket.id, "user_id": ticket.user_id, "created_at": ticket.created_at}
+
+def _publish_ticket(info: dict, point: Optional[tuple], sign: int = 1) -> None:
+    """ส่ง Event บิลใหม่ (sign=1) / ยกเลิก (sign=-1) ให้ Dashboard ของร้าน (point จาก top_numbers.ticket_point)"""
+    if point is None:
+        return
+    _, shop_id, lotto_type_id, round_date, rows = point
+    amount = sum(a for _, _, a in rows)
+    pubsub.publish_many(shop_id, [
+        ("ticket" if sign > 0 else "cancel", {
+            **info, "lotto_type_id": lotto_type_id, "round_date": round_date, "total_amount": amount,
+        }),
+        ("sales", {
+            "lotto_type_id": lotto_type_id, "round_date": round_date, "amount": sign * amount, "tickets": sign,
+        }),
+        ("exposure", {
+            "lotto_type_id": lotto_type_id, "round_date": round_date,
+            "items": [{"number": n, "bet_type": bt, "amount": sign * a} for bt, n, a in rows],
+        }),
+    ])
+
 @router.post("/submit_ticket", response_model=TicketResponse)
-@limiter.limit("30/minute")
+# ต่อร้านรวมทุกคน / ต่อคน (ตัวล่างตรวจก่อน: คนที่เกินโควตาตัวเองไม่กินโควตาร้าน)
+@limiter.limit("600/minute", key_func=shop_key)
+@limiter.limit("30/minute", key_func=user_key)
 def submit_ticket(
     request: Request,
-    ticket_in: TicketCreate,
+    ticket_in: Optional[TicketCreate] = None,
+    template_id: Optional[UUID] = None,
+    lotto_type_id: Optional[UUID] = None,
+    scale: Decimal = Decimal("1"),
+    note: Optional[str] = None,
+    shop_id: Optional[UUID] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
+    # 0. เตรียมรายการเลข: ส่งมาใน Body ตามปกติ หรือใช้ "โพยสำเร็จรูป" (?template_id=) ที่เก็บไว้บน Server
+    #    (แบบโพยสำเร็จรูป Superadmin เลือกร้านด้วย ?shop_id= แทน shop_id ใน Body)
+    if template_id:
+        tmpl = template_cache.get_cached_template(
+            str(template_id),
+            lambda tid: db.query(BetTemplate).filter(BetTemplate.id == tid).first()
+        )
+        if not tmpl or tmpl["user_id"] != current_user.id:
+            raise HTTPException(status_code=404, detail="ไม่พบโพยสำเร็จรูป")
+        if scale <= 0:
+            raise HTTPException(status_code=400, detail="ตัวคูณยอดแทงต้องมากกว่า 0")
+
+        lotto_type_id = lotto_type_id or tmpl["lotto_type_id"]
+        bet_items = [
+            (number, bet_type, (amount * scale).quantize(Decimal("0.01")))
+            for number, bet_type, amount in tmpl["items"]
+        ]
+        req_shop_id = shop_id
+    elif ticket_in:
+        lotto_type_id = ticket_in.lotto_type_id
+        note = ticket_in.note
+        bet_items = [(i.number, i.bet_type, i.amount) for i in ticket_in.items]
+        req_shop_id = ticket_in.shop_id
+    else:
+        raise HTTPException(status_code=400, detail="กรุณาส่งรายการแทง หรือระบุ template_id")
+
+    if not lotto_type_id:
+        raise HTTPException(status_code=400, detail="กรุณาระบุประเภทหวย")
+
     # 1. ระบุ Shop ID
     target_shop_id = current_user.shop_id
-    if current_user.role == UserRole.superadmin and ticket_in.shop_id:
-        target_shop_id = ticket_in.shop_id
+    if current_user.role == UserRole.superadmin and req_shop_id:
+        target_shop_id = req_shop_id
     elif current_user.role == UserRole.admin:
         target_shop_id = current_user.shop_id
 
     # 2. ดึงข้อมูลหวย
-    lotto = db.query(LottoType).filter(LottoType.id == ticket_in.lotto_type_id).first()
+    lotto = db.query(LottoType).filter(LottoType.id == lotto_type_id).first()
     if not lotto:
         raise HTTPException(status_code=404, detail="ไม่พบประเภทหวย")
     
@@ -133,7 +194,7 @@ def submit_ticket(
     r_end = datetime.combine(target_round_date, time.max) - timedelta(hours=7)
 
     daily_risks = db.query(NumberRisk).filter(
-        NumberRisk.lotto_type_id == ticket_in.lotto_type_id,
+        NumberRisk.lotto_type_id == lotto_type_id,
         NumberRisk.shop_id == target_shop_id, 
         NumberRisk.created_at >= r_start,
         NumberRisk.created_at <= r_end
@@ -158,12 +219,12 @@ def submit_ticket(
         except:
             return Decimal(str(default_val))
 
-    for item_in in ticket_in.items:
-        check_key = f"{item_in.number}:{item_in.bet_type}"
-        check_key_all = f"{item_in.number}:ALL"
+    for number, bet_type, amount in bet_items:
+        check_key = f"{number}:{bet_type}"
+        check_key_all = f"{number}:ALL"
         risk_status = risk_map.get(check_key) or risk_map.get(check_key_all)
 
-        rate_config = rates.get(item_in.bet_type, {})
+        rate_config = rates.get(bet_type, {})
         base_pay = Decimal(0)
         min_bet = Decimal("1")
         max_bet = Decimal("0")
@@ -176,7 +237,7 @@ def submit_ticket(
             min_bet = safe_dec(rate_config.get('min'), 1)
             max_bet = safe_dec(rate_config.get('max'), 0)
 
-        final_amount = Decimal(str(item_in.amount)) 
+        final_amount = Decimal(str(amount)) 
         final_rate = base_pay
         
         if risk_status == "CLOSE":
@@ -185,30 +246,32 @@ def submit_ticket(
         elif risk_status == "HALF":
             final_rate = base_pay / 2
             if final_amount < min_bet:
-                raise HTTPException(status_code=400, detail=f"แทงขั้นต่ำ {min_bet:,.0f} บาท ({item_in.bet_type})")
+                raise HTTPException(status_code=400, detail=f"แทงขั้นต่ำ {min_bet:,.0f} บาท ({bet_type})")
             if max_bet > 0 and final_amount > max_bet:
-                raise HTTPException(status_code=400, detail=f"แทงสูงสุด {max_bet:,.0f} บาท ({item_in.bet_type})")
+                raise HTTPException(status_code=400, detail=f"แทงสูงสุด {max_bet:,.0f} บาท ({bet_type})")
         else:
             if base_pay == 0:
-                 raise HTTPException(status_code=400, detail=f"ไม่พบอัตราจ่ายสำหรับ: {item_in.bet_type}")
+                 raise HTTPException(status_code=400, detail=f"ไม่พบอัตราจ่ายสำหรับ: {bet_type}")
             if final_amount < min_bet:
-                raise HTTPException(status_code=400, detail=f"แทงขั้นต่ำ {min_bet:,.0f} บาท ({item_in.bet_type})")
+                raise HTTPException(status_code=400, detail=f"แทงขั้นต่ำ {min_bet:,.0f} บาท ({bet_type})")
             if max_bet > 0 and final_amount > max_bet:
-                raise HTTPException(status_code=400, detail=f"แทงสูงสุด {max_bet:,.0f} บาท ({item_in.bet_type})")
+                raise HTTPException(status_code=400, detail=f"แทงสูงสุด {max_bet:,.0f} บาท ({bet_type})")
 
         processed_items.append({
-            "number": item_in.number,
-            "bet_type": item_in.bet_type,
+            "number": number,
+            "bet_type": bet_type,
             "amount": final_amount,
             "reward_rate": final_rate
         })
         total_amount += final_amount
 
     # 6. ตรวจสอบยอดเงินเบื้องต้น (แบบไม่ Lock เพื่อให้คืนค่า Error ไวที่สุดถ้าเงินไม่พอ)
-    if Decimal(str(current_user.credit_balance)) < total_amount:
+    # ยอดเงินไม่อยู่ใน Principal (Cache) → อ่านเฉพาะคอลัมน์นี้จาก DB
+    balance = Decimal(str(db.query(User.credit_balance).filter(User.id == current_user.id).scalar() or 0))
+    if balance < total_amount:
         raise HTTPException(
             status_code=400, 
-            detail=f"ยอดเงินไม่พอ (ขาด {total_amount - Decimal(str(current_user.credit_balance)):,.2f} บาท)"
+            detail=f"ยอดเงินไม่พอ (ขาด {total_amount - balance:,.2f} บาท)"
         )
 
     try:
@@ -219,9 +282,9 @@ def submit_ticket(
         new_ticket = Ticket(
             shop_id=target_shop_id,
             user_id=current_user.id,
-            lotto_type_id=ticket_in.lotto_type_id,
+            lotto_type_id=lotto_type_id,
             round_date=target_round_date,
-            note=ticket_in.note,
+            note=note,
             total_amount=total_amount,
             commission_amount=comm_amount,
             status=TicketStatus.PENDING
@@ -233,6 +296,7 @@ def submit_ticket(
         items_to_insert = [
             TicketItem(
                 ticket_id=new_ticket.id,
+                round_date=target_round_date,
                 number=p["number"],
                 bet_type=p["bet_type"],
                 amount=p["amount"],
@@ -254,8 +318,17 @@ def submit_ticket(
         # หักเงิน
         user_db.credit_balance = current_credit - total_amount
 
+        # 📊 บวกยอดเข้า daily_rollups (Transaction เดียวกับบิล)
+        rollups.record_ticket(db, after=rollups.ticket_snapshot(new_ticket))
+
         db.commit()
         db.refresh(new_ticket)
+
+        # 📈 กราฟรายนาที (RAM) - หลัง commit เท่านั้น
+        timeseries.record(timeseries.ticket_point(new_ticket))
+        top_point = top_numbers.ticket_point(new_ticket, processed_items)
+        top_numbers.record(top_point)
+        _publish_ticket(_ticket_event(new_ticket), top_point)
         return new_ticket
 
     except HTTPException as he:
@@ -271,7 +344,7 @@ def cancel_ticket(
     background_tasks: BackgroundTasks,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     ticket = db.query(Ticket).options(joinedload(Ticket.user), joinedload(Ticket.lotto_type)).filter(Ticket.id == ticket_id).first()
     if not ticket:
@@ -291,6 +364,12 @@ def cancel_ticket(
         raise HTTPException(status_code=403, detail="Not authorized")
 
     try:
+        rollup_before = rollups.ticket_snapshot(ticket)
+        # บิลที่ยังไม่ถูกยกเลิกเท่านั้นที่ต้องหักออกจากกราฟรายนาที
+        ts_point = timeseries.ticket_point(ticket) if ticket.status != TicketStatus.CANCELLED else None
+        top_point = top_numbers.ticket_point(ticket, ticket.items) if ticket.status != TicketStatus.CANCELLED else None
+        event_info = _ticket_event(ticket)
+
         # คำนวณเงินที่จะคืนและเงินที่จะดึงกลับ
         refund_amount = Decimal(ticket.total_amount)
         reclaim_reward = Decimal(0)
@@ -313,7 +392,14 @@ def cancel_ticket(
             item.status = TicketStatus.CANCELLED
             item.winning_amount = 0
 
+        # 📊 ย้ายยอดจากขาย/รอผล/จ่าย ไปเป็นยอดยกเลิก (flush ก่อน ให้ล็อก users ก่อน daily_rollups เหมือนตอนส่งโพย)
+        db.flush()
+        rollups.record_ticket(db, rollup_before, rollups.ticket_snapshot(ticket))
+
         db.commit()
+        timeseries.record(ts_point, sign=-1)
+        top_numbers.record(top_point, sign=-1)
+        _publish_ticket(event_info, top_point, sign=-1)
         return {
             "status": "success", 
             "message": "Ticket cancelled", 
@@ -335,9 +421,17 @@ def read_history(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    use_cursor: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
+    # 🚀 Keyset Pagination: ส่ง use_cursor=true (หน้าแรก) หรือ cursor=... (หน้าถัดไป)
+    # จะได้ {"items": [...], "next_cursor": "..."} แทน List (skip/limit แบบเดิมยังใช้ได้)
+    if cursor or use_cursor: skip = 0
+    # Keyset ดึงเกิน 1 แถวไว้ดูว่ายังมีหน้าถัดไปไหม (pagination.keyset_page ตัดทิ้งเอง)
+    fetch_limit = limit + 1 if cursor or use_cursor else limit
+
     # 1. จัดการวันที่ (ใช้วันนี้เป็น Default)
     thai_today = get_thai_now().date()
     s_date_str = start_date or date or thai_today.strftime("%Y-%m-%d")
@@ -350,7 +444,7 @@ def read_history(
 
     # 3. สร้าง Cache Key (เหมือนรหัสบัตรประชาชนของ Request นี้)
     key_dict = {
-        "user_id": str(current_user.id), "skip": skip, "limit": limit,
+        "user_id": str(current_user.id), "skip": skip, "limit": fetch_limit,
         "start": s_date_str, "end": e_date_str, 
         "lotto": str(lotto_type_id) if lotto_type_id else "ALL",
         "status": status or "ALL"
@@ -359,7 +453,7 @@ def read_history(
     cache_key = f"history_client_{hashlib.md5(json.dumps(key_dict, sort_keys=True).encode()).hexdigest()}"
 
     # 4. ฟังก์ชันดึง Database (จะถูกเรียกก็ต่อเมื่อไม่มี Cache)
-    def fetch_from_db():
+    def fetch_from_db(after: Optional[str] = None):
         try:
             s_d = datetime.strptime(s_date_str, "%Y-%m-%d").date()
             e_d = datetime.strptime(e_date_str, "%Y-%m-%d").date()
@@ -379,12 +473,46 @@ def read_history(
         if lotto_type_id: query = query.filter(Ticket.lotto_type_id == lotto_type_id)
         if status and status != 'ALL': query = query.filter(Ticket.status == status)
 
-        orm_results = query.order_by(Ticket.created_at.desc()).offset(skip).limit(limit).all()
+        # 🧊 ช่วงวันที่ย้อนไปถึงงวดที่ถูกย้ายเข้า archive แล้ว → ดึงทั้ง 2 ที่มารวมกัน
+        archive_query = None
+        if archiver.round_range_in_archive(db, s_d):
+            archive_query = db.query(TicketArchive).options(
+                joinedload(TicketArchive.lotto_type)
+            ).filter(
+                TicketArchive.user_id == current_user.id,
+                TicketArchive.round_date >= s_d,
+                TicketArchive.round_date <= e_d
+            )
+            if lotto_type_id: archive_query = archive_query.filter(TicketArchive.lotto_type_id == lotto_type_id)
+            if status and status != 'ALL': archive_query = archive_query.filter(TicketArchive.status == status)
+
+        # หน้าถัดไปของ Keyset: ต่อจากแถวสุดท้ายของหน้าก่อน (ไม่ต้องอ่านทิ้ง skip แถว)
+        if after:
+            query = query.filter(pagination.keyset_filter(Ticket.created_at, Ticket.id, after))
+            if archive_query is not None:
+                archive_query = archive_query.filter(pagination.keyset_filter(TicketArchive.created_at, TicketArchive.id, after))
+
+        if archive_query is not None:
+            hot = query.order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(skip + fetch_limit).all()
+            cold = archive_query.order_by(TicketArchive.created_at.desc(), TicketArchive.id.desc()).limit(skip + fetch_limit).all()
+            return archiver.merge_history(
+                [TicketResponse.model_validate(t, from_attributes=True).model_dump() for t in hot],
+                [TicketResponse.model_validate(archiver.archive_to_response(a), from_attributes=True).model_dump() for a in cold],
+                skip, fetch_limit
+            )
+
+        orm_results = query.order_by(Ticket.created_at.desc(), Ticket.id.desc()).offset(skip).limit(fetch_limit).all()
         # 🚀 เพิ่ม from_attributes=True เข้าไปในวงเล็บ
         return [TicketResponse.model_validate(t, from_attributes=True).model_dump() for t in orm_results]
     
     # 5. เรียกใช้สมองกล
-    return get_or_set_history(cache_key, is_past, fetch_from_db)
+    # หน้าถัดๆ ไปของ Keyset อ่านแค่ limit แถวอยู่แล้ว → ไม่ต้องเก็บ Cache แยกทีละ cursor
+    if cursor:
+        return pagination.keyset_page(fetch_from_db(cursor), limit)
+    # หน้าแรกของ Keyset ดึง limit + 1 แถว → Cache คนละก้อนกับ skip=0 (fetch_limit อยู่ใน cache_key)
+    rows = get_or_set_history(cache_key, is_past, fetch_from_db,
+                              tags=[user_tag(current_user.id), shop_tag(current_user.shop_id)])
+    return pagination.keyset_page(rows, limit) if use_cursor else rows
 
 @router.get("/shop_history")
 def get_shop_tickets(
@@ -394,11 +522,16 @@ def get_shop_tickets(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     user_id: Optional[UUID] = None,
+    cursor: Optional[str] = None,
+    use_cursor: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if not current_user.shop_id:
          raise HTTPException(status_code=400, detail="No shop assigned")
+    if cursor or use_cursor: skip = 0
+    # Keyset ดึงเกิน 1 แถวไว้ดูว่ายังมีหน้าถัดไปไหม (pagination.keyset_page ตัดทิ้งเอง)
+    fetch_limit = limit + 1 if cursor or use_cursor else limit
 
     thai_today = get_thai_now().date()
     s_date_str = start_date or date or thai_today.strftime("%Y-%m-%d")
@@ -408,14 +541,14 @@ def get_shop_tickets(
     is_past = e_date_obj < thai_today
 
     key_dict = {
-        "shop_id": str(current_user.shop_id), "skip": skip, "limit": limit,
+        "shop_id": str(current_user.shop_id), "skip": skip, "limit": fetch_limit,
         "start": s_date_str, "end": e_date_str, 
         "user": str(user_id) if user_id else "ALL"
     }
     cache_key = f"history_shop_{hashlib.md5(json.dumps(key_dict, sort_keys=True).encode()).hexdigest()}"
 
     # ในฟังก์ชัน get_shop_tickets -> fetch_from_db()
-    def fetch_from_db():
+    def fetch_from_db(after: Optional[str] = None):
         try:
             s_d = datetime.strptime(s_date_str, "%Y-%m-%d").date()
             e_d = datetime.strptime(e_date_str, "%Y-%m-%d").date()
@@ -436,23 +569,57 @@ def get_shop_tickets(
 
         if user_id: query = query.filter(Ticket.user_id == user_id)
 
-        orm_results = query.order_by(Ticket.created_at.desc()).offset(skip).limit(limit).all()
+        # 🧊 รวมบิลจาก archive ถ้าช่วงวันที่ย้อนไปถึง
+        archive_query = None
+        if archiver.round_range_in_archive(db, s_d):
+            archive_query = db.query(TicketArchive).options(
+                joinedload(TicketArchive.user),
+                joinedload(TicketArchive.lotto_type)
+            ).filter(
+                TicketArchive.shop_id == current_user.shop_id,
+                TicketArchive.round_date >= s_d,
+                TicketArchive.round_date <= e_d
+            )
+            if user_id: archive_query = archive_query.filter(TicketArchive.user_id == user_id)
+
+        if after:
+            query = query.filter(pagination.keyset_filter(Ticket.created_at, Ticket.id, after))
+            if archive_query is not None:
+                archive_query = archive_query.filter(pagination.keyset_filter(TicketArchive.created_at, TicketArchive.id, after))
+
+        if archive_query is not None:
+            hot = query.order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(skip + fetch_limit).all()
+            cold = archive_query.order_by(TicketArchive.created_at.desc(), TicketArchive.id.desc()).limit(skip + fetch_limit).all()
+            return archiver.merge_history(
+                [TicketResponse.model_validate(t, from_attributes=True).model_dump() for t in hot],
+                [TicketResponse.model_validate(archiver.archive_to_response(a), from_attributes=True).model_dump() for a in cold],
+                skip, fetch_limit
+            )
+
+        orm_results = query.order_by(Ticket.created_at.desc(), Ticket.id.desc()).offset(skip).limit(fetch_limit).all()
         # 🚀 เพิ่ม from_attributes=True เข้าไปในวงเล็บ
         return [TicketResponse.model_validate(t, from_attributes=True).model_dump() for t in orm_results]
 
-    return get_or_set_history(cache_key, is_past, fetch_from_db)
+    if cursor:
+        return pagination.keyset_page(fetch_from_db(cursor), limit)
+    rows = get_or_set_history(cache_key, is_past, fetch_from_db, tags=[shop_tag(current_user.shop_id)])
+    return pagination.keyset_page(rows, limit) if use_cursor else rows
 
 # 🚀 API ใหม่: สำหรับดึงรายการเลขแทงเฉพาะบิลที่ลูกค้าต้องการดูรายละเอียด
 @router.get("/tickets/{ticket_id}/items")
 def get_ticket_items(
     ticket_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
-    # 1. เช็คว่าบิลมีจริงไหม
+    # 1. เช็คว่าบิลมีจริงไหม (ไม่เจอในตารางหลัก → อาจถูกย้ายเข้า archive แล้ว)
     ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    archived = None
     if not ticket:
-        raise HTTPException(status_code=404, detail="ไม่พบโพย")
+        archived = db.query(TicketArchive).filter(TicketArchive.id == ticket_id).first()
+        if not archived:
+            raise HTTPException(status_code=404, detail="ไม่พบโพย")
+        ticket = archived
         
     # 🌟 2. กำแพงตรวจสอบสิทธิ์ (อนุญาตแค่คนในร้านเดียวกัน)
     if current_user.role != UserRole.superadmin:
@@ -460,7 +627,13 @@ def get_ticket_items(
         if ticket.shop_id != current_user.shop_id:
             raise HTTPException(status_code=403, detail="ไม่มีสิทธิ์ดูโพยของร้านอื่น")
 
-    # 3. ดึงรายการเลขของบิลนี้ส่งกลับไป
-    items = db.query(TicketItem).filter(TicketItem.ticket_id == ticket_id).all()
+    if archived:
+        return archiver.unpack_items(archived)
+
+    # 3. ดึงรายการเลขของบิลนี้ส่งกลับไป (ระบุ round_date ให้ค้นแค่ partition เดือนเดียว)
+    items = db.query(TicketItem).filter(
+        TicketItem.ticket_id == ticket_id,
+        TicketItem.round_date == ticket.round_date
+    ).all()
     
     return items
\ No newline at end of file
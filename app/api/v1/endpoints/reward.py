@@ -4,16 +4,16 @@ from sqlalchemy import func
 from app.api import deps
 from app.db.session import get_db, SessionLocal
 from app.models.user import User, UserRole
-from app.models.lotto import Ticket, TicketItem, TicketStatus, LottoResult, NumberRisk, LottoType
+from app.models.lotto import Ticket, TicketItem, TicketStatus, LottoResult, NumberRisk, LottoType, TicketArchive
 from app.schemas import RewardRequest, RewardResultResponse, RewardHistoryResponse
 from app.core.config import get_thai_now, get_round_date, settings
 from decimal import Decimal
-from datetime import date
+from datetime import date, datetime
 from typing import List, Optional, Dict
 from uuid import UUID 
 from app.core.game_logic import check_is_win_precise
-from app.core.history_cache import get_or_set_history, clear_all_history_cache
-from app.core.stats_cache import invalidate_stats_cache  # 🌟 เพิ่มคำสั่งนี้
+from app.core import archiver, rollups, pubsub, number_stats, result_history, lotto_cache, http_cache, cache
+from app.core.cache import bus as cache_bus
 
 router = APIRouter()
 
@@ -43,8 +43,13 @@ def process_reward_background(target_code: str, target_date: date, top_3: str, b
         total_payout = Decimal(0)
         win_count = 0
         user_balance_adjustments: Dict[UUID, Decimal] = {}
+        rollup_deltas = {}
+        # ยอดต่อร้านสำหรับ Event "settlement" ของ Dashboard
+        shop_totals: Dict[UUID, Dict] = {}
 
         for ticket in all_tickets:
+            rollup_before = rollups.ticket_snapshot(ticket)
+
             # --- A. Rollback Phase (ดึงเงินคืนถ้าเคยถูกรางวัล) ---
             prev_win_amount = sum(item.winning_amount or 0 for item in ticket.items if item.status == TicketStatus.WIN)
             
@@ -92,6 +97,14 @@ def process_reward_background(target_code: str, target_date: date, top_3: str, b
                 ticket.status = TicketStatus.LOSE
                 ticket.winning_amount = 0
 
+            rollups.add_delta(rollup_deltas, rollup_before, rollups.ticket_snapshot(ticket))
+
+            shop_total = shop_totals.setdefault(ticket.shop_id, {"lotto_type_id": ticket.lotto_type_id, "tickets": 0, "winners": 0, "payout": Decimal(0)})
+            shop_total["tickets"] += 1
+            if is_ticket_win:
+                shop_total["winners"] += 1
+                shop_total["payout"] += ticket_payout
+
         # 4. 🚀 บันทึกการเปลี่ยนแปลงเงิน User (แบบรวดเดียวจบ)
         winning_uids = [uid for uid, amount in user_balance_adjustments.items() if amount != 0]
         
@@ -103,10 +116,22 @@ def process_reward_background(target_code: str, target_date: date, top_3: str, b
             for user in affected_users:
                 user.credit_balance += user_balance_adjustments[user.id]
 
+        # 📊 ปรับยอดรอผล → ยอดจ่าย ใน daily_rollups (Statement เดียว, หลังล็อก users เหมือนตอนส่งโพย)
+        db.flush()
+        rollups.apply_deltas(db, rollup_deltas)
+
         db.commit() # เซฟลง Database รวดเดียวจบ!
         
-        clear_all_history_cache()
-        invalidate_stats_cache()
+        # ล้างประวัติบิล / หน้าสถิติ เฉพาะร้านและลูกค้าที่มีบิลในงวดนี้ (รวมมุมมองรวมทุกร้าน)
+        cache_bus.invalidate(None, tags=[
+            cache.shop_tag(None),
+            *(cache.shop_tag(shop_id) for shop_id in shop_totals),
+            *(cache.user_tag(user_id) for user_id in {t.user_id for t in all_tickets}),
+        ])
+        for shop_id, shop_total in shop_totals.items():
+            pubsub.publish(shop_id, "settlement", {
+                **shop_total, "code": target_code, "round_date": target_date, "top_3": top_3, "bottom_2": bottom_2,
+            })
         print(f"✅ Background Reward Issue Success! Processed {len(all_tickets)} tickets.")
 
     except Exception as e:
@@ -125,7 +150,7 @@ def issue_reward(
     background_tasks: BackgroundTasks,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.superadmin, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -139,6 +164,17 @@ def issue_reward(
     source_lotto = db.query(LottoType).get(data.lotto_type_id)
     if not source_lotto:
         raise HTTPException(status_code=404, detail="Lotto type not found")
+
+    # 🧊 งวดที่ย้ายเข้า Cold Archive แล้วตรวจรางวัลซ้ำไม่ได้ (บิลไม่อยู่ในตารางหลักแล้ว)
+    if archiver.round_range_in_archive(db, target_date):
+        is_archived = db.query(TicketArchive.id).join(
+            LottoType, LottoType.id == TicketArchive.lotto_type_id
+        ).filter(
+            LottoType.code == source_lotto.code,
+            TicketArchive.round_date == target_date
+        ).first()
+        if is_archived:
+            raise HTTPException(status_code=400, detail="งวดนี้ถูกย้ายเข้าคลังข้อมูลเก่าแล้ว ไม่สามารถออกผลใหม่ได้")
         
     # 🌟 1. [เพิ่มใหม่] เซฟเลขรางวัลลงตาราง LottoResult "ทันที" เพื่อให้หน้าเว็บเห็นเลขปุ๊บปั๊บ
     related_lottos = db.query(LottoType).filter(LottoType.code == source_lotto.code).all()
@@ -162,8 +198,15 @@ def issue_reward(
                 reward_data={"top": data.top_3, "bottom": data.bottom_2}
             )
             db.add(new_result)
+
+    # ผลระดับ Code (1 แถวต่องวด) สำหรับกระดานรายวัน / ประวัติ - อยู่ใน Transaction เดียวกัน
+    result_history.save_code_result(
+        db, source_lotto.code, target_date, data.top_3, data.bottom_2,
+        {"top": data.top_3, "bottom": data.bottom_2}
+    )
             
     db.commit() # เซฟเลขลง Database ทันที!
+    result_history.record_result(source_lotto.code, target_date, data.top_3, data.bottom_2)
 
     # 🌟 เปลี่ยนจากการโยนเข้า Background Task เป็นการเรียกใช้งานตรงๆ ไปเลย
     process_reward_background(
@@ -182,34 +225,19 @@ def issue_reward(
 @router.get("/daily") 
 def get_daily_rewards(
     date: str, 
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
-    # 1. ดึงผลรางวัลทั้งหมดของวันนี้ พร้อมข้อมูลหวยมาด้วย
-    results = db.query(LottoResult, LottoType).join(
-        LottoType, LottoResult.lotto_type_id == LottoType.id
-    ).filter(
-        LottoResult.round_date == date
-    ).all()
-    
-    # 2. จำผลรางวัลไว้ในหน่วยความจำโดยอ้างอิงจาก "รหัสหวย (Code)" เช่น THAI, LAOS
-    code_results = {}
-    for r, lotto in results:
-        if lotto.code:
-            code_results[lotto.code] = {
-                "top_3": r.top_3 or (r.reward_data.get("top") if r.reward_data else ""), 
-                "bottom_2": r.bottom_2 or (r.reward_data.get("bottom") if r.reward_data else ""),
-                "created_at": r.created_at
-            }
-            
-    # 3. จ่ายผลรางวัลกลับไปให้ "ทุกร้าน" ที่มีรหัสหวยตรงกัน (ใส่ร้านเดียว เห็นทุกร้าน!)
-    all_lottos = db.query(LottoType).all()
-    final_map = {}
-    for lotto in all_lottos:
-        if lotto.code in code_results:
-            final_map[str(lotto.id)] = code_results[lotto.code]
-            
-    return final_map
+    try:
+        round_date = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format (YYYY-MM-DD)")
+
+    # 1. ผลรางวัลของวันนี้ต่อ "รหัสหวย (Code)" เช่น THAI, LAOS (1 แถวต่อ Code, งวดที่ผ่านไปแล้วจำไว้ใน RAM)
+    # 2. จ่ายผลรางวัลกลับไปให้ "ทุกร้าน" ที่มีรหัสหวยตรงกัน (ใส่ร้านเดียว เห็นทุกร้าน!) - แปลง JSON ไว้แล้วใน result_history
+    code_index = lotto_cache.get_code_index(lambda: db.query(LottoType).order_by(LottoType.id).all())
+    return http_cache.respond(request, result_history.get_daily_board(db, round_date, code_index))
 
 
 @router.get("/history")
@@ -217,29 +245,34 @@ def get_reward_history(
     lotto_type_id: UUID,
     limit: int = 10,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
-    # 1. หา Code ของหวยตัวนี้
-    target_lotto = db.query(LottoType).get(lotto_type_id)
-    if not target_lotto or not target_lotto.code:
+    # 1. หา Code ของหวยตัวนี้ (จาก Cache รายการหวย)
+    target_lotto = lotto_cache.get_cached_lotto(lotto_type_id, lambda: db.query(LottoType).order_by(LottoType.id).all())
+    if not target_lotto or not target_lotto["code"]:
         return []
         
-    # 2. หา ID ของหวยชนิดนี้จาก "ทุกร้าน"
-    related_lottos = db.query(LottoType).filter(LottoType.code == target_lotto.code).all()
-    related_ids = [l.id for l in related_lottos]
-    
-    # 3. ดึงประวัติย้อนหลังและกรองไม่ให้วันที่ซ้ำกัน
-    results = db.query(LottoResult).filter(
-        LottoResult.lotto_type_id.in_(related_ids)
-    ).order_by(LottoResult.round_date.desc()).all()
-    
-    unique_results = {}
-    for r in results:
-        if r.round_date not in unique_results:
-            unique_results[r.round_date] = {
-                "round_date": r.round_date,
-                "top_3": r.top_3 or (r.reward_data.get("top") if r.reward_data else ""),
-                "bottom_2": r.bottom_2 or (r.reward_data.get("bottom") if r.reward_data else "")
-            }
-    
-    return list(unique_results.values())[:limit]
\ No newline at end of file
+    # 2. ผลล่าสุดของ Code นี้ (รวมทุกร้าน งวดละแถว) จาก RAM / DB เฉพาะ limit งวดที่ต้องใช้
+    return result_history.get_latest_results(db, target_lotto["code"], max(0, limit))
+
+
+@router.get("/number_stats")
+def get_reward_number_stats(
+    lotto_type_id: UUID,
+    rounds: Optional[int] = None,
+    top: int = 10,
+    db: Session = Depends(get_db),
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    สถิติเลขออกย้อนหลัง (เลขเด็ด / เลขดับ / เลขวิ่ง) ของหวย Code นี้ rounds งวดล่าสุด
+    ตอบจาก RAM (app/core/number_stats.py) ออกผลใหม่แล้วอัปเดตให้เอง
+    """
+    target_lotto = lotto_cache.get_cached_lotto(lotto_type_id, lambda: db.query(LottoType).order_by(LottoType.id).all())
+    if not target_lotto or not target_lotto["code"]:
+        raise HTTPException(status_code=404, detail="Lotto type not found")
+
+    if rounds is not None and rounds < 1:
+        raise HTTPException(status_code=400, detail="rounds must be at least 1")
+    top = max(1, min(top, 100))
+    return number_stats.get_number_stats(db, target_lotto["code"], rounds, top)
@@ -1,43 +1,55 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Response
 from uuid import UUID
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.api import deps
 from app.db.session import get_db
 from app.models.shop import Shop
-from app.models.user import User, UserRole
+from app.models.user import UserRole
 from app.schemas import ShopCreate, ShopUpdate, ShopResponse, ShopConfigUpdate
 from sqlalchemy import func
-from datetime import date, datetime, time, timedelta
-from app.models.lotto import Ticket, TicketItem, TicketStatus
+from datetime import date, datetime
+from app.models.lotto import DailyRollup
+from app.core.stats_cache import get_or_set_stats_cache
+from app.core.cache import shop_tag
+from app.core import timeseries, top_numbers, result_history, lotto_cache, config_cache, http_cache, principal_cache
 from app.models.lotto import LottoCategory
 
 router = APIRouter()
 
+# หน้าร้านเปิดโดยไม่ Login (ทุกคนเห็นเหมือนกัน) → ให้ Browser/CDN จำได้สั้นๆ
+SHOP_CONFIG_CACHE_CONTROL = "public, max-age=60"
+
 @router.get("/config/{subdomain}")
-def get_shop_config(subdomain: str, db: Session = Depends(get_db)):
-    # 1. ค้นหาร้านจาก Subdomain
-    shop = db.query(Shop).filter(Shop.subdomain == subdomain).first()
-    
-    # 2. ถ้าไม่เจอ หรือ ร้านถูกปิด/ลบ (Soft Delete) -> ระเบิด 404
-    if not shop or not shop.is_active:
+def get_shop_config(subdomain: str, request: Request, db: Session = Depends(get_db)):
+    def fetch():
+        # 1. ค้นหาร้านจาก Subdomain
+        shop = db.query(Shop).filter(Shop.subdomain == subdomain).first()
+
+        # 2. ถ้าไม่เจอ หรือ ร้านถูกปิด/ลบ (Soft Delete) -> ไม่มี Config
+        if not shop or not shop.is_active:
+            return None
+
+        # 3. ถ้าเจอ ส่ง ID และ Config กลับไป
+        return {
+            "id": shop.id,
+            "name": shop.name,
+            "logo_url": shop.logo_url,
+            "theme_color": shop.theme_color
+        }
+
+    config = config_cache.get_shop_config(subdomain, fetch)
+    if config is None:
         raise HTTPException(status_code=404, detail="Shop not found")
-        
-    # 3. ถ้าเจอ ส่ง ID และ Config กลับไป
-    return {
-        "id": shop.id,
-        "name": shop.name,
-        "logo_url": shop.logo_url,
-        "theme_color": shop.theme_color
-    }
+    return http_cache.respond(request, config, SHOP_CONFIG_CACHE_CONTROL)
 
 # [เพิ่มใหม่] API สำหรับ Admin ร้านค้า แก้ไขตั้งค่า LINE ของตัวเอง
 @router.put("/config")
 def update_shop_config(
     config_in: ShopConfigUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # Security: ต้องเป็น Admin หรือ Superadmin
     if current_user.role not in [UserRole.admin, UserRole.superadmin]:
@@ -66,6 +78,7 @@ def update_shop_config(
         shop.line_target_id = config_in.line_target_id
 
     db.commit()
+    config_cache.invalidate_shop_config()
     db.refresh(shop)
     
     return {"status": "success", "message": "Shop configuration updated"}
@@ -74,7 +87,7 @@ def update_shop_config(
 def create_shop(
     shop_in: ShopCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # Security: เฉพาะ Superadmin เท่านั้น
     if current_user.role != UserRole.superadmin:
@@ -119,6 +132,8 @@ def create_shop(
         )
         db.add(new_cat)
     db.commit()
+    config_cache.invalidate_shop_config()
+    config_cache.invalidate_categories()
     db.refresh(new_shop)
     return new_shop
 
@@ -127,7 +142,7 @@ def read_shops(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # Superadmin ดูได้ทุกร้าน
     if current_user.role == UserRole.superadmin:
@@ -144,7 +159,7 @@ def read_shops(
 def toggle_shop_status(
     shop_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # Security: เฉพาะ Superadmin
     if current_user.role != UserRole.superadmin:
@@ -157,6 +172,7 @@ def toggle_shop_status(
     # สลับสถานะ True <-> False
     shop.is_active = not shop.is_active
     db.commit()
+    config_cache.invalidate_shop_config()
     
     status_msg = "Activated" if shop.is_active else "Suspended"
     return {"status": "success", "message": f"Shop {status_msg}", "is_active": shop.is_active}
@@ -166,7 +182,7 @@ def toggle_shop_status(
 def delete_shop_permanently(
     shop_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # Security: เฉพาะ Superadmin
     if current_user.role != UserRole.superadmin:
@@ -182,10 +198,13 @@ def delete_shop_permanently(
         # 1. ลบรายการแทง และ โพย
         db.execute(text("DELETE FROM ticket_items WHERE ticket_id IN (SELECT id FROM tickets WHERE shop_id = :sid)"), {"sid": shop_id})
         db.execute(text("DELETE FROM tickets WHERE shop_id = :sid"), {"sid": shop_id})      
+        db.execute(text("DELETE FROM ticket_archives WHERE shop_id = :sid"), {"sid": shop_id})
+        db.execute(text("DELETE FROM daily_rollups WHERE shop_id = :sid"), {"sid": shop_id})
         
         # 2. ลบหวยที่ร้านสร้างเอง
         db.execute(text("DELETE FROM number_risks WHERE lotto_type_id IN (SELECT id FROM lotto_types WHERE shop_id = :sid)"), {"sid": shop_id})
         db.execute(text("DELETE FROM lotto_results WHERE lotto_type_id IN (SELECT id FROM lotto_types WHERE shop_id = :sid)"), {"sid": shop_id})
+        result_history.prune_code_results(db, "SELECT code FROM lotto_types WHERE shop_id = :sid", {"sid": shop_id})
         db.execute(text("DELETE FROM lotto_types WHERE shop_id = :sid"), {"sid": shop_id})
 
         # 3. ลบ Users ในร้าน
@@ -195,6 +214,14 @@ def delete_shop_permanently(
         db.delete(shop)
         
         db.commit()
+        lotto_cache.invalidate_lotto_cache()
+        config_cache.invalidate_shop_config()
+        config_cache.invalidate_categories()
+        config_cache.invalidate_rates()
+        principal_cache.invalidate_all_principals()
+        timeseries.clear_timeseries()
+        top_numbers.clear_top_numbers()
+        result_history.clear_result_history()
         return {"status": "success", "message": f"Shop {shop.name} and all associated data have been deleted permanently."}
 
     except Exception as e:
@@ -202,17 +229,28 @@ def delete_shop_permanently(
         print(f"Delete Shop Error: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete shop. Data might be linked to other resources.")
 
-# API ดูยอดขายรายร้าน (รองรับช่วงเวลา)
+# คอลัมน์ที่เรียงได้ (?sort_by=)
+PERFORMANCE_SORT_FIELDS = ("sales", "payout", "pending", "cancelled", "profit", "bill_count", "name", "created_at")
 
+# API ดูยอดขายรายร้าน (รองรับช่วงเวลา + เรียง/แบ่งหน้าฝั่ง Server)
 @router.get("/stats/performance")
 def get_shops_performance(
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    sort_by: str = "sales",
+    order: str = "desc",
+    skip: int = 0,
+    limit: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role != UserRole.superadmin:
         raise HTTPException(status_code=403, detail="Not authorized")
+    if sort_by not in PERFORMANCE_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of: {', '.join(PERFORMANCE_SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
 
     # 1. กำหนดช่วงเวลา (Default: วันนี้)
     if start_date and end_date:
@@ -224,75 +262,82 @@ def get_shops_performance(
     else:
         s_date = e_date = date.today()
 
-    # 2. แปลงเป็น UTC Range (Start 00:00 - End 23:59 ของไทย)
-    start_utc = datetime.combine(s_date, time.min) - timedelta(hours=7)
-    end_utc = datetime.combine(e_date, time.max) - timedelta(hours=7)
-    
-    shops = db.query(Shop).order_by(Shop.created_at.desc()).all()
-    results = []
-
-    for shop in shops:
-        # Base Filters (ร้าน + ช่วงเวลา)
-        filters = [
-            Ticket.shop_id == shop.id,
-            Ticket.created_at >= start_utc,
-            Ticket.created_at <= end_utc
-        ]
-
-        # A. ยอดขาย (Total Bet) - ไม่รวมบิลที่ยกเลิก
-        sales = db.query(func.sum(Ticket.total_amount))\
-            .filter(*filters, Ticket.status != TicketStatus.CANCELLED)\
-            .scalar() or 0
-
-        # B. ยอดจ่าย (Total Payout)
-        payout = db.query(func.sum(TicketItem.winning_amount))\
-            .join(Ticket)\
-            .filter(
-                *filters,
-                TicketItem.status == 'WIN',
-                Ticket.status != TicketStatus.CANCELLED
-            ).scalar() or 0
-
-        # ✅ C. ยอดรอผล (Pending) - เอาไว้หักออกจากกำไร
-        pending = db.query(func.sum(Ticket.total_amount))\
-            .filter(*filters, Ticket.status == TicketStatus.PENDING)\
-            .scalar() or 0
-
-        # ✅ D. ยอดที่ยกเลิก/คืน (Cancelled) - แสดงผลอย่างเดียว
-        cancelled = db.query(func.sum(Ticket.total_amount))\
-            .filter(*filters, Ticket.status == TicketStatus.CANCELLED)\
-            .scalar() or 0
-
-        bill_count = db.query(func.count(Ticket.id))\
-            .filter(*filters, Ticket.status != TicketStatus.CANCELLED)\
-            .scalar() or 0
-
-        # E. คำนวณกำไรสุทธิ (ตามสูตรใหม่: ยอดขาย - จ่าย - รอผล)
+    cache_key = f"shops_performance_shop_ALL_{s_date}_{e_date}_{sort_by}_{order}_{skip}_{limit}"
+
+    def fetch_data(db: Session):
+        # 📊 2. ยอดทุกร้านใน Query เดียว: shops LEFT JOIN (daily_rollups GROUP BY shop_id)
+        totals = db.query(
+            DailyRollup.shop_id.label("shop_id"),
+            func.sum(DailyRollup.sales_amount).label("sales"),       # A. ยอดขาย - ไม่รวมบิลที่ยกเลิก
+            func.sum(DailyRollup.payout_amount).label("payout"),     # B. ยอดจ่าย
+            func.sum(DailyRollup.pending_amount).label("pending"),   # C. ยอดรอผล - เอาไว้หักออกจากกำไร
+            func.sum(DailyRollup.cancelled_amount).label("cancelled"), # D. ยอดที่ยกเลิก/คืน - แสดงผลอย่างเดียว
+            func.sum(DailyRollup.bill_count - DailyRollup.cancelled_count).label("bill_count"),
+        ).filter(
+            DailyRollup.stat_date >= s_date,
+            DailyRollup.stat_date <= e_date
+        ).group_by(DailyRollup.shop_id).subquery()
+
+        sales = func.coalesce(totals.c.sales, 0)
+        payout = func.coalesce(totals.c.payout, 0)
+        pending = func.coalesce(totals.c.pending, 0)
+        # E. กำไรสุทธิ (ตามสูตรใหม่: ยอดขาย - จ่าย - รอผล)
         profit = sales - payout - pending
-
-        results.append({
-            "id": str(shop.id),
-            "name": shop.name,
-            "code": shop.code,
-            "logo_url": shop.logo_url,
+        columns = {
             "sales": sales,
             "payout": payout,
-            "pending": pending,     # ส่งยอดรอผลไปด้วยเผื่อใช้
-            "cancelled": cancelled, # ส่งยอดยกเลิกไปแสดงผล
+            "pending": pending,
+            "cancelled": func.coalesce(totals.c.cancelled, 0),
             "profit": profit,
-            "is_active": shop.is_active,
-            "bill_count": bill_count
-        })
-
-    results.sort(key=lambda x: x['sales'], reverse=True)
-    return results
+            "bill_count": func.coalesce(totals.c.bill_count, 0),
+            "name": Shop.name,
+            "created_at": Shop.created_at,
+        }
+
+        sort_col = columns[sort_by]
+        query = db.query(
+            Shop,
+            *[col.label(name) for name, col in columns.items() if name not in ("name", "created_at")],
+            func.count().over().label("total_shops")
+        ).outerjoin(totals, totals.c.shop_id == Shop.id).order_by(
+            sort_col.asc() if order == "asc" else sort_col.desc(),
+            Shop.created_at.desc()
+        ).offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+        rows = query.all()
+
+        # หน้าว่าง (skip เกินจำนวนร้าน) ไม่มีแถวให้อ่าน total จาก window → นับแยก
+        total = rows[0].total_shops if rows else db.query(func.count(Shop.id)).scalar()
+
+        return {
+            "total": total,
+            "items": [{
+                "id": str(r.Shop.id),
+                "name": r.Shop.name,
+                "code": r.Shop.code,
+                "logo_url": r.Shop.logo_url,
+                "sales": r.sales,
+                "payout": r.payout,
+                "pending": r.pending,     # ส่งยอดรอผลไปด้วยเผื่อใช้
+                "cancelled": r.cancelled, # ส่งยอดยกเลิกไปแสดงผล
+                "profit": r.profit,
+                "is_active": r.Shop.is_active,
+                "bill_count": r.bill_count
+            } for r in rows]
+        }
+
+    data = get_or_set_stats_cache(cache_key, fetch_data, db, tags=[shop_tag(None)])
+    # จำนวนร้านทั้งหมด (ใช้ทำปุ่มเปลี่ยนหน้า) ตัว Body ยังเป็น List เหมือนเดิม
+    response.headers["X-Total-Count"] = str(data["total"])
+    return data["items"]
 
 @router.put("/{shop_id}", response_model=ShopResponse)
 def update_shop(
     shop_id: UUID,
     shop_in: ShopUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # 1. เช็คว่าเป็น Superadmin ไหม
     if current_user.role != UserRole.superadmin:
@@ -319,5 +364,6 @@ def update_shop(
 
     db.add(shop)
     db.commit()
+    config_cache.invalidate_shop_config()
     db.refresh(shop)
     return shop
\ No newline at end of file
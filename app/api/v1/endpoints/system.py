@@ -1,19 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.api import deps
 from app.db.session import get_db
 from app.models.user import User, UserRole
 from app.models.shop import Shop  
-from app.models.lotto import Ticket
+from app.models.lotto import Ticket, TicketArchive
 from app.core import lotto_cache  # ✅ Import cache module
+from app.core import archiver, timeseries, top_numbers, stats_cache, pubsub, result_history, cache, token_revocation
+from app.core.cache import bus
 
 router = APIRouter()
 
 @router.get("/stats")
 def get_system_stats(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role != UserRole.superadmin:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -22,17 +25,19 @@ def get_system_stats(
     active_shops = db.query(Shop).filter(Shop.is_active == True).count()
     total_users = db.query(User).count()
     total_tickets = db.query(Ticket).count()
+    archived_tickets = db.query(TicketArchive).count()
 
     return {
         "total_shops": total_shops,
         "active_shops": active_shops,
         "total_users": total_users,
-        "total_tickets": total_tickets
+        "total_tickets": total_tickets + archived_tickets,
+        "archived_tickets": archived_tickets
     }
 
 @router.get("/cache/stats")
 def get_cache_stats(
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     """
     ดึงสถิติ Cache สำหรับ Monitoring (Admin/SuperAdmin เท่านั้น)
@@ -42,9 +47,50 @@ def get_cache_stats(
     
     return lotto_cache.get_cache_stats()
 
+@router.get("/cache/stats_cache")
+def get_stats_cache_metrics(
+    top: int = 50,
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Metrics ของ Cache หน้าสถิติ: hit / stale / miss และเวลาที่ใช้ดึงใหม่ต่อ Key (SuperAdmin เท่านั้น)
+    """
+    if current_user.role != UserRole.superadmin:
+        raise HTTPException(status_code=403, detail="SuperAdmin only")
+
+    return stats_cache.get_stats_cache_metrics(top)
+
+@router.get("/cache/metrics")
+def get_all_cache_metrics(
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Metrics ของ Cache ทุก Namespace ของ worker นี้: hit / stale / miss / โหลดซ้อน / evict / ขนาด
+    + L2 ที่ใช้ร่วมกัน (shm / redis) + สถานะการล้างข้าม worker (LISTEN/NOTIFY) + รายการเพิกถอน Refresh Token (SuperAdmin เท่านั้น)
+    """
+    if current_user.role != UserRole.superadmin:
+        raise HTTPException(status_code=403, detail="SuperAdmin only")
+
+    return {
+        "namespaces": cache.get_all_metrics(), "backend": cache.get_backend_stats(), "bus": bus.get_bus_stats(),
+        "token_revocations": token_revocation.get_revocation_stats(),
+    }
+
+@router.get("/stream/stats")
+def get_stream_stats(
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    จำนวนคนดู Dashboard Real-time และ Event ที่ส่ง/ทิ้ง ของ worker นี้ (SuperAdmin เท่านั้น)
+    """
+    if current_user.role != UserRole.superadmin:
+        raise HTTPException(status_code=403, detail="SuperAdmin only")
+
+    return pubsub.get_pubsub_stats()
+
 @router.post("/cache/invalidate")
 def force_invalidate_cache(
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     """
     Force invalidate cache ทันที (SuperAdmin เท่านั้น)
@@ -57,7 +103,7 @@ def force_invalidate_cache(
 
 @router.post("/cache/reset-metrics")
 def reset_cache_metrics(
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     """
     รีเซ็ต Cache Metrics (SuperAdmin เท่านั้น)
@@ -68,11 +114,43 @@ def reset_cache_metrics(
     lotto_cache.reset_cache_metrics()
     return {"status": "success", "message": "Metrics reset"}
 
+@router.post("/archive/run")
+def run_archive_job(
+    background_tasks: BackgroundTasks,
+    days: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    ย้ายงวดที่ตรวจรางวัลจบแล้วเข้า Cold Archive (SuperAdmin เท่านั้น)
+    ทำงานเบื้องหลัง ดูความคืบหน้าที่ /system/archive/stats
+    """
+    if current_user.role != UserRole.superadmin:
+        raise HTTPException(status_code=403, detail="SuperAdmin only")
+
+    if archiver.get_archive_stats()["is_running"]:
+        raise HTTPException(status_code=409, detail="Archive job is already running")
+
+    background_tasks.add_task(archiver.run_archive, days=days, max_seconds=max_seconds)
+    return {"status": "started"}
+
+@router.get("/archive/stats")
+def get_archive_stats(
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    สถิติ Archive Job (จำนวนบิลที่ย้าย, ความเร็ว tickets/s, รอบล่าสุด)
+    """
+    if current_user.role != UserRole.superadmin:
+        raise HTTPException(status_code=403, detail="SuperAdmin only")
+
+    return archiver.get_archive_stats()
+
 # 1. ล้างข้อมูลทั้งระบบ (Global Cleanup)
 @router.delete("/cleanup/global")
 def cleanup_global_data(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     """
     ล้างข้อมูลธุรกรรมทั้งหมดในระบบ (SuperAdmin เท่านั้น)
@@ -103,16 +181,29 @@ def cleanup_global_data(
         # 2. ลบ Tickets
         result = db.execute(text("DELETE FROM tickets"))
         print(f"   ✅ Deleted {result.rowcount} tickets")
+
+        # 2.1 ลบบิลเก่าใน Cold Archive
+        result = db.execute(text("DELETE FROM ticket_archives"))
+        print(f"   ✅ Deleted {result.rowcount} ticket_archives")
+
+        # 2.2 ลบยอดสรุปรายวัน (หน้าสถิติ)
+        result = db.execute(text("DELETE FROM daily_rollups"))
+        print(f"   ✅ Deleted {result.rowcount} daily_rollups")
         
         # 3. ลบผลรางวัล
         result = db.execute(text("DELETE FROM lotto_results"))
         print(f"   ✅ Deleted {result.rowcount} lotto_results")
+        result = db.execute(text("DELETE FROM code_results"))
+        print(f"   ✅ Deleted {result.rowcount} code_results")
         
         # 4. ✅ [NEW] ลบเลขอั้น
         result = db.execute(text("DELETE FROM number_risks"))
         print(f"   ✅ Deleted {result.rowcount} number_risks")
         
         db.commit()
+        timeseries.clear_timeseries()
+        top_numbers.clear_top_numbers()
+        result_history.clear_result_history()
         print("✅ Global Cleanup Complete!")
         
         return {
@@ -129,7 +220,7 @@ def cleanup_global_data(
 def cleanup_shop_data(
     shop_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     """
     ล้างข้อมูลธุรกรรมของร้านค้าเฉพาะ (SuperAdmin เท่านั้น)
@@ -163,6 +254,14 @@ def cleanup_shop_data(
         # 2. ลบ Tickets
         result = db.execute(text("DELETE FROM tickets WHERE shop_id = :sid"), params)
         print(f"   ✅ Deleted {result.rowcount} tickets")
+
+        # 2.1 ลบบิลเก่าใน Cold Archive
+        result = db.execute(text("DELETE FROM ticket_archives WHERE shop_id = :sid"), params)
+        print(f"   ✅ Deleted {result.rowcount} ticket_archives")
+
+        # 2.2 ลบยอดสรุปรายวัน (หน้าสถิติ)
+        result = db.execute(text("DELETE FROM daily_rollups WHERE shop_id = :sid"), params)
+        print(f"   ✅ Deleted {result.rowcount} daily_rollups")
         
         # 3. ✅ [FIX] ลบผลรางวัลของหวยในร้านนี้ (แก้ชื่อคอลัมน์ lotto_id → lotto_type_id)
         result = db.execute(text("""
@@ -170,6 +269,7 @@ def cleanup_shop_data(
             WHERE lotto_type_id IN (SELECT id FROM lotto_types WHERE shop_id = :sid)
         """), params)
         print(f"   ✅ Deleted {result.rowcount} lotto_results")
+        result_history.prune_code_results(db, "SELECT code FROM lotto_types WHERE shop_id = :sid", params)
         
         # 4. ✅ [FIX] ลบเลขอั้นผ่าน lotto_type_id (เพราะ shop_id nullable)
         result = db.execute(text("""
@@ -179,6 +279,9 @@ def cleanup_shop_data(
         print(f"   ✅ Deleted {result.rowcount} number_risks")
 
         db.commit()
+        timeseries.clear_timeseries()
+        top_numbers.clear_top_numbers()
+        result_history.clear_result_history()
         print(f"✅ Shop Cleanup Complete for shop_id: {shop_id}")
         
         return {
@@ -11,6 +11,7 @@ from app.db.session import get_db
 from datetime import timedelta
 from app.core.config import settings
 from app.models.shop import Shop
+from app.core import timeseries, top_numbers, principal_cache, token_revocation
 
 router = APIRouter()
 
@@ -19,7 +20,7 @@ router = APIRouter()
 def impersonate_shop_admin(
     shop_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # 1. เช็คว่าเป็น Superadmin
     if current_user.role != UserRole.superadmin:
@@ -43,7 +44,8 @@ def impersonate_shop_admin(
     access_token = create_access_token(
         subject=str(shop_admin.id), 
         role=shop_admin.role.value,
-        expires_delta=access_token_expires
+        expires_delta=access_token_expires,
+        shop_id=shop_admin.shop_id
     )
 
     return {
@@ -59,24 +61,27 @@ def impersonate_shop_admin(
 
 @router.get("/me", response_model=UserResponse)
 def read_user_me(
-    current_user: User = Depends(deps.get_current_active_user),
+    db: Session = Depends(get_db),
+    current_user: deps.Principal = Depends(deps.get_current_active_user),
 ):
     """
     ดึงข้อมูลของ User ที่ Login อยู่ปัจจุบัน พร้อมชื่อร้าน
     """
+    # ยอดเงิน / ชื่อ / ร้าน ล่าสุดจาก DB (Principal มีแค่ข้อมูลตรวจสิทธิ์)
+    user = db.query(User).filter(User.id == current_user.id).first()
     # ดึงชื่อร้าน ถ้ามี shop ผูกอยู่
-    shop_name = current_user.shop.name if current_user.shop else None
-    shop_logo = current_user.shop.logo_url if current_user.shop else None
+    shop_name = user.shop.name if user.shop else None
+    shop_logo = user.shop.logo_url if user.shop else None
     
     return {
-        "id": current_user.id,
-        "username": current_user.username,
-        "full_name": current_user.full_name,
-        "role": current_user.role,
-        "shop_id": current_user.shop_id,
-        "is_active": current_user.is_active,
-        "created_at": current_user.created_at,
-        "credit_balance": current_user.credit_balance,
+        "id": user.id,
+        "username": user.username,
+        "full_name": user.full_name,
+        "role": user.role,
+        "shop_id": user.shop_id,
+        "is_active": user.is_active,
+        "created_at": user.created_at,
+        "credit_balance": user.credit_balance,
         "shop_name": shop_name,
         "shop_logo": shop_logo
     }
@@ -86,7 +91,7 @@ def read_user_me(
 def read_shop_admins(
     shop_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role != UserRole.superadmin:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -102,7 +107,7 @@ def read_shop_admins(
 def create_shop_admin(
     user_in: UserCreate, 
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # 1. Security: เฉพาะ Superadmin เท่านั้น
     if current_user.role != UserRole.superadmin:
@@ -136,7 +141,7 @@ def create_shop_admin(
 def delete_user(
     user_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # 1. หา User ที่ต้องการลบ
     user_to_delete = db.query(User).filter(User.id == user_id).first()
@@ -172,12 +177,28 @@ def delete_user(
             {"uid": user_to_delete.id}
         )
 
+        # ลบโพยเก่าที่ถูกย้ายเข้า Cold Archive
+        db.execute(
+            text("DELETE FROM ticket_archives WHERE user_id = :uid"), 
+            {"uid": user_to_delete.id}
+        )
+
+        # ลบยอดสรุปรายวันของลูกค้าคนนี้ (หน้าสถิติ)
+        db.execute(
+            text("DELETE FROM daily_rollups WHERE user_id = :uid"), 
+            {"uid": user_to_delete.id}
+        )
+
         # 💡 (เผื่อไว้) ถ้าคุณมีตารางประวัติการเงิน เช่น transactions หรือ credit_logs ให้เอาคอมเมนต์ออกแล้วลบด้วย
         # db.execute(text("DELETE FROM transactions WHERE user_id = :uid"), {"uid": user_to_delete.id})
 
         # ลบตัว User เป็นอันดับสุดท้าย
         db.delete(user_to_delete)
         db.commit()
+        principal_cache.invalidate_principal(user_id)
+        token_revocation.revoke_user_sessions(user_id)
+        timeseries.clear_timeseries()
+        top_numbers.clear_top_numbers()
         
     except Exception as e:
         db.rollback()
@@ -192,7 +213,7 @@ def update_member_by_admin(
     user_id: UUID,
     user_in: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     """
     Admin รีเซ็ตรหัสผ่าน หรือแก้ไขข้อมูลให้ Member ในร้านตัวเอง
@@ -234,6 +255,10 @@ def update_member_by_admin(
 
     db.add(member)
     db.commit()
+    principal_cache.invalidate_principal(user_id)
+    # เปลี่ยนรหัส / ปิดบัญชี → Refresh Token ทุกเครื่องใช้ไม่ได้ (ต้อง Login ใหม่)
+    if user_in.password or user_in.is_active is False:
+        token_revocation.revoke_user_sessions(user_id)
     db.refresh(member)
     
     member.shop_name = member.shop.name if member.shop else None
@@ -244,7 +269,7 @@ def update_member_by_admin(
 def create_member(
     member_in: MemberCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if current_user.role not in [UserRole.admin, UserRole.superadmin]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -275,29 +300,35 @@ def create_member(
 def update_user_me(
     user_in: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     """
     ให้ Member แก้ไขข้อมูลส่วนตัว
     """
-    if user_in.username and user_in.username != current_user.username:
+    user = db.query(User).filter(User.id == current_user.id).first()
+
+    if user_in.username and user_in.username != user.username:
         existing_user = db.query(User).filter(User.username == user_in.username).first()
         if existing_user:
             raise HTTPException(status_code=400, detail="Username already taken")
-        current_user.username = user_in.username
+        user.username = user_in.username
 
     if user_in.password:
-        current_user.password_hash = get_password_hash(user_in.password)
+        user.password_hash = get_password_hash(user_in.password)
 
     if user_in.full_name is not None:
-        current_user.full_name = user_in.full_name
+        user.full_name = user_in.full_name
 
-    db.add(current_user)
+    db.add(user)
     db.commit()
-    db.refresh(current_user)
+    principal_cache.invalidate_principal(current_user.id)
+    # เปลี่ยนรหัสตัวเอง → ทุก Session (รวมเครื่องนี้) ต้อง Login ใหม่
+    if user_in.password:
+        token_revocation.revoke_user_sessions(current_user.id)
+    db.refresh(user)
     
-    current_user.shop_name = current_user.shop.name if current_user.shop else None
-    return current_user
+    user.shop_name = user.shop.name if user.shop else None
+    return user
 
 # 2. Admin ดูรายชื่อ Member ในร้านตัวเอง
 @router.get("/members", response_model=List[UserResponse])
@@ -305,7 +336,7 @@ def read_members(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     if not current_user.shop_id:
         return []
@@ -323,7 +354,7 @@ def adjust_credit(
     user_id: UUID,
     adjustment: CreditAdjustment,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # Security: ต้องเป็น Admin หรือ Superadmin
     if current_user.role not in [UserRole.admin, UserRole.superadmin]:
@@ -348,6 +379,7 @@ def adjust_credit(
 
     db.add(member)
     db.commit()
+    principal_cache.invalidate_principal(user_id)
     db.refresh(member)
     
     return member
@@ -357,7 +389,7 @@ def adjust_credit(
 def toggle_user_status(
     user_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    current_user: deps.Principal = Depends(deps.get_current_active_user)
 ):
     # 1. Security Check
     if current_user.role not in [UserRole.admin, UserRole.superadmin]:
@@ -384,5 +416,8 @@ def toggle_user_status(
         user.locked_until = None
 
     db.commit()
+    principal_cache.invalidate_principal(user_id)
+    if not user.is_active:
+        token_revocation.revoke_user_sessions(user_id)
     
     return {"status": "success", "is_active": user.is_active, "message": "User status updated"}
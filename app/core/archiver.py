@@ -0,0 +1,274 @@
+# app/core/archiver.py
+"""
+Cold Archive - ย้ายงวดที่ "ตรวจรางวัลจบแล้ว" และเก่ากว่า ARCHIVE_AFTER_DAYS วัน
+จาก tickets / ticket_items ไปเก็บที่ ticket_archives (1 แถวต่อบิล, รายการเลขรวมเป็น JSONB)
+
+- ทำทีละ batch (1 batch = 1 transaction: INSERT archive + DELETE บิลเดิม ใน SQL เดียว)
+  ถ้า Job ตายกลางทาง รันใหม่ก็ทำต่อจากที่ค้างได้เลย (บิลที่ย้ายแล้วไม่อยู่ในตารางหลักแล้ว)
+- กันรันซ้อนข้าม Worker ด้วย pg_try_advisory_lock
+- ฝั่งอ่าน (history / top_numbers) ใช้ helper ด้านล่างรวมผลจากทั้ง 2 ที่ให้เหมือนเดิม
+  (ยอดสรุปหน้าสถิติอ่านจาก daily_rollups ซึ่งนับบิลใน archive อยู่แล้ว)
+"""
+import time
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings, get_thai_now
+from app.models.lotto import TicketArchive
+
+# ห้ามย้ายงวดที่ใหม่กว่านี้ (การยกเลิกบิลและตรวจรางวัลซ้ำต้องเจอบิลในตารางหลักเสมอ)
+MIN_ARCHIVE_AFTER_DAYS = 35
+
+_ADVISORY_LOCK_KEY = 290_001
+_run_lock = threading.Lock()
+
+# 📊 Metrics ของ Job (ดูได้ที่ /system/archive/stats)
+_metrics_lock = threading.Lock()
+_ARCHIVE_METRICS: Dict[str, Any] = {
+    "runs": 0,
+    "total_tickets": 0,
+    "total_items": 0,
+    "total_rounds": 0,
+    "total_seconds": 0.0,
+    "is_running": False,
+    "last_run": None,
+}
+
+# Cache งวดล่าสุดที่อยู่ใน archive (ฝั่งอ่านใช้ตัดสินว่าต้องไปค้น archive ด้วยไหม)
+_max_round_cache: Dict[str, Any] = {"value": None, "expires": 0.0}
+MAX_ROUND_TTL = 60
+
+FIND_SETTLED_ROUNDS_SQL = text("""
+    SELECT lotto_type_id, round_date
+    FROM tickets
+    WHERE round_date < :cutoff
+    GROUP BY lotto_type_id, round_date
+    HAVING bool_and(status <> 'PENDING')
+    ORDER BY round_date, lotto_type_id
+    LIMIT :limit
+""")
+
+# ย้าย 1 batch: เลือกบิล → INSERT archive (รวมรายการเลขเป็น JSONB) → DELETE บิลเดิม (ticket_items ลบตาม FK CASCADE)
+MOVE_BATCH_SQL = text("""
+    WITH batch AS (
+        SELECT id, round_date FROM tickets
+        WHERE lotto_type_id IS NOT DISTINCT FROM :lotto_type_id AND round_date = :round_date
+          AND status <> 'PENDING'
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE
+    ), moved AS (
+        INSERT INTO ticket_archives (
+            id, shop_id, user_id, lotto_type_id, round_date, note, total_amount,
+            status, winning_amount, commission_amount, created_at, items_packed
+        )
+        SELECT t.id, t.shop_id, t.user_id, t.lotto_type_id, t.round_date, t.note, t.total_amount,
+               t.status, t.winning_amount, t.commission_amount, t.created_at,
+               COALESCE((
+                   SELECT jsonb_agg(jsonb_build_array(
+                       ti.id::text, ti.number, ti.bet_type, ti.amount::text,
+                       ti.reward_rate::text, COALESCE(ti.winning_amount, 0)::text, ti.status
+                   ))
+                   FROM ticket_items ti
+                   WHERE ti.ticket_id = t.id AND ti.round_date = t.round_date
+               ), '[]'::jsonb)
+        FROM tickets t JOIN batch b ON b.id = t.id AND b.round_date = t.round_date
+        ON CONFLICT (id) DO NOTHING
+        RETURNING jsonb_array_length(items_packed) AS item_count
+    ), removed AS (
+        DELETE FROM tickets t USING batch b
+        WHERE t.id = b.id AND t.round_date = b.round_date
+        RETURNING t.id
+    )
+    SELECT (SELECT count(*) FROM removed) AS tickets,
+           (SELECT COALESCE(sum(item_count), 0) FROM moved) AS items
+""")
+
+def _effective_days(days: Optional[int]) -> int:
+    # Job ใช้ค่าที่ "น้อยกว่า" การตั้งค่าไม่ได้ (ฝั่งอ่านอาศัยเงื่อนไขนี้)
+    return max(days or 0, settings.ARCHIVE_AFTER_DAYS, MIN_ARCHIVE_AFTER_DAYS)
+
+def run_archive(days: Optional[int] = None, batch_size: Optional[int] = None, max_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    ย้ายงวดที่ตรวจจบแล้วเข้า archive
+
+    Args:
+        days: ย้ายงวดที่เก่ากว่ากี่วัน (ใช้ค่าที่มากกว่าระหว่างนี้กับ ARCHIVE_AFTER_DAYS)
+        max_seconds: จำกัดเวลาต่อรอบ (หมดเวลาแล้วหยุด รอบหน้าทำต่อเอง)
+    """
+    from app.db.session import engine
+
+    if not _run_lock.acquire(blocking=False):
+        return {"status": "already_running"}
+
+    days = _effective_days(days)
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = get_thai_now().date() - timedelta(days=days)
+    started = time.perf_counter()
+    run = {
+        "status": "running",
+        "started_at": datetime.utcnow().isoformat(),
+        "cutoff": cutoff.isoformat(),
+        "tickets": 0, "items": 0, "rounds": 0, "batches": 0,
+    }
+    with _metrics_lock:
+        _ARCHIVE_METRICS["is_running"] = True
+        _ARCHIVE_METRICS["last_run"] = run
+
+    try:
+        with engine.connect() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _ADVISORY_LOCK_KEY}).scalar():
+                conn.rollback()
+                run["status"] = "locked_by_other_worker"
+                return run
+            try:
+                conn.commit()
+                run["status"] = _archive_rounds(conn, cutoff, batch_size, max_seconds, started, run)
+            finally:
+                conn.rollback()
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _ADVISORY_LOCK_KEY})
+                conn.commit()
+    except Exception as e:
+        run["status"] = "failed"
+        run["error"] = str(e)
+        print(f"❌ Archive failed: {e}")
+    finally:
+        elapsed = time.perf_counter() - started
+        run["seconds"] = round(elapsed, 3)
+        run["tickets_per_sec"] = round(run["tickets"] / elapsed, 1) if elapsed > 0 else 0
+        run["finished_at"] = datetime.utcnow().isoformat()
+        with _metrics_lock:
+            _ARCHIVE_METRICS["runs"] += 1
+            _ARCHIVE_METRICS["total_tickets"] += run["tickets"]
+            _ARCHIVE_METRICS["total_items"] += run["items"]
+            _ARCHIVE_METRICS["total_rounds"] += run["rounds"]
+            _ARCHIVE_METRICS["total_seconds"] += elapsed
+            _ARCHIVE_METRICS["is_running"] = False
+        _max_round_cache["expires"] = 0.0
+        _run_lock.release()
+
+    print(f"🧊 Archive {run['status']}: {run['tickets']} tickets / {run['items']} items "
+          f"in {run['seconds']}s ({run['tickets_per_sec']} tickets/s)")
+    return run
+
+def _archive_rounds(conn, cutoff: date, batch_size: int, max_seconds: Optional[float], started: float, run: dict) -> str:
+    while True:
+        rounds = conn.execute(FIND_SETTLED_ROUNDS_SQL, {"cutoff": cutoff, "limit": 100}).all()
+        conn.commit()
+        if not rounds:
+            return "completed"
+
+        for lotto_type_id, round_date in rounds:
+            while True:
+                if max_seconds and time.perf_counter() - started > max_seconds:
+                    return "paused"
+                row = conn.execute(MOVE_BATCH_SQL, {
+                    "lotto_type_id": lotto_type_id, "round_date": round_date, "batch_size": batch_size
+                }).one()
+                conn.commit()
+                run["tickets"] += row.tickets
+                run["items"] += int(row.items)
+                run["batches"] += 1
+                if row.tickets < batch_size:
+                    break
+            run["rounds"] += 1
+
+def get_archive_stats() -> Dict[str, Any]:
+    with _metrics_lock:
+        stats = dict(_ARCHIVE_METRICS)
+    seconds = stats["total_seconds"]
+    stats["avg_tickets_per_sec"] = round(stats["total_tickets"] / seconds, 1) if seconds > 0 else 0
+    stats["archive_after_days"] = _effective_days(None)
+    return stats
+
+# ==========================================
+# 📖 ฝั่งอ่าน: รวมผลจากตารางหลัก + archive
+# ==========================================
+
+def archive_max_round(db: Session) -> Optional[date]:
+    """งวดล่าสุดที่อยู่ใน archive (None = ยังไม่มีอะไรถูกย้าย)"""
+    now = time.time()
+    if now < _max_round_cache["expires"]:
+        return _max_round_cache["value"]
+    value = db.query(func.max(TicketArchive.round_date)).scalar()
+    _max_round_cache.update(value=value, expires=now + MAX_ROUND_TTL)
+    return value
+
+def round_range_in_archive(db: Session, s_date: date) -> bool:
+    """ช่วง round_date ที่เริ่มจาก s_date มีโอกาสเจอบิลใน archive ไหม"""
+    max_round = archive_max_round(db)
+    return max_round is not None and s_date <= max_round
+
+def created_range_in_archive(db: Session, s_date: date) -> bool:
+    """ช่วงวันที่กดแทง (created_at) ที่เริ่มจาก s_date มีโอกาสเจอบิลใน archive ไหม (บิลกดแทงช้ากว่างวดได้ไม่เกิน 1 วัน)"""
+    max_round = archive_max_round(db)
+    return max_round is not None and s_date <= max_round + timedelta(days=1)
+
+def archive_to_response(row: TicketArchive) -> Dict[str, Any]:
+    """แปลงแถว archive ให้หน้าตาเหมือน TicketResponse (ไม่ส่งรายการเลข เหมือน noload(Ticket.items))"""
+    return {
+        "id": row.id,
+        "total_amount": row.total_amount,
+        "status": row.status,
+        "created_at": row.created_at,
+        "note": row.note,
+        "user": row.user,
+        "items": [],
+        "lotto_type": row.lotto_type,
+        "lotto_type_id": row.lotto_type_id,
+        "commission_amount": row.commission_amount,
+        "winning_amount": row.winning_amount,
+    }
+
+def unpack_items(row: TicketArchive) -> List[Dict[str, Any]]:
+    """แตก items_packed กลับเป็นรายการเลข (หน้าตาเดียวกับ TicketItem)"""
+    return [
+        {
+            "id": item_id,
+            "ticket_id": row.id,
+            "round_date": row.round_date,
+            "number": number,
+            "bet_type": bet_type,
+            "amount": Decimal(amount),
+            "reward_rate": Decimal(reward_rate),
+            "winning_amount": Decimal(winning_amount),
+            "status": status,
+        }
+        for item_id, number, bet_type, amount, reward_rate, winning_amount, status in (row.items_packed or [])
+    ]
+
+def merge_history(hot: List[dict], archived: List[dict], skip: int, limit: int) -> List[dict]:
+    """รวม 2 รายการที่เรียง (created_at, id) ใหม่→เก่าอยู่แล้ว แล้วตัดหน้า (ทั้งคู่ต้องดึงมา skip + limit แถว)"""
+    # str(UUID) เรียงเหมือน uuid ใน Postgres → ลำดับตรงกับ Keyset cursor
+    merged = sorted(hot + archived, key=lambda t: (t["created_at"], str(t["id"])), reverse=True)
+    return merged[skip:skip + limit]
+
+ARCHIVE_NUMBER_TOTALS_SQL = """
+    SELECT e->>1 AS number, e->>2 AS bet_type, sum((e->>3)::numeric) AS total_amount, count(*) AS frequency
+    FROM ticket_archives a CROSS JOIN LATERAL jsonb_array_elements(a.items_packed) e
+    WHERE a.created_at >= :start_utc AND a.created_at <= :end_utc
+      AND a.status <> 'CANCELLED' {shop_filter}
+    GROUP BY e->>1, e->>2
+"""
+
+def archive_number_totals(db: Session, start_utc: datetime, end_utc: datetime, shop_id=None,
+                          lotto_type_id=None, bet_type: Optional[str] = None) -> Dict[tuple, Dict[str, Any]]:
+    """ยอดแทงราย (เลข, ประเภทแทง) จาก archive (สำหรับ top_numbers)"""
+    params = {"start_utc": start_utc, "end_utc": end_utc}
+    shop_filter = ""
+    if shop_id:
+        shop_filter += " AND a.shop_id = :shop_id"
+        params["shop_id"] = shop_id
+    if lotto_type_id:
+        shop_filter += " AND a.lotto_type_id = :lotto_type_id"
+        params["lotto_type_id"] = lotto_type_id
+    if bet_type:
+        shop_filter += " AND e->>2 = :bet_type"
+        params["bet_type"] = bet_type
+    rows = db.execute(text(ARCHIVE_NUMBER_TOTALS_SQL.format(shop_filter=shop_filter)), params).all()
+    return {(r.number, r.bet_type): {"total_amount": r.total_amount, "frequency": r.frequency} for r in rows}
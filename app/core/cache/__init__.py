@@ -0,0 +1,14 @@
+# app/core/cache/__init__.py
+"""
+Cache กลางของระบบ (ต่อ Process / ต่อ gunicorn worker)
+
+แต่ละโมดูลขอ Namespace ของตัวเองด้วย get_cache(name, ttl=..., max_items=..., max_bytes=...)
+ได้ LRU + TTL + งบหน่วยความจำ + Single-flight + Stale-while-revalidate + Tag + Metrics แบบเดียวกันหมด
+get_cache(name, shared=True, ...) = มี L2 ใช้ร่วมกับ worker อื่นด้วย (CACHE_BACKEND = local / shm / redis)
+"""
+from .store import Cache
+from .sizing import approx_size
+from .registry import (
+    get_cache, invalidate_tags, clear_all, get_all_metrics, get_backend_stats,
+    shop_tag, user_tag, lotto_tag, template_tag,
+)
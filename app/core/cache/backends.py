@@ -0,0 +1,387 @@
+# app/core/cache/backends.py
+"""
+ชั้นเก็บ Cache ที่ใช้ร่วมกันหลาย worker (L2) - เลือกด้วย CACHE_BACKEND
+
+- local : ไม่มี L2 (แต่ละ worker มีแค่ Cache ใน RAM ของตัวเอง แบบเดิม)
+- shm   : ไฟล์ mmap ใน /dev/shm ใช้ร่วมกันทุก worker ในเครื่องเดียวกัน (ไม่ต้องมี Service เพิ่ม)
+- redis : Redis (หรืออะไรก็ได้ที่คุยโปรโตคอล Redis) ใช้ร่วมกันหลายเครื่อง
+
+ทุก Backend เก็บแค่ bytes + "เลขรุ่น" ของ Tag:
+ล้างตาม Tag = เพิ่มเลขรุ่นของ Tag นั้น → ค่าที่เขียนไว้ด้วยเลขรุ่นเก่าถือว่าหมดอายุทันที (ไม่ต้องไล่ลบ)
+ค่าถูก pickle (+ zlib ถ้าใหญ่) แล้วเซ็นด้วย Key ที่ได้จาก SECRET_KEY ก่อนเก็บ
+→ ค่าที่ไม่มีลายเซ็นถูกต้อง (เช่น ใครเขียนลง Redis เอง) ถูกทิ้งเป็น Miss โดยไม่ unpickle
+"""
+import fcntl
+import hashlib
+import hmac
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# ==========================================
+# 📦 แปลงค่า ↔ bytes
+# ==========================================
+
+COMPRESS_OVER = 4096
+SIGNATURE_BYTES = 16
+
+_signing_key: Optional[bytes] = None
+
+def _get_signing_key() -> bytes:
+    global _signing_key
+    if _signing_key is None:
+        from app.core.config import settings
+
+        # แยกจาก Key ที่เซ็น JWT (ใช้ SECRET_KEY ตรงๆ)
+        _signing_key = hashlib.blake2b(settings.SECRET_KEY.encode(), digest_size=32, person=b"shop-cache").digest()
+    return _signing_key
+
+def _sign(body: bytes) -> bytes:
+    return hashlib.blake2b(body, key=_get_signing_key(), digest_size=SIGNATURE_BYTES).digest()
+
+def encode(obj: Any) -> bytes:
+    raw = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    body = b"z" + zlib.compress(raw, 1) if len(raw) > COMPRESS_OVER else b"p" + raw
+    return _sign(body) + body
+
+def decode(data: bytes) -> Any:
+    signature, body = data[:SIGNATURE_BYTES], data[SIGNATURE_BYTES:]
+    if not body or not hmac.compare_digest(signature, _sign(body)):
+        raise ValueError("bad cache signature")
+    if body[:1] == b"z":
+        return pickle.loads(zlib.decompress(body[1:]))
+    return pickle.loads(body[1:])
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+
+# ==========================================
+# 🧠 Shared memory (mmap)
+# ==========================================
+
+class SharedMemoryBackend:
+    """
+    ไฟล์ขนาดคงที่ (mmap) แบ่งเป็น: Header | ตัวนับเลขรุ่นของ Tag | ช่องเล็ก (SMALL_SLOT) | ช่องใหญ่ (slot_kb)
+    ค่าส่วนใหญ่ (เลขอั้น / สถิติ) เล็ก → ใช้ช่องเล็กจำนวนมาก / ก้อนใหญ่ (รายการหวย / ประวัติบิล) ใช้ช่องใหญ่ (อย่างละครึ่งไฟล์)
+
+    - Key ถูก hash ไปลงกลุ่มละ WAYS ช่อง: เขียนทับช่องของ Key เดิม → ช่องว่าง/หมดอายุ → ช่องที่ใกล้หมดอายุสุด
+    - ค่าที่ใหญ่กว่าช่องใหญ่ไม่ถูกเก็บ (ยังอยู่ใน Cache ของ worker ตามปกติ)
+    - เลขรุ่นของ Tag อยู่ในตารางขนาดคงที่ (hash ชนกันแค่ทำให้ล้างเกินบ้าง ไม่มีทางได้ค่าเก่า)
+    - ล็อคข้าม Process ด้วย fcntl แยกตามกลุ่ม + threading.Lock ใน Process (fcntl ไม่กัน Thread เดียวกัน)
+    - ไฟล์จริง = path.<hash ของรูปแบบ> → เปลี่ยน CACHE_SHM_MB / SLOT_KB ระหว่าง Rolling reload ได้ไฟล์ใหม่
+      ไม่ย่อ/ล้างไฟล์ที่ worker อื่น mmap ค้างอยู่เด็ดขาด (ไม่งั้น worker นั้นโดน SIGBUS)
+      ไฟล์ของรูปแบบเก่าไม่ถูกลบเอง (ลบได้หลัง worker รุ่นเก่าหยุดหมด / หายเองตอน reboot)
+    """
+    MAGIC = b"SHOPCCH3"
+    HEADER = struct.Struct("<8sIIIII")          # magic, small groups, large slot size, large groups, ways, version_slots
+    SLOT_HEADER = struct.Struct("<QdI")         # key hash, expires_at (epoch), length
+    VERSION = struct.Struct("<Q")
+    SMALL_SLOT = 4096
+    WAYS = 4
+    VERSION_SLOTS = 8192
+    STRIPES = 64
+
+    def __init__(self, path: str, size_mb: int, slot_kb: int):
+        self.path = path
+        versions_bytes = self.VERSION_SLOTS * self.VERSION.size
+        half = max(0, size_mb * 1024 * 1024 - self.HEADER.size - versions_bytes) // 2
+        self._versions_at = self.HEADER.size
+        offset = self._versions_at + versions_bytes
+        # (ขนาดช่อง, จำนวนกลุ่ม, ตำแหน่งเริ่ม) ของช่องเล็ก / ช่องใหญ่
+        self._regions = []
+        for slot_size in (self.SMALL_SLOT, max(slot_kb * 1024, self.SMALL_SLOT)):
+            groups = max(1, half // (slot_size * self.WAYS))
+            self._regions.append((slot_size, groups, offset))
+            offset += groups * self.WAYS * slot_size
+        self.size = offset
+        (_, small_groups, _), (large_size, large_groups, _) = self._regions
+        self._header = self.HEADER.pack(self.MAGIC, small_groups, large_size, large_groups, self.WAYS, self.VERSION_SLOTS)
+        layout = hashlib.blake2b(self._header + struct.pack("<Q", self.size), digest_size=6).hexdigest()
+        self.file_path = f"{path}.{layout}"
+
+        self._pid: Optional[int] = None
+        self._fd: Optional[int] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._open_lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(self.STRIPES * len(self._regions))]
+        self._version_lock = threading.Lock()
+        self.stats_counters = dict.fromkeys(("reads", "hits", "writes", "too_large", "bumps"), 0)
+
+    # ---------- เปิดไฟล์ (ครั้งแรกของแต่ละ Process หลัง fork) ----------
+
+    def _map(self) -> mmap.mmap:
+        if self._pid == os.getpid():
+            return self._mm
+        with self._open_lock:
+            if self._pid != os.getpid():
+                os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+                # ล็อคแยกไฟล์ → สร้างไฟล์ได้ Process เดียว / ไม่แตะไฟล์ข้อมูลที่มีคน mmap อยู่
+                lock_fd = os.open(self.file_path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.lockf(lock_fd, fcntl.LOCK_EX)
+                    fd = self._open_existing()
+                    if fd is None:
+                        fd = self._create()
+                finally:
+                    os.close(lock_fd)
+                self._mm = mmap.mmap(fd, self.size)
+                self._fd = fd
+                self._pid = os.getpid()
+        return self._mm
+
+    def _open_existing(self) -> Optional[int]:
+        """(เรียกในล็อคไฟล์) ไฟล์ที่ตรงรูปแบบนี้ / None = ยังไม่มีหรือเสีย (เช่น Process ตายระหว่างสร้าง)"""
+        try:
+            fd = os.open(self.file_path, os.O_RDWR)
+        except FileNotFoundError:
+            return None
+        if os.fstat(fd).st_size == self.size and os.pread(fd, self.HEADER.size, 0) == self._header:
+            return fd
+        os.close(fd)
+        return None
+
+    def _create(self) -> int:
+        """(เรียกในล็อคไฟล์) สร้างไฟล์ใหม่ครบก่อน แล้ว rename ทับ → Process ที่ mmap ไฟล์เดิมไว้ยังใช้ของเดิมต่อได้"""
+        tmp = f"{self.file_path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, self.size)
+            os.pwrite(fd, self._header, 0)
+            os.rename(tmp, self.file_path)
+        except Exception:
+            os.close(fd)
+            raise
+        return fd
+
+    @contextmanager
+    def _locked(self, offset: int, length: int, exclusive: bool, stripe: threading.Lock):
+        with stripe:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH, length, offset)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+
+    # ---------- เลขรุ่นของ Tag ----------
+
+    def _version_offset(self, tag: str) -> int:
+        return self._versions_at + (_hash64(tag) % self.VERSION_SLOTS) * self.VERSION.size
+
+    def _read_versions(self, mm: mmap.mmap, tags: Sequence[str]) -> List[int]:
+        return [self.VERSION.unpack_from(mm, self._version_offset(t))[0] for t in tags]
+
+    def bump(self, tags: Sequence[str]) -> None:
+        mm = self._map()
+        length = self.VERSION_SLOTS * self.VERSION.size
+        with self._locked(self._versions_at, length, True, self._version_lock):
+            for tag in tags:
+                offset = self._version_offset(tag)
+                self.VERSION.pack_into(mm, offset, self.VERSION.unpack_from(mm, offset)[0] + 1)
+        self.stats_counters["bumps"] += len(tags)
+
+    # ---------- ค่า ----------
+
+    def _group(self, region: int, key_hash: int):
+        """(ตำแหน่งเริ่มของกลุ่ม, ขนาดช่อง, ล็อคใน Process) ของ Key ใน region นี้"""
+        slot_size, groups, start = self._regions[region]
+        group = key_hash % groups
+        stripe = self._stripes[region * self.STRIPES + group % self.STRIPES]
+        return start + group * self.WAYS * slot_size, slot_size, stripe
+
+    def _find(self, mm, group_at: int, slot_size: int, key_hash: int) -> Optional[int]:
+        for way in range(self.WAYS):
+            offset = group_at + way * slot_size
+            if self.SLOT_HEADER.unpack_from(mm, offset)[0] == key_hash:
+                return offset
+        return None
+
+    def read(self, key: str, tags: Sequence[str]) -> Tuple[Optional[bytes], List[int]]:
+        mm = self._map()
+        key_hash = _hash64(key)
+        self.stats_counters["reads"] += 1
+        data = None
+        for region in range(len(self._regions)):
+            group_at, slot_size, stripe = self._group(region, key_hash)
+            with self._locked(group_at, self.WAYS * slot_size, False, stripe):
+                offset = self._find(mm, group_at, slot_size, key_hash)
+                if offset is not None:
+                    _, expires_at, length = self.SLOT_HEADER.unpack_from(mm, offset)
+                    if length and expires_at > time.time():
+                        body = offset + self.SLOT_HEADER.size
+                        data = mm[body:body + length]
+            if data is not None:
+                self.stats_counters["hits"] += 1
+                break
+        return data, self._read_versions(mm, tags)
+
+    def write(self, key: str, data: bytes, ttl: float) -> bool:
+        fits = [r for r, (slot_size, _, _) in enumerate(self._regions) if len(data) <= slot_size - self.SLOT_HEADER.size]
+        if not fits:
+            self.stats_counters["too_large"] += 1
+            return False
+        mm = self._map()
+        key_hash = _hash64(key)
+        for region in range(len(self._regions)):
+            group_at, slot_size, stripe = self._group(region, key_hash)
+            with self._locked(group_at, self.WAYS * slot_size, True, stripe):
+                if region == fits[0]:
+                    self._write_slot(mm, group_at, slot_size, key_hash, data, ttl)
+                else:
+                    # ลบค่าเดิมของ Key นี้ที่อาจอยู่อีกขนาดช่อง (ค่าเปลี่ยนขนาด)
+                    offset = self._find(mm, group_at, slot_size, key_hash)
+                    if offset is not None:
+                        self.SLOT_HEADER.pack_into(mm, offset, 0, 0.0, 0)
+        self.stats_counters["writes"] += 1
+        return True
+
+    def _write_slot(self, mm, group_at: int, slot_size: int, key_hash: int, data: bytes, ttl: float) -> None:
+        """(เรียกในล็อคของกลุ่ม)"""
+        now = time.time()
+        target = self._find(mm, group_at, slot_size, key_hash)
+        if target is None:
+            target_expiry = None
+            for way in range(self.WAYS):
+                offset = group_at + way * slot_size
+                _, expires_at, length = self.SLOT_HEADER.unpack_from(mm, offset)
+                if not length or expires_at <= now:
+                    expires_at = 0.0
+                if target is None or expires_at < target_expiry:
+                    target, target_expiry = offset, expires_at
+        self.SLOT_HEADER.pack_into(mm, target, key_hash, now + ttl, len(data))
+        body = target + self.SLOT_HEADER.size
+        mm[body:body + len(data)] = data
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "shm", "path": self.file_path, "bytes": self.size,
+            "slots": {size: groups * self.WAYS for size, groups, _ in self._regions}, **self.stats_counters,
+        }
+
+# ==========================================
+# 🌐 Redis
+# ==========================================
+
+class RedisBackend:
+    """
+    Redis ผ่าน redis-py: ค่า = SET PX, เลขรุ่นของ Tag = INCR (อ่านค่าพร้อมเลขรุ่นใน MGET เดียว)
+    Redis ล่ม/ช้า → ถือว่า Miss แล้วพัก ERROR_BACKOFF วินาที (ระบบยังทำงานด้วย Cache ใน RAM + DB)
+    ล้างไม่สำเร็จระหว่างล่ม → จำ Tag ไว้ เพิ่มเลขรุ่นให้ได้ก่อนอ่านครั้งถัดไป (ไม่ได้ค่าเก่ากลับมาตอน Redis ฟื้น)
+    """
+    TIMEOUT_SECONDS = 0.5
+    ERROR_BACKOFF = 5
+    # เลขรุ่นต้องอยู่นานกว่าค่าที่อ้างถึง (ค่าอายุสูงสุด 1 วัน)
+    VERSION_TTL = 2 * 86400
+
+    def __init__(self, url: str, prefix: str = "shop-cache:"):
+        import redis
+
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(
+            url, protocol=2, socket_timeout=self.TIMEOUT_SECONDS, socket_connect_timeout=self.TIMEOUT_SECONDS
+        )
+        self._down_until = 0.0
+        self._pending_bumps: set = set()
+        self._pending_lock = threading.Lock()
+        self.stats_counters = dict.fromkeys(("reads", "hits", "writes", "bumps", "errors", "skipped"), 0)
+
+    def _available(self) -> bool:
+        if time.time() < self._down_until:
+            self.stats_counters["skipped"] += 1
+            return False
+        if self._pending_bumps:
+            with self._pending_lock:
+                pending, self._pending_bumps = list(self._pending_bumps), set()
+            if not self._incr(pending):
+                return False
+        return True
+
+    def _incr(self, tags: Sequence[str]) -> bool:
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(self.prefix + "t:" + tag)
+                pipe.expire(self.prefix + "t:" + tag, self.VERSION_TTL)
+            pipe.execute()
+        except Exception as e:
+            with self._pending_lock:
+                self._pending_bumps.update(tags)
+            self._failed(e)
+            return False
+        self.stats_counters["bumps"] += len(tags)
+        return True
+
+    def _failed(self, e: Exception) -> None:
+        self.stats_counters["errors"] += 1
+        self._down_until = time.time() + self.ERROR_BACKOFF
+        print(f"⚠️ Redis cache error: {e} (bypass {self.ERROR_BACKOFF}s)")
+
+    def read(self, key: str, tags: Sequence[str]) -> Tuple[Optional[bytes], Optional[List[int]]]:
+        if not self._available():
+            return None, None
+        self.stats_counters["reads"] += 1
+        try:
+            values = self._client.mget([self.prefix + "e:" + key] + [self.prefix + "t:" + t for t in tags])
+        except Exception as e:
+            self._failed(e)
+            return None, None
+        if values[0] is not None:
+            self.stats_counters["hits"] += 1
+        return values[0], [int(v or 0) for v in values[1:]]
+
+    def write(self, key: str, data: bytes, ttl: float) -> bool:
+        if not self._available():
+            return False
+        try:
+            self._client.set(self.prefix + "e:" + key, data, px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            self._failed(e)
+            return False
+        self.stats_counters["writes"] += 1
+        return True
+
+    def bump(self, tags: Sequence[str]) -> None:
+        if not tags:
+            return
+        if time.time() < self._down_until:
+            with self._pending_lock:
+                self._pending_bumps.update(tags)
+            return
+        self._incr(tags)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis", "url": self.url.split("@")[-1],
+            "pending_bumps": len(self._pending_bumps), **self.stats_counters,
+        }
+
+# ==========================================
+# ⚙️ เลือกตาม Settings
+# ==========================================
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_shared_backend():
+    """Backend L2 ตาม CACHE_BACKEND (None = local)"""
+    global _backend
+    from app.core.config import settings
+
+    kind = settings.CACHE_BACKEND.lower()
+    if kind == "local":
+        return None
+    with _backend_lock:
+        if _backend is None:
+            if kind == "shm":
+                _backend = SharedMemoryBackend(settings.CACHE_SHM_PATH, settings.CACHE_SHM_MB, settings.CACHE_SHM_SLOT_KB)
+            elif kind == "redis":
+                _backend = RedisBackend(settings.CACHE_REDIS_URL)
+            else:
+                raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+        return _backend
@@ -0,0 +1,314 @@
+# app/core/cache/bus.py
+"""
+ล้าง Cache ข้าม worker / instance ด้วย Postgres LISTEN/NOTIFY (channel cache_invalidate)
+
+- invalidate(): ล้างใน worker ตัวเองทันที แล้ว NOTIFY ให้ worker อื่น (ผ่าน Connection จาก Pool แบบ autocommit)
+  เรียกหลัง commit เสมอ → worker อื่นที่โหลดค่าใหม่ตอนนี้ได้ข้อมูลใหม่แน่นอน
+  ส่วนที่กำลังโหลดค่าเก่าค้างอยู่จะถูกทิ้งด้วย generation ของ Cache
+- แต่ละ worker มี Thread ฟัง 1 ตัว (Connection แยกออกจาก Pool) → ล้างตามที่ worker อื่นสั่ง (ข้ามข้อความของตัวเอง)
+- หลุดจาก DB แล้วต่อใหม่ได้ → ล้างทุก Namespace (อาจพลาดข้อความระหว่างหลุด)
+- subscribe(): ฟัง channel อื่น (เช่น token_revoked) ด้วย Thread / Connection เดียวกัน ไม่ต้องเปิด Connection เพิ่ม
+  publish() ส่งข้อความเข้า channel นั้นแบบเดียวกับ invalidate() / DeltaChannel รวมยอดที่เปลี่ยนส่งเป็นชุด
+- CACHE_NOTIFY_ENABLED=false (เช่น ต่อผ่าน Pooler แบบ transaction ที่ LISTEN ใช้ไม่ได้) → ล้างแค่ worker ตัวเอง
+  และ Cache ที่พึ่ง NOTIFY กลับไปใช้ TTL สั้นแบบเดิม / ตั้ง CACHE_NOTIFY_DSN เพื่อฟังผ่าน Connection ตรง (session mode) ได้
+"""
+import json
+import os
+import select
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.cache import registry
+
+CHANNEL = "cache_invalidate"
+# NOTIFY รับ payload ได้ไม่เกิน 8000 ไบต์ → แบ่ง Tag เป็นหลายข้อความ
+MAX_PAYLOAD_BYTES = 7000
+POLL_SECONDS = 30
+MAX_BACKOFF_SECONDS = 30
+
+_origin: Optional[str] = None
+_origin_pid: Optional[int] = None
+_listener: Optional[threading.Thread] = None
+_start_lock = threading.Lock()
+# channel อื่นที่ฟังไปด้วย: { channel: (handler(payload), on_connect()) }
+_SUBSCRIBERS: Dict[str, Tuple[Callable[[str], None], Optional[Callable[[], None]]]] = {}
+_STATS: Dict[str, Any] = {
+    "connected": False, "published": 0, "publish_errors": 0, "received": 0, "applied": 0,
+    "ignored_own": 0, "reconnects": 0, "last_error": None, "last_event_at": None,
+}
+
+def _get_origin() -> str:
+    """รหัสของ worker นี้ (สร้างหลัง fork ของ gunicorn)"""
+    global _origin, _origin_pid
+    if _origin_pid != os.getpid():
+        _origin_pid = os.getpid()
+        _origin = f"{socket.gethostname()}:{_origin_pid}:{uuid.uuid4().hex[:8]}"
+    return _origin
+
+# ==========================================
+# 🧹 ล้างในเครื่อง
+# ==========================================
+
+def _apply(namespace: Optional[str], tags: Iterable[str], clear: bool, shared: bool) -> None:
+    """shared=True เฉพาะ worker ต้นทาง (ล้าง L2 ครั้งเดียว ไม่ใช่ทุก worker ที่ได้ NOTIFY)"""
+    if namespace is None:
+        if clear:
+            registry.clear_all(shared=shared)
+        else:
+            registry.invalidate_tags(*tags, shared=shared)
+        return
+    cache = registry.find_cache(namespace)
+    if cache is None:
+        if shared:
+            # worker นี้ยังไม่เคยใช้ Namespace นี้ แต่ L2 อาจมีค่าอยู่
+            cache = registry.get_cache(namespace, shared=True)
+        else:
+            return
+    if clear:
+        cache.clear(shared=shared)
+    else:
+        cache.invalidate_tags(*tags, shared=shared)
+
+# ==========================================
+# 📣 ฝั่งสั่งล้าง
+# ==========================================
+
+def _payloads(namespace: Optional[str], tags: List[str], clear: bool) -> List[str]:
+    base = {"o": _get_origin(), "ns": namespace}
+    if clear:
+        return [json.dumps({**base, "clear": True})]
+    payloads, chunk = [], []
+    for tag in tags:
+        candidate = json.dumps({**base, "tags": chunk + [tag]})
+        if chunk and len(candidate.encode()) > MAX_PAYLOAD_BYTES:
+            payloads.append(json.dumps({**base, "tags": chunk}))
+            chunk = [tag]
+        else:
+            chunk.append(tag)
+    if chunk:
+        payloads.append(json.dumps({**base, "tags": chunk}))
+    return payloads
+
+def _notify(payloads: List[str], channel: str = CHANNEL) -> None:
+    from app.db.session import engine
+
+    try:
+        with engine.connect() as conn:
+            for payload in payloads:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+            conn.commit()
+        _STATS["published"] += len(payloads)
+    except Exception as e:
+        _STATS["publish_errors"] += 1
+        _STATS["last_error"] = str(e)
+        print(f"⚠️ Cache NOTIFY failed: {e}")
+
+def invalidate(namespace: Optional[str] = None, tags: Iterable[str] = (), clear: bool = False) -> None:
+    """
+    ล้าง Cache ทุก worker: namespace=None = ทุก Namespace / clear=True = ล้างทั้งหมด ไม่งั้นล้างตาม tags
+    (เรียกหลัง commit)
+    """
+    tags = list(tags)
+    if not clear and not tags:
+        return
+    _apply(namespace, tags, clear, shared=True)
+    if settings.CACHE_NOTIFY_ENABLED:
+        _notify(_payloads(namespace, tags, clear))
+
+def publish(channel: str, payload: str) -> None:
+    """ส่งข้อความไป channel ที่ลงทะเบียนด้วย subscribe() ของทุก worker (รวมตัวเอง - handler ต้องรับซ้ำได้) เรียกหลัง commit"""
+    if settings.CACHE_NOTIFY_ENABLED:
+        _notify([payload], channel)
+
+# ==========================================
+# 👂 ฝั่งฟัง (1 Thread ต่อ worker)
+# ==========================================
+
+def subscribe(channel: str, handler: Callable[[str], None], on_connect: Optional[Callable[[], None]] = None) -> None:
+    """
+    ฟัง channel อื่นผ่าน Listener ตัวเดียวกัน (ลงทะเบียนก่อน start_listener - ตอน import)
+    on_connect ถูกเรียกทุกครั้งที่ต่อ DB ได้ (หลัง LISTEN) → ให้โหลดสถานะจาก DB ใหม่ เผื่อพลาดข้อความระหว่างหลุด
+    """
+    _SUBSCRIBERS[channel] = (handler, on_connect)
+
+def _dispatch(channel: str, payload: str) -> None:
+    if channel == CHANNEL:
+        _handle(payload)
+        return
+    subscriber = _SUBSCRIBERS.get(channel)
+    if subscriber is None:
+        return
+    try:
+        subscriber[0](payload)
+    except Exception as e:
+        print(f"⚠️ NOTIFY handler {channel} failed: {e}")
+
+def _handle(payload: str) -> None:
+    _STATS["received"] += 1
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        print(f"⚠️ Bad cache NOTIFY payload: {payload[:200]}")
+        return
+    if event.get("o") == _get_origin():
+        _STATS["ignored_own"] += 1
+        return
+    _apply(event.get("ns"), event.get("tags") or [], bool(event.get("clear")), shared=False)
+    _STATS["applied"] += 1
+    _STATS["last_event_at"] = time.time()
+
+def _connect():
+    """Connection ของ psycopg2 ที่ไม่คืน Pool (ค้างไว้ LISTEN ตลอดอายุ worker)"""
+    if settings.CACHE_NOTIFY_DSN:
+        import psycopg2
+        conn = psycopg2.connect(settings.CACHE_NOTIFY_DSN)
+    else:
+        from app.db.session import engine
+        fairy = engine.raw_connection()
+        conn = fairy.driver_connection
+        fairy.detach()
+        conn.rollback()
+    conn.autocommit = True
+    return conn
+
+def _listen_loop() -> None:
+    backoff = 1
+    connected_before = False
+    while True:
+        conn = None
+        try:
+            conn = _connect()
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {CHANNEL}")
+            for channel in _SUBSCRIBERS:
+                cur.execute(f"LISTEN {channel}")
+            if connected_before:
+                # อาจพลาดข้อความระหว่างหลุด → ทิ้งทั้งหมดแล้วโหลดใหม่
+                _STATS["reconnects"] += 1
+                registry.clear_all(shared=False)
+                print("🔄 Cache listener reconnected → cleared local caches")
+            connected_before = True
+            _STATS["connected"] = True
+            backoff = 1
+            for channel, (_, on_connect) in _SUBSCRIBERS.items():
+                if on_connect is not None:
+                    try:
+                        on_connect()
+                    except Exception as e:
+                        print(f"⚠️ NOTIFY on_connect {channel} failed: {e}")
+
+            while True:
+                ready, _, _ = select.select([conn], [], [], POLL_SECONDS)
+                if not ready:
+                    # เงียบนาน → เช็คว่า Connection ยังอยู่
+                    cur.execute("SELECT 1")
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    _dispatch(notify.channel, notify.payload)
+        except Exception as e:
+            _STATS["connected"] = False
+            _STATS["last_error"] = str(e)
+            print(f"⚠️ Cache listener error: {e} (retry in {backoff}s)")
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(backoff)
+        backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+
+def start_listener() -> Optional[threading.Thread]:
+    """เริ่ม Thread ฟัง NOTIFY (เรียกตอน startup ของแต่ละ worker, เรียกซ้ำได้)"""
+    global _listener
+    if not settings.CACHE_NOTIFY_ENABLED:
+        return None
+    with _start_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen_loop, name="cache-listener", daemon=True)
+            _listener.start()
+        return _listener
+
+# ==========================================
+# 📦 ส่งยอดที่เปลี่ยนข้าม worker เป็นชุด
+# ==========================================
+
+DELTA_FLUSH_SECONDS = 0.5
+
+class DeltaChannel:
+    """
+    ส่งรายการ (ค่าที่แปลงเป็น JSON ได้) จาก worker นี้ให้ worker อื่นเป็นชุดทุก DELTA_FLUSH_SECONDS
+    (NOTIFY 1 ครั้งต่อชุด ไม่ใช่ต่อรายการ) - ใช้กับตัวนับใน RAM ที่ต้องเห็นบิลของทุก worker
+    - apply(items): รายการจาก worker อื่น (ของตัวเองถูกข้าม - ต้นทางใส่เองไปแล้ว)
+    - reset(): ทิ้งสถานะทั้งหมด ← ต่อ DB ใหม่ (อาจพลาดข้อความ) / reset_all() จาก worker ใดก็ได้
+    ปิด NOTIFY → add() ไม่ทำอะไร / worker ตายก่อน flush = รายการที่ค้างหาย (worker อื่นเห็นไม่ครบจนกว่าจะตั้งต้นใหม่)
+    รายการเดียวต้องเล็กกว่า MAX_PAYLOAD_BYTES (ผู้เรียกแบ่งเอง)
+    """
+
+    def __init__(self, channel: str, apply: Callable[[List[Any]], None], reset: Callable[[], None]):
+        self.channel = channel
+        self._apply = apply
+        self._reset = reset
+        self._pending: List[Any] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        subscribe(channel, self._receive, on_connect=reset)
+
+    def add(self, items: Iterable[Any]) -> None:
+        """เรียกหลัง commit (ต้นทางใส่ในสถานะของตัวเองแล้ว)"""
+        if not settings.CACHE_NOTIFY_ENABLED:
+            return
+        with self._lock:
+            self._pending.extend(items)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._flush_loop, name=f"delta-{self.channel}", daemon=True)
+                self._thread.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(DELTA_FLUSH_SECONDS)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            items, self._pending = self._pending, []
+        if not items:
+            return
+        base = len(json.dumps({"o": _get_origin(), "items": []}))
+        payloads, chunk, size = [], [], base
+        for item in items:
+            encoded = json.dumps(item)
+            if chunk and size + len(encoded) + 2 > MAX_PAYLOAD_BYTES:
+                payloads.append(json.dumps({"o": _get_origin(), "items": chunk}))
+                chunk, size = [], base
+            chunk.append(item)
+            size += len(encoded) + 2
+        payloads.append(json.dumps({"o": _get_origin(), "items": chunk}))
+        _notify(payloads, self.channel)
+
+    def reset_all(self) -> None:
+        """ล้างสถานะทุก worker (หลังลบข้อมูลด้วยมือ / หลัง commit)"""
+        self._reset()
+        if settings.CACHE_NOTIFY_ENABLED:
+            self.flush()
+            _notify([json.dumps({"o": _get_origin(), "reset": True})], self.channel)
+
+    def _receive(self, payload: str) -> None:
+        event = json.loads(payload)
+        if event.get("o") == _get_origin():
+            return
+        if event.get("reset"):
+            self._reset()
+        else:
+            self._apply(event.get("items") or [])
+
+def get_bus_stats() -> Dict[str, Any]:
+    return {"enabled": settings.CACHE_NOTIFY_ENABLED, "origin": _get_origin(), **_STATS}
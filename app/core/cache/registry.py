@@ -0,0 +1,68 @@
+# app/core/cache/registry.py
+"""
+ทะเบียน Cache ทุก Namespace ของ Process → ล้างตาม Tag ข้าม Namespace และดู Metrics รวมได้ที่เดียว
+shared=True ตอนสร้าง = ใช้ L2 ร่วมกับ worker อื่นตาม CACHE_BACKEND (local = ไม่มี L2)
+"""
+import threading
+from typing import Any, Dict, Optional
+
+from app.core.cache import backends
+from app.core.cache.store import Cache
+
+_CACHES: Dict[str, Cache] = {}
+_lock = threading.Lock()
+
+def get_cache(name: str, shared: bool = False, **options) -> Cache:
+    """Cache ของ Namespace นี้ (สร้างครั้งแรกด้วย options, ครั้งต่อไปได้ตัวเดิม)"""
+    with _lock:
+        cache = _CACHES.get(name)
+        if cache is None:
+            backend = backends.get_shared_backend() if shared else None
+            cache = _CACHES[name] = Cache(name, backend=backend, **options)
+        return cache
+
+def find_cache(name: str) -> Optional[Cache]:
+    """Cache ของ Namespace นี้ถ้า worker นี้สร้างไว้แล้ว (ไม่สร้างใหม่)"""
+    with _lock:
+        return _CACHES.get(name)
+
+def shop_tag(shop_id: Optional[Any]) -> str:
+    """Tag ของร้าน (None = มุมมองรวมทุกร้านของ SuperAdmin)"""
+    return f"shop:{shop_id or 'ALL'}"
+
+def user_tag(user_id: Any) -> str:
+    return f"user:{user_id}"
+
+def lotto_tag(lotto_type_id: Any) -> str:
+    return f"lotto:{lotto_type_id}"
+
+def template_tag(template_id: Any) -> str:
+    return f"template:{template_id}"
+
+def invalidate_tags(*tags: str, shared: bool = True) -> int:
+    """ล้างทุก Key ที่มี Tag เหล่านี้ในทุก Namespace (คืนจำนวน Key ที่ลบ)"""
+    with _lock:
+        caches = list(_CACHES.values())
+    removed = sum(cache.invalidate_tags(*tags, shared=False) for cache in caches)
+    if shared:
+        # เลขรุ่นของ Tag ใน L2 ใช้ร่วมทุก Namespace → เพิ่มครั้งเดียวพอ
+        shared_cache = next((cache for cache in caches if cache.backend is not None), None)
+        if shared_cache is not None:
+            shared_cache._bump_shared(tags)
+    return removed
+
+def clear_all(shared: bool = True) -> None:
+    with _lock:
+        caches = list(_CACHES.values())
+    for cache in caches:
+        cache.clear(shared=shared)
+
+def get_all_metrics() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        caches = list(_CACHES.values())
+    return {cache.name: cache.metrics() for cache in caches}
+
+def get_backend_stats() -> Optional[Dict[str, Any]]:
+    """สถิติของ L2 ฝั่ง worker นี้ (None = CACHE_BACKEND=local)"""
+    backend = backends.get_shared_backend()
+    return backend.stats() if backend is not None else None
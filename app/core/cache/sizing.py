@@ -0,0 +1,31 @@
+# app/core/cache/sizing.py
+"""
+ประมาณขนาดข้อมูลใน RAM (ไบต์) สำหรับงบหน่วยความจำของ Cache
+
+ค่าที่เก็บเป็น List / Dict ซ้อนกันแบบ JSON (ผลจาก model_dump, แถวสถิติ) → เดินโครงสร้างด้วย sys.getsizeof
+List ยาวๆ วัดแค่ SAMPLE ตัวแรกแล้วคูณกลับ (ไม่ต้องเดินครบทุกแถว ค่าใกล้เคียงพอสำหรับตัดสินใจ Evict)
+"""
+import sys
+from itertools import islice
+from typing import Any
+
+SAMPLE = 32
+MAX_DEPTH = 6
+
+def approx_size(value: Any, _depth: int = 0) -> int:
+    size = sys.getsizeof(value)
+    if _depth >= MAX_DEPTH:
+        return size
+
+    if isinstance(value, dict):
+        sample = list(islice(value.items(), SAMPLE))
+        inner = sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in sample)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        sample = list(islice(value, SAMPLE))
+        inner = sum(approx_size(v, _depth + 1) for v in sample)
+    else:
+        return size
+
+    if sample and len(value) > len(sample):
+        inner = inner * len(value) // len(sample)
+    return size + inner
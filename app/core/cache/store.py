@@ -0,0 +1,470 @@
+# app/core/cache/store.py
+"""
+Cache 1 Namespace (ต่อ Process): LRU + TTL + งบหน่วยความจำ + Single-flight + Stale-while-revalidate + Tag
+
+- อายุ: ก่อน ttl = สด / ttl..hard_ttl = ค่าเก่าที่ตอบได้ถ้ามี refresh (ดึงใหม่เบื้องหลังครั้งละคนเดียวต่อ Key)
+  เลย hard_ttl = ต้องรอโหลดใหม่ (ถ้าโหลดพังและ stale_on_error → ตอบค่าเก่าไปก่อน)
+- Single-flight: Key เดียวกันโหลดพร้อมกันได้คนเดียว คนอื่นรอผลของคนนั้น (ไม่มีล็อคค้างต่อ Key หลังโหลดเสร็จ)
+- จำกัดทั้งจำนวน Key (max_items) และขนาดรวมโดยประมาณ (max_bytes) → ทิ้งตัวที่ไม่ได้ใช้นานสุดก่อน
+- Tag เช่น shop:<id>, user:<id>, lotto:<id> → ล้างเฉพาะกลุ่มได้โดยไม่ต้องไล่ชื่อ Key
+- invalidate จดเลขลำดับไว้ที่ Key / Tag ที่ล้าง (clear = ทั้ง Namespace) → ผลที่เริ่มโหลดก่อนการล้าง "ที่เกี่ยวกับ Key/Tag นั้น"
+  จะไม่ถูกเขียนกลับเข้า Cache / การโหลด Key อื่นที่ค้างอยู่ไม่โดนทิ้งตาม (ไม่เกิดโหลดซ้ำทั้ง Namespace ตอนล้าง Tag ถี่ๆ)
+- backend (L2 ใช้ร่วมหลาย worker, ดู backends.py): ไม่มีใน RAM → ลองอ่านจาก L2 ก่อนโหลดเอง, โหลดเสร็จ → เขียนลง L2
+  ค่าใน L2 ผูกกับเลขรุ่นของ Tag (รวม Tag ของ Namespace และของ Key) ที่อ่านไว้ก่อนโหลด → ล้างแล้วค่าเก่าใช้ไม่ได้ทันที
+"""
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set
+
+from app.core.cache import backends
+from app.core.cache.sizing import approx_size
+
+# จำนวนเลขลำดับของ Key / Tag ที่ล้างไปที่จำไว้ (เกินแล้วยุบเป็นการล้างทั้ง Namespace 1 ครั้ง)
+MAX_MARKS = 4096
+
+COUNTERS = ("hits", "stale_hits", "misses", "coalesced", "loads", "load_errors", "evictions", "invalidations", "oversize",
+            "shared_hits", "shared_errors")
+
+# Thread ดึงค่าใหม่เบื้องหลัง ใช้ร่วมกันทุก Namespace
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "fresh_until", "stale_until", "tags", "size")
+
+    def __init__(self, value, stored_at, fresh_until, stale_until, tags, size):
+        self.value = value
+        self.stored_at = stored_at
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.tags = tags
+        self.size = size
+
+class _Flight:
+    """การโหลด 1 ครั้งที่คนอื่นรอผลร่วมกัน"""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+class Cache:
+    def __init__(self, name: str, ttl: float = 60, hard_ttl: Optional[float] = None,
+                 max_items: int = 1000, max_bytes: Optional[int] = None,
+                 sizer: Callable[[Any], int] = approx_size, track_keys: int = 0, backend: Any = None):
+        self.name = name
+        self.ttl = ttl
+        self.hard_ttl = ttl if hard_ttl is None else max(hard_ttl, ttl)
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.sizer = sizer
+        # เก็บเวลาโหลดต่อ Key ไว้ดู Key ที่ช้าสุด (0 = ไม่เก็บ)
+        self.track_keys = track_keys
+        self.backend = backend
+
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._refreshing: Set[Hashable] = set()
+        # เลขลำดับการล้าง: การโหลดจำ _seq ตอนเริ่ม แล้วเทียบกับ Key / Tag ของตัวเอง + _floor (clear) ตอนจะเก็บ
+        self._seq = 0
+        self._floor = 0
+        self._key_marks: Dict[Hashable, int] = {}
+        self._tag_marks: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._load_ms_total = 0.0
+        self._load_ms_max = 0.0
+        self._key_stats: "OrderedDict[Hashable, Dict[str, float]]" = OrderedDict()
+
+    # ==========================================
+    # 📖 อ่าน
+    # ==========================================
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """ค่าที่ยังสด (ไม่โหลด ไม่นับค่าเก่า)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and time.monotonic() < entry.fresh_until:
+                self._data.move_to_end(key)
+                self._count(key, "hits")
+                return entry.value
+            self._count(key, "misses")
+            return default
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """ค่าที่เก็บอยู่ไม่ว่าจะเก่าแค่ไหน (ไม่นับ Metrics ไม่ขยับ LRU) - สำหรับ Monitoring"""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry.value if entry is not None else default
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None,
+                    hard_ttl: Optional[float] = None, tags: Iterable[str] = (),
+                    refresh: Optional[Callable[[], Any]] = None, stale_on_error: bool = False) -> Any:
+        """
+        loader() = โหลดแบบรอ (ใช้ Session ของ Request ได้)
+        refresh() = โหลดเบื้องหลังตอนค่าเก่าอยู่ในช่วง ttl..hard_ttl (ต้องเปิด Session เอง) - None = ไม่ตอบค่าเก่า
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if hard_ttl is None:
+            hard_ttl = self.hard_ttl if refresh is not None else ttl
+        tags = tuple(tags)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if now < entry.fresh_until:
+                    self._data.move_to_end(key)
+                    self._count(key, "hits")
+                    return entry.value
+                if refresh is not None and now < entry.stale_until:
+                    # ♻️ ค่าเก่ายังใช้ได้: ตอบเลย แล้วดึงใหม่เบื้องหลัง (ครั้งละคนเดียวต่อ Key)
+                    self._data.move_to_end(key)
+                    self._count(key, "stale_hits")
+                    if key not in self._refreshing and key not in self._inflight:
+                        self._refreshing.add(key)
+                        _refresh_pool.submit(self._refresh, key, refresh, ttl, hard_ttl, tags, self._seq)
+                    return entry.value
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self._count(key, "coalesced")
+                leader = False
+            else:
+                flight = self._inflight[key] = _Flight()
+                self._count(key, "misses")
+                leader = True
+                generation = self._seq
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        versions = None
+        if self.backend is not None:
+            hit, versions = self._read_shared(key, tags)
+            if hit is not None and (hit[1] > 0 or refresh is not None):
+                # 🤝 worker อื่นโหลดไว้แล้ว (ค่าเก่าใน L2 ใช้ได้ถ้ามี refresh → ตอบแล้วดึงใหม่เบื้องหลัง)
+                value, fresh_left, stale_left = hit
+                try:
+                    self._insert(key, value, fresh_left, stale_left, tags, generation)
+                    with self._lock:
+                        self._count(key, "shared_hits")
+                        if fresh_left <= 0 and key not in self._refreshing:
+                            self._refreshing.add(key)
+                            _refresh_pool.submit(self._refresh, key, refresh, ttl, hard_ttl, tags, generation)
+                finally:
+                    with self._lock:
+                        self._end_flight(key, flight)
+                    flight.value = value
+                    flight.done.set()
+                return value
+
+        started = time.perf_counter()
+        try:
+            value = loader()
+        except BaseException as exc:
+            with self._lock:
+                self._end_flight(key, flight)
+                self._count(key, "load_errors")
+                stale = self._data.get(key) if stale_on_error else None
+            if stale is not None:
+                flight.value = stale.value
+                flight.done.set()
+                return stale.value
+            flight.error = exc
+            flight.done.set()
+            raise
+
+        try:
+            self._store(key, value, ttl, hard_ttl, tags, generation, started, versions)
+        finally:
+            with self._lock:
+                self._end_flight(key, flight)
+            flight.value = value
+            flight.done.set()
+        return value
+
+    def _end_flight(self, key, flight: _Flight) -> None:
+        """(เรียกใน _lock)"""
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    # ==========================================
+    # ✍️ เขียน
+    # ==========================================
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None,
+            hard_ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        tags = tuple(tags)
+        with self._lock:
+            generation = self._seq
+        versions = self._read_shared(key, tags)[1] if self.backend is not None else None
+        self._store(key, value, ttl, ttl if hard_ttl is None else hard_ttl, tags, generation, None, versions)
+
+    def _refresh(self, key, refresh, ttl, hard_ttl, tags, generation) -> None:
+        started = time.perf_counter()
+        versions = None
+        try:
+            if self.backend is not None:
+                hit, versions = self._read_shared(key, tags)
+                if hit is not None and hit[1] > 0:
+                    # worker อื่นดึงใหม่ไปแล้ว
+                    self._insert(key, hit[0], hit[1], hit[2], tags, generation)
+                    return
+            value = refresh()
+        except Exception as e:
+            with self._lock:
+                self._count(key, "load_errors")
+            print(f"⚠️ Cache refresh failed ({self.name}:{key}): {e}")
+        else:
+            self._store(key, value, ttl, hard_ttl, tags, generation, started, versions)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value, ttl, hard_ttl, tags, generation, started, versions=None) -> None:
+        with self._lock:
+            if started is not None:
+                self._record_load(key, started)
+        if not self._insert(key, value, ttl, max(hard_ttl, ttl), tags, generation):
+            return
+        if versions is not None:
+            self._write_shared(key, value, ttl, max(hard_ttl, ttl), versions)
+
+    def _invalidated_since(self, key, tags, generation: int) -> bool:
+        """(เรียกใน _lock) Key / Tag นี้ (หรือทั้ง Namespace) ถูกล้างหลังเริ่มโหลดหรือไม่"""
+        if generation < self._floor or self._key_marks.get(key, 0) > generation:
+            return True
+        return any(self._tag_marks.get(tag, 0) > generation for tag in tags)
+
+    def _mark(self, keys: Iterable[Hashable] = (), tags: Iterable[str] = ()) -> None:
+        """(เรียกใน _lock) จดว่า Key / Tag เหล่านี้ถูกล้างที่ลำดับใหม่"""
+        self._seq += 1
+        for key in keys:
+            self._key_marks[key] = self._seq
+        for tag in tags:
+            self._tag_marks[tag] = self._seq
+        if len(self._key_marks) + len(self._tag_marks) > MAX_MARKS:
+            self._mark_all()
+
+    def _mark_all(self) -> None:
+        """(เรียกใน _lock) ทุกการโหลดที่เริ่มก่อนตอนนี้ใช้ไม่ได้ → ไม่ต้องจำราย Key / Tag อีก"""
+        self._seq += 1
+        self._floor = self._seq
+        self._key_marks.clear()
+        self._tag_marks.clear()
+
+    def _insert(self, key, value, fresh_for, stale_for, tags, generation) -> bool:
+        """เก็บลง RAM ของ worker นี้ (False = มีการล้างระหว่างโหลด → ทิ้ง)"""
+        size = self.sizer(value) if self.max_bytes else 0
+        now = time.monotonic()
+        with self._lock:
+            if self._invalidated_since(key, tags, generation):
+                return False
+            if self.max_bytes and size > self.max_bytes:
+                self._count(key, "oversize")
+                self._remove(key)
+                return True
+
+            self._remove(key)
+            tags = frozenset(tags)
+            self._data[key] = _Entry(value, now, now + fresh_for, now + stale_for, tags, size)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while self._data and (
+                len(self._data) > self.max_items or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                old_key = next(iter(self._data))
+                self._remove(old_key)
+                self._counters["evictions"] += 1
+        return True
+
+    # ==========================================
+    # 🤝 L2 (ใช้ร่วมหลาย worker)
+    # ==========================================
+
+    def _shared_key(self, key) -> str:
+        return f"{self.name}:{key}"
+
+    def _shared_tags(self, key, tags) -> list:
+        return [f"ns:{self.name}", f"key:{self.name}:{key}", *tags]
+
+    def _read_shared(self, key, tags):
+        """
+        ((value, fresh_left, stale_left) | None, versions) - versions ใช้ตอนเขียนกลับ (None = L2 ใช้ไม่ได้ตอนนี้)
+        """
+        try:
+            data, versions = self.backend.read(self._shared_key(key), self._shared_tags(key, tags))
+            if data is None or versions is None:
+                return None, versions
+            stored_versions, fresh_until, stale_until, value = backends.decode(data)
+        except Exception as e:
+            with self._lock:
+                self._counters["shared_errors"] += 1
+            print(f"⚠️ Shared cache read failed ({self.name}:{key}): {e}")
+            return None, None
+        now = time.time()
+        if stored_versions != versions or now >= stale_until:
+            return None, versions
+        return (value, fresh_until - now, stale_until - now), versions
+
+    def _write_shared(self, key, value, fresh_for, stale_for, versions) -> None:
+        now = time.time()
+        try:
+            data = backends.encode((versions, now + fresh_for, now + stale_for, value))
+            self.backend.write(self._shared_key(key), data, stale_for)
+        except Exception as e:
+            with self._lock:
+                self._counters["shared_errors"] += 1
+            print(f"⚠️ Shared cache write failed ({self.name}:{key}): {e}")
+
+    def _bump_shared(self, tags) -> None:
+        if self.backend is None or not tags:
+            return
+        try:
+            self.backend.bump(list(tags))
+        except Exception as e:
+            with self._lock:
+                self._counters["shared_errors"] += 1
+            print(f"⚠️ Shared cache invalidate failed ({self.name}): {e}")
+
+    def _remove(self, key) -> bool:
+        """(เรียกใน _lock)"""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    # ==========================================
+    # 🗑️ ล้าง
+    # ==========================================
+
+    # shared=False = ล้างแค่ RAM ของ worker นี้ (worker ต้นทางล้าง L2 ไปแล้ว เช่น ตอนได้รับ NOTIFY)
+
+    def invalidate(self, *keys: Hashable, shared: bool = True) -> int:
+        with self._lock:
+            self._mark(keys=keys)
+            removed = sum(1 for key in keys if self._remove(key))
+            self._counters["invalidations"] += removed
+        if shared:
+            self._bump_shared([f"key:{self.name}:{key}" for key in keys])
+        return removed
+
+    def invalidate_tags(self, *tags: str, shared: bool = True) -> int:
+        with self._lock:
+            self._mark(tags=tags)
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            for key in keys:
+                self._remove(key)
+            self._counters["invalidations"] += len(keys)
+        if shared:
+            self._bump_shared(tags)
+        return len(keys)
+
+    def clear(self, shared: bool = True) -> None:
+        with self._lock:
+            self._mark_all()
+            self._counters["invalidations"] += len(self._data)
+            self._data.clear()
+            self._tags.clear()
+            self._bytes = 0
+        if shared:
+            self._bump_shared([f"ns:{self.name}"])
+
+    # ==========================================
+    # 📊 Metrics
+    # ==========================================
+
+    def _count(self, key, name: str) -> None:
+        """(เรียกใน _lock)"""
+        self._counters[name] += 1
+        if self.track_keys:
+            stats = self._key_stats.get(key)
+            if stats is None:
+                stats = self._key_stats[key] = dict.fromkeys(COUNTERS[:6] + ("last_ms", "max_ms", "total_ms"), 0)
+                while len(self._key_stats) > self.track_keys:
+                    self._key_stats.popitem(last=False)
+            stats[name] = stats.get(name, 0) + 1
+
+    def _record_load(self, key, started: float) -> None:
+        """(เรียกใน _lock)"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._count(key, "loads")
+        self._load_ms_total += elapsed_ms
+        self._load_ms_max = max(self._load_ms_max, elapsed_ms)
+        if self.track_keys:
+            stats = self._key_stats[key]
+            stats["last_ms"] = round(elapsed_ms, 2)
+            stats["max_ms"] = max(stats["max_ms"], stats["last_ms"])
+            stats["total_ms"] += elapsed_ms
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """กี่วินาทีแล้วตั้งแต่เก็บ Key นี้ (None = ไม่มี)"""
+        with self._lock:
+            entry = self._data.get(key)
+            return time.monotonic() - entry.stored_at if entry is not None else None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            c = self._counters
+            lookups = c["hits"] + c["stale_hits"] + c["misses"] + c["coalesced"]
+            return {
+                "name": self.name,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_items": self.max_items,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hard_ttl": self.hard_ttl,
+                "tags": len(self._tags),
+                "shared": self.backend is not None,
+                "inflight": len(self._inflight),
+                "refreshing": len(self._refreshing),
+                **c,
+                "hit_rate": round((c["hits"] + c["stale_hits"]) / lookups * 100, 2) if lookups else 0.0,
+                "avg_load_ms": round(self._load_ms_total / c["loads"], 2) if c["loads"] else 0,
+                "max_load_ms": round(self._load_ms_max, 2),
+            }
+
+    def slowest(self, top: int = 50):
+        """Key ที่โหลดช้าสุด (ต้องเปิด track_keys)"""
+        with self._lock:
+            rows = []
+            for key, stats in self._key_stats.items():
+                rows.append({
+                    "key": key,
+                    **{k: v for k, v in stats.items() if k != "total_ms"},
+                    "avg_ms": round(stats["total_ms"] / stats["loads"], 2) if stats["loads"] else 0,
+                    "cached": key in self._data,
+                })
+        return sorted(rows, key=lambda r: r["max_ms"], reverse=True)[:top]
+
+    def reset_metrics(self) -> None:
+        with self._lock:
+            self._counters = dict.fromkeys(COUNTERS, 0)
+            self._load_ms_total = 0.0
+            self._load_ms_max = 0.0
+            self._key_stats.clear()
@@ -8,6 +8,16 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # bcrypt: ความแรง (rounds, เพิ่ม 1 = ช้าขึ้น 2 เท่า - เปลี่ยนแล้ว Hash เดิมถูกทำใหม่ตอน Login สำเร็จ)
+    # ทำใน Process แยก PASSWORD_HASH_WORKERS ตัว (0 = ทำใน Thread ของ Request แบบเดิม) / งานค้างเกิน MAX_PENDING ตอบ 503
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # Refresh Token: อายุนับจากครั้งล่าสุดที่ใช้ (sliding, วัน) / อายุสูงสุดนับจาก Login (วัน)
+    # เพิกถอน (หมุน Token / Logout) เขียนลง DB เป็นชุดทุก TOKEN_REVOCATION_FLUSH_SECONDS
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REFRESH_SESSION_MAX_DAYS: int = 30
+    TOKEN_REVOCATION_FLUSH_SECONDS: float = 1.0
     
     SUPABASE_URL: str
     SUPABASE_KEY: str
@@ -15,6 +25,50 @@ class Settings(BaseSettings):
     # เวลาตัดรอบวันใหม่ (Default 05:20 น.)
     DAY_CUTOFF_TIME: str = "05:20:00"
 
+    # จำนวนเดือนที่สร้าง partition ของ tickets / ticket_items ล่วงหน้า
+    PARTITION_MONTHS_AHEAD: int = 3
+
+    # Cold Archive: ย้ายงวดที่ตรวจรางวัลจบแล้วและเก่ากว่า N วันไป ticket_archives
+    ARCHIVE_AFTER_DAYS: int = 90
+    ARCHIVE_BATCH_SIZE: int = 500
+
+    # กราฟยอดขายรายนาที (/play/stats/timeseries): ขนาด Ring Buffer ต่อร้าน (นาที) และรอบดึงยอดวันนี้จาก DB ใหม่
+    # ใช้เฉพาะตอนปิด NOTIFY (เปิดไว้ = บิลของ worker อื่นส่งมาทาง NOTIFY, ดึงจาก DB ครั้งเดียวต่อวัน) / 0 = ครั้งเดียวต่อวัน (worker เดียวเท่านั้น)
+    TIMESERIES_RING_MINUTES: int = 2880
+    TIMESERIES_RESYNC_SECONDS: int = 30
+    # เลขแทงสูงสุดของงวดที่กำลังขาย (/play/stats/top_numbers): รอบดึงยอดจาก DB ใหม่
+    # ใช้เฉพาะตอนปิด NOTIFY (เปิดไว้ = บิลของ worker อื่นส่งมาทาง NOTIFY, ดึงจาก DB ครั้งแรกที่เปิดดูเท่านั้น) / 0 = ครั้งแรกเท่านั้น (worker เดียวเท่านั้น)
+    TOP_NUMBERS_RESYNC_SECONDS: int = 30
+    # ผลรางวัลล่าสุดต่อ Code หวย (/reward/history, number_stats): จำนวนงวดที่จำไว้ และรอบดึงผลจาก DB ใหม่ (สำรองกรณีปิด NOTIFY / พลาดข้อความ - เปิดไว้ worker อื่นเห็นผลทันที)
+    RESULT_HISTORY_ROUNDS: int = 100
+    RESULT_HISTORY_RESYNC_SECONDS: int = 30
+    # สถิติเลขออกย้อนหลัง (/reward/number_stats): จำนวนงวดสูงสุดที่คำนวณ (ไม่เกิน RESULT_HISTORY_ROUNDS)
+    NUMBER_STATS_ROUNDS: int = 100
+
+    # งบหน่วยความจำโดยประมาณของ Cache ต่อ worker (MB): ประวัติบิล / หน้าสถิติ
+    HISTORY_CACHE_MAX_MB: int = 64
+    STATS_CACHE_MAX_MB: int = 64
+    # ล้าง Cache ข้าม worker ด้วย LISTEN/NOTIFY (ปิดถ้าต่อผ่าน Pooler แบบ transaction) / DSN แยกสำหรับ LISTEN (ว่าง = ใช้ DATABASE_URL)
+    CACHE_NOTIFY_ENABLED: bool = True
+    CACHE_NOTIFY_DSN: str = ""
+    # อายุ Cache รายการหวย / เลขอั้น (วินาที) เมื่อเปิด NOTIFY (ปิด NOTIFY ใช้ 60 / 300 แบบเดิม)
+    LOTTO_CACHE_TTL: int = 600
+    RISK_CACHE_TTL: int = 3600
+    # อายุ Cache ผู้ใช้ที่ Login อยู่ (Role / ร้าน / สถานะ) ของ get_current_user (วินาที) - แก้ผู้ใช้แล้วล้างทันทีอยู่แล้ว
+    PRINCIPAL_CACHE_TTL: int = 30
+    # L2 ของ Cache ใช้ร่วมหลาย worker: local = ไม่มี / shm = ไฟล์ mmap ในเครื่องเดียวกัน / redis = หลายเครื่อง
+    CACHE_BACKEND: str = "local"
+    CACHE_SHM_PATH: str = "/dev/shm/lotto-shop-cache"
+    CACHE_SHM_MB: int = 64
+    CACHE_SHM_SLOT_KB: int = 64
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    # Rate Limit: local = นับแยกแต่ละ worker / redis = นับร่วมทุก worker/instance (ว่าง = ใช้ CACHE_REDIS_URL)
+    RATE_LIMIT_BACKEND: str = "local"
+    RATE_LIMIT_REDIS_URL: str = ""
+
+    # Dashboard Real-time (/play/stream): จำนวนข้อความล่าสุดที่เก็บต่อร้าน (Client ที่ค้างอ่านเกินนี้จะได้ resync)
+    SSE_QUEUE_SIZE: int = 256
+
     class Config:
         env_file = ".env"
 
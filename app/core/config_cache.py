@@ -0,0 +1,50 @@
+# app/core/config_cache.py
+"""
+Cache ข้อมูลตั้งค่าที่อ่านทุกหน้าแต่แก้นานๆ ครั้ง: หมวดหมู่หวย / เรทจ่าย / หน้าร้านตาม Subdomain
+(Namespace "categories", "rates", "shop_config" ของ app/core/cache)
+
+เก็บเป็น Rendered (JSON + ETag ของ app/core/http_cache.py) → Request ที่เจอใน Cache ไม่ต้องแตะ DB / ไม่ต้องแปลง JSON
+แก้ข้อมูลแล้วเรียก invalidate_* หลัง commit → ล้างทั้ง Namespace ทุก worker (แก้ไม่บ่อย ไม่ต้องไล่ทีละ Key)
+"""
+from typing import Any, Callable, List, Optional
+
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.core.cache import get_cache, bus
+from app.core.http_cache import Rendered, render, render_models
+from app.schemas import CategoryResponse, RateProfileResponse
+
+# แก้แล้ว NOTIFY ล้างทุก worker → เก็บได้นาน / ไม่มี NOTIFY ต้องพึ่งอายุสั้นๆ
+CACHE_TTL = settings.LOTTO_CACHE_TTL if settings.CACHE_NOTIFY_ENABLED else 60
+
+_CATEGORY_LIST = TypeAdapter(List[CategoryResponse])
+_RATE_LIST = TypeAdapter(List[RateProfileResponse])
+
+_categories = get_cache("categories", shared=True, ttl=CACHE_TTL, max_items=5000)
+_rates = get_cache("rates", shared=True, ttl=CACHE_TTL, max_items=5000)
+_shop_config = get_cache("shop_config", shared=True, ttl=CACHE_TTL, max_items=5000)
+
+def get_categories(key: str, fetch: Callable[[], List[Any]]) -> Rendered:
+    """หมวดหมู่ของมุมมอง key (ผู้เรียกเลือก key ตาม Role/ร้าน) - fetch() คืน LottoCategory ตามลำดับที่ต้องการ"""
+    return _categories.get_or_load(key, lambda: render_models(_CATEGORY_LIST, fetch()))
+
+def get_rates(key: str, fetch: Callable[[], List[Any]]) -> Rendered:
+    return _rates.get_or_load(key, lambda: render_models(_RATE_LIST, fetch()))
+
+def get_shop_config(subdomain: str, fetch: Callable[[], Optional[dict]]) -> Optional[Rendered]:
+    """None = ไม่มีร้านนี้ / ปิดอยู่ (จำไว้ด้วย เปิดร้านใหม่แล้วล้างให้)"""
+    def load() -> Optional[Rendered]:
+        config = fetch()
+        return render(config) if config is not None else None
+
+    return _shop_config.get_or_load(subdomain, load)
+
+def invalidate_categories():
+    bus.invalidate("categories", clear=True)
+
+def invalidate_rates():
+    bus.invalidate("rates", clear=True)
+
+def invalidate_shop_config():
+    bus.invalidate("shop_config", clear=True)
@@ -0,0 +1,159 @@
+# app/core/export.py
+"""
+Export บิล (และรายการเลข) เป็น CSV / NDJSON แบบ Stream สำหรับกระทบยอดรายเดือน (/play/export)
+
+- อ่านด้วย Server-side Cursor (yield_per) ทีละ BATCH_ROWS แถว → RAM คงที่ ไม่ขึ้นกับจำนวนบิล
+- เขียนออกเป็นก้อนละ ~CHUNK_BYTES (บีบอัด gzip ทีละก้อนได้)
+- รวมบิลใน ticket_archives ด้วย (งวดที่ถูกย้ายไปแล้วออกก่อน แล้วต่อด้วยตารางหลัก เรียงตามงวด → เวลา)
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Iterator, List, Optional
+
+import pytz
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+_BANGKOK = pytz.timezone('Asia/Bangkok')
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+BATCH_ROWS = 2000
+CHUNK_BYTES = 64 * 1024
+# ทุก Query ของไฟล์เดียวกันต้องอ่านจาก Snapshot เดียว (ดู iter_export)
+ISOLATION_LEVEL = "REPEATABLE READ"
+
+TICKET_COLUMNS = [
+    "ticket_id", "created_at", "round_date", "user_id", "username", "lotto_type_id", "lotto_name",
+    "status", "total_amount", "commission_amount", "winning_amount", "note",
+]
+ITEM_COLUMNS = TICKET_COLUMNS + [
+    "item_id", "number", "bet_type", "amount", "reward_rate", "item_winning_amount", "item_status",
+]
+
+_TICKET_SELECT = """
+    t.id AS ticket_id, t.created_at, t.round_date, t.user_id, u.username, t.lotto_type_id, l.name AS lotto_name,
+    t.status, t.total_amount, t.commission_amount, t.winning_amount, t.note
+"""
+
+HOT_TICKETS_SQL = f"""
+    SELECT {_TICKET_SELECT}
+    FROM tickets t
+    LEFT JOIN users u ON u.id = t.user_id
+    LEFT JOIN lotto_types l ON l.id = t.lotto_type_id
+    WHERE {{where}}
+    ORDER BY t.round_date, t.created_at, t.id
+"""
+HOT_ITEMS_SQL = f"""
+    SELECT {_TICKET_SELECT},
+           i.id AS item_id, i.number, i.bet_type, i.amount, i.reward_rate,
+           i.winning_amount AS item_winning_amount, i.status AS item_status
+    FROM tickets t
+    JOIN ticket_items i ON i.ticket_id = t.id AND i.round_date = t.round_date
+    LEFT JOIN users u ON u.id = t.user_id
+    LEFT JOIN lotto_types l ON l.id = t.lotto_type_id
+    WHERE {{where}} AND i.round_date BETWEEN :s_date AND :e_date
+    ORDER BY t.round_date, t.created_at, t.id
+"""
+ARCHIVE_TICKETS_SQL = HOT_TICKETS_SQL.replace("FROM tickets t", "FROM ticket_archives t")
+ARCHIVE_ITEMS_SQL = f"""
+    SELECT {_TICKET_SELECT},
+           e->>0 AS item_id, e->>1 AS number, e->>2 AS bet_type, (e->>3)::numeric AS amount,
+           (e->>4)::numeric AS reward_rate, (e->>5)::numeric AS item_winning_amount, e->>6 AS item_status
+    FROM ticket_archives t
+    CROSS JOIN LATERAL jsonb_array_elements(t.items_packed) e
+    LEFT JOIN users u ON u.id = t.user_id
+    LEFT JOIN lotto_types l ON l.id = t.lotto_type_id
+    WHERE {{where}}
+    ORDER BY t.round_date, t.created_at, t.id
+"""
+
+def _plain(value: Any) -> Any:
+    """แปลงค่าจาก DB ให้อยู่ในรูปที่เขียนลงไฟล์ได้ (เวลาเป็นเวลาไทย)"""
+    if isinstance(value, datetime):
+        return value.astimezone(_BANGKOK).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+def _queries(include_items: bool, with_archive: bool) -> List[str]:
+    queries = []
+    if with_archive:
+        queries.append(ARCHIVE_ITEMS_SQL if include_items else ARCHIVE_TICKETS_SQL)
+    queries.append(HOT_ITEMS_SQL if include_items else HOT_TICKETS_SQL)
+    return queries
+
+def iter_export(conn: Connection, s_date: date, e_date: date, shop_id=None, lotto_type_id=None,
+                user_id=None, include_items: bool = False, fmt: str = "csv",
+                compress: bool = False, with_archive: bool = True) -> Iterator[bytes]:
+    """
+    สร้างไฟล์ Export ทีละก้อน (bytes) ช่วง round_date s_date..e_date
+    conn ต้องเปิดค้างไว้จนอ่าน Iterator หมด (Server-side Cursor ผูกกับ Connection นี้)
+    และเปิดด้วย isolation_level=ISOLATION_LEVEL → Query archive กับ Query ตารางหลักเห็น Snapshot เดียวกัน
+    (ไม่งั้นบิลที่ถูกย้ายไป archive ระหว่าง 2 Query จะหายหรือซ้ำในไฟล์)
+    """
+    conditions = ["t.round_date BETWEEN :s_date AND :e_date"]
+    params = {"s_date": s_date, "e_date": e_date}
+    for column, value in (("shop_id", shop_id), ("lotto_type_id", lotto_type_id), ("user_id", user_id)):
+        if value is not None:
+            conditions.append(f"t.{column} = :{column}")
+            params[column] = value
+    where = " AND ".join(conditions)
+    columns = ITEM_COLUMNS if include_items else TICKET_COLUMNS
+
+    gzipper = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+
+    def take_chunk() -> bytes:
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return gzipper.compress(data) if gzipper else data
+
+    if writer:
+        writer.writerow(columns)
+
+    for sql in _queries(include_items, with_archive):
+        result = conn.execute(text(sql.format(where=where)), params, execution_options={"yield_per": BATCH_ROWS})
+        # text() ไม่ส่ง yield_per ต่อให้ Result → ต้องระบุขนาดเองไม่งั้น partitions() จะ fetchall ทั้งก้อน
+        for rows in result.partitions(BATCH_ROWS):
+            for row in rows:
+                values = [_plain(v) for v in row]
+                if writer:
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False))
+                    buffer.write("\n")
+            if buffer.tell() >= CHUNK_BYTES:
+                chunk = take_chunk()
+                if chunk:
+                    yield chunk
+
+    tail = take_chunk()
+    if gzipper:
+        tail += gzipper.flush()
+    if tail:
+        yield tail
+
+def export_filename(s_date: date, e_date: date, include_items: bool, fmt: str, compress: bool) -> str:
+    kind = "items" if include_items else "tickets"
+    return f"{kind}_{s_date.isoformat()}_{e_date.isoformat()}.{fmt}" + (".gz" if compress else "")
+
+def round_range(start_date: str, end_date: str, max_days: Optional[int] = None):
+    """แปลงช่วงวันที่ YYYY-MM-DD คืน (s_date, e_date) / ValueError ถ้ารูปแบบผิดหรือช่วงไม่ถูกต้อง"""
+    s_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    e_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    if e_date < s_date:
+        raise ValueError("end_date before start_date")
+    if max_days and e_date - s_date > timedelta(days=max_days):
+        raise ValueError("range too long")
+    return s_date, e_date
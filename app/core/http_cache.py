@@ -0,0 +1,59 @@
+# app/core/http_cache.py
+"""
+JSON สำเร็จรูป + ETag สำหรับ Endpoint อ่านที่ตอบจาก Cache
+
+- Cache เก็บ Rendered (bytes + ETag) แทน Object → Request ที่เจอใน Cache ไม่ต้องผ่าน Pydantic / jsonable_encoder อีก
+- ETag = hash ของ bytes → If-None-Match ตรงกันตอบ 304 (ไม่มี Body) ก่อนแตะ DB หรือแปลง JSON ใดๆ
+- แปลง JSON ด้วย pydantic-core (มี Schema) / orjson (dict ธรรมดา) ได้ผลเหมือนที่ FastAPI ส่งเอง
+"""
+import hashlib
+from decimal import Decimal
+from typing import Any, Iterable, NamedTuple, Optional
+
+import orjson
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+# ข้อมูลต่อผู้ใช้ที่เปลี่ยนได้ตลอด: Browser เก็บได้แต่ต้องถามทุกครั้ง (ได้ 304 ถ้าไม่เปลี่ยน)
+PRIVATE_REVALIDATE = "private, no-cache"
+
+class Rendered(NamedTuple):
+    body: bytes
+    etag: str
+
+def rendered(body: bytes) -> Rendered:
+    return Rendered(body, '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"')
+
+def _default(obj: Any) -> Any:
+    # Decimal เป็นตัวเลขแบบ jsonable_encoder
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def render(content: Any) -> Rendered:
+    """dict / list ธรรมดา (แบบ Endpoint ที่ไม่มี response_model)"""
+    return rendered(orjson.dumps(content, default=_default))
+
+def render_models(adapter: TypeAdapter, objects: Iterable[Any]) -> Rendered:
+    """ORM Objects ตาม Schema (แบบ Endpoint ที่มี response_model) เช่น TypeAdapter(List[CategoryResponse])"""
+    return rendered(adapter.dump_json(adapter.validate_python(list(objects), from_attributes=True)))
+
+def join_array(fragments: Iterable[bytes]) -> Rendered:
+    """ต่อ JSON ของแต่ละรายการ (แปลงไว้แล้ว) เป็น Array"""
+    return rendered(b"[" + b",".join(fragments) + b"]")
+
+EMPTY_ARRAY = rendered(b"[]")
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def respond(request: Request, content: Rendered, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    """200 พร้อม Body ที่แปลงไว้แล้ว หรือ 304 ถ้า Client มีรุ่นนี้อยู่แล้ว"""
+    headers = {"ETag": content.etag, "Cache-Control": cache_control}
+    if _matches(request.headers.get("if-none-match"), content.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content.body, media_type="application/json", headers=headers)
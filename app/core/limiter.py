@@ -1,6 +1,58 @@
 # app/core/limiter.py
+"""
+Rate Limit ของ API (slowapi)
+
+RATE_LIMIT_BACKEND:
+  - local = นับใน RAM ของแต่ละ worker (30/minute จริงๆ = 30 × จำนวน worker × จำนวน instance)
+  - redis = นับร่วมกันทุก worker / instance (app/core/limiter_storage.py) - Redis ล่ม → นับใน RAM ชั่วคราวจนกว่าจะกลับมา
+ทั้งสองแบบใช้ sliding window counter (ไม่มีช่วงต่อรอบที่ยิงได้ 2 เท่า)
+
+Key: IP (ค่าเริ่มต้น) / user_key = ต่อผู้ใช้ / shop_key = ต่อร้าน (จาก Token - ไม่มี Token ใช้ IP)
+"""
+from typing import Optional
+
+from fastapi import Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-# ให้ระบบจดจำจาก IP Address ของคนที่ยิงเข้ามา (get_remote_address)
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+from app.core import limiter_storage  # noqa: F401 - ลงทะเบียน lotto+redis:// ให้ limits
+from app.core.config import settings
+from app.core.security import decode_token
+
+STRATEGY = "sliding-window-counter"
+
+def storage_uri(backend: str, redis_url: str) -> str:
+    if backend == "redis":
+        return "lotto+" + redis_url
+    return "memory://"
+
+def build_limiter(backend: str, redis_url: str) -> Limiter:
+    return Limiter(
+        key_func=get_remote_address,
+        strategy=STRATEGY,
+        storage_uri=storage_uri(backend, redis_url),
+        in_memory_fallback_enabled=backend != "local",
+    )
+
+def _claims(request: Request) -> Optional[dict]:
+    # decode_token จำ Token ที่ตรวจแล้ว → ไม่ต้องตรวจ HMAC ซ้ำกับ get_current_user
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return decode_token(token)
+
+def user_key(request: Request) -> str:
+    claims = _claims(request)
+    if claims and claims.get("sub"):
+        return f"user:{claims['sub']}"
+    return get_remote_address(request)
+
+def shop_key(request: Request) -> str:
+    claims = _claims(request)
+    if claims and claims.get("shop"):
+        return f"shop:{claims['shop']}"
+    # Token ไม่มีร้าน (SuperAdmin / Token รุ่นเก่า) → นับต่อผู้ใช้แทน
+    return user_key(request)
+
+# ให้ระบบจดจำจาก IP Address ของคนที่ยิงเข้ามา (get_remote_address) เว้นแต่ Endpoint จะระบุ key_func เอง
+limiter = build_limiter(settings.RATE_LIMIT_BACKEND, settings.RATE_LIMIT_REDIS_URL or settings.CACHE_REDIS_URL)
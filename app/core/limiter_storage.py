@@ -0,0 +1,118 @@
+# app/core/limiter_storage.py
+"""
+ที่เก็บตัวนับของ Rate Limit (slowapi / limits) ที่ใช้ร่วมกันทุก worker / ทุก instance ผ่าน Redis
+
+ใช้คำสั่งพื้นฐานของโปรโตคอล Redis เท่านั้น (GET / MGET / INCRBY / EXPIRE / PTTL / DEL / SCAN / PING - ไม่ใช้ Lua)
+→ ใช้ได้กับ Redis / Valkey / KeyDB / Server จำลองในสคริปต์ทดสอบ
+
+Sliding window counter: นับแยกหน้าต่างละ Key (key/<เลขหน้าต่าง>) แล้วถ่วงน้ำหนักหน้าต่างก่อนตามเวลาที่เหลือ
+ขอสิทธิ์ 1 ครั้ง = 1 round-trip (GET ก่อน + INCRBY ปัจจุบัน + EXPIRE ใน Pipeline เดียว)
+เกินโควตา → คืนยอดที่เพิ่งบวก (INCRBY ติดลบ) แล้วปฏิเสธ
+
+ลงทะเบียนเป็น Scheme "lotto+redis://" / "lotto+rediss://" ของ limits.storage_from_string
+"""
+import time
+from math import floor
+from typing import Tuple
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+class RespStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    STORAGE_SCHEME = ["lotto+redis", "lotto+rediss"]
+    TIMEOUT_SECONDS = 0.2
+    PREFIX = "rate:"
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        import redis
+
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._redis = redis
+        self._client = redis.Redis.from_url(
+            uri.removeprefix("lotto+"), protocol=2,
+            socket_timeout=self.TIMEOUT_SECONDS, socket_connect_timeout=self.TIMEOUT_SECONDS,
+        )
+
+    @property
+    def base_exceptions(self):
+        return self._redis.RedisError
+
+    # ==========================================
+    # 🪟 Sliding window counter
+    # ==========================================
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = (self.PREFIX + k for k in self.sliding_window_keys(key, expiry, now))
+        pipe = self._client.pipeline(transaction=False)
+        pipe.get(previous_key)
+        pipe.incrby(current_key, amount)
+        # หน้าต่างปัจจุบันต้องอยู่ต่อเป็น "หน้าต่างก่อน" ของรอบถัดไป
+        pipe.expire(current_key, 2 * expiry)
+        previous, current, _ = pipe.execute()
+        previous_count = int(previous or 0)
+        weighted = previous_count * self._previous_ttl(previous_count, expiry, now) / expiry + int(current)
+        if floor(weighted) > limit:
+            # อีก Request ชิงไปก่อน / เต็มอยู่แล้ว → คืนยอดที่เพิ่งบวก
+            self._client.incrby(current_key, -amount)
+            return False
+        return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> Tuple[int, float, int, float]:
+        now = time.time()
+        previous_key, current_key = (self.PREFIX + k for k in self.sliding_window_keys(key, expiry, now))
+        previous, current = self._client.mget(previous_key, current_key)
+        previous_count, current_count = int(previous or 0), int(current or 0)
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, self._previous_ttl(previous_count, expiry, now), current_count, current_ttl
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self._client.delete(self.PREFIX + previous_key, self.PREFIX + current_key)
+
+    @staticmethod
+    def _previous_ttl(previous_count: int, expiry: int, now: float) -> float:
+        """เวลาที่หน้าต่างก่อนยังถ่วงน้ำหนักอยู่ (เหมือน storage ของ limits)"""
+        if previous_count == 0:
+            return 0.0
+        return (1 - (((now - expiry) / expiry) % 1)) * expiry
+
+    # ==========================================
+    # 🔢 Fixed window (ให้ครบตาม Storage ของ limits)
+    # ==========================================
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        value = self._client.incrby(self.PREFIX + key, amount)
+        if value == amount:
+            self._client.expire(self.PREFIX + key, expiry)
+        return value
+
+    def get(self, key: str) -> int:
+        return int(self._client.get(self.PREFIX + key) or 0)
+
+    def get_expiry(self, key: str) -> float:
+        return time.time() + max(self._client.pttl(self.PREFIX + key), 0) / 1000
+
+    def check(self) -> bool:
+        try:
+            return bool(self._client.ping())
+        except self._redis.RedisError:
+            return False
+
+    def reset(self) -> int:
+        """ลบตัวนับทั้งหมดของ Rate Limit (เฉพาะ Key ขึ้นต้นด้วย PREFIX - ไม่แตะ Cache ที่ใช้ Redis เดียวกัน) คืนจำนวนที่ลบ"""
+        removed = 0
+        batch = []
+        for key in self._client.scan_iter(match=self.PREFIX + "*", count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                removed += self._client.delete(*batch)
+                batch = []
+        if batch:
+            removed += self._client.delete(*batch)
+        return removed
+
+    def clear(self, key: str) -> None:
+        self._client.delete(self.PREFIX + key)
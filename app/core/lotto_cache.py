@@ -1,149 +1,160 @@
 # app/core/lotto_cache.py
 """
 Lotto Cache System - Optimized for Low Latency & High Consistency
-จัดการ Cache รายการหวย พร้อม Thread-Safe และ Metrics
+จัดการ Cache รายการหวย (Namespace "lottos" ของ app/core/cache) พร้อม Metrics
+
+โหลดครั้งเดียวแล้วสร้างดัชนีไว้เลย (ต่อร้าน / แม่แบบ / Code / id) + JSON สำเร็จรูป + ETag ของแต่ละมุมมอง
+→ GET /play/lottos เป็นแค่การหา Key ใน Dict แล้วส่ง bytes ออกไป ไม่ต้องกรองทีละตัว / แปลง JSON ทุก Request
 """
-from typing import List, Optional, Dict
-import time
-import threading
+from typing import List, Dict, Any, Optional
+from app.core.config import settings
+from app.core.cache import get_cache, bus
+from app.core.http_cache import Rendered, EMPTY_ARRAY, join_array
 from app.schemas import LottoResponse
 
-# ==================== Cache State ====================
-_LOTTO_LIST_CACHE: Optional[List[Dict]] = None
-_LAST_UPDATED: float = 0
-_cache_lock = threading.Lock()  # ✅ Thread-safe protection
-
 # ==================== Configuration ====================
-CACHE_DURATION = 60  
+# แก้หวยแล้ว NOTIFY ล้างทุก worker → เก็บได้นาน / ไม่มี NOTIFY ต้องพึ่งอายุสั้นๆ
+CACHE_DURATION = settings.LOTTO_CACHE_TTL if settings.CACHE_NOTIFY_ENABLED else 60
+_KEY = "all"
+
+# รายการหวยทั้งระบบเก็บเป็นก้อนเดียว: {"lottos", "code_index", "by_id", "views"}
+_cache = get_cache("lottos", shared=True, ttl=CACHE_DURATION, max_items=1)
+
+# มุมมองของ GET /play/lottos (+ /lottos/templates) → Key ใน snapshot["views"] คือ "<view>:<shop_id|ALL>"
+VIEW_ALL = "all"              # SuperAdmin: ทุกตัว
+VIEW_SHOP = "shop"            # Admin: ทุกตัวของร้าน (รวมแม่แบบของร้าน)
+VIEW_MEMBER = "member"        # ลูกค้า: เฉพาะที่ไม่ใช่แม่แบบของร้าน (ไม่มีร้าน = ทุกร้าน)
+VIEW_TEMPLATES = "templates"  # แม่แบบของร้าน + แม่แบบกลาง (ไม่มีร้าน = แม่แบบกลาง)
+VIEW_ALL_TEMPLATES = "all_templates"  # SuperAdmin: แม่แบบทั้งหมด
+
+def _view_key(view: str, shop_id: Optional[Any]) -> str:
+    return f"{view}:{shop_id or 'ALL'}"
+
+def _load(db_fetch_callback) -> Dict[str, Any]:
+    lottos_orm = db_fetch_callback()
 
-# ==================== Metrics (สำหรับ Debug) ====================
-_cache_hits = 0
-_cache_misses = 0
+    # Convert ORM → Pydantic → Dict เพื่อตัดขาดจาก DB Session (ป้องกัน DetachedInstanceError)
+    valid_lottos = []
+    # { code: [lotto_type_id (str), ...] } ของหวยทุกตัว (รวมแม่แบบ) ใช้กระจายผลรางวัลตาม Code
+    code_index: Dict[str, List[str]] = {}
+    by_id: Dict[str, Dict] = {}
+    # JSON ของหวยแต่ละตัว (แปลงครั้งเดียว แล้วต่อเป็นมุมมองต่างๆ) แยกตามร้าน
+    all_json: List[bytes] = []
+    shop_json: Dict[Optional[str], List[bytes]] = {}
+    member_json: Dict[Optional[str], List[bytes]] = {}
+    template_json: Dict[Optional[str], List[bytes]] = {}
+    for lotto in lottos_orm:
+        try:
+            model = LottoResponse.model_validate(lotto)
+        except Exception as conv_err:
+            print(f"⚠️ Failed to convert lotto {getattr(lotto, 'id', 'unknown')}: {conv_err}")
+            continue  # Skip invalid lotto
+        data = model.model_dump()
+        valid_lottos.append(data)
+        by_id[str(data["id"])] = data
+        if getattr(lotto, 'code', None):
+            code_index.setdefault(lotto.code, []).append(str(lotto.id))
+
+        # รูปแบบเดียวกับที่ FastAPI ส่งตาม response_model
+        fragment = model.model_dump_json().encode("utf-8")
+        shop_key = str(data["shop_id"]) if data["shop_id"] else None
+        all_json.append(fragment)
+        shop_json.setdefault(shop_key, []).append(fragment)
+        if data["is_template"] is False:
+            member_json.setdefault(shop_key, []).append(fragment)
+        elif data["is_template"]:
+            template_json.setdefault(shop_key, []).append(fragment)
+
+    views = {_view_key(VIEW_ALL, None): join_array(all_json)}
+    for shop_key, fragments in shop_json.items():
+        views[_view_key(VIEW_SHOP, shop_key)] = join_array(fragments)
+    for shop_key, fragments in member_json.items():
+        if shop_key:
+            views[_view_key(VIEW_MEMBER, shop_key)] = join_array(fragments)
+    # ลูกค้าที่ไม่มีร้าน เห็นหวยที่ไม่ใช่แม่แบบของทุกร้าน
+    views[_view_key(VIEW_MEMBER, None)] = join_array([f for fragments in member_json.values() for f in fragments])
+    global_templates = template_json.get(None, [])
+    views[_view_key(VIEW_ALL_TEMPLATES, None)] = join_array([f for fragments in template_json.values() for f in fragments])
+    views[_view_key(VIEW_TEMPLATES, None)] = join_array(global_templates)
+    for shop_key, fragments in template_json.items():
+        if shop_key:
+            views[_view_key(VIEW_TEMPLATES, shop_key)] = join_array(fragments + global_templates)
+
+    return {"lottos": valid_lottos, "code_index": code_index, "by_id": by_id, "views": views}
+
+def _get_snapshot(db_fetch_callback) -> Dict[str, Any]:
+    try:
+        # โหลดพร้อมกันหลาย Request → ดึง DB แค่คนเดียว / ดึงไม่สำเร็จ → ใช้ของเก่าไปก่อน (stale is better than crash)
+        return _cache.get_or_load(_KEY, lambda: _load(db_fetch_callback), stale_on_error=True)
+    except Exception as e:
+        print(f"❌ Cache Refresh Error: {e}")
+        return {"lottos": [], "code_index": {}, "by_id": {}, "views": {}}
 
 def get_cached_lottos(db_fetch_callback) -> List[Dict]:
     """
     ดึงรายการหวยจาก Cache (Thread-Safe)
-    
+
     Args:
         db_fetch_callback: ฟังก์ชันที่ query DB (ต้อง return List[LottoType])
-    
+
     Returns:
-        List[Dict]: รายการหวยทั้งหมด (เป็น Dict แทน ORM Objects)
-    
-    Note:
-        - ใช้ threading.Lock ป้องกัน concurrent refresh
-        - Cache duration = 1 วินาที (สมดุลระหว่างความเร็วและความแม่นยำ)
-        - Auto-convert ORM → Dict เพื่อป้องกัน DetachedInstanceError
+        List[Dict]: รายการหวยทั้งหมด (เป็น Dict แทน ORM Objects) - ห้ามแก้ List ที่ได้ไป
+    """
+    return _get_snapshot(db_fetch_callback)["lottos"]
+
+def get_code_index(db_fetch_callback) -> Dict[str, List[str]]:
     """
-    global _LOTTO_LIST_CACHE, _LAST_UPDATED, _cache_hits, _cache_misses
-    
-    current_time = time.time()
-    
-    # ✅ [FIX] ใช้ Lock ป้องกัน race condition จาก concurrent requests
-    with _cache_lock:
-        # เช็คว่าต้อง refresh cache หรือไม่
-        need_refresh = (
-            _LOTTO_LIST_CACHE is None or 
-            (current_time - _LAST_UPDATED > CACHE_DURATION)
-        )
-        
-        if need_refresh:
-            _cache_misses += 1
-            print(f"🔄 [Cache MISS] Refreshing Lotto Cache from DB (age: {current_time - _LAST_UPDATED:.2f}s)")
-            
-            try:
-                # 1. Query Database
-                start_time = time.time()
-                lottos_orm = db_fetch_callback()
-                query_time = (time.time() - start_time) * 1000  # ms
-                
-                # 2. Convert ORM → Pydantic → Dict
-                # เพื่อตัดขาดจาก DB Session (ป้องกัน DetachedInstanceError)
-                valid_lottos = []
-                for lotto in lottos_orm:
-                    try:
-                        lotto_dict = LottoResponse.model_validate(lotto).model_dump()
-                        valid_lottos.append(lotto_dict)
-                    except Exception as conv_err:
-                        print(f"⚠️ Failed to convert lotto {getattr(lotto, 'id', 'unknown')}: {conv_err}")
-                        continue  # Skip invalid lotto
-                
-                # 3. Update cache
-                _LOTTO_LIST_CACHE = valid_lottos
-                _LAST_UPDATED = current_time
-                
-                print(f"✅ Cache refreshed: {len(valid_lottos)} lottos (query: {query_time:.0f}ms, hit rate: {_get_cache_hit_rate_unsafe():.1f}%)")
-                
-            except Exception as e:
-                print(f"❌ Cache Refresh Error: {e}")
-                # ถ้า refresh ไม่สำเร็จ และไม่มี cache เก่า → คืน []
-                if _LOTTO_LIST_CACHE is None:
-                    print("⚠️ No cache available, returning empty list")
-                    return []
-                else:
-                    # ถ้ามี cache เก่า → ใช้ cache เก่าไปก่อน (stale is better than crash)
-                    print(f"⚠️ Using stale cache (age: {current_time - _LAST_UPDATED:.1f}s)")
-        else:
-            # Cache Hit
-            _cache_hits += 1
-            cache_age = current_time - _LAST_UPDATED
-            if _cache_hits % 100 == 0:  # Log ทุก 100 hits
-                print(f"📊 Cache stats: {_cache_hits} hits, {_cache_misses} misses (hit rate: {_get_cache_hit_rate_unsafe():.1f}%)")
-        
-        return _LOTTO_LIST_CACHE if _LOTTO_LIST_CACHE else []
+    { code: [lotto_type_id, ...] } จากรอบเดียวกับ get_cached_lottos (ห้ามแก้ Dict ที่ได้ไป - ถูกแทนทั้งก้อนตอน refresh)
+    """
+    return _get_snapshot(db_fetch_callback)["code_index"]
+
+def get_cached_lotto(lotto_type_id: Any, db_fetch_callback) -> Optional[Dict]:
+    """หวย 1 ตัวตาม id (None = ไม่มี) - ห้ามแก้ Dict ที่ได้ไป"""
+    return _get_snapshot(db_fetch_callback)["by_id"].get(str(lotto_type_id))
+
+def get_lottos_view(db_fetch_callback, view: str, shop_id: Optional[Any] = None) -> Rendered:
+    """
+    JSON สำเร็จรูป + ETag ของมุมมอง VIEW_* ของร้านนี้ (shop_id=None = ไม่มีร้าน / ทั้งระบบตามมุมมอง)
+    ส่งออกด้วย http_cache.respond() ได้เลย
+    """
+    if view in (VIEW_ALL, VIEW_ALL_TEMPLATES):
+        shop_id = None
+    views = _get_snapshot(db_fetch_callback)["views"]
+    data = views.get(_view_key(view, shop_id))
+    if data is None and view == VIEW_TEMPLATES:
+        # ร้านที่ไม่มีแม่แบบของตัวเอง → แม่แบบกลางอย่างเดียว
+        data = views.get(_view_key(VIEW_TEMPLATES, None))
+    return data or EMPTY_ARRAY
 
 def invalidate_lotto_cache():
     """
-    Force invalidate cache (เรียกเมื่อ Admin กดเพิ่ม/ลบ/แก้ไขหวย)
-    
-    Thread-Safe: ใช้ lock ป้องกัน concurrent invalidation
+    Force invalidate cache (เรียกเมื่อ Admin กดเพิ่ม/ลบ/แก้ไขหวย หลัง commit) → request ถัดไปของทุก worker ดึงใหม่
     """
-    global _LOTTO_LIST_CACHE, _LAST_UPDATED
-    
-    with _cache_lock:
-        _LOTTO_LIST_CACHE = None
-        _LAST_UPDATED = 0  # ✅ Reset timestamp → บังคับให้ refresh ทันที
-        print("🗑️ Invalidated Lotto Cache → next request will refresh")
+    bus.invalidate("lottos", clear=True)
 
 def get_cache_stats() -> Dict:
     """
     ดึงสถิติ Cache สำหรับ Monitoring (Thread-Safe)
     """
-    with _cache_lock:  # ✅ [FIX] ป้องกัน race condition
-        return {
-            "cache_hits": _cache_hits,
-            "cache_misses": _cache_misses,
-            "hit_rate": _get_cache_hit_rate_unsafe(),  # เรียก unsafe version (อยู่ใน lock แล้ว)
-            "cached_items": len(_LOTTO_LIST_CACHE) if _LOTTO_LIST_CACHE else 0,
-            "cache_age_seconds": time.time() - _LAST_UPDATED if _LAST_UPDATED > 0 else None,
-            "cache_duration": CACHE_DURATION
-        }
+    metrics = _cache.metrics()
+    snapshot = _cache.peek(_KEY)
+    return {
+        "cache_hits": metrics["hits"],
+        "cache_misses": metrics["misses"] + metrics["coalesced"],
+        "hit_rate": metrics["hit_rate"],
+        "cached_items": len(snapshot["lottos"]) if snapshot else 0,
+        "cache_age_seconds": _cache.age(_KEY),
+        "cache_duration": CACHE_DURATION
+    }
 
 def get_cache_hit_rate() -> float:
     """
     คำนวณ Cache Hit Rate (%) - Thread-Safe
-    
-    Note: ใช้สำหรับเรียกจากภายนอก (เช่น logging)
-    """
-    with _cache_lock:  # ✅ [FIX] ป้องกัน race condition
-        return _get_cache_hit_rate_unsafe()
-
-def _get_cache_hit_rate_unsafe() -> float:
-    """
-    คำนวณ Cache Hit Rate (%) - Internal Use Only (ไม่มี lock)
-    
-    Warning: ต้องเรียกภายใน context ที่มี _cache_lock แล้วเท่านั้น!
     """
-    total = _cache_hits + _cache_misses
-    return (_cache_hits / total * 100) if total > 0 else 0.0
+    return _cache.metrics()["hit_rate"]
 
 def reset_cache_metrics():
     """
     รีเซ็ต metrics (สำหรับ testing หรือ monitoring reset) - Thread-Safe
     """
-    global _cache_hits, _cache_misses
-    
-    with _cache_lock:  # ✅ [FIX] ป้องกัน race condition
-        _cache_hits = 0
-        _cache_misses = 0
-        print("🔄 Cache metrics reset")
\ No newline at end of file
+    _cache.reset_metrics()
@@ -0,0 +1,111 @@
+# app/core/number_stats.py
+"""
+สถิติเลขออกย้อนหลังต่อ Code หวย (เลขเด็ด / เลขดับ) สำหรับ /reward/number_stats
+
+- ผลรางวัลเป็นของ Code (ออกครั้งเดียว ทุกร้านเห็นเหมือนกัน) → คำนวณ 1 ชุดต่อ Code ไม่ใช่ต่อร้าน
+- ผล NUMBER_STATS_ROUNDS งวดล่าสุดมาจาก app/core/result_history.py (อยู่ใน RAM, issue_reward อัปเดตให้ทันที)
+- เก็บสถิติที่คำนวณแล้วไว้ อ่านแล้วตอบได้ทันที คำนวณใหม่เมื่อผลชุดนั้นเปลี่ยน
+  (ไม่เกินไม่กี่ร้อยงวด ใช้เวลาระดับมิลลิวินาที)
+
+สถิติต่อชนิดรางวัล (top_3 / bottom_2):
+- hot / cold: เลขที่ออกบ่อยสุด / เลขที่หายไปนานสุด (นับเฉพาะเลขที่เคยออกใน Window)
+- positions: เลขโดดแต่ละหลัก 0-9 / running: เลขวิ่ง (เลขโดดที่อยู่ตำแหน่งไหนก็ได้)
+- gap = กี่งวดแล้วที่ไม่ออก (0 = งวดล่าสุด), streak = ออกติดกันกี่งวดจนถึงงวดล่าสุด, max_streak = ติดกันนานสุดใน Window
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core import result_history
+
+# จำนวน Code ที่เก็บไว้พร้อมกันต่อ Process (เกินแล้วทิ้งอันที่ไม่ได้ดูนานสุด)
+MAX_CODES = 500
+DIGITS = "0123456789"
+# ชนิดรางวัล → จำนวนหลัก (ผลที่หลักไม่ครบ เช่น ข้อมูลเก่าจาก Backfill ไม่นำมาคำนวณ)
+FIELDS = {"top_3": 3, "bottom_2": 2}
+
+# { code: {"results": ผลที่ใช้คำนวณ, "views": {(rounds, top): stats}} }
+_COMPUTED: "OrderedDict[str, dict]" = OrderedDict()
+_lock = threading.Lock()
+
+# ==========================================
+# 🧮 คำนวณ
+# ==========================================
+
+def _tally(rounds: List[Set[str]]) -> Dict[str, Dict[str, Any]]:
+    """rounds[i] = ชุดของ Key ที่ออกในงวด i (0 = ล่าสุด) → count / gap / streak / max_streak ต่อ Key"""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for i, keys in enumerate(rounds):
+        for key in keys:
+            st = stats.get(key)
+            if st is None:
+                st = stats[key] = {"count": 0, "gap": i, "streak": 0, "max_streak": 0, "_last": -2, "_run": 0}
+            st["count"] += 1
+            st["_run"] = st["_run"] + 1 if st["_last"] == i - 1 else 1
+            st["_last"] = i
+            st["max_streak"] = max(st["max_streak"], st["_run"])
+            if st["gap"] == 0 and st["_run"] == i + 1:
+                st["streak"] = st["_run"]
+    for st in stats.values():
+        del st["_last"], st["_run"]
+    return stats
+
+def _digit_rows(stats: Dict[str, Dict[str, Any]]) -> List[dict]:
+    """ครบทั้ง 0-9 (ตัวที่ไม่เคยออก count=0, gap=None)"""
+    return [
+        {"digit": d, **stats.get(d, {"count": 0, "gap": None, "streak": 0, "max_streak": 0})}
+        for d in DIGITS
+    ]
+
+def _field_stats(values: List[str], width: int, top: int) -> Dict[str, Any]:
+    """values ต้องยาว width หลักทุกตัว"""
+    numbers = _tally([{v} for v in values])
+    rows = [{"number": n, **st} for n, st in numbers.items()]
+
+    return {
+        "hot": sorted(rows, key=lambda r: (-r["count"], r["gap"], r["number"]))[:top],
+        "cold": sorted(rows, key=lambda r: (-r["gap"], r["count"], r["number"]))[:top],
+        "distinct": len(rows),
+        "unseen": 10 ** width - len(rows),
+        "positions": [
+            _digit_rows(_tally([{v[pos]} for v in values])) for pos in range(width)
+        ],
+        "running": _digit_rows(_tally([set(v) for v in values])),
+    }
+
+def _compute(results: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "rounds": len(results),
+        "last_round": results[0]["round_date"] if results else None,
+        "first_round": results[-1]["round_date"] if results else None,
+    }
+    for field, width in FIELDS.items():
+        # ข้ามงวดที่ผลชนิดนี้ว่าง/ผิดรูปแบบ/หลักไม่ครบ (gap นับเป็นงวดที่มีผลชนิดนั้นจริง)
+        values = [r[field] for r in results if r[field] and len(r[field]) == width and r[field].isdigit()]
+        stats[field] = _field_stats(values, width, top)
+    return stats
+
+# ==========================================
+# 📖 ฝั่งอ่าน
+# ==========================================
+
+def get_number_stats(db: Session, code: str, rounds: Optional[int] = None, top: int = 10) -> Dict[str, Any]:
+    """สถิติของ rounds งวดล่าสุด (ไม่เกิน NUMBER_STATS_ROUNDS) - คำนวณครั้งเดียวต่อ (rounds, top) จนกว่าผลจะเปลี่ยน"""
+    depth = min(settings.NUMBER_STATS_ROUNDS, settings.RESULT_HISTORY_ROUNDS)
+    rounds = min(rounds or depth, depth)
+    results = result_history.get_latest_results(db, code, depth)
+
+    with _lock:
+        entry = _COMPUTED.get(code)
+        if entry is None or entry["results"] != results:
+            entry = _COMPUTED[code] = {"results": results, "views": {}}
+            while len(_COMPUTED) > MAX_CODES:
+                _COMPUTED.popitem(last=False)
+        _COMPUTED.move_to_end(code)
+        stats = entry["views"].get((rounds, top))
+        if stats is None:
+            stats = entry["views"][(rounds, top)] = {"code": code, **_compute(results[:rounds], top)}
+        return stats
@@ -0,0 +1,43 @@
+# app/core/pagination.py
+"""
+Keyset (Cursor) Pagination สำหรับหน้าประวัติโพย เรียง (created_at, id) ใหม่→เก่า
+
+cursor = base64url ของ {"t": created_at, "i": id} ของแถวสุดท้ายในหน้าก่อน (Frontend ไม่ต้องแกะ ส่งกลับมาเฉยๆ)
+หน้าถัดไปใช้ WHERE (created_at, id) < (t, i) แทน OFFSET → หน้าลึกแค่ไหนก็อ่านแค่ limit + 1 แถว
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+
+def encode_cursor(created_at: datetime, row_id) -> str:
+    raw = json.dumps({"t": created_at.isoformat(), "i": str(row_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), UUID(data["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_filter(created_col, id_col, cursor: str):
+    """เงื่อนไข (created_at, id) < cursor แบบ Row Comparison (ใช้ index (..., created_at DESC, id DESC) ได้ตรงๆ)"""
+    created_at, row_id = decode_cursor(cursor)
+    return tuple_(created_col, id_col) < tuple_(literal(created_at, created_col.type), literal(row_id, id_col.type))
+
+def keyset_page(rows: List[dict], limit: int) -> dict:
+    """
+    ห่อผลลัพธ์เป็น {"items": [...], "next_cursor": ...} (next_cursor = None เมื่อหมดแล้ว)
+    rows ต้องดึงมา limit + 1 แถว → มีแถวเกินมา = ยังมีหน้าถัดไป (หน้าสุดท้ายที่เต็มพอดีไม่ได้ cursor ว่างๆ)
+    """
+    next_cursor = None
+    if limit > 0 and len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return {"items": rows[:limit], "next_cursor": next_cursor}
@@ -0,0 +1,50 @@
+# app/core/principal_cache.py
+"""
+Cache ผู้ใช้ที่ Login อยู่ (Namespace "principals" ของ app/core/cache) สำหรับ deps.get_current_user
+
+เก็บเฉพาะสิ่งที่ใช้ตรวจสิทธิ์ (Role / ร้าน / สถานะ / ค่าคอมฯ) → Request ส่วนใหญ่ไม่ต้อง SELECT users เลย
+ยอดเงิน (credit_balance) เปลี่ยนทุกบิล ไม่อยู่ในนี้: Endpoint ที่ต้องใช้ยอดล่าสุดโหลดจาก DB เอง
+แก้ / ปิด / ลบผู้ใช้แล้วเรียก invalidate_principal หลัง commit → ทุก worker โหลดใหม่ทันที (TTL สั้นเผื่อไว้อีกชั้น)
+"""
+from decimal import Decimal
+from typing import Any, Callable, NamedTuple, Optional
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.cache import get_cache, user_tag, bus
+from app.models.user import UserRole
+
+class Principal(NamedTuple):
+    id: UUID
+    username: str
+    role: UserRole
+    shop_id: Optional[UUID]
+    is_active: bool
+    commission_percent: Decimal
+
+_cache = get_cache("principals", ttl=settings.PRINCIPAL_CACHE_TTL, max_items=20000)
+
+def get_principal(user_id: str, fetch: Callable[[str], Any]) -> Optional[Principal]:
+    """fetch(user_id) คืน User จาก DB (None = ไม่มีผู้ใช้นี้ → จำไว้ด้วยจนหมดอายุ/ถูกล้าง)"""
+    def load() -> Optional[Principal]:
+        user = fetch(user_id)
+        if user is None:
+            return None
+        return Principal(
+            id=user.id,
+            username=user.username,
+            role=user.role,
+            shop_id=user.shop_id,
+            is_active=bool(user.is_active),
+            commission_percent=Decimal(str(user.commission_percent or 0)),
+        )
+
+    return _cache.get_or_load(str(user_id), load, tags=(user_tag(user_id),))
+
+def invalidate_principal(*user_ids: Any):
+    """เรียกหลัง commit เมื่อแก้ข้อมูลผู้ใช้ (Role / สถานะ / ค่าคอมฯ / ชื่อ / ลบ)"""
+    bus.invalidate("principals", tags=[user_tag(uid) for uid in user_ids])
+
+def invalidate_all_principals():
+    """ลบร้าน (ผู้ใช้ทั้งร้านหายไปด้วย) - นานๆ ครั้ง ล้างทั้ง Namespace"""
+    bus.invalidate("principals", clear=True)
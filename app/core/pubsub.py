@@ -0,0 +1,169 @@
+# app/core/pubsub.py
+"""
+Pub/Sub ใน Process สำหรับ Dashboard แบบ Real-time (/play/stream/{shop_id})
+
+- ฝั่งส่ง (submit / cancel / ตรวจรางวัล) เรียก publish() ได้จาก Thread ไหนก็ได้ หลัง commit
+  → แปลงเป็นข้อความ SSE ครั้งเดียว แล้วโยนเข้า Event Loop 1 ครั้งต่อ Event (ไม่ใช่ 1 ครั้งต่อคนดู)
+- 1 Channel ต่อร้าน = Log ข้อความล่าสุด SSE_QUEUE_SIZE อัน + asyncio.Event ให้คนดูรอ
+  คนดูแต่ละคนเก็บแค่ "อ่านถึงข้อความที่เท่าไหร่" → RAM ไม่โตตามจำนวนคนดู
+  ตื่นมาทีเดียวอ่านทุกอย่างที่ค้างเป็นก้อนเดียว (Event ถี่ๆ ไม่ทำให้ปลุก Task ถี่ตาม)
+- Client ที่อ่านช้าจนข้อความที่ยังไม่ได้อ่านหลุดจาก Log → ได้ event "resync" ให้ไปดึงยอดใหม่จาก API ปกติ
+  (ไม่ให้คนดูช้าคนเดียวกิน RAM หรือถ่วงคนอื่น)
+- ไม่มีคนดูร้านนั้นอยู่ = publish() คืนทันที ไม่ต้องแปลง JSON
+- Heartbeat ทำที่ Channel (1 Timer ต่อร้าน ไม่ใช่ต่อคนดู) กัน Proxy ตัดสาย และให้รู้ว่า Client หลุดไปแล้ว
+
+⚠️ ต่อ Process: Client ที่ต่อเข้า worker หนึ่ง จะได้ Event จากบิลที่ worker นั้นรับเท่านั้น
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+RESYNC_MESSAGE = b"event: resync\ndata: {}\n\n"
+HEARTBEAT_MESSAGE = b": ping\n\n"
+HEARTBEAT_SECONDS = 15
+
+class _Channel:
+    """Log ข้อความของร้านเดียว (แก้ไขใน Event Loop เท่านั้น)"""
+    __slots__ = ("loop", "log", "head", "event", "subscribers", "idle", "timer")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxlen: int):
+        self.loop = loop
+        self.log: deque = deque(maxlen=maxlen)
+        self.head = 0  # ลำดับของข้อความถัดไป
+        self.event = asyncio.Event()
+        self.subscribers = 0
+        self.idle = True
+        self.timer = loop.call_later(HEARTBEAT_SECONDS, self._heartbeat)
+
+    def append(self, message: bytes) -> None:
+        self.log.append(message)
+        self.head += 1
+        self.idle = False
+        # ปลุกทุกคนที่รออยู่ แล้วเปลี่ยน Event ใหม่ให้รอบถัดไป
+        event, self.event = self.event, asyncio.Event()
+        event.set()
+
+    def _heartbeat(self) -> None:
+        if self.idle:
+            self.append(HEARTBEAT_MESSAGE)
+        self.idle = True
+        self.timer = self.loop.call_later(HEARTBEAT_SECONDS, self._heartbeat)
+
+    def close(self) -> None:
+        self.timer.cancel()
+
+class Subscriber:
+    __slots__ = ("shop_id", "channel", "cursor", "dropped")
+
+    def __init__(self, shop_id: str, channel: _Channel):
+        self.shop_id = shop_id
+        self.channel = channel
+        self.cursor = channel.head  # เริ่มจากข้อความใหม่ ไม่ส่งของเก่าย้อนหลัง
+        self.dropped = 0
+
+# { shop_id (str): _Channel } - แก้ไขเฉพาะใน Event Loop
+_channels: Dict[str, _Channel] = {}
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_stats = {"published": 0, "resyncs": 0}
+_stats_lock = threading.Lock()
+
+def _json_default(value: Any) -> Any:
+    # ให้หน้าตาเหมือน Response ปกติของ FastAPI (Decimal → ตัวเลข, วันที่ → ISO)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def _encode(event: str, data: Any) -> bytes:
+    payload = json.dumps(data, default=_json_default, separators=(',', ':'))
+    return f"event: {event}\ndata: {payload}\n\n".encode()
+
+# ==========================================
+# 📡 ฝั่งส่ง
+# ==========================================
+
+def publish(shop_id, event: str, data: Any) -> None:
+    """ส่ง Event ให้ทุกคนที่ดูร้านนี้อยู่ (Thread-safe, ไม่ Block)"""
+    publish_many(shop_id, [(event, data)])
+
+def publish_many(shop_id, events: List[Tuple[str, Any]]) -> None:
+    """ส่งหลาย Event พร้อมกัน (เช่น ticket + sales + exposure ของบิลเดียว) เป็นก้อนเดียวใน Log"""
+    loop = _loop
+    key = str(shop_id)
+    if loop is None or key not in _channels:
+        return
+    message = b"".join(_encode(event, data) for event, data in events)
+    try:
+        loop.call_soon_threadsafe(_append, key, message)
+    except RuntimeError:
+        # Event Loop ปิดไปแล้ว (กำลัง Shutdown)
+        pass
+
+def _append(shop_id: str, message: bytes) -> None:
+    channel = _channels.get(shop_id)
+    if channel is None:
+        return
+    channel.append(message)
+    with _stats_lock:
+        _stats["published"] += 1
+
+# ==========================================
+# 📺 ฝั่งรับ (เรียกใน Event Loop เท่านั้น)
+# ==========================================
+
+def subscribe(shop_id) -> Subscriber:
+    global _loop
+    _loop = asyncio.get_running_loop()
+    key = str(shop_id)
+    channel = _channels.get(key)
+    if channel is None:
+        channel = _channels[key] = _Channel(_loop, settings.SSE_QUEUE_SIZE)
+    channel.subscribers += 1
+    return Subscriber(key, channel)
+
+def unsubscribe(sub: Subscriber) -> None:
+    channel = sub.channel
+    channel.subscribers -= 1
+    if channel.subscribers <= 0 and _channels.get(sub.shop_id) is channel:
+        channel.close()
+        del _channels[sub.shop_id]
+
+async def read(sub: Subscriber) -> bytes:
+    """
+    รอจนมีข้อความใหม่ (รวม Heartbeat ทุก HEARTBEAT_SECONDS) แล้วคืนทุกข้อความที่ค้างเป็นก้อนเดียว
+    RESYNC_MESSAGE = อ่านไม่ทัน ข้อความหลุดจาก Log ไปแล้ว
+    """
+    channel = sub.channel
+    while sub.cursor == channel.head:
+        await channel.event.wait()
+
+    base = channel.head - len(channel.log)
+    if sub.cursor < base:
+        sub.dropped += channel.head - sub.cursor
+        sub.cursor = channel.head
+        with _stats_lock:
+            _stats["resyncs"] += 1
+        return RESYNC_MESSAGE
+
+    chunk = b"".join(itertools.islice(channel.log, sub.cursor - base, None))
+    sub.cursor = channel.head
+    return chunk
+
+def get_pubsub_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    by_shop = {shop_id: channel.subscribers for shop_id, channel in list(_channels.items())}
+    return {
+        **stats,
+        "subscribers": sum(by_shop.values()),
+        "shops": len(by_shop),
+        "log_size": settings.SSE_QUEUE_SIZE,
+    }
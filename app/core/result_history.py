@@ -0,0 +1,244 @@
+# app/core/result_history.py
+"""
+ผลรางวัลต่อ Code หวย (ใช้ร่วมกันทุกร้าน) สำหรับ /reward/history, /reward/daily และ number_stats
+
+- อ่านจาก code_results (1 แถวต่อ Code ต่องวด, issue_reward เขียนพร้อม lotto_results ของทุกร้าน)
+- ประวัติ: เก็บ RESULT_HISTORY_ROUNDS งวดล่าสุดต่อ Code ไว้ใน RAM แบบ LRU
+  issue_reward เรียก record_result() หลัง commit → แทรก/แก้งวดนั้นใน RAM ทันที (ไม่ต้องดึง DB)
+  แล้วส่งต่อ worker อื่นผ่าน NOTIFY (channel result_history ของ app/core/cache/bus.py) / ลบผลก็ล้างทุก worker แบบเดียวกัน
+  ปิด NOTIFY → worker อื่นเห็นเมื่อครบรอบ RESULT_HISTORY_RESYNC_SECONDS (0 = ไม่ดึงใหม่)
+- กระดานรายวัน: { code: ผล } ต่อวันที่ งวดที่ผ่านไปแล้วจำไว้ PAST_RESYNC_SECONDS (ผลออกช้า / ออกซ้ำ → ล้างวันนั้นทุก worker)
+  งวดปัจจุบันดึงใหม่ทุก RESULT_HISTORY_RESYNC_SECONDS แล้วกระจายให้ lotto_type_id ทุกร้านด้วย
+  Index code → lotto_ids ของ lotto_cache (ไม่ต้อง JOIN / โหลด lotto_types ทั้งระบบ)
+  ผลที่กระจายแล้วจำเป็น JSON + ETag ไว้ ใช้ซ้ำจนกว่าผลของวันนั้นหรือรายการหวยจะเป็นชุดใหม่
+"""
+import json
+import time
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings, get_thai_now, get_round_date
+from app.core.cache import bus
+from app.core.http_cache import Rendered, render
+from app.models.lotto import CodeResult
+
+# จำนวน Code / วันที่ ที่เก็บไว้พร้อมกันต่อ Process (เกินแล้วทิ้งอันที่ไม่ได้ดูนานสุด)
+MAX_CODES = 500
+MAX_DAILY_DATES = 400
+# งวดที่ผ่านไปแล้วแทบไม่เปลี่ยน แต่ยังอาจออกผลช้า/ออกซ้ำ → ดึงใหม่นานๆ ครั้งเผื่อพลาด NOTIFY
+PAST_RESYNC_SECONDS = 3600
+CHANNEL = "result_history"
+
+# ผลล่าสุดของ Code (อ่านจาก Primary Key (code, round_date) ถอยหลัง)
+CODE_RESULTS_SQL = """
+    SELECT round_date, COALESCE(top_3, '') AS top_3, COALESCE(bottom_2, '') AS bottom_2
+    FROM code_results
+    WHERE code = :code
+    ORDER BY round_date DESC
+    LIMIT :rounds
+"""
+DAILY_RESULTS_SQL = """
+    SELECT code, COALESCE(top_3, '') AS top_3, COALESCE(bottom_2, '') AS bottom_2, created_at
+    FROM code_results
+    WHERE round_date = :round_date
+"""
+# ลบผลระดับ Code ที่ไม่เหลือ lotto_results ของร้านไหนแล้ว (หลังลบหวย/ร้าน) - {codes} = SQL ที่คืนรายการ code
+PRUNE_CODE_RESULTS_SQL = """
+    DELETE FROM code_results c
+    WHERE c.code IN ({codes})
+      AND NOT EXISTS (
+          SELECT 1 FROM lotto_results r JOIN lotto_types l ON l.id = r.lotto_type_id
+          WHERE l.code = c.code AND r.round_date = c.round_date
+      )
+"""
+
+# { code: {"synced_at": epoch, "results": [{"round_date", "top_3", "bottom_2"}] ใหม่ → เก่า} }
+# results ถูกแทนที่ทั้ง List เมื่อเปลี่ยน (ไม่แก้ในที่) → ผู้อ่านถือ List เดิมต่อได้อย่างปลอดภัย
+_CODES: "OrderedDict[str, dict]" = OrderedDict()
+# { round_date: {"synced_at": epoch, "is_past": bool, "results": {code: {"top_3", "bottom_2", "created_at"}}} }
+_DAILY: "OrderedDict[date, dict]" = OrderedDict()
+# { round_date: (results, code_index, Rendered) } - ใช้ได้ตราบที่ results / code_index ยังเป็น Object เดิม
+_BOARDS: "OrderedDict[date, tuple]" = OrderedDict()
+# เพิ่มทุกครั้งที่ล้าง/แก้ → ผลที่ดึง DB ค้างอยู่ระหว่างนั้นไม่ถูกเก็บทับ (อาจเป็นค่าก่อนล้าง)
+_generation = 0
+_lock = threading.Lock()
+_sync_lock = threading.Lock()
+
+def fetch_results(db: Session, code: str, rounds: int) -> List[Dict[str, Any]]:
+    rows = db.execute(text(CODE_RESULTS_SQL), {"code": code, "rounds": rounds}).all()
+    return [{"round_date": r.round_date, "top_3": r.top_3, "bottom_2": r.bottom_2} for r in rows]
+
+# ==========================================
+# ✍️ ฝั่งเขียน
+# ==========================================
+
+def save_code_result(db: Session, code: str, round_date: date, top_3: str, bottom_2: str, reward_data: dict) -> None:
+    """Upsert ผลระดับ Code (เรียกใน Transaction เดียวกับ lotto_results ก่อน commit)"""
+    stmt = insert(CodeResult).values(
+        code=code, round_date=round_date, top_3=top_3, bottom_2=bottom_2, reward_data=reward_data
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["code", "round_date"],
+        set_={"top_3": stmt.excluded.top_3, "bottom_2": stmt.excluded.bottom_2,
+              "reward_data": stmt.excluded.reward_data, "updated_at": func.now()},
+    )
+    db.execute(stmt)
+
+def prune_code_results(db: Session, codes_sql: str, params: dict) -> None:
+    """ลบผลระดับ Code ที่ไม่เหลือ lotto_results แล้ว (เรียกหลังลบ lotto_results ใน Transaction เดียวกัน)"""
+    db.execute(text(PRUNE_CODE_RESULTS_SQL.format(codes=codes_sql)), params)
+
+def _apply_record(code: str, round_date: date, top_3: str, bottom_2: str) -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _DAILY.pop(round_date, None)
+        _BOARDS.pop(round_date, None)
+        entry = _CODES.get(code)
+        if entry is None:
+            return
+        results = [r for r in entry["results"] if r["round_date"] != round_date]
+        results.append({"round_date": round_date, "top_3": top_3, "bottom_2": bottom_2})
+        results.sort(key=lambda r: r["round_date"], reverse=True)
+        entry["results"] = results[:settings.RESULT_HISTORY_ROUNDS]
+
+def _apply_clear(codes: Optional[Iterable[str]]) -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _DAILY.clear()
+        _BOARDS.clear()
+        if codes is None:
+            _CODES.clear()
+        else:
+            for code in codes:
+                _CODES.pop(code, None)
+
+def record_result(code: str, round_date: date, top_3: Optional[str], bottom_2: Optional[str]) -> None:
+    """
+    issue_reward เรียกหลัง commit: แทรก/แก้ผลงวดนี้ของ Code (เฉพาะ Code ที่โหลดไว้แล้ว) และล้างกระดานของวันนั้น
+    ทุก worker (worker นี้ทันที / worker อื่นผ่าน NOTIFY)
+    """
+    if not code:
+        return
+    _apply_record(code, round_date, top_3 or "", bottom_2 or "")
+    bus.publish(CHANNEL, json.dumps({
+        "op": "record", "code": code, "round_date": round_date.isoformat(),
+        "top_3": top_3 or "", "bottom_2": bottom_2 or "",
+    }))
+
+# ==========================================
+# 📖 ฝั่งอ่าน
+# ==========================================
+
+def _needs_sync(code: str) -> bool:
+    entry = _CODES.get(code)
+    if entry is None:
+        return True
+    resync = settings.RESULT_HISTORY_RESYNC_SECONDS
+    return resync > 0 and time.time() - entry["synced_at"] >= resync
+
+def get_latest_results(db: Session, code: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """ผล limit งวดล่าสุดของ Code (ใหม่ → เก่า) - เกิน RESULT_HISTORY_ROUNDS จะดึงจาก DB ตรง"""
+    depth = settings.RESULT_HISTORY_ROUNDS
+    if limit is None:
+        limit = depth
+    if limit > depth:
+        return fetch_results(db, code, limit)
+
+    if _needs_sync(code):
+        with _sync_lock:
+            if _needs_sync(code):
+                generation = _generation
+                results = fetch_results(db, code, depth)
+                with _lock:
+                    if generation != _generation:
+                        # ถูกล้าง/แก้ระหว่างดึง → ใช้ผลนี้ตอบครั้งเดียว ไม่เก็บ
+                        return results[:limit]
+                    _CODES[code] = {"synced_at": time.time(), "results": results}
+                    while len(_CODES) > MAX_CODES:
+                        _CODES.popitem(last=False)
+
+    with _lock:
+        entry = _CODES.get(code)
+        if entry is None:
+            return []
+        _CODES.move_to_end(code)
+        return entry["results"][:limit]
+
+def get_daily_results(db: Session, round_date: date) -> Dict[str, Dict[str, Any]]:
+    """{ code: {"top_3", "bottom_2", "created_at"} } ของงวดวันที่นี้ (ห้ามแก้ Dict ที่ได้ไป)"""
+    with _lock:
+        entry = _DAILY.get(round_date)
+        if entry is not None:
+            resync = PAST_RESYNC_SECONDS if entry["is_past"] else settings.RESULT_HISTORY_RESYNC_SECONDS
+            if resync <= 0 or time.time() - entry["synced_at"] < resync:
+                _DAILY.move_to_end(round_date)
+                return entry["results"]
+
+    generation = _generation
+    rows = db.execute(text(DAILY_RESULTS_SQL), {"round_date": round_date}).all()
+    results = {r.code: {"top_3": r.top_3, "bottom_2": r.bottom_2, "created_at": r.created_at} for r in rows}
+    is_past = round_date < get_round_date(get_thai_now(), settings.DAY_CUTOFF_TIME)
+    with _lock:
+        if generation != _generation:
+            return results
+        _DAILY[round_date] = {"synced_at": time.time(), "is_past": is_past, "results": results}
+        _DAILY.move_to_end(round_date)
+        while len(_DAILY) > MAX_DAILY_DATES:
+            _DAILY.popitem(last=False)
+    return results
+
+def get_daily_board(db: Session, round_date: date, code_index: Dict[str, List[str]]) -> Rendered:
+    """
+    { lotto_type_id: ผล } ของงวดวันที่นี้ (ผลของ Code กระจายให้หวยทุกร้านที่ Code ตรงกัน) เป็น JSON สำเร็จรูป
+    code_index = lotto_cache.get_code_index()
+    """
+    results = get_daily_results(db, round_date)
+    with _lock:
+        board = _BOARDS.get(round_date)
+        if board is not None and board[0] is results and board[1] is code_index:
+            _BOARDS.move_to_end(round_date)
+            return board[2]
+
+    final_map = {}
+    for code, result in results.items():
+        for lotto_id in code_index.get(code, ()):
+            final_map[lotto_id] = result
+    rendered = render(final_map)
+    with _lock:
+        _BOARDS[round_date] = (results, code_index, rendered)
+        _BOARDS.move_to_end(round_date)
+        while len(_BOARDS) > MAX_DAILY_DATES:
+            _BOARDS.popitem(last=False)
+    return rendered
+
+def clear_result_history(codes: Optional[Iterable[str]] = None) -> None:
+    """ล้างผลที่จำไว้ทุก worker (หลังลบผลรางวัล/หวยด้วยมือ) ครั้งถัดไปจะดึงจาก DB ใหม่ - codes=None = ทุก Code"""
+    codes = None if codes is None else list(codes)
+    _apply_clear(codes)
+    payload = json.dumps({"op": "clear", "codes": codes})
+    if len(payload.encode()) > bus.MAX_PAYLOAD_BYTES:
+        payload = json.dumps({"op": "clear", "codes": None})
+    bus.publish(CHANNEL, payload)
+
+# ==========================================
+# 📥 รับจาก worker อื่น
+# ==========================================
+
+def _handle_notify(payload: str) -> None:
+    # ข้อความของตัวเองก็วนกลับมา → ใส่ผลเดิมซ้ำ / ล้างซ้ำ ไม่มีผลเสีย
+    event = json.loads(payload)
+    if event.get("op") == "record":
+        _apply_record(event["code"], date.fromisoformat(event["round_date"]), event["top_3"], event["bottom_2"])
+    elif event.get("op") == "clear":
+        _apply_clear(event.get("codes"))
+
+# ต่อ DB ใหม่ (อาจพลาดข้อความระหว่างหลุด) → ล้างทั้งหมด โหลดใหม่ตอนมีคนอ่าน
+bus.subscribe(CHANNEL, _handle_notify, on_connect=lambda: _apply_clear(None))
@@ -0,0 +1,186 @@
+# app/core/rollups.py
+"""
+ยอดสรุปรายวัน (daily_rollups) ให้หน้าสถิติอ่านแทนการรวม tickets / ticket_items ทุกครั้ง
+
+- 1 แถวต่อ (ร้าน, วันที่กดแทงตามเวลาไทย, ลูกค้า, หวย, งวด) → ช่วงวันที่ยาวแค่ไหนก็อ่านแค่ระดับวัน
+- อัปเดตแบบบวกส่วนต่าง (delta) ใน Transaction เดียวกับบิล: ส่งโพย / ยกเลิก / ตรวจรางวัล
+- บิลที่ถูกย้ายเข้า ticket_archives ยังนับอยู่ในนี้ (ย้ายบิลไม่ต้องแก้ยอด)
+- rebuild_rollups(): คำนวณใหม่จาก tickets + ticket_archives (python rebuild_rollups.py)
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Optional, Tuple
+
+import pytz
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.lotto import DailyRollup, TicketStatus
+from app.db.partitions import ROUND_LOOKBEHIND_DAYS, ROUND_LOOKAHEAD_DAYS
+
+_BANGKOK = pytz.timezone('Asia/Bangkok')
+
+KEY_COLUMNS = ("stat_date", "shop_id", "user_id", "lotto_type_id", "round_date")
+VALUE_COLUMNS = (
+    "bill_count", "cancelled_count", "sales_amount", "commission_amount",
+    "pending_amount", "cancelled_amount", "payout_amount",
+)
+
+# คำนวณยอดจากบิล (tickets + archive) - เงื่อนไขเดียวกับ ticket_snapshot()
+AGGREGATE_SQL = """
+    SELECT (created_at AT TIME ZONE 'Asia/Bangkok')::date AS stat_date, shop_id, user_id, lotto_type_id, round_date,
+           count(*) AS bill_count,
+           count(*) FILTER (WHERE status = 'CANCELLED') AS cancelled_count,
+           coalesce(sum(total_amount) FILTER (WHERE status <> 'CANCELLED'), 0) AS sales_amount,
+           coalesce(sum(commission_amount) FILTER (WHERE status <> 'CANCELLED'), 0) AS commission_amount,
+           coalesce(sum(total_amount) FILTER (WHERE status = 'PENDING'), 0) AS pending_amount,
+           coalesce(sum(total_amount) FILTER (WHERE status = 'CANCELLED'), 0) AS cancelled_amount,
+           coalesce(sum(winning_amount) FILTER (WHERE status = 'WIN'), 0) AS payout_amount
+    FROM (
+        SELECT created_at, shop_id, user_id, lotto_type_id, round_date, status, total_amount, commission_amount, winning_amount
+        FROM tickets {where}
+        UNION ALL
+        SELECT created_at, shop_id, user_id, lotto_type_id, round_date, status, total_amount, commission_amount, winning_amount
+        FROM ticket_archives {where}
+    ) t
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+def stat_date_of(created_at: datetime) -> date:
+    return created_at.astimezone(_BANGKOK).date()
+
+def thai_day_bounds(s_date: date, e_date: date) -> Tuple[datetime, datetime]:
+    """ช่วง created_at (UTC) ของวันที่ s_date ถึง e_date ตามเวลาไทย (เหมือนหน้าสถิติเดิม)"""
+    return (
+        datetime.combine(s_date, time.min) - timedelta(hours=7),
+        datetime.combine(e_date, time.max) - timedelta(hours=7),
+    )
+
+# ==========================================
+# ✍️ ฝั่งเขียน: ส่งโพย / ยกเลิก / ตรวจรางวัล
+# ==========================================
+
+def ticket_snapshot(ticket) -> Tuple[tuple, dict]:
+    """(key, ยอดที่บิลนี้นับเข้า rollup ตอนนี้) - เรียกก่อนและหลังเปลี่ยนสถานะบิลแล้วส่งทั้งคู่ให้ add_delta()"""
+    key = (stat_date_of(ticket.created_at), ticket.shop_id, ticket.user_id, ticket.lotto_type_id, ticket.round_date)
+    total = Decimal(ticket.total_amount or 0)
+    status = ticket.status
+    cancelled = status == TicketStatus.CANCELLED
+    return key, {
+        "bill_count": 1,
+        "cancelled_count": 1 if cancelled else 0,
+        "sales_amount": Decimal(0) if cancelled else total,
+        "commission_amount": Decimal(0) if cancelled else Decimal(ticket.commission_amount or 0),
+        "pending_amount": total if status == TicketStatus.PENDING else Decimal(0),
+        "cancelled_amount": total if cancelled else Decimal(0),
+        "payout_amount": Decimal(ticket.winning_amount or 0) if status == TicketStatus.WIN else Decimal(0),
+    }
+
+def add_delta(deltas: dict, before: Optional[tuple] = None, after: Optional[tuple] = None) -> dict:
+    """สะสมส่วนต่าง (after - before) ลง deltas {key: {column: value}} คืน deltas เดิม"""
+    for snap, sign in ((before, -1), (after, 1)):
+        if snap is None:
+            continue
+        key, values = snap
+        acc = deltas.setdefault(key, dict.fromkeys(VALUE_COLUMNS, 0))
+        for col, value in values.items():
+            acc[col] += sign * value
+    return deltas
+
+def apply_deltas(db: Session, deltas: dict) -> int:
+    """
+    Upsert ส่วนต่างทั้งหมดใน Statement เดียว (ยังไม่ commit - ให้ไปพร้อมกับบิล)
+    เรียง key ก่อนเสมอ กัน Deadlock เวลาตรวจรางวัลหลายงวดพร้อมกัน
+    """
+    rows = []
+    for key in sorted(deltas, key=lambda k: tuple(str(part) for part in k)):
+        values = deltas[key]
+        # บิลที่ไม่มีหวย (ข้อมูลเก่า) ไม่นับเข้า rollup
+        if key[3] is None or not any(values.values()):
+            continue
+        rows.append({**dict(zip(KEY_COLUMNS, key)), **values})
+    if not rows:
+        return 0
+
+    stmt = insert(DailyRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(KEY_COLUMNS),
+        set_={
+            **{col: getattr(DailyRollup, col) + getattr(stmt.excluded, col) for col in VALUE_COLUMNS},
+            "updated_at": func.now(),
+        }
+    )
+    db.execute(stmt)
+    return len(rows)
+
+def record_ticket(db: Session, before: Optional[tuple] = None, after: Optional[tuple] = None) -> None:
+    """ทางลัดสำหรับบิลใบเดียว (ส่งโพย: after อย่างเดียว / ยกเลิก: before + after)"""
+    apply_deltas(db, add_delta({}, before, after))
+
+# ==========================================
+# 📊 ฝั่งอ่าน: หน้าสถิติ
+# ==========================================
+
+def rollup_totals(db: Session, s_date: Optional[date] = None, e_date: Optional[date] = None,
+                  shop_id=None, group_by: Optional[str] = None):
+    """
+    รวมยอดช่วงวันที่กดแทง s_date..e_date (None = ไม่จำกัด)
+    group_by=None → dict ยอดรวม / "user_id" หรือ "shop_id" → {id: dict ยอดรวม}
+    """
+    columns = [func.coalesce(func.sum(getattr(DailyRollup, col)), 0).label(col) for col in VALUE_COLUMNS]
+    group_col = getattr(DailyRollup, group_by) if group_by else None
+    if group_col is not None:
+        columns.insert(0, group_col.label("group_id"))
+
+    query = db.query(*columns)
+    if s_date:
+        query = query.filter(DailyRollup.stat_date >= s_date)
+    if e_date:
+        query = query.filter(DailyRollup.stat_date <= e_date)
+    if shop_id:
+        query = query.filter(DailyRollup.shop_id == shop_id)
+
+    if group_col is None:
+        row = query.one()
+        return {col: getattr(row, col) for col in VALUE_COLUMNS}
+
+    return {
+        r.group_id: {col: getattr(r, col) for col in VALUE_COLUMNS}
+        for r in query.group_by(group_col).all()
+    }
+
+# ==========================================
+# 🔧 คำนวณใหม่ทั้งหมด (rebuild_rollups.py / หลังแก้ข้อมูลบิลด้วยมือ)
+# ==========================================
+
+def rebuild_rollups(conn: Connection, s_date: Optional[date] = None, e_date: Optional[date] = None) -> int:
+    """
+    ลบแล้วคำนวณ daily_rollups ใหม่ในช่วงวันที่กดแทง s_date..e_date (None = ทั้งหมด) คืนจำนวนแถว
+    ล็อกตาราง daily_rollups ไว้จนจบ Transaction: บิลที่ส่ง/ตรวจระหว่างนั้นจะรอแล้วบวกส่วนต่างต่อจากยอดใหม่ (ไม่นับซ้ำ)
+    """
+    conn.execute(text("LOCK TABLE daily_rollups IN EXCLUSIVE MODE"))
+
+    conditions, params = ["lotto_type_id IS NOT NULL"], {}
+    delete_sql = "DELETE FROM daily_rollups WHERE true"
+    if s_date:
+        params["start_utc"] = thai_day_bounds(s_date, s_date)[0]
+        params["s_date"] = s_date
+        params["round_lo"] = s_date - timedelta(days=ROUND_LOOKBEHIND_DAYS)
+        conditions += ["created_at >= :start_utc", "round_date >= :round_lo"]
+        delete_sql += " AND stat_date >= :s_date"
+    if e_date:
+        params["end_utc"] = thai_day_bounds(e_date, e_date)[1]
+        params["e_date"] = e_date
+        params["round_hi"] = e_date + timedelta(days=ROUND_LOOKAHEAD_DAYS)
+        conditions += ["created_at <= :end_utc", "round_date <= :round_hi"]
+        delete_sql += " AND stat_date <= :e_date"
+
+    conn.execute(text(delete_sql), params)
+    where = "WHERE " + " AND ".join(conditions)
+    result = conn.execute(text(f"""
+        INSERT INTO daily_rollups ({", ".join(KEY_COLUMNS + VALUE_COLUMNS)})
+        {AGGREGATE_SQL.format(where=where)}
+    """), params)
+    return result.rowcount
@@ -1,15 +1,32 @@
 import jwt
+import asyncio
+import hashlib
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta, timezone
-from typing import Any, Union, Optional
+from typing import Any, Dict, Tuple, Union, Optional
+from fastapi.concurrency import run_in_threadpool
 from passlib.context import CryptContext
 from app.core.config import settings
 
-# ใช้ bcrypt สำหรับ hashing รหัสผ่าน
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# ใช้ bcrypt สำหรับ hashing รหัสผ่าน (rounds ตาม PASSWORD_BCRYPT_ROUNDS - Hash ที่ rounds ไม่ตรงถือว่าต้องอัปเดต)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS)
 
-def create_access_token(subject: Union[str, Any], role: str, expires_delta: Optional[timedelta] = None) -> str:
+# Token ที่ตรวจลายเซ็นแล้ว (LRU): { blake2b(token): (payload, exp) }
+# Dashboard ที่ poll ทุกไม่กี่วินาทีส่ง Token เดิมซ้ำๆ → ตรวจ HMAC + แปลง JSON ครั้งเดียวต่อ Token จนหมดอายุ
+_TOKEN_CACHE: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+_token_lock = threading.Lock()
+MAX_TOKEN_CACHE_ITEMS = 10000
+
+def create_access_token(subject: Union[str, Any], role: str, expires_delta: Optional[timedelta] = None,
+                        shop_id: Optional[Any] = None) -> str:
     """
-    สร้าง JWT Token โดยใช้ PyJWT
+    สร้าง JWT Token โดยใช้ PyJWT (shop = ร้านของผู้ใช้ สำหรับ Rate Limit ต่อร้าน - สิทธิ์จริงดูจาก DB/Principal)
     """
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -24,6 +41,8 @@ def create_access_token(subject: Union[str, Any], role: str, expires_delta: Opti
         "sub": str(subject),
         "role": role
     }
+    if shop_id:
+        to_encode["shop"] = str(shop_id)
     
     # สร้าง Token
     encoded_jwt = jwt.encode(
@@ -33,33 +52,194 @@ def create_access_token(subject: Union[str, Any], role: str, expires_delta: Opti
     )
     return encoded_jwt
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# ==========================================
+# 🔄 Refresh Token (POST /auth/refresh)
+# ==========================================
+# ตรวจแค่ลายเซ็น + รายการเพิกถอนใน RAM (app/core/token_revocation.py) → ต่ออายุ Session ได้โดยไม่ต้อง bcrypt / ไม่เขียน users
+# iat ละเอียดระดับมิลลิวินาที (เทียบกับ revoked_before ของรายการเพิกถอน) / auth = เวลาที่ Login (เพดานอายุ Session)
+
+def create_refresh_token(subject: Union[str, Any], session_id: Optional[str] = None,
+                         auth_time: Optional[float] = None, issued_after: float = 0.0) -> Tuple[str, Dict[str, Any]]:
     """
-    ตรวจสอบรหัสผ่าน โดยป้องกันปัญหา bcrypt 72-character limit
+    สร้าง Refresh Token → (token, claims)
+    อายุ REFRESH_TOKEN_EXPIRE_DAYS นับจากตอนนี้ (ใช้ทุกครั้งได้ใบใหม่ = sliding) แต่ไม่เกิน REFRESH_SESSION_MAX_DAYS นับจาก auth_time
+    issued_after: iat ของใบเดิมตอนหมุน Token (ใบใหม่ต้องออกหลังใบเดิมเสมอ แม้อยู่ในมิลลิวินาทีเดียวกัน)
+    """
+    issued = max(round(time.time(), 3), round(issued_after + 0.001, 3))
+    auth_time = auth_time or issued
+    expire = min(issued + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+                 auth_time + settings.REFRESH_SESSION_MAX_DAYS * 86400)
+    claims = {
+        "sub": str(subject),
+        "typ": "refresh",
+        "sid": session_id or uuid.uuid4().hex,
+        "iat": issued,
+        "auth": auth_time,
+        "exp": int(expire),
+    }
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM), claims
+
+def decode_refresh_token(token: str) -> Optional[dict]:
     """
+    ถอด Refresh Token (None = ไม่ถูกต้อง / หมดอายุ / ไม่ใช่ Refresh Token) - ยังไม่ได้เช็ครายการเพิกถอน
+    ไม่ผ่าน Cache ของ decode_token (แต่ละใบใช้ครั้งเดียวแล้วถูกหมุนทิ้ง)
+    """
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM],
+            options={"require": ["exp", "iat", "sub"]},
+            leeway=5,  # นาฬิกาแต่ละเครื่องต่างกันเล็กน้อย (iat)
+        )
+    except (jwt.PyJWTError, Exception):
+        return None
+    if payload.get("typ") != "refresh" or not payload.get("sid"):
+        return None
+    return payload
+
+# ==========================================
+# 🔐 รหัสผ่าน: bcrypt ใน Process Pool แยก
+# ==========================================
+# bcrypt ~200ms ต่อครั้ง → ทำใน Process แยก (จำนวนจำกัด) ไม่แย่ง CPU / Threadpool ของ Request อื่นตอนคน Login พร้อมกัน
+# spawn = Process ลูกเริ่มใหม่สะอาด (ไม่ fork Thread ของ worker ติดไปด้วย)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(max(1, settings.PASSWORD_HASH_MAX_PENDING))
+
+class PasswordPoolBusy(Exception):
+    """งานรหัสผ่านค้างเกิน PASSWORD_HASH_MAX_PENDING (ให้ตอบ 503 แทนการต่อคิวยาว)"""
+
+def _hash(password: str) -> str:
+    # Bcrypt มีข้อจำกัดที่ 72 bytes หากยาวกว่านั้นจะตัดทิ้ง
+    # เราตัดเองก่อนเพื่อป้องกัน passlib พ่น ValueError
+    return pwd_context.hash(password[:72])
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
     try:
-        # Bcrypt มีข้อจำกัดที่ 72 bytes หากยาวกว่านั้นจะตัดทิ้ง
-        # เราตัดเองก่อนเพื่อป้องกัน passlib พ่น ValueError
-        return pwd_context.verify(plain_password[:72], hashed_password)
+        return pwd_context.verify_and_update(plain_password[:72], hashed_password)
     except Exception:
-        return False
+        return False, None
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+def _drop_pool(pool: ProcessPoolExecutor) -> None:
+    """Process ลูกตาย (เช่นโดน OOM kill) → ทิ้ง Pool นี้ ครั้งหน้าสร้างใหม่"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+    print("⚠️ Password pool broken - recreating")
+
+def _run(fn, *args):
+    pool = _get_pool()
+    if pool is None:
+        return fn(*args)
+    with _pending:
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            _drop_pool(pool)
+            return fn(*args)
+
+async def _run_async(fn, *args):
+    """แบบ await: ไม่ถือ Thread ของ Threadpool ระหว่างรอ bcrypt"""
+    pool = _get_pool()
+    if pool is None:
+        return await run_in_threadpool(fn, *args)
+    if not _pending.acquire(blocking=False):
+        raise PasswordPoolBusy()
+    try:
+        return await asyncio.wrap_future(pool.submit(fn, *args))
+    except BrokenProcessPool:
+        _drop_pool(pool)
+        return await run_in_threadpool(fn, *args)
+    finally:
+        _pending.release()
+
+def start_password_pool() -> None:
+    """สร้าง Process ลูกไว้ก่อน (ตอน startup) ให้ Login แรกไม่ต้องรอ spawn"""
+    pool = _get_pool()
+    if pool is not None:
+        try:
+            for future in [pool.submit(int) for _ in range(settings.PASSWORD_HASH_WORKERS)]:
+                future.result()
+        except BrokenProcessPool:
+            _drop_pool(pool)
+            raise
+
+def shutdown_password_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    ตรวจสอบรหัสผ่าน โดยป้องกันปัญหา bcrypt 72-character limit
+    """
+    return _run(_verify_and_update, plain_password, hashed_password)[0]
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    ตรวจรหัสผ่านแบบ await → (ถูกไหม, Hash ใหม่ถ้า Hash เดิมใช้ rounds ไม่ตรง PASSWORD_BCRYPT_ROUNDS / None)
+    PasswordPoolBusy ถ้างานค้างเต็มคิว
+    """
+    return await _run_async(_verify_and_update, plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """
     สร้าง Hash จากรหัสผ่าน (จำกัด 72 ตัวอักษร)
     """
-    return pwd_context.hash(password[:72])
+    return _run(_hash, password)
 
 def decode_token(token: str) -> Optional[dict]:
     """
-    ถอดรหัสและตรวจสอบ Token
+    ถอดรหัสและตรวจสอบ Token (None = ไม่ถูกต้อง / หมดอายุ)
+    Token ที่เคยผ่านแล้วตอบจาก Cache จนถึง exp - ห้ามแก้ dict ที่ได้ (ใช้ร่วมกันทุก Request)
     """
+    if not token:
+        return None
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    with _token_lock:
+        hit = _TOKEN_CACHE.get(key)
+        if hit is not None:
+            if now < hit[1]:
+                _TOKEN_CACHE.move_to_end(key)
+                return hit[0]
+            del _TOKEN_CACHE[key]
+
     try:
         payload = jwt.decode(
             token, 
             settings.SECRET_KEY, 
             algorithms=[settings.ALGORITHM]
         )
-        return payload
     except (jwt.PyJWTError, Exception):
-        return None
\ No newline at end of file
+        return None
+
+    # ไม่มี exp = ไม่รู้ว่าหมดอายุเมื่อไหร่ → ไม่จำ (ถอดใหม่ทุกครั้ง)
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        with _token_lock:
+            _TOKEN_CACHE[key] = (payload, float(exp))
+            _TOKEN_CACHE.move_to_end(key)
+            while len(_TOKEN_CACHE) > MAX_TOKEN_CACHE_ITEMS:
+                _TOKEN_CACHE.popitem(last=False)
+    return payload
@@ -1,55 +1,59 @@
 # app/core/stats_cache.py
-import time
-import threading
-from typing import Any, Dict, Callable
-
-_STATS_CACHE: Dict[str, Dict[str, Any]] = {}
-_cache_lock = threading.Lock()
-
-# 🌟 เพิ่ม Dict สำหรับเก็บกุญแจล็อคเฉพาะแต่ละ Cache Key ป้องกันคนแย่งกันดึง DB
-_key_locks: Dict[str, threading.Lock] = {}
-
-CACHE_TTL = 60  
-
-def get_or_set_stats_cache(cache_key: str, fetch_func: Callable[[], Any], ttl: int = CACHE_TTL) -> Any:
-    current_time = time.time()
-
-    # 1. เช็คว่ามีของใน Cache ไหม
-    with _cache_lock:
-        cache_entry = _STATS_CACHE.get(cache_key)
-        if cache_entry and (current_time - cache_entry['timestamp'] < ttl):
-            return cache_entry['data']
-            
-        # ถ้าไม่มีล็อคของ Key นี้ ให้สร้างขึ้นมา
-        if cache_key not in _key_locks:
-            _key_locks[cache_key] = threading.Lock()
-        key_lock = _key_locks[cache_key]
-
-    # 2. 🌟 บังคับให้เข้าคิว (แก้ปัญหา Cache Stampede ยิง DB พร้อมกันร้อยคน)
-    with key_lock:
-        # Double-check: พอเข้ามาในคิวได้แล้ว เช็คอีกรอบเผื่อว่าคนก่อนหน้าเพิ่งดึงข้อมูลเสร็จ
-        with _cache_lock:
-            cache_entry = _STATS_CACHE.get(cache_key)
-            if cache_entry and (current_time - cache_entry['timestamp'] < ttl):
-                return cache_entry['data']
-        
-        # 3. ให้คนแรกแค่ "คนเดียว" เท่านั้นที่เป็นคนวิ่งไปหา Database!
-        data = fetch_func()
-
-        # 4. เซฟของใหม่ลง Cache และแจกจ่ายให้คนที่รอในคิว
-        with _cache_lock:
-            _STATS_CACHE[cache_key] = {
-                'data': data,
-                'timestamp': time.time()
-            }
-
-    return data
+"""
+Cache ผลหน้าสถิติ/Dashboard (ต่อ Process) - Namespace "stats" ของ app/core/cache
+
+- ก่อน Soft TTL (ttl, Default 60 วิ): ตอบจาก Cache
+- หลัง Soft TTL แต่ยังไม่ถึง Hard TTL: ตอบค่าเก่าทันที แล้วให้ Thread เบื้องหลังดึงใหม่ "คนเดียว" ด้วย SessionLocal ของตัวเอง
+  (ต้องส่ง db มาด้วย และ fetch_func ต้องรับ db เป็น Argument - Session ของ Request จะถูกปิดก่อนเบื้องหลังทำงาน)
+- เลย Hard TTL / ไม่มีใน Cache: รอดึงใหม่ โดยดึง DB แค่คนเดียวต่อ Key คนอื่นรอผล (กัน Cache Stampede)
+- Tag shop:<id> (shop:ALL = มุมมองรวมของ SuperAdmin) → ล้างเฉพาะร้าน
+- จำกัดจำนวน Key และขนาดรวม (STATS_CACHE_MAX_MB) แบบ LRU
+"""
+from typing import Any, Dict, Callable, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.cache import get_cache, shop_tag, bus
+
+CACHE_TTL = 60         # Soft TTL: หลังจากนี้ตอบค่าเก่า + ดึงใหม่เบื้องหลัง
+CACHE_HARD_TTL = 600   # Hard TTL: เก่ากว่านี้ไม่ตอบแล้ว รอดึงใหม่
+MAX_CACHE_ITEMS = 2000
+
+_cache = get_cache(
+    "stats", shared=True, ttl=CACHE_TTL, hard_ttl=CACHE_HARD_TTL, max_items=MAX_CACHE_ITEMS,
+    max_bytes=settings.STATS_CACHE_MAX_MB * 1024 * 1024, track_keys=MAX_CACHE_ITEMS,
+)
+
+def _fetch_with_own_session(fetch_func: Callable[[Session], Any]) -> Any:
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return fetch_func(db)
+    finally:
+        db.close()
+
+def get_or_set_stats_cache(cache_key: str, fetch_func: Callable[..., Any], db: Optional[Session] = None,
+                           ttl: int = CACHE_TTL, hard_ttl: int = CACHE_HARD_TTL, tags: Iterable[str] = ()) -> Any:
+    """
+    db=None → fetch_func() แบบเดิม (ไม่มี Refresh เบื้องหลัง ค่าเก่าเกิน ttl ต้องรอดึงใหม่)
+    db=Session → fetch_func(db) และหลัง ttl จะตอบค่าเก่าระหว่างดึงใหม่เบื้องหลัง (จนถึง hard_ttl)
+    """
+    if db is None:
+        return _cache.get_or_load(cache_key, fetch_func, ttl=ttl, hard_ttl=ttl, tags=tags)
+    return _cache.get_or_load(
+        cache_key, lambda: fetch_func(db), ttl=ttl, hard_ttl=hard_ttl, tags=tags,
+        refresh=lambda: _fetch_with_own_session(fetch_func),
+    )
 
 def invalidate_stats_cache(shop_id: str = None):
-    with _cache_lock:
-        if shop_id:
-            keys_to_delete = [k for k in _STATS_CACHE.keys() if f"shop_{shop_id}" in k]
-            for k in keys_to_delete:
-                del _STATS_CACHE[k]
-        else:
-            _STATS_CACHE.clear()
\ No newline at end of file
+    if shop_id:
+        # มุมมองรวมทุกร้านมียอดของร้านนี้อยู่ด้วย → ล้างไปพร้อมกัน
+        bus.invalidate("stats", tags=[shop_tag(shop_id), shop_tag(None)])
+    else:
+        bus.invalidate("stats", clear=True)
+
+def get_stats_cache_metrics(top: int = 50) -> Dict[str, Any]:
+    """สถิติ Cache สำหรับ Monitoring: ภาพรวม + Key ที่ดึงช้าสุด top อันดับ"""
+    return {**_cache.metrics(), "slowest": _cache.slowest(top)}
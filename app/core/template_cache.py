@@ -0,0 +1,49 @@
+# app/core/template_cache.py
+"""
+Bet Template Cache - เก็บโพยสำเร็จรูปที่ parse แล้วไว้ใน RAM (Namespace "templates" ของ app/core/cache)
+ส่งโพยซ้ำจาก template ได้เลย ไม่ต้อง validate รายการเลขหลายร้อยตัวผ่าน Pydantic ทุกรอบ
+แก้ไข/ลบ template แล้วเรียก invalidate_template หลัง commit → ทุก worker โหลดใหม่ทันที (TTL เผื่อไว้อีกชั้น)
+"""
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.cache import get_cache, template_tag, bus
+
+# ปิด NOTIFY = worker อื่นไม่รู้ว่าถูกแก้ → ใช้ TTL สั้น
+CACHE_TTL = 600 if settings.CACHE_NOTIFY_ENABLED else 60
+
+# โครงสร้าง: { "template_id": {"user_id": UUID, "lotto_type_id": UUID, "items": ((number, bet_type, Decimal), ...)} }
+# จำกัดจำนวน template ที่เก็บไว้ (ตัวที่ไม่ได้ใช้นานสุดจะถูกลบก่อน)
+_cache = get_cache("templates", ttl=CACHE_TTL, max_items=5000)
+
+def pack_items(items) -> List[List[str]]:
+    """แปลงรายการเลข (BetItemCreate) เป็นรูปแบบย่อสำหรับเก็บลง DB"""
+    return [[item.number.strip(), item.bet_type, str(item.amount)] for item in items]
+
+def parse_items(raw_items) -> Tuple[Tuple[str, str, Decimal], ...]:
+    """แปลงรูปแบบย่อจาก DB กลับเป็น tuple ที่พร้อมใช้ใน submit_ticket"""
+    return tuple((str(n), str(bt), Decimal(str(a))) for n, bt, a in (raw_items or []))
+
+def get_cached_template(template_id: str, db_fetch_callback: Callable[[str], Any]) -> Optional[Dict[str, Any]]:
+    """
+    ดึง template ที่ parse แล้วจาก Cache (ถ้าไม่มีค่อยไปดึง DB แค่ครั้งเดียว)
+
+    Args:
+        db_fetch_callback: ฟังก์ชันที่ query BetTemplate จาก DB (คืน None ถ้าไม่เจอ - จำไว้ด้วยจนหมดอายุ/ถูกล้าง)
+    """
+    def load() -> Optional[Dict[str, Any]]:
+        tmpl = db_fetch_callback(template_id)
+        if tmpl is None:
+            return None
+        return {
+            "user_id": tmpl.user_id,
+            "lotto_type_id": tmpl.lotto_type_id,
+            "items": parse_items(tmpl.items),
+        }
+
+    return _cache.get_or_load(template_id, load, tags=(template_tag(template_id),))
+
+def invalidate_template(template_id: str):
+    """เรียกเมื่อลูกค้าแก้ไข/ลบ template (หลัง commit)"""
+    bus.invalidate("templates", tags=[template_tag(template_id)])
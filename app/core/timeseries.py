@@ -0,0 +1,329 @@
+# app/core/timeseries.py
+"""
+ยอดขาย/จำนวนบิล รายนาที ต่อ (ร้าน, หวย) สำหรับกราฟหน้า Dashboard (/play/stats/timeseries)
+
+- วันนี้ (เวลาไทย): อ่านจาก Ring Buffer ใน RAM ต่อร้าน (1 ช่อง = 1 นาที) ที่ submit_ticket / cancel_ticket อัปเดต
+- วันก่อนหน้า: date_trunc รวมจาก tickets (+ ticket_archives ถ้าช่วงนั้นถูกย้ายไปแล้ว)
+- ยอดที่นับ = บิลที่ยังไม่ยกเลิก (เหมือน sales_amount ของ daily_rollups)
+
+⚠️ Buffer อยู่ในแต่ละ Process (gunicorn 2 workers = 2 ชุด):
+   ครั้งแรกที่ Process อ่านวันนี้ของร้านหนึ่ง จะดึงยอดตั้งต้นจาก tickets 1 ครั้ง (บิลก่อนรีสตาร์ท / บิลที่ worker อื่นรับไป)
+   หลังจากนั้นไม่อ่านตารางบิลอีก: บิลที่ worker อื่นรับ/ยกเลิก ส่งมาเป็นรายบิลผ่าน NOTIFY (bus.DeltaChannel, channel timeseries)
+   ตั้งต้นใน Snapshot เดียวกับรายการบิลล่าสุด → บิลที่ commit ก่อน Snapshot แต่มาถึง Buffer ทีหลังไม่ถูกนับซ้ำ
+   ปิด NOTIFY → ตั้งต้นใหม่ทุก TIMESERIES_RESYNC_SECONDS แทน (0 = ไม่ตั้งต้นใหม่ - worker เดียวเท่านั้น)
+"""
+import time
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+import pytz
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.cache import bus
+from app.db.partitions import ROUND_LOOKBEHIND_DAYS, ROUND_LOOKAHEAD_DAYS
+
+_BANGKOK = pytz.timezone('Asia/Bangkok')
+
+INTERVALS = {"minute": 1, "hour": 60}
+
+# บิลที่ยังไม่ยกเลิก รวมเป็นช่อง (เวลาไทย) - ใช้ทั้งตอนตั้งต้น Buffer และอ่านย้อนหลัง
+BUCKET_SQL = """
+    SELECT shop_id, lotto_type_id, date_trunc(:unit, created_at AT TIME ZONE 'Asia/Bangkok') AS bucket,
+           count(*) AS tickets, coalesce(sum(total_amount), 0) AS sales
+    FROM (
+        SELECT shop_id, lotto_type_id, created_at, total_amount FROM tickets {where}
+        {archive}
+    ) t
+    GROUP BY 1, 2, 3
+"""
+ARCHIVE_UNION = """
+        UNION ALL
+        SELECT shop_id, lotto_type_id, created_at, total_amount FROM ticket_archives {where}
+"""
+# บิลที่ Snapshot ตั้งต้นนับไปแล้วแต่อาจยังมาถึง Buffer ทีหลัง: เพิ่งสร้าง / ยกเลิกแล้ว (ทั้งวัน)
+SEEN_TICKETS_SQL = """
+    SELECT id, status = 'CANCELLED' AS cancelled FROM tickets {where}
+      AND (created_at >= :since OR status = 'CANCELLED')
+"""
+# หลังตั้งต้น ตรวจรายการที่มาถึงกับบิลใน Snapshot นานเท่านี้ (นานกว่าเวลาจาก commit → NOTIFY ถึงมาก)
+DEDUP_SECONDS = 60
+
+class _ShopRing:
+    """Ring Buffer รายนาทีของร้านเดียว: ช่องที่ (นาที % size) เก็บ {lotto_type_id: [ยอดขาย, จำนวนบิล]}"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.minutes: List[Optional[int]] = [None] * size
+        self.buckets: List[Optional[dict]] = [None] * size
+
+    def add(self, minute: int, lotto_type_id, sales: Decimal, tickets: int) -> None:
+        slot = minute % self.size
+        if self.minutes[slot] != minute:
+            # ช่องนี้เป็นของนาทีที่เก่ากว่า size นาที → เขียนทับ
+            self.minutes[slot] = minute
+            self.buckets[slot] = {}
+        acc = self.buckets[slot].setdefault(lotto_type_id, [Decimal(0), 0])
+        acc[0] += sales
+        acc[1] += tickets
+
+    def clear(self, lo: int, hi: int) -> None:
+        for minute in range(lo, hi):
+            slot = minute % self.size
+            if self.minutes[slot] == minute:
+                self.minutes[slot] = None
+                self.buckets[slot] = None
+
+    def read(self, lo: int, hi: int):
+        for minute in range(lo, hi):
+            slot = minute % self.size
+            if self.minutes[slot] == minute:
+                for lotto_type_id, (sales, tickets) in self.buckets[slot].items():
+                    yield lotto_type_id, minute, sales, tickets
+
+# { shop_id: _ShopRing }
+_RINGS: Dict[object, _ShopRing] = {}
+# { shop_id หรือ None (ทุกร้าน): (วันที่ตั้งต้น, เวลาที่ตั้งต้น) }
+_SYNCED: Dict[object, Tuple[date, float]] = {}
+# กำลังตั้งต้น: { shop_id หรือ None: [(point, sign)] ที่มาถึงระหว่างนั้น } - ใส่ Buffer หลังเติมยอดจาก Snapshot
+_SEEDING: Dict[object, list] = {}
+# หลังตั้งต้น: { shop_id หรือ None: (หมดเวลาตรวจ, {ticket_id: ยกเลิกแล้วใน Snapshot}) }
+_SEEN: Dict[object, Tuple[float, Dict[UUID, bool]]] = {}
+# เพิ่มทุกครั้งที่ล้าง → การตั้งต้นที่ค้างอยู่ระหว่างล้างไม่ถูกบันทึก
+_generation = 0
+_lock = threading.Lock()
+# กันหลาย Request ตั้งต้นร้านเดียวกันพร้อมกัน
+_sync_lock = threading.Lock()
+
+def _minute_of(dt: datetime) -> int:
+    return int(dt.timestamp() // 60)
+
+def _thai_today() -> date:
+    return datetime.now(_BANGKOK).date()
+
+def _day_minutes(day: date) -> Tuple[int, int]:
+    """[นาทีแรก, นาทีสุดท้าย + 1) ของวัน (เวลาไทย) เป็น epoch minute"""
+    start = _BANGKOK.localize(datetime.combine(day, datetime.min.time()))
+    return _minute_of(start), _minute_of(start) + 24 * 60
+
+def _ring(shop_id) -> _ShopRing:
+    ring = _RINGS.get(shop_id)
+    if ring is None:
+        ring = _RINGS[shop_id] = _ShopRing(settings.TIMESERIES_RING_MINUTES)
+    return ring
+
+# ==========================================
+# ✍️ ฝั่งเขียน: เรียกหลัง commit เท่านั้น (Rollback แล้วยอดใน RAM ต้องไม่ขยับ)
+# ==========================================
+
+def ticket_point(ticket) -> Optional[tuple]:
+    """(ticket_id, shop_id, lotto_type_id, นาที, ยอด) ของบิล - เก็บไว้ก่อน commit แล้วส่งให้ record() ทีหลัง"""
+    if ticket.lotto_type_id is None or ticket.created_at is None:
+        return None
+    return ticket.id, ticket.shop_id, ticket.lotto_type_id, _minute_of(ticket.created_at), Decimal(ticket.total_amount or 0)
+
+def _already_counted(ticket_id, shop_id, sign: int, now: float) -> bool:
+    """(เรียกใน _lock) Snapshot ตั้งต้นที่ยังอยู่ในช่วงตรวจ นับบิลนี้ (สร้าง / ยกเลิก) ไปแล้วหรือยัง"""
+    for key in (shop_id, None):
+        seen = _SEEN.get(key)
+        if seen is None:
+            continue
+        if now >= seen[0]:
+            del _SEEN[key]
+            continue
+        cancelled = seen[1].get(ticket_id)
+        if cancelled is not None and (sign > 0 or cancelled):
+            return True
+    return False
+
+def _apply(point: tuple, sign: int) -> None:
+    """(เรียกใน _lock)"""
+    ticket_id, shop_id, lotto_type_id, minute, amount = point
+    for key in (shop_id, None):
+        if key in _SEEDING:
+            _SEEDING[key].append((point, sign))
+            return
+    if _already_counted(ticket_id, shop_id, sign, time.time()):
+        return
+    _ring(shop_id).add(minute, lotto_type_id, sign * amount, sign)
+
+def record(point: Optional[tuple], sign: int = 1) -> None:
+    """บวก (ส่งโพย, sign=1) หรือหัก (ยกเลิก, sign=-1) บิลออกจาก Buffer แล้วส่งต่อ worker อื่น"""
+    if point is None:
+        return
+    with _lock:
+        _apply(point, sign)
+    ticket_id, shop_id, lotto_type_id, minute, amount = point
+    _channel.add([[str(ticket_id), str(shop_id), str(lotto_type_id), minute, str(amount), sign]])
+
+def _apply_remote(items: List[list]) -> None:
+    with _lock:
+        for ticket_id, shop_id, lotto_type_id, minute, amount, sign in items:
+            shop_id = UUID(shop_id)
+            # ร้านที่ worker นี้ยังไม่เคยตั้งต้น → ไม่ต้องเก็บ (ตั้งต้นจาก DB ตอนเปิดดูครั้งแรกอยู่แล้ว)
+            if not any(key in _SYNCED or key in _SEEDING for key in (shop_id, None)):
+                continue
+            _apply((UUID(ticket_id), shop_id, UUID(lotto_type_id), minute, Decimal(amount)), sign)
+
+def _reset() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _RINGS.clear()
+        _SYNCED.clear()
+        _SEEN.clear()
+        # ตั้งต้นที่ค้างอยู่จะทิ้งผลเอง (generation เปลี่ยน) - รายการที่รอไว้ไม่ต้องใช้แล้ว
+        for pending in _SEEDING.values():
+            pending.clear()
+
+_channel = bus.DeltaChannel("timeseries", _apply_remote, _reset)
+
+# ==========================================
+# 📖 ฝั่งอ่าน
+# ==========================================
+
+def _needs_sync(shop_id, today: date) -> bool:
+    # มี NOTIFY = ตั้งต้นครั้งเดียวต่อวัน (หลังจากนั้นได้รายบิลจาก worker อื่น)
+    resync = 0 if settings.CACHE_NOTIFY_ENABLED else settings.TIMESERIES_RESYNC_SECONDS
+    for key in (shop_id, None):
+        synced = _SYNCED.get(key)
+        if synced and synced[0] == today and (resync <= 0 or time.time() - synced[1] < resync):
+            return False
+    return True
+
+def _sync_today(db: Session, shop_id, today: date) -> None:
+    """
+    ตั้งต้นยอดวันนี้ของร้าน (None = ทุกร้าน) จาก tickets แล้วแทนที่ของเดิมใน Buffer
+    ยอดรายนาที + บิลที่อาจถูกนับซ้ำ อ่านใน Snapshot เดียวกัน (REPEATABLE READ)
+    รายการที่มาถึงระหว่าง/หลังตั้งต้น DEDUP_SECONDS ถ้า Snapshot นับไปแล้วจะถูกข้าม
+    """
+    lo, hi = _day_minutes(today)
+    where = ["created_at >= :start_utc", "created_at < :end_utc",
+             "round_date BETWEEN :round_lo AND :round_hi", "lotto_type_id IS NOT NULL"]
+    params = {
+        "unit": "minute",
+        "start_utc": datetime.fromtimestamp(lo * 60, pytz.utc),
+        "end_utc": datetime.fromtimestamp(hi * 60, pytz.utc),
+        "round_lo": today - timedelta(days=ROUND_LOOKBEHIND_DAYS),
+        "round_hi": today + timedelta(days=ROUND_LOOKAHEAD_DAYS),
+        "since": datetime.fromtimestamp(time.time() - DEDUP_SECONDS, pytz.utc),
+    }
+    if shop_id:
+        where.append("shop_id = :shop_id")
+        params["shop_id"] = shop_id
+    where_sql = "WHERE " + " AND ".join(where)
+
+    with _lock:
+        generation = _generation
+        _SEEDING[shop_id] = []
+    try:
+        # Connection แยกจาก Session ของ Request (ต้องเริ่ม Transaction ใหม่ถึงจะตั้ง Isolation ได้)
+        with db.get_bind().connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+            rows = conn.execute(
+                text(BUCKET_SQL.format(where=where_sql + " AND status <> 'CANCELLED'", archive="")), params
+            ).all()
+            seen = {r.id: r.cancelled for r in conn.execute(text(SEEN_TICKETS_SQL.format(where=where_sql)), params)}
+    except Exception:
+        with _lock:
+            pending = _SEEDING.pop(shop_id, [])
+            for point, sign in pending:
+                _apply(point, sign)
+        raise
+
+    with _lock:
+        pending = _SEEDING.pop(shop_id, [])
+        if generation != _generation:
+            return
+        for sid in ([shop_id] if shop_id else list(_RINGS)):
+            if sid in _RINGS:
+                _RINGS[sid].clear(lo, hi)
+        for r in rows:
+            _ring(r.shop_id).add(_minute_of(_BANGKOK.localize(r.bucket)), r.lotto_type_id, Decimal(r.sales), r.tickets)
+        _SEEN[shop_id] = (time.time() + DEDUP_SECONDS, seen)
+        for point, sign in pending:
+            _apply(point, sign)
+        _SYNCED[shop_id] = (today, time.time())
+
+def read_today(db: Session, shop_id=None, lotto_type_id=None) -> List[tuple]:
+    """แถว (shop_id, lotto_type_id, นาที, ยอด, จำนวนบิล) ของวันนี้จาก Buffer"""
+    today = _thai_today()
+    if _needs_sync(shop_id, today):
+        with _sync_lock:
+            if _needs_sync(shop_id, today):
+                _sync_today(db, shop_id, today)
+
+    lo, hi = _day_minutes(today)
+    with _lock:
+        shop_ids = [shop_id] if shop_id else list(_RINGS)
+        return [
+            (sid, lid, minute, sales, tickets)
+            for sid in shop_ids if sid in _RINGS
+            for lid, minute, sales, tickets in _RINGS[sid].read(lo, hi)
+            if lotto_type_id is None or lid == lotto_type_id
+        ]
+
+def read_history(db: Session, s_date: date, e_date: date, unit: str,
+                 shop_id=None, lotto_type_id=None, include_archive: bool = False) -> List[tuple]:
+    """แถว (shop_id, lotto_type_id, นาที, ยอด, จำนวนบิล) ของวันที่ s_date..e_date จาก date_trunc บนตารางบิล"""
+    lo, _ = _day_minutes(s_date)
+    _, hi = _day_minutes(e_date)
+    where = ["created_at >= :start_utc", "created_at < :end_utc",
+             "round_date BETWEEN :round_lo AND :round_hi", "lotto_type_id IS NOT NULL", "status <> 'CANCELLED'"]
+    params = {
+        "unit": unit,
+        "start_utc": datetime.fromtimestamp(lo * 60, pytz.utc),
+        "end_utc": datetime.fromtimestamp(hi * 60, pytz.utc),
+        "round_lo": s_date - timedelta(days=ROUND_LOOKBEHIND_DAYS),
+        "round_hi": e_date + timedelta(days=ROUND_LOOKAHEAD_DAYS),
+    }
+    if shop_id:
+        where.append("shop_id = :shop_id")
+        params["shop_id"] = shop_id
+    if lotto_type_id:
+        where.append("lotto_type_id = :lotto_type_id")
+        params["lotto_type_id"] = lotto_type_id
+
+    where_sql = "WHERE " + " AND ".join(where)
+    archive = ARCHIVE_UNION.format(where=where_sql) if include_archive else ""
+    rows = db.execute(text(BUCKET_SQL.format(where=where_sql, archive=archive)), params).all()
+    return [
+        (r.shop_id, r.lotto_type_id, _minute_of(_BANGKOK.localize(r.bucket)), Decimal(r.sales), r.tickets)
+        for r in rows
+    ]
+
+def build_series(rows: Iterable[tuple], interval: str) -> List[dict]:
+    """รวมแถวรายนาทีเป็นช่วง interval แล้วจัดกลุ่มต่อ (ร้าน, หวย) เรียงตามเวลา (ช่องที่ไม่มียอดจะไม่ส่งไป)"""
+    step = INTERVALS[interval]
+    grouped: Dict[tuple, Dict[int, list]] = {}
+    for shop_id, lotto_type_id, minute, sales, tickets in rows:
+        points = grouped.setdefault((shop_id, lotto_type_id), {})
+        acc = points.setdefault(minute - minute % step, [Decimal(0), 0])
+        acc[0] += sales
+        acc[1] += tickets
+
+    series = []
+    for (shop_id, lotto_type_id), points in grouped.items():
+        items = [
+            {"time": datetime.fromtimestamp(minute * 60, _BANGKOK).isoformat(), "sales": sales, "tickets": tickets}
+            for minute, (sales, tickets) in sorted(points.items())
+            if tickets
+        ]
+        if not items:
+            continue
+        series.append({
+            "shop_id": shop_id,
+            "lotto_type_id": lotto_type_id,
+            "total_sales": sum(p["sales"] for p in items),
+            "total_tickets": sum(p["tickets"] for p in items),
+            "points": items,
+        })
+    series.sort(key=lambda s: s["total_sales"], reverse=True)
+    return series
+
+def clear_timeseries() -> None:
+    """ล้าง Buffer ทุก worker (หลังลบร้าน/ลบบิลด้วยมือ) ครั้งถัดไปจะตั้งต้นจาก DB ใหม่"""
+    _channel.reset_all()
@@ -0,0 +1,288 @@
+# app/core/token_revocation.py
+"""
+รายการเพิกถอน Refresh Token (ตาราง token_revocations) - ทุก worker ถือไว้ใน RAM / เขียนลง DB เป็นชุด
+
+POST /auth/refresh ตรวจแค่ลายเซ็น (security.decode_refresh_token) + รายการนี้ → ไม่ต้อง bcrypt / ไม่เขียน users
+แต่ละแถว = "Refresh Token ของ key นี้ที่ออก (iat) ไม่หลัง revoked_before ใช้ไม่ได้":
+  - sid:<session>  ต่อ Session (1 Login): หมุน Token ทุกครั้งที่ refresh (ใบเก่าของ Session ใช้ไม่ได้อีก) / Logout
+  - user:<id>      ทุก Session ของผู้ใช้: เปลี่ยนรหัสผ่าน / ปิดบัญชี / ลบ
+→ 1 แถวต่อ Session ที่ยังไม่หมดอายุ (ไม่ใช่ 1 แถวต่อการ refresh) / แถวที่เลย expires_at ถูกลบทิ้งชั่วโมงละครั้ง
+
+- revoke(): แก้ใน RAM ทันที แล้วรอเขียนเป็นชุดทุก TOKEN_REVOCATION_FLUSH_SECONDS
+  (INSERT ... ON CONFLICT ครั้งเดียวต่อชุด + NOTIFY ใน Transaction เดียวกัน → worker อื่นเห็นหลัง commit)
+  wait=True เขียนทันที (Logout / เปลี่ยนรหัส / ปิดบัญชี - นานๆ ครั้ง และต้องมีผลทันที)
+- worker อื่นรับผ่าน Listener ของ app/core/cache/bus.py (channel token_revoked) / ต่อ DB ใหม่ → โหลดทั้งตารางใหม่
+  CACHE_NOTIFY_ENABLED=false → ดึงแถวที่เปลี่ยนล่าสุดจาก DB เองทุกรอบ flush แทน
+- rotate(): ตรวจ + เพิกถอนแบบ atomic ภายใน worker (ใบเดียวกันหมุนได้ครั้งเดียว)
+- ใบที่ถูกหมุนทิ้งแล้วถูกส่งมาอีก (Reuse) → ปิดทั้ง Session ทันทีทุก worker: ขโมยไปหมุนก่อนก็ใช้ต่อไม่ได้
+  และถ้า 2 worker หมุนใบเดียวกันได้ทั้งคู่ในช่วงก่อน flush สาขาที่ส่งใบเก่ามาทีหลังจะทำให้ทั้ง Session ตาย
+⚠️ Token ที่เพิ่งถูกหมุนทิ้งยังใช้กับ worker อื่นได้ไม่เกิน 1 รอบ flush
+   worker ตายก่อน flush = รายการที่ค้างอยู่หาย (ใบเก่าใช้ได้ต่อจนหมดอายุ - ใบใหม่ไม่กระทบ)
+"""
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.cache import bus
+from app.models.user import TokenRevocation
+
+CHANNEL = "token_revoked"
+PRUNE_SECONDS = 3600
+# ไม่มี NOTIFY: ดึงย้อนหลังเผื่อนาฬิกาต่างเครื่อง / ชุดที่ commit ช้ากว่าเวลาที่ตัด
+PULL_OVERLAP_SECONDS = 30
+
+# { key: (revoked_before เป็นมิลลิวินาที, expires_at เป็นวินาที) }
+_entries: Dict[str, Tuple[int, float]] = {}
+_pending: Dict[str, Tuple[int, float]] = {}
+_lock = threading.Lock()
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+_start_lock = threading.Lock()
+_STATS: Dict[str, Any] = {
+    "flushed": 0, "batches": 0, "flush_errors": 0, "received": 0, "loaded": 0, "reused": 0, "last_error": None,
+}
+
+def _ms(seconds: float) -> int:
+    return int(round(float(seconds) * 1000))
+
+def _merge(target: Dict[str, Tuple[int, float]], key: str, revoked_before: int, expires_at: float) -> None:
+    """รวมแบบเอาค่ามากสุด → ลำดับที่ได้รับ / เขียนซ้ำไม่มีผล"""
+    old = target.get(key)
+    if old is not None:
+        revoked_before, expires_at = max(old[0], revoked_before), max(old[1], expires_at)
+    target[key] = (revoked_before, expires_at)
+
+def session_key(session_id: Any) -> str:
+    return f"sid:{session_id}"
+
+def user_key(user_id: Any) -> str:
+    return f"user:{user_id}"
+
+# ==========================================
+# 🔍 ตรวจ (ทุกครั้งที่ refresh - อ่าน RAM อย่างเดียว)
+# ==========================================
+
+def _revoked_by(claims: Dict[str, Any]) -> Optional[str]:
+    """key ที่ทำให้ใบนี้ใช้ไม่ได้ (None = ยังใช้ได้)"""
+    issued = _ms(claims["iat"])
+    for key in (session_key(claims["sid"]), user_key(claims["sub"])):
+        entry = _entries.get(key)
+        if entry is not None and issued <= entry[0]:
+            return key
+    return None
+
+def is_revoked(claims: Dict[str, Any]) -> bool:
+    """claims จาก security.decode_refresh_token"""
+    return _revoked_by(claims) is not None
+
+def check_refresh(claims: Dict[str, Any]) -> bool:
+    """
+    ตรวจก่อน refresh: True = ใช้ได้
+    ใบที่ถูกหมุนทิ้งไปแล้วถูกส่งมาซ้ำ (Token หลุด - ไม่รู้ว่าใครเป็นเจ้าของจริง) → ปิดทั้ง Session ทุก worker
+    """
+    revoked_by = _revoked_by(claims)
+    if revoked_by is None:
+        return True
+    if revoked_by == session_key(claims["sid"]):
+        _revoke_reused(claims)
+    return False
+
+# ==========================================
+# ✂️ เพิกถอน
+# ==========================================
+
+def _record(key: str, revoked_before: float, expires_at: float) -> None:
+    # ต้องถือ _lock
+    _merge(_entries, key, _ms(revoked_before), expires_at)
+    _merge(_pending, key, _ms(revoked_before), expires_at)
+
+def revoke(key: str, revoked_before: float, expires_at: float, wait: bool = False) -> None:
+    """Token ของ key ที่ออกไม่หลัง revoked_before (วินาที) ใช้ไม่ได้ / เก็บไว้ถึง expires_at (วินาที)"""
+    with _lock:
+        _record(key, revoked_before, expires_at)
+    if wait:
+        flush()
+    else:
+        start_revocation_sync()
+
+def rotate(old_claims: Dict[str, Any], new_claims: Dict[str, Any]) -> bool:
+    """
+    หมุน Token: ใบเดิม (และใบก่อนหน้าทั้งหมดของ Session) ใช้ไม่ได้ / ใบใหม่ออกหลังใบเดิมเสมอ
+    ตรวจ + เพิกถอนใน _lock เดียวกัน → refresh ใบเดียวกันพร้อมกันได้ใบใหม่แค่ครั้งเดียว (คืน False = แพ้ → 401)
+    """
+    with _lock:
+        revoked_by = _revoked_by(old_claims)
+        if revoked_by is None:
+            _record(session_key(old_claims["sid"]), old_claims["iat"], new_claims["exp"])
+    if revoked_by is None:
+        start_revocation_sync()
+        return True
+    if revoked_by == session_key(old_claims["sid"]):
+        _revoke_reused(old_claims)
+    return False
+
+def _latest_expiry(now: float) -> float:
+    # Refresh Token ที่ออกก่อนตอนนี้หมดอายุไม่เกินเวลานี้
+    return now + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+
+def revoke_session(claims: Dict[str, Any]) -> None:
+    """Logout: ปิด Session นี้ (ทุกใบที่ออกมาแล้ว)"""
+    now = time.time()
+    revoke(session_key(claims["sid"]), now, _latest_expiry(now), wait=True)
+
+def _revoke_reused(claims: Dict[str, Any]) -> None:
+    """ใบเก่าถูกใช้ซ้ำ: ปิด Session รวมถึงใบที่หมุนจากใบนี้ไปแล้ว (iat ของใบใหม่ไม่เกิน iat เดิม + 1 ms หรือตอนนี้)"""
+    now = time.time()
+    _STATS["reused"] += 1
+    revoke(session_key(claims["sid"]), max(now, claims["iat"] + 0.001), _latest_expiry(now), wait=True)
+
+def revoke_user_sessions(*user_ids: Any) -> None:
+    """ทุก Session ของผู้ใช้ (เปลี่ยนรหัสผ่าน / ปิดบัญชี / ลบ) - เรียกหลัง commit"""
+    now = time.time()
+    for user_id in user_ids:
+        revoke(user_key(user_id), now, _latest_expiry(now))
+    flush()
+
+# ==========================================
+# 💾 เขียนลง DB เป็นชุด + แจ้ง worker อื่น
+# ==========================================
+
+def _dt(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+def _payloads(batch: Dict[str, Tuple[int, float]]) -> List[str]:
+    payloads, chunk, size = [], [], 2
+    for key in sorted(batch):
+        item = [key, batch[key][0], int(batch[key][1])]
+        item_size = len(json.dumps(item)) + 2
+        if chunk and size + item_size > bus.MAX_PAYLOAD_BYTES:
+            payloads.append(json.dumps(chunk))
+            chunk, size = [], 2
+        chunk.append(item)
+        size += item_size
+    if chunk:
+        payloads.append(json.dumps(chunk))
+    return payloads
+
+def flush() -> int:
+    """เขียนรายการที่ค้างทั้งหมดในครั้งเดียว (เขียนไม่สำเร็จ → เก็บไว้เขียนรอบหน้า) คืนจำนวนแถว"""
+    global _pending
+    with _lock:
+        batch, _pending = _pending, {}
+    if not batch:
+        return 0
+
+    from app.db.session import engine
+
+    # เรียง key กัน Deadlock เวลาหลาย worker เขียน key เดียวกันพร้อมกัน
+    rows = [
+        {"key": key, "revoked_before": _dt(batch[key][0] / 1000), "expires_at": _dt(batch[key][1])}
+        for key in sorted(batch)
+    ]
+    stmt = insert(TokenRevocation).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={
+            "revoked_before": func.greatest(TokenRevocation.revoked_before, stmt.excluded.revoked_before),
+            "expires_at": func.greatest(TokenRevocation.expires_at, stmt.excluded.expires_at),
+        }
+    )
+    try:
+        with engine.begin() as conn:
+            conn.execute(stmt)
+            if settings.CACHE_NOTIFY_ENABLED:
+                for payload in _payloads(batch):
+                    conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+    except Exception as e:
+        with _lock:
+            for key, (revoked_before, expires_at) in batch.items():
+                _merge(_pending, key, revoked_before, expires_at)
+        _STATS["flush_errors"] += 1
+        _STATS["last_error"] = str(e)
+        print(f"⚠️ Token revocation flush failed ({len(batch)} pending): {e}")
+        return 0
+    _STATS["flushed"] += len(batch)
+    _STATS["batches"] += 1
+    return len(batch)
+
+# ==========================================
+# 📥 รับจาก worker อื่น / โหลดจาก DB
+# ==========================================
+
+def _handle_notify(payload: str) -> None:
+    items = json.loads(payload)
+    with _lock:
+        for key, revoked_before, expires_at in items:
+            _merge(_entries, key, int(revoked_before), float(expires_at))
+    _STATS["received"] += len(items)
+
+def load_revocations(since: Optional[float] = None) -> int:
+    """โหลดแถวที่ยังไม่หมดอายุ (since = เฉพาะที่ revoked_before หลังเวลานี้) เข้า RAM"""
+    from app.db.session import engine
+
+    query = "SELECT key, revoked_before, expires_at FROM token_revocations WHERE expires_at > now()"
+    params = {}
+    if since is not None:
+        query += " AND revoked_before > :since"
+        params["since"] = _dt(since)
+    with engine.connect() as conn:
+        rows = conn.execute(text(query), params).all()
+    with _lock:
+        for key, revoked_before, expires_at in rows:
+            _merge(_entries, key, _ms(revoked_before.timestamp()), expires_at.timestamp())
+    _STATS["loaded"] += len(rows)
+    return len(rows)
+
+def _prune() -> None:
+    from app.db.session import engine
+
+    now = time.time()
+    with _lock:
+        for key in [k for k, (_, expires_at) in _entries.items() if expires_at < now]:
+            del _entries[key]
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM token_revocations WHERE expires_at < now()"))
+
+# NOTIFY มาทาง Listener ตัวเดียวกับ Cache (ต่อใหม่ทุกครั้ง → โหลดทั้งตาราง เผื่อพลาดข้อความระหว่างหลุด)
+bus.subscribe(CHANNEL, _handle_notify, on_connect=load_revocations)
+
+def _sync_loop() -> None:
+    last_pull: Optional[float] = None
+    last_prune = time.time()
+    while not _stop.wait(settings.TOKEN_REVOCATION_FLUSH_SECONDS):
+        flush()
+        try:
+            if not settings.CACHE_NOTIFY_ENABLED:
+                started = time.time()
+                load_revocations(None if last_pull is None else last_pull - PULL_OVERLAP_SECONDS)
+                last_pull = started
+            if time.time() - last_prune >= PRUNE_SECONDS:
+                last_prune = time.time()
+                _prune()
+        except Exception as e:
+            _STATS["last_error"] = str(e)
+            print(f"⚠️ Token revocation sync failed: {e}")
+
+def start_revocation_sync() -> threading.Thread:
+    """เริ่ม Thread เขียนเป็นชุด (เรียกตอน startup ของแต่ละ worker, เรียกซ้ำได้)"""
+    global _thread
+    with _start_lock:
+        if _thread is None or not _thread.is_alive():
+            _stop.clear()
+            _thread = threading.Thread(target=_sync_loop, name="token-revocation-sync", daemon=True)
+            _thread.start()
+        return _thread
+
+def stop_revocation_sync() -> None:
+    """ตอน shutdown: หยุด Thread แล้วเขียนที่ค้างให้หมด"""
+    _stop.set()
+    flush()
+
+def get_revocation_stats() -> Dict[str, Any]:
+    return {"entries": len(_entries), "pending": len(_pending), **_STATS}
@@ -0,0 +1,238 @@
+# app/core/top_numbers.py
+"""
+ยอดแทงรายเลขสดๆ ต่อ (ร้าน, หวย, งวด, ประเภทแทง) สำหรับ /play/stats/top_numbers ของงวดที่กำลังขาย
+
+- ตัวนับอยู่ใน RAM: submit_ticket บวก / cancel_ticket หัก (หลัง commit)
+- เลขมีได้ไม่เกิน 1,000 ตัวต่อประเภทแทง → นับแบบตรงเป๊ะทุกเลข (ไม่ต้องใช้ Sketch แบบประมาณค่า)
+  แล้วตัด Top N ด้วย heapq.nlargest ตอนอ่าน
+- งวดที่ยังไม่เคยถูกเปิดดูใน Process นี้ ไม่เก็บตัวนับ (ไม่กิน RAM ให้หวยที่ไม่มีใครดู)
+  ครั้งแรกที่เปิดดูจะดึงยอดตั้งต้นจาก ticket_items 1 ครั้ง (ครอบคลุมบิลของ worker อื่น / ก่อนรีสตาร์ท)
+  หลังจากนั้นไม่ GROUP BY อีก: บิลที่ worker อื่นรับ/ยกเลิก ส่งยอดรายเลขมาทาง NOTIFY (bus.DeltaChannel, channel top_numbers)
+  ตั้งต้นใน Snapshot เดียวกับรายการบิลล่าสุด → บิลที่ commit ก่อน Snapshot แต่มาถึงตัวนับทีหลังไม่ถูกนับซ้ำ
+  ปิด NOTIFY → ตั้งต้นใหม่ทุก TOP_NUMBERS_RESYNC_SECONDS แทน (0 = ไม่ตั้งต้นใหม่ - worker เดียวเท่านั้น)
+"""
+import heapq
+import time
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core import archiver
+from app.core.cache import bus
+
+# จำนวนงวด (หวย × งวด) ที่เก็บตัวนับไว้พร้อมกันต่อ Process (เกินแล้วทิ้งงวดที่ไม่ได้ดูนานสุด)
+MAX_LIVE_ROUNDS = 500
+
+# ยอดรายเลขของงวดเดียว (บิลที่ยังไม่ยกเลิก)
+ROUND_NUMBERS_SQL = """
+    SELECT t.shop_id, i.bet_type, i.number, sum(i.amount) AS total_amount, count(*) AS frequency
+    FROM ticket_items i
+    JOIN tickets t ON t.id = i.ticket_id AND t.round_date = i.round_date
+    WHERE t.lotto_type_id = :lotto_type_id AND t.round_date = :round_date AND i.round_date = :round_date
+      AND t.status <> 'CANCELLED'
+    GROUP BY 1, 2, 3
+"""
+ARCHIVE_ROUND_NUMBERS_SQL = """
+    SELECT a.shop_id, e->>2 AS bet_type, e->>1 AS number, sum((e->>3)::numeric) AS total_amount, count(*) AS frequency
+    FROM ticket_archives a CROSS JOIN LATERAL jsonb_array_elements(a.items_packed) e
+    WHERE a.lotto_type_id = :lotto_type_id AND a.round_date = :round_date AND a.status <> 'CANCELLED'
+    GROUP BY 1, 2, 3
+"""
+# บิลที่ Snapshot ตั้งต้นนับไปแล้วแต่อาจยังมาถึงตัวนับทีหลัง: เพิ่งสร้าง / ยกเลิกแล้ว
+SEEN_TICKETS_SQL = """
+    SELECT id, status = 'CANCELLED' AS cancelled FROM tickets
+    WHERE lotto_type_id = :lotto_type_id AND round_date = :round_date
+      AND (created_at >= :since OR status = 'CANCELLED')
+"""
+# หลังตั้งต้น ตรวจรายการที่มาถึงกับบิลใน Snapshot นานเท่านี้ (นานกว่าเวลาจาก commit → NOTIFY ถึงมาก)
+DEDUP_SECONDS = 60
+# จำนวนเลขต่อ 1 รายการที่ส่งทาง NOTIFY (บิลใหญ่แบ่งหลายรายการ ไม่ให้เกิน MAX_PAYLOAD_BYTES)
+ROWS_PER_DELTA = 100
+
+# { (lotto_type_id, round_date): {"synced_at": epoch, "shops": {shop_id: {bet_type: {number: [ยอด, จำนวนครั้ง]}}}} }
+_LIVE: "OrderedDict[tuple, dict]" = OrderedDict()
+# กำลังตั้งต้น: { (lotto_type_id, round_date): [(point, sign)] ที่มาถึงระหว่างนั้น }
+_SEEDING: Dict[tuple, list] = {}
+# หลังตั้งต้น: { (lotto_type_id, round_date): (หมดเวลาตรวจ, {ticket_id: ยกเลิกแล้วใน Snapshot}) }
+_SEEN: Dict[tuple, tuple] = {}
+# เพิ่มทุกครั้งที่ล้าง → การตั้งต้นที่ค้างอยู่ระหว่างล้างไม่ถูกบันทึก
+_generation = 0
+_lock = threading.Lock()
+_sync_lock = threading.Lock()
+
+# ==========================================
+# ✍️ ฝั่งเขียน: เรียกหลัง commit เท่านั้น
+# ==========================================
+
+def ticket_point(ticket, items) -> Optional[tuple]:
+    """(ticket_id, shop_id, lotto_type_id, round_date, [(bet_type, number, amount)]) - items เป็น TicketItem หรือ dict ก็ได้"""
+    if ticket.lotto_type_id is None:
+        return None
+    rows = []
+    for item in items:
+        get = item.get if isinstance(item, dict) else lambda k: getattr(item, k)
+        rows.append((get("bet_type"), get("number"), Decimal(get("amount") or 0)))
+    return ticket.id, ticket.shop_id, ticket.lotto_type_id, ticket.round_date, rows
+
+def _already_counted(key: tuple, ticket_id, sign: int, now: float) -> bool:
+    """(เรียกใน _lock) Snapshot ตั้งต้นที่ยังอยู่ในช่วงตรวจ นับบิลนี้ (สร้าง / ยกเลิก) ไปแล้วหรือยัง"""
+    seen = _SEEN.get(key)
+    if seen is None:
+        return False
+    if now >= seen[0]:
+        del _SEEN[key]
+        return False
+    cancelled = seen[1].get(ticket_id)
+    return cancelled is not None and (sign > 0 or cancelled)
+
+def _apply(point: tuple, sign: int) -> None:
+    """(เรียกใน _lock) เฉพาะงวดที่มีตัวนับอยู่แล้ว / กำลังตั้งต้น"""
+    ticket_id, shop_id, lotto_type_id, round_date, rows = point
+    key = (lotto_type_id, round_date)
+    if key in _SEEDING:
+        _SEEDING[key].append((point, sign))
+        return
+    entry = _LIVE.get(key)
+    if entry is None or _already_counted(key, ticket_id, sign, time.time()):
+        return
+    shop = entry["shops"].setdefault(shop_id, {})
+    for bet_type, number, amount in rows:
+        acc = shop.setdefault(bet_type, {}).setdefault(number, [Decimal(0), 0])
+        acc[0] += sign * amount
+        acc[1] += sign
+
+def record(point: Optional[tuple], sign: int = 1) -> None:
+    """บวก (ส่งโพย) / หัก (ยกเลิก, sign=-1) ยอดรายเลข แล้วส่งต่อ worker อื่น"""
+    if point is None:
+        return
+    with _lock:
+        _apply(point, sign)
+    ticket_id, shop_id, lotto_type_id, round_date, rows = point
+    head = [str(ticket_id), str(shop_id), str(lotto_type_id), round_date.isoformat(), sign]
+    _channel.add([
+        head + [[[bet_type, number, str(amount)] for bet_type, number, amount in rows[i:i + ROWS_PER_DELTA]]]
+        for i in range(0, len(rows), ROWS_PER_DELTA)
+    ])
+
+def _apply_remote(items: List[list]) -> None:
+    with _lock:
+        for ticket_id, shop_id, lotto_type_id, round_date, sign, rows in items:
+            lotto_type_id, round_date = UUID(lotto_type_id), date.fromisoformat(round_date)
+            # งวดที่ worker นี้ไม่ได้เปิดดู → ไม่ต้องเก็บ (ตั้งต้นจาก DB ตอนเปิดดูครั้งแรกอยู่แล้ว)
+            if (lotto_type_id, round_date) not in _LIVE and (lotto_type_id, round_date) not in _SEEDING:
+                continue
+            rows = [(bet_type, number, Decimal(amount)) for bet_type, number, amount in rows]
+            _apply((UUID(ticket_id), UUID(shop_id), lotto_type_id, round_date, rows), sign)
+
+def _reset() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _LIVE.clear()
+        _SEEN.clear()
+        # ตั้งต้นที่ค้างอยู่จะทิ้งผลเอง (generation เปลี่ยน) - รายการที่รอไว้ไม่ต้องใช้แล้ว
+        for pending in _SEEDING.values():
+            pending.clear()
+
+_channel = bus.DeltaChannel("top_numbers", _apply_remote, _reset)
+
+# ==========================================
+# 📖 ฝั่งอ่าน
+# ==========================================
+
+def _sync_round(db: Session, lotto_type_id, round_date: date) -> None:
+    """
+    ดึงยอดรายเลขของงวดจาก DB มาแทนตัวนับเดิมทั้งก้อน
+    ยอดรายเลข + บิลที่อาจถูกนับซ้ำ อ่านใน Snapshot เดียวกัน (REPEATABLE READ)
+    รายการที่มาถึงระหว่าง/หลังตั้งต้น DEDUP_SECONDS ถ้า Snapshot นับไปแล้วจะถูกข้าม
+    """
+    key = (lotto_type_id, round_date)
+    params = {"lotto_type_id": lotto_type_id, "round_date": round_date,
+              "since": datetime.fromtimestamp(time.time() - DEDUP_SECONDS, timezone.utc)}
+    archived = archiver.round_range_in_archive(db, round_date)
+
+    with _lock:
+        generation = _generation
+        _SEEDING[key] = []
+    try:
+        # Connection แยกจาก Session ของ Request (ต้องเริ่ม Transaction ใหม่ถึงจะตั้ง Isolation ได้)
+        with db.get_bind().connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+            rows = conn.execute(text(ROUND_NUMBERS_SQL), params).all()
+            if archived:
+                rows += conn.execute(text(ARCHIVE_ROUND_NUMBERS_SQL), params).all()
+            seen = {r.id: r.cancelled for r in conn.execute(text(SEEN_TICKETS_SQL), params)}
+    except Exception:
+        with _lock:
+            _SEEDING.pop(key, None)
+        raise
+
+    shops: Dict[object, dict] = {}
+    for r in rows:
+        acc = shops.setdefault(r.shop_id, {}).setdefault(r.bet_type, {}).setdefault(r.number, [Decimal(0), 0])
+        acc[0] += Decimal(r.total_amount)
+        acc[1] += r.frequency
+
+    with _lock:
+        pending = _SEEDING.pop(key, [])
+        if generation != _generation:
+            return
+        _LIVE[key] = {"synced_at": time.time(), "shops": shops}
+        _LIVE.move_to_end(key)
+        _SEEN[key] = (time.time() + DEDUP_SECONDS, seen)
+        for point, sign in pending:
+            _apply(point, sign)
+        while len(_LIVE) > MAX_LIVE_ROUNDS:
+            evicted, _ = _LIVE.popitem(last=False)
+            _SEEN.pop(evicted, None)
+
+def _needs_sync(key: tuple) -> bool:
+    entry = _LIVE.get(key)
+    if entry is None:
+        return True
+    # มี NOTIFY = ตั้งต้นครั้งเดียว (หลังจากนั้นได้รายบิลจาก worker อื่น)
+    resync = 0 if settings.CACHE_NOTIFY_ENABLED else settings.TOP_NUMBERS_RESYNC_SECONDS
+    return resync > 0 and time.time() - entry["synced_at"] >= resync
+
+def get_live_top(db: Session, lotto_type_id, round_date: date, shop_id=None,
+                 bet_type: Optional[str] = None, limit: int = 200) -> List[dict]:
+    """Top N (เลข, ประเภทแทง) ของงวด เรียงตามยอดแทง - shop_id=None = รวมทุกร้าน"""
+    key = (lotto_type_id, round_date)
+    if _needs_sync(key):
+        with _sync_lock:
+            if _needs_sync(key):
+                _sync_round(db, lotto_type_id, round_date)
+
+    totals: Dict[tuple, list] = {}
+    with _lock:
+        entry = _LIVE.get(key)
+        if entry is None:
+            return []
+        _LIVE.move_to_end(key)
+        shops = [entry["shops"].get(shop_id, {})] if shop_id else list(entry["shops"].values())
+        for shop in shops:
+            for bt, numbers in shop.items():
+                if bet_type and bt != bet_type:
+                    continue
+                for number, (amount, frequency) in numbers.items():
+                    if frequency <= 0:
+                        continue
+                    acc = totals.setdefault((number, bt), [Decimal(0), 0])
+                    acc[0] += amount
+                    acc[1] += frequency
+
+    top = heapq.nlargest(limit, totals.items(), key=lambda kv: kv[1][0])
+    return [
+        {"number": number, "bet_type": bt, "total_amount": amount, "frequency": frequency}
+        for (number, bt), (amount, frequency) in top
+    ]
+
+def clear_top_numbers() -> None:
+    """ล้างตัวนับทุก worker (หลังลบร้าน/หวย/บิลด้วยมือ) ครั้งถัดไปจะตั้งต้นจาก DB ใหม่"""
+    _channel.reset_all()
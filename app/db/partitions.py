@@ -0,0 +1,161 @@
+# app/db/partitions.py
+"""
+Partition รายเดือนของ tickets / ticket_items (Declarative Range Partitioning ตาม round_date)
+
+- ensure_month_partitions(): สร้าง partition ล่วงหน้า (Thread เบื้องหลังวันละครั้ง + manage_partitions.py)
+- detach_month_partition(): ถอด partition เดือนเก่าออกจากตารางหลัก (ยังเก็บข้อมูลไว้เป็นตารางแยก)
+- round_date_filters(): เงื่อนไข round_date สำหรับ Query ที่กรองด้วย created_at ให้ Postgres ตัด partition ที่ไม่เกี่ยวทิ้ง
+"""
+import threading
+import time
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+
+# ลำดับสำคัญ: tickets ต้องมี partition ก่อน ticket_items (FK อ้างอิงกัน)
+PARTITIONED_TABLES = ("tickets", "ticket_items")
+
+# บิลที่กดแทงวันที่ D จะมี round_date อยู่ในช่วง [D - 1, D + 62] เสมอ
+# (-1 = หวยข้ามคืน/ก่อนเวลาตัดรอบ, +62 = หวยรายเดือนที่แทงล่วงหน้างวดถัดไป)
+ROUND_LOOKBEHIND_DAYS = 1
+ROUND_LOOKAHEAD_DAYS = 62
+
+# กันไม่ให้ Worker เดียวกันรันซ้อน (ข้าม Worker ใช้ pg_advisory_xact_lock)
+_maintenance_lock = threading.Lock()
+_ADVISORY_LOCK_KEY = 280_001
+
+def month_floor(d: date) -> date:
+    return d.replace(day=1)
+
+def add_months(d: date, months: int) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    return date(d.year + y, m + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"
+    ), {"t": table}).scalar())
+
+def list_partitions(conn: Connection, table: str) -> List[Tuple[str, str]]:
+    """คืน [(ชื่อ partition, ช่วงค่า)] เรียงตามชื่อ"""
+    rows = conn.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:t)
+        ORDER BY c.relname
+    """), {"t": table}).all()
+    return [(r[0], r[1]) for r in rows]
+
+def default_partition_rows(conn: Connection, table: str) -> int:
+    if not conn.execute(text("SELECT to_regclass(:t)"), {"t": f"{table}_default"}).scalar():
+        return 0
+    return conn.execute(text(f"SELECT count(*) FROM {table}_default")).scalar() or 0
+
+def ensure_month_partitions(conn: Connection, months_ahead: Optional[int] = None, from_month: Optional[date] = None) -> List[str]:
+    """
+    สร้าง partition รายเดือนตั้งแต่ from_month (Default: เดือนปัจจุบัน) ไปอีก months_ahead เดือน
+    + partition DEFAULT (กันบิลหลุดถ้า Job ไม่ได้รันนาน) คืนรายชื่อ partition ที่สร้างใหม่
+    """
+    if months_ahead is None:
+        months_ahead = settings.PARTITION_MONTHS_AHEAD
+    start = month_floor(from_month or date.today())
+    created = []
+
+    conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _ADVISORY_LOCK_KEY})
+
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            continue
+        existing = {name for name, _ in list_partitions(conn, table)}
+
+        for i in range(months_ahead + 1):
+            lo = add_months(start, i)
+            name = partition_name(table, lo)
+            if name in existing:
+                continue
+            # ใช้ SAVEPOINT: ถ้าเดือนนั้นมีข้อมูลค้างใน DEFAULT จะสร้างไม่ได้ แต่ไม่ทำให้ทั้ง Transaction พัง
+            try:
+                with conn.begin_nested():
+                    conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{add_months(lo, 1).isoformat()}')"
+                    ))
+                created.append(name)
+            except Exception as e:
+                print(f"⚠️ Cannot create partition {name}: {e}")
+
+        if f"{table}_default" not in existing:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+            created.append(f"{table}_default")
+
+    return created
+
+def detach_month_partition(conn: Connection, month: date) -> List[str]:
+    """
+    ถอด partition ของเดือนที่ระบุออกจาก tickets / ticket_items (ข้อมูลยังอยู่ในตาราง {table}_yYYYYmMM)
+    ต้องถอด ticket_items ก่อน และตัด FK ของตารางที่ถอดแล้วทิ้ง ไม่อย่างนั้น Postgres จะไม่ยอมถอด tickets
+    """
+    month = month_floor(month)
+    detached = []
+
+    for table in reversed(PARTITIONED_TABLES):
+        name = partition_name(table, month)
+        if not conn.execute(text("SELECT to_regclass(:t)"), {"t": name}).scalar():
+            continue
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        fk_names = conn.execute(text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:t) AND contype = 'f'"
+        ), {"t": name}).scalars().all()
+        for fk in fk_names:
+            conn.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{fk}"'))
+        detached.append(name)
+
+    return detached
+
+def round_date_filters(s_date: date, e_date: date, *columns) -> list:
+    """
+    แปลงช่วงวันที่กดแทง (created_at ตามเวลาไทย) เป็นเงื่อนไข round_date ที่ครอบคลุมแน่นอน
+    ใส่คู่กับ filter created_at เดิม เพื่อให้ Postgres ตัด partition เดือนอื่นทิ้ง (Partition Pruning)
+
+    ตัวอย่าง: round_date_filters(s, e, Ticket.round_date, TicketItem.round_date)
+    """
+    lo = s_date - timedelta(days=ROUND_LOOKBEHIND_DAYS)
+    hi = e_date + timedelta(days=ROUND_LOOKAHEAD_DAYS)
+    return [col.between(lo, hi) for col in columns]
+
+def run_partition_maintenance() -> List[str]:
+    """สร้าง partition ล่วงหน้า (ถ้า DB ยังไม่ได้ migrate เป็น partition จะข้ามไปเฉยๆ)"""
+    from app.db.session import engine
+
+    with _maintenance_lock:
+        try:
+            with engine.begin() as conn:
+                created = ensure_month_partitions(conn)
+                for table in PARTITIONED_TABLES:
+                    stray = default_partition_rows(conn, table)
+                    if stray:
+                        print(f"⚠️ {table}_default has {stray} rows (ควรสร้าง partition ของเดือนนั้นแล้วย้ายข้อมูล)")
+            if created:
+                print(f"🗂️ Created partitions: {', '.join(created)}")
+            return created
+        except Exception as e:
+            print(f"❌ Partition maintenance failed: {e}")
+            return []
+
+def start_partition_maintenance_thread(interval_hours: int = 24) -> threading.Thread:
+    """รัน run_partition_maintenance ทันที แล้วซ้ำทุก interval_hours (daemon thread ต่อ Worker)"""
+    def _loop():
+        while True:
+            run_partition_maintenance()
+            time.sleep(interval_hours * 3600)
+
+    t = threading.Thread(target=_loop, name="partition-maintenance", daemon=True)
+    t.start()
+    return t
@@ -6,6 +6,9 @@ from app.api.v1.router import api_router
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.core.limiter import limiter
+from app.db.partitions import start_partition_maintenance_thread
+from app.core.cache import bus as cache_bus
+from app.core import security, token_revocation
 
 app = FastAPI(
     title="shop Multi-Tenant API",
@@ -28,6 +31,25 @@ app.add_middleware(
 
 app.include_router(api_router, prefix="/api/v1")
 
+# 🗂️ สร้าง partition รายเดือนของ tickets / ticket_items ล่วงหน้า (รันทันที + ซ้ำวันละครั้ง)
+# 👂 ฟังคำสั่งล้าง Cache จาก worker อื่น (LISTEN/NOTIFY)
+# 🔐 เปิด Process Pool ของ bcrypt ไว้ก่อน (Login แรกไม่ต้องรอ)
+# 🔄 เขียนรายการเพิกถอน Refresh Token เป็นชุด (รับจาก worker อื่นผ่าน Listener ด้านบน)
+@app.on_event("startup")
+def start_background_jobs():
+    start_partition_maintenance_thread()
+    cache_bus.start_listener()
+    token_revocation.start_revocation_sync()
+    try:
+        security.start_password_pool()
+    except Exception as e:
+        print(f"⚠️ Password pool warm-up failed (will retry on first use): {e}")
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    security.shutdown_password_pool()
+    token_revocation.stop_revocation_sync()
+
 
 # 3. Health Check สำหรับ Cloud Run
 @app.get("/")
@@ -1,4 +1,4 @@
 # Import Model ทุกตัวเข้ามาไว้ที่นี่
-from .user import User, UserRole
+from .user import User, UserRole, TokenRevocation
 from .shop import Shop
-from .lotto import LottoType, Ticket, TicketItem, LottoResult, NumberRisk, RateProfile
+from .lotto import LottoType, Ticket, TicketItem, LottoResult, NumberRisk, RateProfile, BetTemplate, TicketArchive, DailyRollup, CodeResult
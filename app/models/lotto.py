@@ -1,9 +1,9 @@
 import uuid
 import enum
-from sqlalchemy import Column, String, Boolean, ForeignKey, DECIMAL, DateTime, Time, JSON, Text, Date, UniqueConstraint, Integer, Index, Numeric
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, ForeignKey, ForeignKeyConstraint, DECIMAL, DateTime, Time, JSON, Text, Date, UniqueConstraint, Integer, Index, Numeric
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.db.base_class import Base
 
 # Enum สถานะโพย
@@ -57,6 +57,10 @@ class LottoType(Base):
     # Relationship
     shop = relationship("Shop", backref="lottos")
 
+    __table_args__ = (
+        Index('ix_lotto_types_code', 'code'),
+    )
+
 class Ticket(Base):
     __tablename__ = "tickets"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -68,7 +72,8 @@ class Ticket(Base):
     status = Column(String, default=TicketStatus.PENDING)
     winning_amount = Column(Numeric(10, 2), default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    round_date = Column(Date, nullable=True)
+    # 🗂️ Partition Key: ตาราง tickets แบ่ง partition รายเดือนตาม round_date (ดู app/db/partitions.py)
+    round_date = Column(Date, primary_key=True, nullable=False)
     commission_amount = Column(DECIMAL(10, 2), default=0.00)
     # Relationships
     items = relationship("TicketItem", back_populates="ticket", cascade="all, delete-orphan")
@@ -77,12 +82,27 @@ class Ticket(Base):
     shop = relationship("Shop")
     __table_args__ = (
         Index('ix_ticket_created_shop_status', 'created_at', 'shop_id', 'status'),
+        # 🚀 Index สำหรับ Query ที่ถูกเรียกบ่อย (ดู alembic/versions/0001_hot_query_indexes.py)
+        Index('ix_tickets_user_round_created', 'user_id', 'round_date', text('created_at DESC')),
+        Index('ix_tickets_shop_round_created', 'shop_id', 'round_date', text('created_at DESC')),
+        Index('ix_tickets_lotto_round_active', 'lotto_type_id', 'round_date',
+              postgresql_where=text("status <> 'CANCELLED'")),
+        Index('ix_tickets_shop_created_cover', 'shop_id', 'created_at',
+              postgresql_include=['status', 'total_amount', 'commission_amount']),
+        Index('ix_tickets_pending_shop_round', 'shop_id', 'round_date',
+              postgresql_include=['total_amount'], postgresql_where=text("status = 'PENDING'")),
+        # Keyset Pagination ของหน้าประวัติ (ดู app/core/pagination.py)
+        Index('ix_tickets_user_created_id', 'user_id', text('created_at DESC'), text('id DESC')),
+        Index('ix_tickets_shop_created_id', 'shop_id', text('created_at DESC'), text('id DESC')),
+        {'postgresql_partition_by': 'RANGE (round_date)'},
     )
 
 class TicketItem(Base):
     __tablename__ = "ticket_items"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False)
+    ticket_id = Column(UUID(as_uuid=True), nullable=False)
+    # คัดลอก round_date จากบิลแม่ เพื่อให้อยู่ partition เดือนเดียวกัน (FK ต้องมี partition key)
+    round_date = Column(Date, primary_key=True, nullable=False)
     
     number = Column(String, nullable=False)
     bet_type = Column(String, nullable=False) # 2up, 3tod, etc.
@@ -95,7 +115,64 @@ class TicketItem(Base):
     
     __table_args__ = (
         Index('ix_ticket_item_number_status', 'number', 'status'),
-        Index('ix_ticket_item_ticket_id', 'ticket_id'),
+        Index('ix_ticket_items_ticket_cover', 'ticket_id', postgresql_include=['status', 'winning_amount']),
+        ForeignKeyConstraint(['ticket_id', 'round_date'], ['tickets.id', 'tickets.round_date'], ondelete='CASCADE'),
+        {'postgresql_partition_by': 'RANGE (round_date)'},
+    )
+
+
+# [เพิ่ม] คลังบิลเก่า (Cold Archive): งวดที่ตรวจรางวัลจบแล้วเกิน ARCHIVE_AFTER_DAYS วัน ย้ายมาเก็บที่นี่ (ดู app/core/archiver.py)
+class TicketArchive(Base):
+    __tablename__ = "ticket_archives"
+    id = Column(UUID(as_uuid=True), primary_key=True) # ใช้ id เดิมของบิล
+    shop_id = Column(UUID(as_uuid=True), ForeignKey("shops.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    lotto_type_id = Column(UUID(as_uuid=True), ForeignKey("lotto_types.id"))
+    round_date = Column(Date, nullable=False)
+    note = Column(String, nullable=True)
+    total_amount = Column(DECIMAL(10, 2), nullable=False)
+    status = Column(String, nullable=False)
+    winning_amount = Column(Numeric(10, 2), default=0)
+    commission_amount = Column(DECIMAL(10, 2), default=0.00)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    # รายการเลขแบบย่อ: [[id, number, bet_type, amount, reward_rate, winning_amount, status], ...] (ตัวเลขเก็บเป็น string กันทศนิยมเพี้ยน)
+    items_packed = Column(JSONB, nullable=False, default=list)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    user = relationship("User")
+    lotto_type = relationship("LottoType")
+
+    __table_args__ = (
+        Index('ix_ticket_archives_user_round_created', 'user_id', 'round_date', text('created_at DESC')),
+        Index('ix_ticket_archives_shop_round_created', 'shop_id', 'round_date', text('created_at DESC')),
+        Index('ix_ticket_archives_shop_created', 'shop_id', 'created_at'),
+        Index('ix_ticket_archives_lotto_round', 'lotto_type_id', 'round_date'),
+        Index('ix_ticket_archives_round_date', 'round_date'),
+        Index('ix_ticket_archives_user_created_id', 'user_id', text('created_at DESC'), text('id DESC')),
+        Index('ix_ticket_archives_shop_created_id', 'shop_id', text('created_at DESC'), text('id DESC')),
+    )
+
+
+# ยอดสรุปรายวันสำหรับหน้าสถิติ (อัปเดตทีละส่วนต่างโดย app/core/rollups.py)
+# ไม่มี FK เพราะเป็นข้อมูลที่คำนวณซ้ำได้ (python rebuild_rollups.py) ตอนลบร้าน/ลูกค้า/หวยให้ลบแถวตามไปด้วย
+class DailyRollup(Base):
+    __tablename__ = "daily_rollups"
+    shop_id = Column(UUID(as_uuid=True), primary_key=True)
+    stat_date = Column(Date, primary_key=True) # วันที่กดแทง (เวลาไทย) ตรงกับ filter created_at ของหน้าสถิติ
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    lotto_type_id = Column(UUID(as_uuid=True), primary_key=True)
+    round_date = Column(Date, primary_key=True)
+    bill_count = Column(Integer, nullable=False, default=0) # รวมบิลที่ยกเลิก
+    cancelled_count = Column(Integer, nullable=False, default=0)
+    sales_amount = Column(Numeric(14, 2), nullable=False, default=0) # ไม่รวมบิลที่ยกเลิก
+    commission_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    pending_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    cancelled_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    payout_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_daily_rollups_stat_date', 'stat_date'),
     )
 
 
@@ -118,6 +195,25 @@ class LottoResult(Base):
 
     __table_args__ = (
         UniqueConstraint('lotto_type_id', 'round_date', name='unique_result_per_round'),
+        Index('ix_lotto_results_round_date', 'round_date'),
+    )
+
+
+# ผลรางวัลระดับ Code หวย (1 แถวต่อ Code ต่องวด ใช้ร่วมกันทุกร้าน) เขียนพร้อม lotto_results ตอนออกผล
+# ให้กระดานผลรายวัน / ประวัติผล อ่านแถวเดียวแทนการรวม lotto_results ของทุกร้าน
+class CodeResult(Base):
+    __tablename__ = "code_results"
+
+    code = Column(String(20), primary_key=True)
+    round_date = Column(Date, primary_key=True)
+    top_3 = Column(String, nullable=True)
+    bottom_2 = Column(String, nullable=True)
+    reward_data = Column(JSON, nullable=False, default=dict)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_code_results_round_date', 'round_date'),
     )
 
 
@@ -135,6 +231,11 @@ class NumberRisk(Base):
     # Relationship กลับไปหาหวย (Optional)
     lotto = relationship("LottoType")
 
+    __table_args__ = (
+        Index('ix_number_risks_lotto_shop_created', 'lotto_type_id', 'shop_id', 'created_at'),
+        Index('ix_number_risks_shop_created', 'shop_id', 'created_at'),
+    )
+
 class LottoCategory(Base):
     __tablename__ = "lotto_categories"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -142,4 +243,17 @@ class LottoCategory(Base):
     color = Column(String, default="bg-gray-100 text-gray-700") # สีปุ่ม (Tailwind Class)
     shop_id = Column(UUID(as_uuid=True), ForeignKey("shops.id"), nullable=True) # ผูกกับร้านค้า
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    order_index = Column(Integer, default=10)
\ No newline at end of file
+    order_index = Column(Integer, default=10)
+
+# [เพิ่ม] ตารางเก็บโพยสำเร็จรูป (Bet Templates) ของลูกค้าแต่ละคน
+class BetTemplate(Base):
+    __tablename__ = "bet_templates"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    shop_id = Column(UUID(as_uuid=True), ForeignKey("shops.id", ondelete="CASCADE"), nullable=True)
+    lotto_type_id = Column(UUID(as_uuid=True), ForeignKey("lotto_types.id", ondelete="SET NULL"), nullable=True)
+    name = Column(String, nullable=False)
+    # เก็บแบบย่อ: [["59", "2up", "10.00"], ["123", "3top", "5.00"]]
+    items = Column(JSON, nullable=False, default=[])
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,6 +1,6 @@
 import uuid
 import enum
-from sqlalchemy import Column, String, Boolean, ForeignKey, DECIMAL, Enum as SAEnum, DateTime, Integer
+from sqlalchemy import Column, String, Boolean, ForeignKey, DECIMAL, Enum as SAEnum, DateTime, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -29,4 +29,17 @@ class User(Base):
     locked_until = Column(DateTime(timezone=True), nullable=True)
     commission_percent = Column(DECIMAL(5, 2), default=0.00)
     # Relationship: เชื่อมกลับไปหา Shop
-    shop = relationship("Shop", back_populates="users")
\ No newline at end of file
+    shop = relationship("Shop", back_populates="users")
+
+# รายการเพิกถอน Refresh Token (app/core/token_revocation.py) - 1 แถวต่อ Session / ผู้ใช้ที่ถูกเพิกถอน
+# Refresh Token ของ key นี้ที่ออก (iat) ไม่หลัง revoked_before ใช้ไม่ได้ / แถวหมดความหมายหลัง expires_at
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+
+    key = Column(String(80), primary_key=True)  # sid:<session> / user:<user_id>
+    revoked_before = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('ix_token_revocations_expires_at', 'expires_at'),
+    )
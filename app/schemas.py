@@ -77,6 +77,10 @@ class UserResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -112,6 +116,30 @@ class TicketCreate(BaseModel):
     note: Optional[str] = None
     shop_id: Optional[UUID] = None
     
+# --- Bet Template Schemas (โพยสำเร็จรูป) ---
+class BetTemplateCreate(BaseModel):
+    name: str
+    lotto_type_id: Optional[UUID] = None
+    items: List[BetItemCreate]
+
+    @field_validator('items')
+    @classmethod
+    def validate_items(cls, v):
+        if not v: raise ValueError("โพยสำเร็จรูปต้องมีอย่างน้อย 1 รายการ")
+        return v
+
+class BetTemplateItem(BaseModel):
+    number: str
+    bet_type: str
+    amount: Decimal
+
+class BetTemplateResponse(BaseModel):
+    id: UUID
+    name: str
+    lotto_type_id: Optional[UUID] = None
+    items: List[BetTemplateItem] = []
+    created_at: Optional[datetime] = None
+
 class TicketUser(BaseModel):
     username: str
     full_name: Optional[str] = None
@@ -0,0 +1,25 @@
+# backend/archive_rounds.py
+"""
+ย้ายงวดที่ตรวจรางวัลจบแล้วเข้า Cold Archive (ticket_archives)
+
+  python archive_rounds.py                 # ใช้ ARCHIVE_AFTER_DAYS จาก .env
+  python archive_rounds.py 120             # ย้ายงวดที่เก่ากว่า 120 วัน (น้อยกว่าค่าใน .env ไม่ได้)
+  python archive_rounds.py 120 600         # จำกัดเวลา 600 วินาที (รันครั้งหน้าทำต่อจากที่ค้าง)
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.archiver import run_archive
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    max_seconds = float(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    result = run_archive(days=days, max_seconds=max_seconds)
+    print(f"📊 rounds={result['rounds']} batches={result['batches']} "
+          f"tickets={result['tickets']} items={result['items']} "
+          f"({result['tickets_per_sec']} tickets/s)")
+    if result["status"] == "failed":
+        sys.exit(1)
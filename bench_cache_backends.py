@@ -0,0 +1,307 @@
+# backend/bench_cache_backends.py
+"""
+ตรวจ + วัด L2 ของ Cache (app/core/cache/backends.py) ที่ใช้ร่วมกันหลาย worker
+
+วิธีทำงาน:
+  1. shm: Process แม่โหลดค่าเก็บลงไฟล์ mmap → WORKERS Process ลูก (เหมือน gunicorn worker) อ่านได้โดยไม่ต้องโหลดซ้ำ
+  2. shm: Process หนึ่งล้างตาม Tag / ล้างทั้ง Namespace / ล้างราย Key → Process อื่นต้องโหลดใหม่ (ไม่ได้ค่าเก่าจาก L2)
+  3. shm: หลาย Process เขียน/อ่านพร้อมกัน → ค่าที่อ่านได้ต้องไม่ขาด/ไม่ปนกัน
+     และ worker รุ่นใหม่ที่ตั้งขนาดต่างจากเดิม (Rolling reload) ต้องไม่ทำให้ worker เดิมที่ mmap อยู่พัง (SIGBUS)
+  4. redis: ข้อ 1-2 กับ Server โปรโตคอล Redis จำลองในสคริปต์นี้ (หรือ Redis จริงด้วย BENCH_REDIS_URL=redis://...)
+  5. redis ล่ม: Cache ยังตอบได้ (โหลดจาก loader) และพักการต่อ Redis ไม่ให้ทุก Request รอ Timeout
+  6. ค่าที่ไม่ได้เซ็นด้วย SECRET_KEY (ใครเขียนลง shm / Redis เอง) ต้องไม่ถูก unpickle → Miss แล้วโหลดใหม่
+  7. เวลาอ่าน L2 ต่อครั้ง (µs) เทียบกับโหลดจาก DB
+
+ไม่ต้องใช้ Database:  python bench_cache_backends.py   (ต้องมี redis-py สำหรับข้อ 4-5)
+"""
+import sys
+import os
+import fnmatch
+import multiprocessing
+import pickle
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.cache import Cache
+from app.core.cache.backends import SharedMemoryBackend, RedisBackend
+
+WORKERS = 4
+KEYS = 200
+ROWS_PER_VALUE = 50
+READS = 20_000
+
+def _value(k):
+    return [{"number": f"{n:03d}", "amount": n * k, "lotto": f"lotto-{k}"} for n in range(ROWS_PER_VALUE)]
+
+# ==========================================
+# 🧪 Server โปรโตคอล Redis จำลอง (GET/SET PX/MGET/INCR(BY)/EXPIRE/DEL/PING)
+# ==========================================
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    # ตอบทีละคำสั่ง (Pipeline) → ต้องปิด Nagle ไม่งั้นรอ delayed ACK ~40ms
+    disable_nagle_algorithm = True
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:])
+        args = []
+        for _ in range(count):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def _bulk(self, value):
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def handle(self):
+        store, lock = self.server.store, self.server.lock
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            cmd = args[0].upper()
+            now = time.time()
+            with lock:
+                for key in [k for k, (_, exp) in store.items() if exp and exp <= now]:
+                    del store[key]
+                if cmd == b"PING":
+                    out = b"+PONG\r\n"
+                elif cmd == b"GET":
+                    out = self._bulk(store.get(args[1], (None, 0))[0])
+                elif cmd == b"MGET":
+                    out = b"*%d\r\n" % (len(args) - 1) + b"".join(self._bulk(store.get(k, (None, 0))[0]) for k in args[1:])
+                elif cmd == b"SET":
+                    expires = 0
+                    if len(args) >= 5 and args[3].upper() == b"PX":
+                        expires = now + int(args[4]) / 1000
+                    store[args[1]] = (args[2], expires)
+                    out = b"+OK\r\n"
+                elif cmd in (b"INCR", b"INCRBY"):
+                    value, expires = store.get(args[1], (b"0", 0))
+                    value = b"%d" % (int(value) + (int(args[2]) if cmd == b"INCRBY" else 1))
+                    store[args[1]] = (value, expires)
+                    out = b":%s\r\n" % value
+                elif cmd == b"EXPIRE":
+                    if args[1] in store:
+                        store[args[1]] = (store[args[1]][0], now + int(args[2]))
+                    out = b":%d\r\n" % (1 if args[1] in store else 0)
+                elif cmd == b"DEL":
+                    out = b":%d\r\n" % sum(1 for k in args[1:] if store.pop(k, None) is not None)
+                elif cmd == b"SCAN":
+                    # ตอบทุก Key ในรอบเดียว (cursor 0 = จบ) / รองรับ MATCH
+                    opts = {args[i].upper(): args[i + 1] for i in range(2, len(args) - 1, 2)}
+                    pattern = opts.get(b"MATCH", b"*").decode()
+                    keys = [k for k in store if fnmatch.fnmatchcase(k.decode(), pattern)]
+                    out = b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys) + b"".join(self._bulk(k) for k in keys)
+                else:
+                    out = b"-ERR unknown command '%s'\r\n" % cmd
+            self.wfile.write(out)
+
+class _RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.store = {}
+        self.lock = threading.Lock()
+
+def start_stand_in() -> str:
+    server = _RespServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{server.server_address[1]}/0"
+
+# ==========================================
+# 👷 งานของ Process ลูก (= gunicorn worker)
+# ==========================================
+
+def _make_backend(kind, target):
+    if kind == "shm":
+        return SharedMemoryBackend(target, 32, 64)
+    return RedisBackend(target, prefix="bench:")
+
+def _worker_read_all(kind, target, loads, results, idx):
+    cache = Cache("bench", ttl=60, max_items=KEYS * 2, backend=_make_backend(kind, target))
+
+    def loader(k):
+        with loads.get_lock():
+            loads.value += 1
+        return _value(k)
+
+    ok = all(cache.get_or_load(f"k{k}", lambda k=k: loader(k), tags=[f"shop:{k % 10}"]) == _value(k) for k in range(KEYS))
+    results[idx] = 1 if ok else 0
+
+def _worker_hammer(target, seconds, errors):
+    # เขียน/อ่านพร้อมกันบน Key ชุดเดียวกัน: ทุกค่าต้องถอดรหัสได้และตรงกับ Key
+    backend = _make_backend("shm", target)
+    cache_id = os.getpid()
+    deadline = time.time() + seconds
+    n = 0
+    while time.time() < deadline:
+        k = n % 50
+        cache = Cache("hammer", ttl=60, backend=backend)
+        value = cache.get_or_load(f"k{k}", lambda: {"k": k, "by": cache_id, "rows": _value(k)})
+        if value["k"] != k or value["rows"] != _value(k):
+            with errors.get_lock():
+                errors.value += 1
+        if n % 7 == 0:
+            cache.invalidate(f"k{k}")
+        n += 1
+
+# ==========================================
+# ✅ การตรวจ
+# ==========================================
+
+def check_shared_loads(kind, target) -> bool:
+    print(f"🤝 [{kind}] Process แม่โหลด {KEYS} Key → {WORKERS} worker อ่านต่อ")
+    Cache("bench", backend=_make_backend(kind, target)).clear()  # เผื่อ Redis จริงมีค่าจากรอบก่อน
+    loads = multiprocessing.Value("i", 0)
+    results = multiprocessing.Array("i", WORKERS + 1)
+    _worker_read_all(kind, target, loads, results, WORKERS)
+    first = loads.value
+    procs = [multiprocessing.Process(target=_worker_read_all, args=(kind, target, loads, results, i)) for i in range(WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    print(f"   loads: parent {first}, workers {loads.value - first} (ไม่มี L2 = {KEYS * WORKERS}), values ok {sum(results)}/{WORKERS + 1}")
+    return first == KEYS and loads.value == first and sum(results) == WORKERS + 1
+
+def check_invalidation(kind, target) -> bool:
+    print(f"🧹 [{kind}] ล้างจาก worker หนึ่ง → worker อื่นไม่ได้ค่าเก่าจาก L2")
+    a = Cache("inv", ttl=60, backend=_make_backend(kind, target))
+    a.get_or_load("t", lambda: "old", tags=["shop:1"])
+    a.get_or_load("n", lambda: "old")
+    a.get_or_load("k", lambda: "old")
+
+    def fresh_worker():
+        # Cache ใหม่ = RAM ว่าง (เหมือน worker อื่น) → ต้องอ่านจาก L2
+        return Cache("inv", ttl=60, backend=_make_backend(kind, target))
+
+    before = [fresh_worker().get_or_load(k, lambda: "new", tags=["shop:1"] if k == "t" else ()) for k in ("t", "n", "k")]
+    a.invalidate_tags("shop:1")
+    a.invalidate("k")
+    after_tag = fresh_worker().get_or_load("t", lambda: "new", tags=["shop:1"])
+    after_key = fresh_worker().get_or_load("k", lambda: "new")
+    untouched = fresh_worker().get_or_load("n", lambda: "new")
+    a.clear()
+    after_clear = fresh_worker().get_or_load("n", lambda: "new")
+    print(f"   before {before}  tag → {after_tag!r}  key → {after_key!r}  other key {untouched!r}  clear → {after_clear!r}")
+    return before == ["old"] * 3 and after_tag == after_key == after_clear == "new" and untouched == "old"
+
+def check_shm_concurrency(path) -> bool:
+    print(f"⚔️ [shm] {WORKERS} Process อ่าน/เขียน/ล้างพร้อมกัน 2 วินาที")
+    errors = multiprocessing.Value("i", 0)
+    procs = [multiprocessing.Process(target=_worker_hammer, args=(path, 2, errors)) for _ in range(WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    print(f"   ค่าที่เสีย/ปนกัน {errors.value}")
+    return errors.value == 0 and all(p.exitcode == 0 for p in procs)
+
+_forged_runs = []
+
+def _forged_payload():
+    _forged_runs.append(1)
+    return "forged"
+
+class _Forged:
+    # unpickle = เรียก _forged_payload (แทนโค้ดอันตรายที่ผู้โจมตีจะใส่)
+    def __reduce__(self):
+        return (_forged_payload, ())
+
+def check_forged(kind, target) -> bool:
+    print(f"🔏 [{kind}] ค่าที่ไม่ได้เซ็น / ลายเซ็นผิด → ไม่ unpickle")
+    backend = _make_backend(kind, target)
+    cache = Cache("forged", ttl=60, backend=backend)
+    raw = pickle.dumps(_Forged())
+    values = []
+    for i, data in enumerate((b"p" + raw, b"\0" * 16 + b"p" + raw)):
+        backend.write(cache._shared_key(f"k{i}"), data, 60)
+        values.append(Cache("forged", ttl=60, backend=backend).get_or_load(f"k{i}", lambda: "loaded"))
+    print(f"   values {values}, unpickled {len(_forged_runs)}")
+    return values == ["loaded", "loaded"] and not _forged_runs
+
+def _worker_old_layout(path, ready, resized, result):
+    old = Cache("layout", ttl=60, backend=SharedMemoryBackend(path, 32, 64))
+    old.get_or_load("k", lambda: "old-layout")
+    ready.set()
+    resized.wait(30)
+    # ไฟล์เดิมถูกย่อ = SIGBUS ตรงนี้ (Process ตาย exitcode < 0)
+    result.value = 1 if Cache("layout", ttl=60, backend=old.backend).get_or_load("k", lambda: "reloaded") == "old-layout" else 0
+
+def check_shm_layout_change(path) -> bool:
+    print("📐 [shm] worker ใหม่ตั้งขนาดต่างจากเดิมขณะ worker เดิมยังทำงาน")
+    ready, resized, result = multiprocessing.Event(), multiprocessing.Event(), multiprocessing.Value("i", 0)
+    proc = multiprocessing.Process(target=_worker_old_layout, args=(path, ready, resized, result))
+    proc.start()
+    ready.wait(30)
+    new = Cache("layout", ttl=60, backend=SharedMemoryBackend(path, 16, 32))
+    value = new.get_or_load("k", lambda: "new-layout")
+    resized.set()
+    proc.join()
+    print(f"   worker ใหม่ได้ {value!r}, worker เดิม exitcode {proc.exitcode} ค่าเดิม {'ยังอยู่' if result.value else 'หาย'}")
+    return value == "new-layout" and proc.exitcode == 0 and result.value == 1
+
+def check_redis_down() -> bool:
+    print("🔌 [redis] Redis ไม่ตอบ → Cache ยังทำงาน และไม่รอ Timeout ทุกครั้ง")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        dead_port = s.getsockname()[1]
+    backend = RedisBackend(f"redis://127.0.0.1:{dead_port}/0")
+    cache = Cache("down", ttl=60, backend=backend)
+    started = time.perf_counter()
+    values = [cache.get_or_load(f"k{k}", lambda k=k: k) for k in range(100)]
+    elapsed = (time.perf_counter() - started) * 1000
+    stats = backend.stats()
+    print(f"   100 lookups in {elapsed:.0f} ms, errors {stats['errors']}, skipped {stats['skipped']}")
+    return values == list(range(100)) and stats["errors"] <= 2 and elapsed < 2000
+
+def bench_read_latency(kind, target):
+    backend = _make_backend(kind, target)
+    writer = Cache("latency", ttl=60, backend=backend)
+    writer.get_or_load("hot", lambda: _value(1), tags=["shop:1"])
+    started = time.perf_counter()
+    reads = READS if kind == "shm" else READS // 10
+    for _ in range(reads):
+        Cache("latency", ttl=60, backend=backend).get_or_load("hot", lambda: None, tags=["shop:1"])
+    per_read = (time.perf_counter() - started) / reads * 1e6
+    print(f"⏱️ [{kind}] อ่าน L2 + ถอดรหัส ({ROWS_PER_VALUE} แถว): {per_read:.1f} µs/ครั้ง")
+
+if __name__ == "__main__":
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        checks.append(check_shared_loads("shm", os.path.join(tmp, "loads.shm")))
+        checks.append(check_invalidation("shm", os.path.join(tmp, "inv.shm")))
+        checks.append(check_shm_concurrency(os.path.join(tmp, "hammer.shm")))
+        checks.append(check_shm_layout_change(os.path.join(tmp, "layout.shm")))
+        checks.append(check_forged("shm", os.path.join(tmp, "forged.shm")))
+        bench_read_latency("shm", os.path.join(tmp, "latency.shm"))
+
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        print("⚠️ ไม่มี redis-py → ข้ามการตรวจ redis")
+    else:
+        url = os.getenv("BENCH_REDIS_URL") or start_stand_in()
+        print(f"🌐 Redis: {url}")
+        checks.append(check_shared_loads("redis", url))
+        checks.append(check_invalidation("redis", url))
+        checks.append(check_forged("redis", url))
+        bench_read_latency("redis", url)
+        checks.append(check_redis_down())
+
+    if not all(checks):
+        print("❌ L2 Cache ทำงานไม่ถูกต้อง")
+        sys.exit(1)
+    print("🎉 L2 Cache OK")
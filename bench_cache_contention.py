@@ -0,0 +1,176 @@
+# backend/bench_cache_contention.py
+"""
+วัด app/core/cache (Cache กลางของ lotto / risk / history / stats) ตอนหลาย Thread แย่งกันใช้ใน worker เดียว
+
+วิธีทำงาน:
+  1. Hit path: THREADS_LIST Thread อ่าน Key ร้อนๆ พร้อมกัน → ops/s และ p99 (ดูว่า Lock ของ Namespace เป็นคอขวดไหม)
+  2. Stampede: STAMPEDE Thread ขอ Key ที่ยังไม่มีพร้อมกัน (โหลดช้า LOAD_MS) → ต้องโหลดแค่ 1 ครั้ง
+  3. อ่าน + ล้างตาม Tag ไปพร้อมกัน (เหมือนตรวจรางวัลระหว่างมีคนเปิดสถิติ) → ไม่มี Error / ไม่มีใครค้าง
+  4. Stale-while-revalidate: ค่าเก่าต้องตอบทันทีระหว่างดึงใหม่เบื้องหลังช้าๆ
+  5. งบหน่วยความจำ: ใส่ข้อมูลเกินงบ → ขนาดรวมต้องไม่เกิน max_bytes
+
+ไม่ต้องใช้ Database:  python bench_cache_contention.py
+"""
+import sys
+import os
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.cache import Cache
+
+THREADS_LIST = [1, 2, 4, 8, 16]
+OPS_PER_THREAD = 50_000
+HOT_KEYS = 200
+STAMPEDE = 200
+LOAD_MS = 50
+BUDGET_BYTES = 8 * 1024 * 1024
+
+def _run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started
+
+def _p99(samples):
+    return sorted(samples)[int(len(samples) * 0.99)] if samples else 0.0
+
+def bench_hits() -> bool:
+    print("🔥 Hit path (get_or_load บน Key ที่มีอยู่แล้ว)")
+    cache = Cache("bench-hits", ttl=3600, max_items=HOT_KEYS * 2)
+    for k in range(HOT_KEYS):
+        cache.set(k, {"rows": list(range(20))}, tags=[f"shop:{k % 10}"])
+
+    for threads in THREADS_LIST:
+        samples = []
+
+        def worker(i):
+            local = []
+            loader = lambda: None
+            for n in range(OPS_PER_THREAD):
+                key = (n * 7 + i) % HOT_KEYS
+                if n % 100 == 0:
+                    t0 = time.perf_counter()
+                    cache.get_or_load(key, loader)
+                    local.append((time.perf_counter() - t0) * 1e6)
+                else:
+                    cache.get_or_load(key, loader)
+            samples.extend(local)
+
+        elapsed = _run_threads(threads, worker)
+        total = threads * OPS_PER_THREAD
+        print(f"   {threads:>2} threads: {total / elapsed:>12,.0f} ops/s   p99 {_p99(samples):6.1f} µs")
+    return cache.metrics()["loads"] == 0
+
+def bench_stampede() -> bool:
+    print(f"🐘 Stampede: {STAMPEDE} threads ขอ Key เดียวกันที่ยังไม่มี (โหลด {LOAD_MS} ms)")
+    cache = Cache("bench-stampede", ttl=60)
+    loads = [0]
+    barrier = threading.Barrier(STAMPEDE)
+
+    def loader():
+        loads[0] += 1
+        time.sleep(LOAD_MS / 1000)
+        return "value"
+
+    results = []
+
+    def worker(i):
+        barrier.wait()
+        results.append(cache.get_or_load("cold", loader))
+
+    elapsed = _run_threads(STAMPEDE, worker)
+    m = cache.metrics()
+    print(f"   loads = {loads[0]}, coalesced = {m['coalesced']}, all answered = {len(results)} in {elapsed * 1000:.0f} ms")
+    return loads[0] == 1 and len(results) == STAMPEDE and all(r == "value" for r in results)
+
+def bench_invalidate_under_load() -> bool:
+    print("🧹 อ่านพร้อมกับล้างตาม Tag ทุก 1 ms")
+    cache = Cache("bench-tags", ttl=60, max_items=5000)
+    stop = threading.Event()
+    errors = []
+    latencies = []
+
+    def reader(i):
+        local = []
+        n = 0
+        while not stop.is_set():
+            key = f"shop{n % 20}:{n % 500}"
+            t0 = time.perf_counter()
+            try:
+                cache.get_or_load(key, lambda: [n] * 10, tags=[f"shop:{n % 20}"])
+            except Exception as e:
+                errors.append(e)
+            local.append((time.perf_counter() - t0) * 1e6)
+            n += 1
+        latencies.extend(local)
+
+    def invalidator():
+        n = 0
+        while not stop.is_set():
+            cache.invalidate_tags(f"shop:{n % 20}")
+            n += 1
+            time.sleep(0.001)
+
+    readers = [threading.Thread(target=reader, args=(i,)) for i in range(8)]
+    inv = threading.Thread(target=invalidator)
+    for t in readers + [inv]:
+        t.start()
+    time.sleep(2)
+    stop.set()
+    for t in readers + [inv]:
+        t.join()
+
+    m = cache.metrics()
+    print(f"   lookups {len(latencies):,}  invalidated {m['invalidations']:,}  loads {m['loads']:,}  "
+          f"p99 {_p99(latencies):.1f} µs  inflight left {m['inflight']}  errors {len(errors)}")
+    return not errors and m["inflight"] == 0
+
+def bench_stale_while_revalidate() -> bool:
+    print("♻️ Stale-while-revalidate (ดึงใหม่เบื้องหลังช้า 200 ms)")
+    cache = Cache("bench-swr", ttl=0.05, hard_ttl=60)
+    cache.set("k", "old", ttl=0.05, hard_ttl=60)
+    time.sleep(0.1)
+
+    def slow_refresh():
+        time.sleep(0.2)
+        return "new"
+
+    samples = []
+    for _ in range(1000):
+        t0 = time.perf_counter()
+        value = cache.get_or_load("k", lambda: "blocking", refresh=slow_refresh)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    time.sleep(0.3)
+    fresh = cache.get_or_load("k", lambda: "blocking", refresh=slow_refresh)
+    m = cache.metrics()
+    print(f"   stale answers p99 {_p99(samples):.1f} µs, first value {value!r}, after refresh {fresh!r}, loads {m['loads']}")
+    return value == "old" and fresh == "new" and m["loads"] == 1
+
+def bench_memory_budget() -> bool:
+    print(f"💾 งบหน่วยความจำ {BUDGET_BYTES // 1024 // 1024} MB (ใส่ 5,000 รายการ x ~10 KB)")
+    cache = Cache("bench-budget", ttl=3600, max_items=100_000, max_bytes=BUDGET_BYTES)
+    started = time.perf_counter()
+    for k in range(5000):
+        cache.set(k, [{"number": f"{n:03d}", "amount": n} for n in range(40)])
+    elapsed = time.perf_counter() - started
+    m = cache.metrics()
+    print(f"   entries {m['entries']:,}  bytes {m['bytes']:,}  evictions {m['evictions']:,}  ({elapsed / 5000 * 1e6:.1f} µs/set)")
+    return m["bytes"] <= BUDGET_BYTES and m["evictions"] > 0
+
+if __name__ == "__main__":
+    checks = [
+        bench_hits(),
+        bench_stampede(),
+        bench_invalidate_under_load(),
+        bench_stale_while_revalidate(),
+        bench_memory_budget(),
+    ]
+    if not all(checks):
+        print("❌ Cache ทำงานไม่ถูกต้อง")
+        sys.exit(1)
+    print("🎉 Cache OK")
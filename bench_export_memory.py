@@ -0,0 +1,114 @@
+# backend/bench_export_memory.py
+"""
+วัด RAM ของ /play/export (app/core/export.py) ตอน Export รายการเลข 1,000,000 แถว
+
+วิธีทำงาน:
+  1. เปิด transaction แล้วใส่บิลจำลอง 200,000 ใบ x 5 เลข ให้ร้านเดียว (กระจาย 30 วัน)
+  2. อ่านไฟล์ Export ทีละก้อนจนจบ (CSV และ NDJSON+gzip) วัด RSS สูงสุดระหว่างอ่าน เทียบกับก่อนเริ่ม
+  3. ROLLBACK ทิ้งทั้งหมด
+
+ใช้หลังรัน migration:  alembic upgrade head && python bench_export_memory.py
+"""
+import sys
+import os
+import time
+from datetime import date, timedelta
+from sqlalchemy import text
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import engine
+from app.db.partitions import ensure_month_partitions
+from app.core import export
+
+SEED_TICKETS = 200000
+ITEMS_PER_TICKET = 5
+SEED_USERS = 500
+SEED_DAYS = 30
+MAX_RSS_GROWTH_MB = 50  # "ไม่กี่สิบ MB"
+
+SEED_SQL = [
+    """
+    INSERT INTO shops (id, name, code, is_active, created_at)
+    VALUES (gen_random_uuid(), 'bench-shop', 'zbench', true, now())
+    """,
+    """
+    INSERT INTO users (id, username, password_hash, role, shop_id, credit_balance, is_active, created_at)
+    SELECT gen_random_uuid(), 'bench_user_' || g, 'x', 'member', s.id, 0, true, now()
+    FROM generate_series(1, :users) g CROSS JOIN (SELECT id FROM shops WHERE code = 'zbench') s
+    """,
+    """
+    INSERT INTO lotto_types (id, name, code, shop_id, is_active, is_template)
+    SELECT gen_random_uuid(), 'bench-lotto', 'ZB1', id, true, false FROM shops WHERE code = 'zbench'
+    """,
+    """
+    INSERT INTO tickets (id, shop_id, user_id, lotto_type_id, total_amount, status, winning_amount,
+                         created_at, round_date, commission_amount)
+    SELECT gen_random_uuid(), u.shop_id, u.id, l.id, 100, 'PENDING', 0,
+           (current_date - (g % :days)) + make_interval(secs => g % 80000),
+           current_date - (g % :days),
+           0
+    FROM generate_series(1, :tickets) g
+    JOIN (SELECT id, shop_id, row_number() OVER (ORDER BY id) - 1 AS rn FROM users WHERE username LIKE 'bench_user_%') u
+      ON u.rn = g % :users
+    CROSS JOIN (SELECT id FROM lotto_types WHERE code = 'ZB1') l
+    """,
+    """
+    INSERT INTO ticket_items (id, ticket_id, round_date, number, bet_type, amount, reward_rate, winning_amount, status)
+    SELECT gen_random_uuid(), t.id, t.round_date, lpad((random() * 99)::int::text, 2, '0'), '2up', 20, 90, 0, 'PENDING'
+    FROM tickets t CROSS JOIN generate_series(1, :items) g
+    WHERE t.lotto_type_id = (SELECT id FROM lotto_types WHERE code = 'ZB1')
+    """,
+]
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def _drain(conn, shop_id, s_d, e_d, **kwargs):
+    """อ่าน Export จนจบ คืน (bytes, แถว, RSS ที่เพิ่มสูงสุด MB, วินาที)"""
+    base = _rss_mb()
+    peak = base
+    size = lines = 0
+    started = time.time()
+    for chunk in export.iter_export(conn, s_d, e_d, shop_id=shop_id, include_items=True, **kwargs):
+        size += len(chunk)
+        lines += chunk.count(b"\n")
+        peak = max(peak, _rss_mb())
+    return size, lines, peak - base, time.time() - started
+
+def run_bench():
+    s_d = date.today() - timedelta(days=SEED_DAYS)
+    e_d = date.today()
+
+    with engine.connect().execution_options(isolation_level=export.ISOLATION_LEVEL) as conn:
+        trans = conn.begin()
+        try:
+            print(f"🌱 Seeding {SEED_TICKETS:,} tickets x {ITEMS_PER_TICKET} items (จะ ROLLBACK ทิ้งตอนจบ)...")
+            ensure_month_partitions(conn, months_ahead=3, from_month=s_d)
+            for sql in SEED_SQL:
+                conn.execute(text(sql), {"users": SEED_USERS, "tickets": SEED_TICKETS, "days": SEED_DAYS,
+                                         "items": ITEMS_PER_TICKET})
+            conn.execute(text("ANALYZE tickets"))
+            conn.execute(text("ANALYZE ticket_items"))
+            shop_id = conn.execute(text("SELECT id FROM shops WHERE code = 'zbench'")).scalar()
+
+            ok = True
+            for label, kwargs in (("CSV", {"fmt": "csv"}), ("NDJSON+gzip", {"fmt": "ndjson", "compress": True})):
+                size, lines, growth, seconds = _drain(conn, shop_id, s_d, e_d, **kwargs)
+                rows = lines if not kwargs.get("compress") else SEED_TICKETS * ITEMS_PER_TICKET
+                print(f"📦 {label:12s}: {size / 1024 / 1024:8.1f} MB, {rows:,} rows, "
+                      f"{seconds:6.1f}s ({rows / seconds:,.0f} rows/s), RSS +{growth:.1f} MB")
+                if growth > MAX_RSS_GROWTH_MB:
+                    print(f"❌ RSS โตเกิน {MAX_RSS_GROWTH_MB} MB")
+                    ok = False
+            return ok
+        finally:
+            trans.rollback()
+
+if __name__ == "__main__":
+    if not run_bench():
+        sys.exit(1)
@@ -0,0 +1,121 @@
+# backend/bench_history_pagination.py
+"""
+เทียบความเร็ว หน้าที่ 50 ของ shop_history ระหว่าง OFFSET แบบเดิม กับ Keyset Cursor (app/core/pagination.py)
+
+วิธีทำงาน:
+  1. เปิด transaction แล้วใส่บิลจำลอง 100,000 ใบให้ร้านเดียว (กระจาย 60 วัน)
+  2. EXPLAIN (ANALYZE, BUFFERS) ทั้ง 2 แบบ หลายรอบ แล้วเอาค่ากลาง
+  3. ROLLBACK ทิ้งทั้งหมด
+
+ใช้หลังรัน migration:  alembic upgrade head && python bench_history_pagination.py
+"""
+import sys
+import os
+import statistics
+from datetime import date, timedelta
+from sqlalchemy import text
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import engine
+from app.db.partitions import ensure_month_partitions
+
+SEED_TICKETS = 100000
+SEED_USERS = 500
+SEED_DAYS = 60
+PAGE = 50
+PAGE_SIZE = 200  # ค่า limit Default ของ /play/shop_history
+REPEAT = 5
+
+SEED_SQL = [
+    """
+    INSERT INTO shops (id, name, code, is_active, created_at)
+    VALUES (gen_random_uuid(), 'bench-shop', 'zbench', true, now())
+    """,
+    """
+    INSERT INTO users (id, username, password_hash, role, shop_id, credit_balance, is_active, created_at)
+    SELECT gen_random_uuid(), 'bench_user_' || g, 'x', 'member', s.id, 0, true, now()
+    FROM generate_series(1, :users) g CROSS JOIN (SELECT id FROM shops WHERE code = 'zbench') s
+    """,
+    """
+    INSERT INTO lotto_types (id, name, code, shop_id, is_active, is_template)
+    SELECT gen_random_uuid(), 'bench-lotto', 'ZB1', id, true, false FROM shops WHERE code = 'zbench'
+    """,
+    """
+    INSERT INTO tickets (id, shop_id, user_id, lotto_type_id, total_amount, status, winning_amount,
+                         created_at, round_date, commission_amount)
+    SELECT gen_random_uuid(), u.shop_id, u.id, l.id, 100, 'PENDING', 0,
+           (current_date - (g % :days)) + make_interval(secs => g % 80000),
+           current_date - (g % :days),
+           0
+    FROM generate_series(1, :tickets) g
+    JOIN (SELECT id, shop_id, row_number() OVER (ORDER BY id) - 1 AS rn FROM users WHERE username LIKE 'bench_user_%') u
+      ON u.rn = g % :users
+    CROSS JOIN (SELECT id FROM lotto_types WHERE code = 'ZB1') l
+    """,
+]
+
+# เขียนให้ตรงกับ Query ที่ ORM ส่งจริงใน get_shop_tickets
+OFFSET_SQL = """
+    SELECT * FROM tickets
+    WHERE shop_id = :shop_id AND round_date >= :s_d AND round_date <= :e_d
+    ORDER BY created_at DESC, id DESC OFFSET :skip LIMIT :limit
+"""
+KEYSET_SQL = """
+    SELECT * FROM tickets
+    WHERE shop_id = :shop_id AND round_date >= :s_d AND round_date <= :e_d
+      AND (created_at, id) < (:c_at, :c_id)
+    ORDER BY created_at DESC, id DESC LIMIT :limit
+"""
+
+def _measure(conn, sql: str, params: dict):
+    """คืน (ms ค่ากลาง, shared buffers ที่แตะ)"""
+    times, buffers = [], 0
+    for _ in range(REPEAT):
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params).scalar()
+        times.append(plan[0]["Execution Time"])
+        root = plan[0]["Plan"]
+        buffers = root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0)
+    return statistics.median(times), buffers
+
+def run_bench():
+    s_d = date.today() - timedelta(days=SEED_DAYS)
+    e_d = date.today()
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            print(f"🌱 Seeding {SEED_TICKETS:,} tickets ให้ร้านเดียว (จะ ROLLBACK ทิ้งตอนจบ)...")
+            ensure_month_partitions(conn, months_ahead=3, from_month=s_d)
+            for sql in SEED_SQL:
+                conn.execute(text(sql), {"users": SEED_USERS, "tickets": SEED_TICKETS, "days": SEED_DAYS})
+            conn.execute(text("ANALYZE tickets"))
+
+            shop_id = conn.execute(text("SELECT id FROM shops WHERE code = 'zbench'")).scalar()
+            base = {"shop_id": shop_id, "s_d": s_d, "e_d": e_d, "limit": PAGE_SIZE}
+            skip = (PAGE - 1) * PAGE_SIZE
+
+            # cursor ของหน้า 50 = แถวสุดท้ายของหน้า 49 (เหมือนที่ Frontend ได้ next_cursor มา)
+            last = conn.execute(text(OFFSET_SQL), {**base, "skip": skip - 1, "limit": 1}).first()
+            offset_rows = conn.execute(text(OFFSET_SQL), {**base, "skip": skip}).all()
+            keyset_rows = conn.execute(text(KEYSET_SQL), {**base, "c_at": last.created_at, "c_id": last.id}).all()
+            if [r.id for r in offset_rows] != [r.id for r in keyset_rows]:
+                print("❌ OFFSET กับ Keyset ได้ผลไม่ตรงกัน")
+                return False
+
+            offset_ms, offset_buf = _measure(conn, OFFSET_SQL, {**base, "skip": skip})
+            keyset_ms, keyset_buf = _measure(conn, KEYSET_SQL, {**base, "c_at": last.created_at, "c_id": last.id})
+
+            print(f"📄 Page {PAGE} (limit {PAGE_SIZE}, skip {skip:,})")
+            print(f"   OFFSET : {offset_ms:8.2f} ms  ({offset_buf:,} buffers)")
+            print(f"   Keyset : {keyset_ms:8.2f} ms  ({keyset_buf:,} buffers)")
+            if keyset_ms > 0:
+                print(f"🚀 Keyset เร็วกว่า {offset_ms / keyset_ms:.1f}x")
+        finally:
+            trans.rollback()
+
+    return True
+
+if __name__ == "__main__":
+    if not run_bench():
+        sys.exit(1)
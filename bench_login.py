@@ -0,0 +1,144 @@
+# backend/bench_login.py
+"""
+Load test การ Login พร้อมกัน (ตอนเปิดงวด) และผลกระทบต่อ Endpoint อื่นใน worker เดียวกัน
+
+วิธีทำงาน:
+  1. สร้างผู้ใช้ทดสอบ (Hash รหัสผ่านด้วย rounds ต่ำกว่า PASSWORD_BCRYPT_ROUNDS เพื่อตรวจการ rehash)
+  2. ยิง LOGINS ครั้ง พร้อมกันครั้งละ CONCURRENCY ผ่าน ASGI (ไม่ต้องเปิด Server) ระหว่างนั้นอีกตัวยิง GET / (Endpoint แบบ sync ใช้ Threadpool เดียวกัน) ต่อเนื่อง
+  3. วัด Login p50/p99 และเวลาตอบของ GET / ก่อน/ระหว่าง Login ทั้งสองแบบ:
+     - inline: PASSWORD_HASH_WORKERS=0 (bcrypt ใน Threadpool แบบเดิม)
+     - pool: bcrypt ใน Process Pool (ค่าจาก .env / 2 ตัวถ้าไม่ได้ตั้ง)
+  4. ตรวจว่า Login ผ่านทุกครั้ง, Hash ถูกอัปเดตเป็น rounds ใหม่หลัง Login สำเร็จ, แล้วลบผู้ใช้ทดสอบทิ้ง
+
+ใช้กับ Database จริง (ต้องมีตาราง users):  python bench_login.py
+"""
+import sys
+import os
+import asyncio
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from app.main import app
+from app.core import security
+from app.core.config import settings
+from app.core.limiter import limiter
+from app.db.session import SessionLocal
+from app.models.user import User, UserRole
+
+LOGINS = 60
+CONCURRENCY = 50  # มากกว่า Threadpool ของ AnyIO (40) = แบบเดิมมี Request อื่นต้องรอคิว
+PASSWORD = "bench-login-pass"
+OLD_ROUNDS = max(4, settings.PASSWORD_BCRYPT_ROUNDS - 2)
+
+def _p(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+def create_user() -> str:
+    db = SessionLocal()
+    try:
+        username = f"bench_login_{uuid.uuid4().hex[:8]}"
+        old_hash = security.pwd_context.copy(bcrypt__rounds=OLD_ROUNDS).hash(PASSWORD)
+        db.add(User(username=username, password_hash=old_hash, role=UserRole.member, credit_balance=0, is_active=True))
+        db.commit()
+        return username
+    finally:
+        db.close()
+
+def stored_hash(username: str) -> str:
+    db = SessionLocal()
+    try:
+        return db.query(User.password_hash).filter(User.username == username).scalar()
+    finally:
+        db.close()
+
+def delete_user(username: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.username == username).delete()
+        db.commit()
+    finally:
+        db.close()
+
+async def _probe(client, stop: asyncio.Event, out: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/")
+        out.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+async def run_scenario(label: str, workers: int, username: str) -> dict:
+    settings.PASSWORD_HASH_WORKERS = workers
+    security.shutdown_password_pool()
+    security.start_password_pool()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        baseline, during = [], []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, stop, baseline))
+        await asyncio.sleep(1)
+        stop.set()
+        await probe
+
+        gate = asyncio.Semaphore(CONCURRENCY)
+        latencies, statuses = [], {}
+
+        async def login():
+            async with gate:
+                started = time.perf_counter()
+                r = await client.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD})
+                latencies.append(time.perf_counter() - started)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, stop, during))
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(LOGINS)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    result = {
+        "statuses": statuses,
+        "login_p50": _p(latencies, 0.50), "login_p99": _p(latencies, 0.99),
+        "probe_base_p99": _p(baseline, 0.99), "probe_p50": _p(during, 0.50), "probe_p99": _p(during, 0.99),
+        "rate": LOGINS / elapsed,
+    }
+    print(f"🔐 [{label}] {LOGINS} Login (พร้อมกัน {CONCURRENCY}) {result['rate']:.1f}/s  status {statuses}  "
+          f"p50 {result['login_p50']:.0f} ms  p99 {result['login_p99']:.0f} ms")
+    print(f"   GET / ระหว่าง Login: p50 {result['probe_p50']:.1f} ms  p99 {result['probe_p99']:.1f} ms  "
+          f"(ปกติ p99 {result['probe_base_p99']:.1f} ms, {len(during)} ครั้ง)")
+    return result
+
+if __name__ == "__main__":
+    limiter.enabled = False  # 10/minute ของ /auth/login จะตัดการทดสอบทิ้ง
+    pool_workers = settings.PASSWORD_HASH_WORKERS or 2
+    username = create_user()
+    try:
+        before = stored_hash(username)
+        inline = asyncio.run(run_scenario("inline", 0, username))
+        after = stored_hash(username)
+        pooled = asyncio.run(run_scenario(f"pool x{pool_workers}", pool_workers, username))
+    finally:
+        security.shutdown_password_pool()
+        delete_user(username)
+
+    rehashed = before.startswith(f"$2b${OLD_ROUNDS:02d}$") and after.startswith(f"$2b${settings.PASSWORD_BCRYPT_ROUNDS:02d}$")
+    print(f"♻️ rehash ตอน Login: {before[:7]} → {after[:7]}")
+    checks = [
+        rehashed,
+        inline["statuses"] == {200: LOGINS},
+        pooled["statuses"] == {200: LOGINS},
+        pooled["probe_p99"] < inline["probe_p99"],
+    ]
+    if not all(checks):
+        print("❌ Login ภายใต้โหลดทำงานไม่ถูกต้อง / Endpoint อื่นยังถูกแย่ง Threadpool")
+        sys.exit(1)
+    print("🎉 Login load OK")
@@ -0,0 +1,167 @@
+# backend/bench_rate_limit.py
+"""
+ตรวจ + วัด Rate Limit ที่นับร่วมกันหลาย worker (app/core/limiter.py + app/core/limiter_storage.py)
+
+วิธีทำงาน:
+  1. WORKERS Process (= gunicorn worker) ยิง Key เดียวกันรวมกันเกินโควตา 30 ครั้ง
+     local (RAM) ผ่านคนละ 30 / redis ต้องผ่านรวมกันแค่ 30
+  2. Sliding window: เต็มโควตาแล้วโดนปฏิเสธ → พ้นหน้าต่างแล้วยิงได้อีก
+  3. Key ต่อผู้ใช้ / ต่อร้าน ผ่าน FastAPI จริง: คนเดียวยิงเกินโควตาตัวเอง / หลายคนในร้านเดียวกันรวมกันเกินโควตาร้าน
+  4. Redis ล่ม → ยังตอบได้ (นับใน RAM ชั่วคราว) ไม่รอ Timeout ทุก Request
+  5. reset() ลบเฉพาะตัวนับของ Rate Limit (Key อื่นใน Redis เดียวกันยังอยู่)
+  6. เวลาที่ Rate Limit เพิ่มต่อ Request (หา Key จาก Token + ตรวจ 2 Limit แบบ submit_ticket) p50/p99 ต้อง < 1 ms
+
+Redis: Server โปรโตคอล Redis จำลองของ bench_cache_backends.py (หรือ Redis จริงด้วย BENCH_REDIS_URL=redis://...)
+ไม่ต้องใช้ Database:  python bench_rate_limit.py   (ต้องมี redis-py)
+"""
+import sys
+import os
+import multiprocessing
+import socket
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+
+from app.core import security
+from app.core.limiter import build_limiter, storage_uri, user_key, shop_key
+from bench_cache_backends import start_stand_in
+
+WORKERS = 4
+HITS_PER_WORKER = 20
+QUOTA = "30/hour"  # หน้าต่างยาว: ไม่คาบเกี่ยวรอบระหว่างทดสอบ (sliding window ถ่วงน้ำหนักหน้าต่างก่อน)
+LATENCY_ROUNDS = 5000
+
+def _worker_hits(uri, key, allowed):
+    strategy = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    item = parse(QUOTA)
+    ok = sum(1 for _ in range(HITS_PER_WORKER) if strategy.hit(item, key))
+    with allowed.get_lock():
+        allowed.value += ok
+
+def check_shared_quota(kind, uri) -> bool:
+    key = f"bench-{uuid.uuid4().hex}"
+    allowed = multiprocessing.Value("i", 0)
+    procs = [multiprocessing.Process(target=_worker_hits, args=(uri, key, allowed)) for _ in range(WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    limit = parse(QUOTA).amount
+    print(f"🤝 [{kind}] {WORKERS} worker × {HITS_PER_WORKER} ครั้ง โควตา {QUOTA}: ผ่าน {allowed.value} (โควตาจริง {limit})")
+    if kind == "local":
+        return allowed.value == min(HITS_PER_WORKER, limit) * WORKERS
+    return allowed.value == limit
+
+def check_sliding(uri) -> bool:
+    strategy = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    item = parse("5 per 2 second")
+    key = f"slide-{uuid.uuid4().hex}"
+    first = [strategy.hit(item, key) for _ in range(6)]
+    time.sleep(4.2)  # พ้นทั้งหน้าต่างปัจจุบันและหน้าต่างก่อน
+    later = strategy.hit(item, key)
+    print(f"🪟 [redis] 5 ครั้ง/2 วินาที: {first} → หลัง 4 วินาที {later}")
+    return first == [True] * 5 + [False] and later
+
+def _app(backend, url):
+    limiter = build_limiter(backend, url)
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+    @app.post("/submit")
+    @limiter.limit("5/minute", key_func=shop_key)
+    @limiter.limit("3/minute", key_func=user_key)
+    def submit(request: Request):
+        return {"ok": True}
+
+    return app
+
+def check_keys(url) -> bool:
+    client = TestClient(_app("redis", url))
+    shop = uuid.uuid4()
+    a, b, other = (security.create_access_token(str(uuid.uuid4()), "member", shop_id=s) for s in (shop, shop, uuid.uuid4()))
+
+    def post(token):
+        return client.post("/submit", headers={"Authorization": f"Bearer {token}"}).status_code
+
+    user_a = [post(a) for _ in range(4)]
+    user_b = [post(b) for _ in range(3)]
+    other_shop = [post(other) for _ in range(3)]
+    print(f"🔑 [redis] ต่อคน 3/นาที + ต่อร้าน 5/นาที: คน A {user_a}  คน B ร้านเดียวกัน {user_b}  ร้านอื่น {other_shop}")
+    return user_a == [200, 200, 200, 429] and user_b == [200, 200, 429] and other_shop == [200, 200, 200]
+
+def check_redis_down() -> bool:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        dead_port = s.getsockname()[1]
+    client = TestClient(_app("redis", f"redis://127.0.0.1:{dead_port}/0"))
+    token = security.create_access_token(str(uuid.uuid4()), "member", shop_id=uuid.uuid4())
+    started = time.perf_counter()
+    codes = [client.post("/submit", headers={"Authorization": f"Bearer {token}"}).status_code for _ in range(20)]
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"🔌 [redis ล่ม] 20 Request {elapsed:.0f} ms: 200 × {codes.count(200)}, 429 × {codes.count(429)} (นับใน RAM ชั่วคราว)")
+    return codes.count(200) == 3 and codes.count(429) == 17 and elapsed < 2000
+
+def check_reset(uri) -> bool:
+    storage = storage_from_string(uri)
+    strategy = SlidingWindowCounterRateLimiter(storage)
+    for i in range(3):
+        strategy.hit(parse("10/minute"), f"reset-{uuid.uuid4().hex}")
+    storage._client.set("bench:keep-me", b"1")
+    removed = storage.reset()
+    left = sum(1 for _ in storage._client.scan_iter(match=storage.PREFIX + "*"))
+    kept = storage._client.get("bench:keep-me") == b"1"
+    print(f"🧽 [redis] reset(): ลบตัวนับ {removed} Key  เหลือ {left}  Key อื่น{'ยังอยู่' if kept else 'หาย'}")
+    return removed >= 3 and left == 0 and kept
+
+def bench_latency(kind, uri) -> float:
+    # สิ่งที่ slowapi ทำต่อ Request ของ submit_ticket: หา Key 2 แบบ (จาก Token) + hit 2 Limit
+    strategy = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    per_user, per_shop = parse("1000000/minute"), parse("1000000/minute")
+    token = security.create_access_token(str(uuid.uuid4()), "member", shop_id=uuid.uuid4())
+    request = Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("127.0.0.1", 1)})
+    samples = []
+    for _ in range(LATENCY_ROUNDS):
+        started = time.perf_counter()
+        strategy.hit(per_user, user_key(request))
+        strategy.hit(per_shop, shop_key(request))
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    p50, p99 = samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99)] * 1000
+    print(f"⏱️ [{kind}] Rate Limit ต่อ Request (2 Limit): p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+    return p99
+
+if __name__ == "__main__":
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        print("❌ ต้องมี redis-py")
+        sys.exit(1)
+
+    url = os.getenv("BENCH_REDIS_URL") or start_stand_in()
+    print(f"🌐 Redis: {url}")
+    local_uri, redis_uri = storage_uri("local", url), storage_uri("redis", url)
+    checks = [
+        check_shared_quota("local", local_uri),
+        check_shared_quota("redis", redis_uri),
+        check_sliding(redis_uri),
+        check_keys(url),
+        check_redis_down(),
+        check_reset(redis_uri),
+        bench_latency("local", local_uri) < 1,
+        bench_latency("redis", redis_uri) < 1,
+    ]
+
+    if not all(checks):
+        print("❌ Rate Limit ทำงานไม่ถูกต้อง / ช้าเกิน 1 ms")
+        sys.exit(1)
+    print("🎉 Rate Limit OK")
@@ -0,0 +1,238 @@
+# backend/bench_refresh.py
+"""
+วัด + ตรวจ Refresh Token (POST /auth/refresh) เทียบกับการ Login ใหม่
+
+วิธีทำงาน:
+  1. สร้างผู้ใช้ทดสอบ แล้ว Login / Refresh อย่างละ ROUNDS ครั้งผ่าน ASGI (ไม่ต้องเปิด Server)
+     วัด p50/p99 และนับคำสั่ง SQL ต่อครั้ง (Login = SELECT + เขียน users / Refresh ต้องไม่เขียน users เลย)
+  2. ความถูกต้อง: ใบเดิมหลังหมุนใช้ไม่ได้ (ส่งซ้ำ = ทั้ง Session ตาย รวมใบล่าสุด) / Refresh Token ใช้แทน Access Token ไม่ได้
+     Logout / เปลี่ยนรหัส → ทุก Session ตาย
+  3. อีก Process (= worker อื่น) ฟัง NOTIFY: รายการเพิกถอนจาก Process นี้ต้องไปถึงภายใน 1 รอบ flush (+ เผื่อ)
+     และรายการที่เขียนไว้ก่อน Process นั้นเริ่มต้องโหลดจาก DB ได้
+  4. ส่ง Refresh Token ใบเดียวกันพร้อมกันหลาย Request → ได้ใบใหม่แค่ 1 ใบ ที่เหลือ 401 แล้วทั้ง Session ตาย (ใบใหม่ก็ใช้ไม่ได้)
+  5. เขียนเป็นชุด: หมุน Token หลาย Session ติดกัน → จำนวนครั้งที่เขียน DB น้อยกว่าจำนวนรายการมาก
+
+ใช้กับ Database จริง (ต้องมีตาราง users / token_revocations และเปิด CACHE_NOTIFY_ENABLED):  python bench_refresh.py
+"""
+import sys
+import os
+import multiprocessing
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.core import security, token_revocation
+from app.core.config import settings
+from app.core.limiter import limiter
+from app.db.session import SessionLocal, engine
+from app.models.user import User, UserRole
+
+ROUNDS = 30
+SESSIONS = 200
+CONCURRENT = 8
+PASSWORD = "bench-refresh-pass"
+PROPAGATION_LIMIT = settings.TOKEN_REVOCATION_FLUSH_SECONDS + 2
+
+_statements = []
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    _statements.append(statement.lstrip().split(None, 1)[0].upper())
+
+def _p(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+def create_user() -> str:
+    db = SessionLocal()
+    try:
+        username = f"bench_refresh_{uuid.uuid4().hex[:8]}"
+        db.add(User(username=username, password_hash=security.get_password_hash(PASSWORD), role=UserRole.member,
+                    credit_balance=0, is_active=True))
+        db.commit()
+        return username
+    finally:
+        db.close()
+
+def delete_user(username: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.username == username).delete()
+        db.commit()
+    finally:
+        db.close()
+
+def _timed(fn, rounds):
+    samples, statements = [], []
+    for _ in range(rounds):
+        del _statements[:]
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+        statements.append(list(_statements))
+    return samples, statements
+
+def bench(client, username) -> bool:
+    def login():
+        r = client.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD})
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    refresh_token = login()["refresh_token"]
+
+    def refresh():
+        nonlocal refresh_token
+        r = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+        assert r.status_code == 200, r.text
+        refresh_token = r.json()["refresh_token"]
+
+    login_samples, login_sql = _timed(login, ROUNDS)
+    refresh_samples, refresh_sql = _timed(refresh, ROUNDS)
+    # ครั้งแรกของ refresh โหลด Principal จาก DB → ดูคำสั่งของครั้งที่เหลือ
+    refresh_writes = sum(1 for stmts in refresh_sql for s in stmts if s in ("UPDATE", "INSERT", "DELETE"))
+    print(f"🔐 Login   p50 {_p(login_samples, 0.5):.1f} ms  p99 {_p(login_samples, 0.99):.1f} ms  "
+          f"SQL/ครั้ง {login_sql[-1]}")
+    print(f"🔄 Refresh p50 {_p(refresh_samples, 0.5):.1f} ms  p99 {_p(refresh_samples, 0.99):.1f} ms  "
+          f"SQL/ครั้ง {refresh_sql[-1]}  (เขียน DB ระหว่าง Request {refresh_writes} ครั้ง)")
+    return refresh_writes == 0 and _p(refresh_samples, 0.5) * 10 < _p(login_samples, 0.5)
+
+def check_revocation(client, username) -> bool:
+    def post(path, token):
+        return client.post(f"/api/v1/auth/{path}", json={"refresh_token": token})
+
+    first = client.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD}).json()
+    second = post("refresh", first["refresh_token"]).json()
+    third = post("refresh", second["refresh_token"])
+    results = {
+        "ใบใหม่": third.status_code,
+        "ใบเดิมหลังหมุน": post("refresh", first["refresh_token"]).status_code,
+        "ใบล่าสุดหลังใบเดิมถูกใช้ซ้ำ": post("refresh", third.json()["refresh_token"]).status_code,
+        "Refresh แทน Access": client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {first['refresh_token']}"}).status_code,
+    }
+    other = client.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD}).json()
+    client.post("/api/v1/auth/logout", json={"refresh_token": other["refresh_token"]})
+    results["หลัง Logout"] = post("refresh", other["refresh_token"]).status_code
+
+    a = client.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD}).json()
+    b = client.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD}).json()
+    user_id = security.decode_refresh_token(a["refresh_token"])["sub"]
+    token_revocation.revoke_user_sessions(user_id)
+    results["เปลี่ยนรหัส (เครื่อง A)"] = post("refresh", a["refresh_token"]).status_code
+    results["เปลี่ยนรหัส (เครื่อง B)"] = post("refresh", b["refresh_token"]).status_code
+    results["Login ใหม่หลังเปลี่ยนรหัส"] = post(
+        "refresh", client.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD}).json()["refresh_token"]
+    ).status_code
+    print(f"🛡️ {results}")
+    expected = [200, 401, 401, 401, 401, 401, 401, 200]
+    return list(results.values()) == expected
+
+# ==========================================
+# 👥 worker อื่น
+# ==========================================
+
+def _other_worker(preloaded_claims, inbox, outbox):
+    from app.core.cache import bus
+    from app.core import token_revocation as revocations
+
+    bus.start_listener()
+    deadline = time.time() + 10
+    while not bus.get_bus_stats()["connected"] and time.time() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.3)  # on_connect โหลดตารางเสร็จ
+    outbox.put(("ready", revocations.is_revoked(preloaded_claims)))
+    claims = inbox.get()
+    started = time.time()
+    while not revocations.is_revoked(claims) and time.time() - started < PROPAGATION_LIMIT + 3:
+        time.sleep(0.01)
+    outbox.put(("seen", revocations.is_revoked(claims), time.time()))
+
+def check_other_worker(client, username) -> bool:
+    login = lambda: client.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD}).json()["refresh_token"]
+    # Logout ก่อน worker อื่นเริ่ม → ต้องโหลดจาก DB ได้
+    preloaded = login()
+    client.post("/api/v1/auth/logout", json={"refresh_token": preloaded})
+
+    ctx = multiprocessing.get_context("spawn")
+    inbox, outbox = ctx.Queue(), ctx.Queue()
+    proc = ctx.Process(target=_other_worker, args=(security.decode_refresh_token(preloaded), inbox, outbox), daemon=True)
+    proc.start()
+    try:
+        _, preloaded_seen = outbox.get(timeout=30)
+        token = login()
+        claims = security.decode_refresh_token(token)
+        inbox.put(claims)
+        rotated_at = time.time()
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": token}).status_code == 200
+        _, seen, seen_at = outbox.get(timeout=PROPAGATION_LIMIT + 10)
+    finally:
+        proc.terminate()
+    delay = seen_at - rotated_at
+    print(f"👥 worker อื่น: รายการที่เขียนก่อนเริ่ม {'เห็น' if preloaded_seen else 'ไม่เห็น'}  |  "
+          f"Token ที่หมุนทิ้ง {'เห็นหลัง %.2f s' % delay if seen else 'ไม่เห็น'} (flush ทุก {settings.TOKEN_REVOCATION_FLUSH_SECONDS} s)")
+    return preloaded_seen and seen and delay < PROPAGATION_LIMIT
+
+def check_concurrent(client, username) -> bool:
+    token = client.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD}).json()["refresh_token"]
+    barrier = threading.Barrier(CONCURRENT)
+    codes, issued = [], []
+
+    def refresh():
+        barrier.wait()
+        r = client.post("/api/v1/auth/refresh", json={"refresh_token": token})
+        codes.append(r.status_code)
+        if r.status_code == 200:
+            issued.append(r.json()["refresh_token"])
+
+    threads = [threading.Thread(target=refresh) for _ in range(CONCURRENT)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    winner = [client.post("/api/v1/auth/refresh", json={"refresh_token": t}).status_code for t in issued]
+    print(f"🏁 Refresh ใบเดียวกันพร้อมกัน {CONCURRENT} Request: 200 = {codes.count(200)} / 401 = {codes.count(401)}"
+          f"  |  ใบใหม่ที่ได้หลังถูกใช้ซ้ำ {winner}")
+    return codes.count(200) == 1 and codes.count(401) == CONCURRENT - 1 and winner == [401]
+
+def check_batching() -> bool:
+    token_revocation.flush()
+    before = dict(token_revocation.get_revocation_stats())
+    for _ in range(SESSIONS):
+        _, old = security.create_refresh_token(uuid.uuid4())
+        _, new = security.create_refresh_token(old["sub"], session_id=old["sid"], auth_time=old["auth"], issued_after=old["iat"])
+        token_revocation.rotate(old, new)
+    time.sleep(settings.TOKEN_REVOCATION_FLUSH_SECONDS * 2 + 0.5)
+    after = token_revocation.get_revocation_stats()
+    rows, batches = after["flushed"] - before["flushed"], after["batches"] - before["batches"]
+    print(f"💾 หมุน Token {SESSIONS} Session: เขียนลง DB {rows} แถวใน {batches} ครั้ง")
+    return rows == SESSIONS and batches <= 3
+
+if __name__ == "__main__":
+    if not settings.CACHE_NOTIFY_ENABLED:
+        print("❌ ต้องเปิด CACHE_NOTIFY_ENABLED (ตรวจการส่งต่อไป worker อื่น)")
+        sys.exit(1)
+    limiter.enabled = False  # 10/minute ของ /auth/login จะตัดการทดสอบทิ้ง
+    settings.PASSWORD_HASH_WORKERS = 0  # bcrypt ใน Thread (เวลาของ Login เท่าของจริงโดยไม่ต้องเปิด Pool)
+    username = create_user()
+    try:
+        client = TestClient(app)
+        checks = [
+            bench(client, username),
+            check_revocation(client, username),
+            check_other_worker(client, username),
+            check_concurrent(client, username),
+            check_batching(),
+        ]
+    finally:
+        delete_user(username)
+    print(f"📦 {token_revocation.get_revocation_stats()}")
+
+    if not all(checks):
+        print("❌ Refresh Token ทำงานไม่ถูกต้อง / ไม่เร็วกว่า Login")
+        sys.exit(1)
+    print("🎉 Refresh OK")
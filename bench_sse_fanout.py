@@ -0,0 +1,79 @@
+# backend/bench_sse_fanout.py
+"""
+วัดความเร็วกระจาย Event ของ app/core/pubsub.py (Dashboard Real-time) ใน worker เดียว
+
+วิธีทำงาน:
+  1. สร้างคนดูจำลอง SUBSCRIBERS คนในร้านเดียว (อ่านตลอด) + SLOW คนที่ไม่อ่านเลย (จำลอง Client ช้า)
+  2. ยิง publish() EVENTS ครั้ง ด้วยความถี่ RATE ต่อวินาที จาก Thread อื่น (เหมือน submit_ticket ใน Threadpool)
+  3. วัดว่าทุกคนได้ครบไหม, Event Loop ค้างนานแค่ไหน (Request อื่นของ worker ต้องรอเท่านี้)
+     และคนช้าได้ resync แทนการเก็บของค้างไม่จำกัด
+
+ไม่ต้องใช้ Database:  python bench_sse_fanout.py
+"""
+import sys
+import os
+import asyncio
+import statistics
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core import pubsub
+
+SUBSCRIBERS = 5000
+SLOW = 50
+EVENTS = 2000
+RATE = 500  # Event ต่อวินาที (ร้านเดียวมีบิลเข้า 500 ใบ/วินาที ถือว่าหนักมากแล้ว)
+SHOP_ID = "bench-shop"
+
+async def run_bench() -> bool:
+    fast = [pubsub.subscribe(SHOP_ID) for _ in range(SUBSCRIBERS)]
+    slow = [pubsub.subscribe(SHOP_ID) for _ in range(SLOW)]
+    received = [0]
+    lags = []
+
+    async def reader(sub):
+        # เหมือน event_stream ใน play/stream.py
+        while True:
+            chunk = await pubsub.read(sub)
+            received[0] += chunk.count(b"event: ")
+
+    readers = [asyncio.create_task(reader(s)) for s in fast]
+    await asyncio.sleep(0.1)
+
+    def producer():
+        for i in range(EVENTS):
+            pubsub.publish(SHOP_ID, "sales", {"seq": i, "amount": 10})
+            time.sleep(1 / RATE)
+
+    started = time.perf_counter()
+    thread = threading.Thread(target=producer)
+    thread.start()
+
+    expected = SUBSCRIBERS * EVENTS
+    while received[0] < expected and time.perf_counter() - started < 60:
+        before = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append((time.perf_counter() - before) * 1000 - 5)
+    elapsed = time.perf_counter() - started
+    thread.join()
+
+    for task in readers:
+        task.cancel()
+    slow_results = [await pubsub.read(s) for s in slow]
+    slow_resync = all(r == pubsub.RESYNC_MESSAGE for r in slow_results)
+    for s in fast + slow:
+        pubsub.unsubscribe(s)
+
+    print(f"📡 {EVENTS:,} events @ {RATE}/s × {SUBSCRIBERS:,} subscribers ({SLOW} slow) in {elapsed:.2f}s")
+    print(f"   delivered  : {received[0]:,} / {expected:,}")
+    print(f"   loop lag   : median {statistics.median(lags):.2f} ms, p99 {sorted(lags)[int(len(lags) * 0.99)]:.2f} ms")
+    print(f"   slow client: resync sent = {slow_resync}, stats = {pubsub.get_pubsub_stats()}")
+    return received[0] == expected and slow_resync
+
+if __name__ == "__main__":
+    if not asyncio.run(run_bench()):
+        print("❌ Fan-out ไม่ครบ หรือ Client ช้าไม่ได้ resync")
+        sys.exit(1)
+    print("🎉 Fan-out OK")
@@ -0,0 +1,102 @@
+# backend/check_query_counts.py
+"""
+ตรวจว่าหน้าสถิติ/Dashboard ยิง SQL จำนวนคงที่ ไม่โตตามจำนวนร้าน (กัน N+1 กลับมา)
+
+วิธีทำงาน:
+  1. เปิด transaction แล้วใส่ร้านจำลอง 200 ร้าน + ยอดใน daily_rollups ร้านละ 30 วัน
+  2. เรียกฟังก์ชัน endpoint ตรงๆ ด้วย Session ที่ผูกกับ transaction นั้น แล้วนับ SQL ที่วิ่งจริง
+  3. ถ้าเกินจำนวนที่กำหนด → exit code 1
+  4. ROLLBACK ทิ้งทั้งหมด
+
+ใช้หลังรัน migration:  alembic upgrade head && python check_query_counts.py
+"""
+import sys
+import os
+import uuid
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import Response
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.db.session import engine
+from app.models.user import User, UserRole
+from app.core import stats_cache
+from app.api.v1.endpoints.shops import get_shops_performance
+from app.api.v1.endpoints.play.stats import get_stats_range, get_summary_stats, get_member_stats
+
+SEED_SHOPS = 200
+SEED_DAYS = 30
+
+SEED_SQL = [
+    """
+    INSERT INTO shops (id, name, code, is_active, created_at)
+    SELECT gen_random_uuid(), 'count-shop-' || g, 'zc' || g, true, now()
+    FROM generate_series(1, :shops) g
+    """,
+    """
+    INSERT INTO daily_rollups (shop_id, stat_date, user_id, lotto_type_id, round_date,
+                               bill_count, cancelled_count, sales_amount, commission_amount,
+                               pending_amount, cancelled_amount, payout_amount)
+    SELECT s.id, current_date - d, gen_random_uuid(), gen_random_uuid(), current_date - d,
+           10, 1, 900, 0, 100, 100, 300
+    FROM shops s CROSS JOIN generate_series(0, :days - 1) d
+    WHERE s.name LIKE 'count-shop-%'
+    """,
+]
+
+def check_counts() -> bool:
+    s_str = (date.today() - timedelta(days=SEED_DAYS)).isoformat()
+    e_str = date.today().isoformat()
+    superadmin = User(id=uuid.uuid4(), username="count-check", role=UserRole.superadmin, shop_id=None)
+    ok = True
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            for sql in SEED_SQL:
+                conn.execute(text(sql), {"shops": SEED_SHOPS, "days": SEED_DAYS})
+            conn.execute(text("ANALYZE daily_rollups"))
+            db = Session(bind=conn)
+
+            # (ชื่อ, ฟังก์ชัน, จำนวน SQL สูงสุดที่ยอมได้)
+            checks = [
+                ("shops/stats/performance", lambda: get_shops_performance(
+                    Response(), s_str, e_str, "sales", "desc", 0, 50, db=db, current_user=superadmin), 1),
+                ("shops/stats/performance (page 5)", lambda: get_shops_performance(
+                    Response(), s_str, e_str, "profit", "asc", 200, 50, db=db, current_user=superadmin), 2),
+                ("play/stats/range", lambda: get_stats_range(s_str, e_str, db=db, current_user=superadmin), 1),
+                ("play/stats/summary", lambda: get_summary_stats("this_month", db=db, current_user=superadmin), 1),
+                ("play/stats/members", lambda: get_member_stats(s_str, e_str, db=db, current_user=superadmin), 2),
+            ]
+
+            statements = []
+            def _count(conn_, cursor, statement, *args):
+                statements.append(statement)
+            event.listen(engine, "before_cursor_execute", _count)
+            try:
+                for name, call, max_queries in checks:
+                    stats_cache.invalidate_stats_cache()
+                    statements.clear()
+                    call()
+                    if len(statements) > max_queries:
+                        ok = False
+                        print(f"❌ {name}: {len(statements)} queries (max {max_queries})")
+                    else:
+                        print(f"✅ {name}: {len(statements)} queries")
+            finally:
+                event.remove(engine, "before_cursor_execute", _count)
+                db.close()
+        finally:
+            trans.rollback()
+            stats_cache.invalidate_stats_cache()
+
+    return ok
+
+if __name__ == "__main__":
+    if not check_counts():
+        print("\n⚠️ พบ endpoint ที่ยิง SQL เกินกำหนด (N+1?)")
+        sys.exit(1)
+    print(f"\n🎉 Query count does not grow with {SEED_SHOPS} shops")
@@ -0,0 +1,214 @@
+# backend/check_query_plans.py
+"""
+ตรวจว่า Query ที่ถูกเรียกบ่อย (hot queries) ยังใช้ Index อยู่ ไม่ตกไปเป็น Seq Scan
+
+วิธีทำงาน:
+  1. เปิด transaction แล้วใส่ข้อมูลจำลอง (ร้าน/ลูกค้า/หวย/โพย/เลขอั้น/ผลรางวัล)
+  2. ANALYZE แล้วสั่ง EXPLAIN (FORMAT JSON) ทีละ Query
+  3. ถ้าเจอ Seq Scan บนตารางใหญ่ → exit code 1
+  4. ROLLBACK ทิ้งทั้งหมด (ไม่มีข้อมูลจำลองค้างใน Database)
+
+ใช้หลังรัน migration:  alembic upgrade head && python check_query_plans.py
+"""
+import sys
+import os
+import re
+from datetime import date, timedelta
+from sqlalchemy import text
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import engine
+from app.db.partitions import ensure_month_partitions
+
+# ตารางที่ห้าม Seq Scan (ตารางเล็กอย่าง shops ไม่ต้องสน)
+HOT_TABLES = {"tickets", "ticket_items", "number_risks", "lotto_results", "lotto_types"}
+# partition ที่แถวน้อยกว่านี้ (เช่น เดือนอนาคต/DEFAULT ที่ยังว่าง) Seq Scan ได้ไม่ผิดอะไร
+MIN_ROWS_TO_CHECK = 1000
+
+SEED_SHOPS = 50
+SEED_USERS = 5000
+SEED_LOTTOS = 2000
+SEED_TICKETS = 200000
+SEED_DAYS = 60
+
+SEED_SQL = [
+    """
+    INSERT INTO shops (id, name, code, is_active, created_at)
+    SELECT gen_random_uuid(), 'plan-shop-' || g, 'zq' || g, true, now()
+    FROM generate_series(1, :shops) g
+    """,
+    """
+    INSERT INTO users (id, username, password_hash, role, shop_id, credit_balance, is_active, created_at)
+    SELECT gen_random_uuid(), 'plan_user_' || g, 'x', 'member', s.id, 0, true, now()
+    FROM generate_series(1, :users) g
+    JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS rn FROM shops WHERE name LIKE 'plan-shop-%') s
+      ON s.rn = g % :shops
+    """,
+    """
+    INSERT INTO lotto_types (id, name, code, shop_id, is_active, is_template)
+    SELECT gen_random_uuid(), 'plan-lotto-' || g, 'QP' || g, s.id, true, false
+    FROM generate_series(1, :lottos) g
+    JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS rn FROM shops WHERE name LIKE 'plan-shop-%') s
+      ON s.rn = g % :shops
+    """,
+    """
+    INSERT INTO tickets (id, shop_id, user_id, lotto_type_id, total_amount, status, winning_amount,
+                         created_at, round_date, commission_amount)
+    SELECT gen_random_uuid(), u.shop_id, u.id, l.id, 100,
+           CASE WHEN g % 10 = 0 THEN 'CANCELLED' WHEN g % 10 IN (1, 2) THEN 'PENDING'
+                WHEN g % 10 = 3 THEN 'WIN' ELSE 'LOSE' END,
+           0,
+           (current_date - (g % :days)) + make_interval(secs => g % 80000),
+           current_date - (g % :days),
+           0
+    FROM generate_series(1, :tickets) g
+    JOIN (SELECT id, shop_id, row_number() OVER (ORDER BY id) - 1 AS rn FROM users WHERE username LIKE 'plan_user_%') u
+      ON u.rn = g % :users
+    JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS rn FROM lotto_types WHERE name LIKE 'plan-lotto-%') l
+      ON l.rn = g % :lottos
+    """,
+    """
+    INSERT INTO ticket_items (id, ticket_id, round_date, number, bet_type, amount, reward_rate, winning_amount, status)
+    SELECT gen_random_uuid(), t.id, t.round_date, lpad((k * 7 % 100)::text, 2, '0'), '2up', 50, 90, 0, t.status
+    FROM tickets t CROSS JOIN generate_series(1, 2) k
+    WHERE t.shop_id IN (SELECT id FROM shops WHERE name LIKE 'plan-shop-%')
+    """,
+    """
+    INSERT INTO number_risks (id, lotto_type_id, shop_id, number, risk_type, specific_bet_type, created_at)
+    SELECT gen_random_uuid(), l.id, l.shop_id, lpad((g % 100)::text, 2, '0'), 'CLOSE', 'ALL',
+           now() - make_interval(days => g % :days)
+    FROM generate_series(1, 50) g CROSS JOIN lotto_types l
+    WHERE l.name LIKE 'plan-lotto-%'
+    """,
+    """
+    INSERT INTO lotto_results (id, lotto_type_id, round_date, top_3, bottom_2, reward_data, created_at)
+    SELECT gen_random_uuid(), l.id, current_date - d, '123', '45', '{}', now()
+    FROM lotto_types l CROSS JOIN generate_series(1, :days) d
+    WHERE l.name LIKE 'plan-lotto-%'
+    """,
+]
+
+# (ชื่อ, SQL) - เขียนให้ตรงกับ Query ที่ ORM ส่งจริงใน endpoints
+HOT_QUERIES = [
+    ("read_history", """
+        SELECT * FROM tickets
+        WHERE user_id = :user_id AND round_date >= :day AND round_date <= :day
+        ORDER BY created_at DESC LIMIT 200
+    """),
+    ("get_shop_tickets", """
+        SELECT * FROM tickets
+        WHERE shop_id = :shop_id AND round_date >= :day AND round_date <= :day
+        ORDER BY created_at DESC LIMIT 200
+    """),
+    ("shop_history_keyset", """
+        SELECT * FROM tickets
+        WHERE shop_id = :shop_id AND round_date >= :round_lo AND round_date <= :round_hi
+          AND (created_at, id) < (:end_utc, :max_id)
+        ORDER BY created_at DESC, id DESC LIMIT 200
+    """),
+    ("process_reward_background", """
+        SELECT * FROM tickets
+        WHERE lotto_type_id IN (:lotto_id) AND round_date = :day AND status <> 'CANCELLED'
+    """),
+    ("stats_range_summary", """
+        SELECT count(id), sum(CASE WHEN status <> 'CANCELLED' THEN total_amount END)
+        FROM tickets
+        WHERE created_at >= :start_utc AND created_at <= :end_utc AND shop_id = :shop_id
+          AND round_date BETWEEN :round_lo AND :round_hi
+    """),
+    ("stats_range_payout", """
+        SELECT sum(ti.winning_amount) FROM ticket_items ti
+        JOIN tickets t ON t.id = ti.ticket_id AND t.round_date = ti.round_date
+        WHERE t.created_at >= :start_utc AND t.created_at <= :end_utc AND t.shop_id = :shop_id
+          AND t.round_date BETWEEN :round_lo AND :round_hi AND ti.round_date BETWEEN :round_lo AND :round_hi
+          AND t.status <> 'CANCELLED' AND ti.status = 'WIN'
+    """),
+    ("pending_exposure", """
+        SELECT sum(total_amount) FROM tickets
+        WHERE shop_id = :shop_id AND round_date = :day AND status = 'PENDING'
+    """),
+    ("submit_ticket_risks", """
+        SELECT * FROM number_risks
+        WHERE lotto_type_id = :lotto_id AND shop_id = :shop_id
+          AND created_at >= :start_utc AND created_at <= :end_utc
+    """),
+    ("risks_daily_all", """
+        SELECT * FROM number_risks
+        WHERE created_at >= :start_utc AND created_at <= :end_utc AND shop_id = :shop_id
+    """),
+    ("reward_daily", """
+        SELECT * FROM lotto_results WHERE round_date = :day
+    """),
+    ("lottos_by_code", """
+        SELECT id FROM lotto_types WHERE code = :code
+    """),
+]
+
+def _parent_table(relation: str) -> str:
+    # tickets_y2026m10 / tickets_default → tickets
+    return re.sub(r"_(y\d{4}m\d{2}|default)$", "", relation)
+
+def _seq_scans(plan: dict, row_counts: dict) -> list:
+    found = []
+    relation = plan.get("Relation Name")
+    if (plan.get("Node Type") == "Seq Scan" and _parent_table(relation) in HOT_TABLES
+            and row_counts.get(relation, 0) >= MIN_ROWS_TO_CHECK):
+        found.append(relation)
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child, row_counts))
+    return found
+
+def check_plans() -> bool:
+    seed_params = {
+        "shops": SEED_SHOPS, "users": SEED_USERS, "lottos": SEED_LOTTOS,
+        "tickets": SEED_TICKETS, "days": SEED_DAYS,
+    }
+    ok = True
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            print(f"🌱 Seeding {SEED_TICKETS:,} tickets (จะ ROLLBACK ทิ้งตอนจบ)...")
+            ensure_month_partitions(conn, months_ahead=3, from_month=date.today() - timedelta(days=SEED_DAYS))
+            for sql in SEED_SQL:
+                conn.execute(text(sql), seed_params)
+            for table in ("shops", "users", "lotto_types", "tickets", "ticket_items", "number_risks", "lotto_results"):
+                conn.execute(text(f"ANALYZE {table}"))
+            row_counts = dict(conn.execute(text(
+                "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"
+            )).all())
+
+            sample = conn.execute(text("""
+                SELECT t.user_id, t.shop_id, t.lotto_type_id, t.round_date, l.code
+                FROM tickets t JOIN lotto_types l ON l.id = t.lotto_type_id
+                WHERE l.name LIKE 'plan-lotto-%' AND t.round_date = current_date - 1
+                LIMIT 1
+            """)).first()
+            params = {
+                "user_id": sample.user_id, "shop_id": sample.shop_id, "lotto_id": sample.lotto_type_id,
+                "day": sample.round_date, "code": sample.code,
+                "start_utc": f"{sample.round_date} 00:00:00+07", "end_utc": f"{sample.round_date} 23:59:59+07",
+                "round_lo": sample.round_date - timedelta(days=1), "round_hi": sample.round_date + timedelta(days=62),
+                "max_id": "ffffffff-ffff-ffff-ffff-ffffffffffff",
+            }
+
+            for name, sql in HOT_QUERIES:
+                plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+                root = plan[0]["Plan"]
+                seq = _seq_scans(root, row_counts)
+                if seq:
+                    ok = False
+                    print(f"❌ {name}: Seq Scan on {', '.join(sorted(set(seq)))} (cost {root['Total Cost']:.0f})")
+                else:
+                    print(f"✅ {name}: index scan (cost {root['Total Cost']:.0f})")
+        finally:
+            trans.rollback()
+
+    return ok
+
+if __name__ == "__main__":
+    if not check_plans():
+        print("\n⚠️ พบ Query ที่ไม่ใช้ Index → ตรวจว่ารัน alembic upgrade head แล้วหรือยัง")
+        sys.exit(1)
+    print("\n🎉 All hot queries use indexes")
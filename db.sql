@@ -56,6 +56,14 @@ CREATE TABLE IF NOT EXISTS users (
 CREATE INDEX IF NOT EXISTS idx_users_shop_id ON users(shop_id);
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 
+-- 1.3 รายการเพิกถอน Refresh Token (1 แถวต่อ Session / ผู้ใช้) - Token ของ key ที่ออกไม่หลัง revoked_before ใช้ไม่ได้
+CREATE TABLE IF NOT EXISTS token_revocations (
+    key VARCHAR(80) PRIMARY KEY, -- sid:<session> / user:<user_id>
+    revoked_before TIMESTAMPTZ NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_token_revocations_expires_at ON token_revocations (expires_at);
+
 /* ==========================================================================
    ส่วนที่ 2: โครงสร้างหวยและหมวดหมู่ (Lotto Config)
    ========================================================================== */
@@ -110,6 +118,8 @@ CREATE TABLE IF NOT EXISTS lotto_types (
 );
 -- ป้องกันชื่อซ้ำในร้านเดียวกัน
 CREATE UNIQUE INDEX IF NOT EXISTS uix_shop_code ON lotto_types (shop_id, code);
+-- หาหวยรหัสเดียวกันจากทุกร้าน (ตรวจรางวัล/ประวัติผล)
+CREATE INDEX IF NOT EXISTS ix_lotto_types_code ON lotto_types (code);
 
 /* ==========================================================================
    ส่วนที่ 3: การจัดการความเสี่ยง (Risk Management)
@@ -126,44 +136,77 @@ CREATE TABLE IF NOT EXISTS number_risks (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 CREATE INDEX IF NOT EXISTS idx_risks_lotto ON number_risks (lotto_type_id, number);
+CREATE INDEX IF NOT EXISTS ix_number_risks_lotto_shop_created ON number_risks (lotto_type_id, shop_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_number_risks_shop_created ON number_risks (shop_id, created_at);
 
 /* ==========================================================================
    ส่วนที่ 4: การซื้อขายและผลรางวัล (Transactions & Results)
    ========================================================================== */
 
--- 4.1 ตารางบิล (Tickets)
+-- 4.1 ตารางบิล (Tickets) - แบ่ง partition รายเดือนตาม round_date
+-- partition เดือนถัดๆ ไปสร้างอัตโนมัติโดย Server (app/db/partitions.py) หรือ python manage_partitions.py ensure
 CREATE TABLE IF NOT EXISTS tickets (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     shop_id UUID NOT NULL REFERENCES shops(id),
     user_id UUID NOT NULL REFERENCES users(id),
     lotto_type_id UUID REFERENCES lotto_types(id),
     
-    round_date DATE,
+    round_date DATE NOT NULL,
     total_amount DECIMAL(15, 2) NOT NULL,
     status VARCHAR(20) DEFAULT 'PENDING', -- PENDING, WIN, LOSE, CANCELLED
     note TEXT,
+    winning_amount DECIMAL(15, 2) DEFAULT 0.00,
+    commission_amount DECIMAL(15, 2) DEFAULT 0.00,
     
     created_at TIMESTAMPTZ DEFAULT NOW(),
-    updated_at TIMESTAMPTZ DEFAULT NOW()
-);
-CREATE INDEX IF NOT EXISTS idx_tickets_user_id ON tickets(user_id);
-CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON tickets(created_at);
-CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status);
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (id, round_date)
+) PARTITION BY RANGE (round_date);
+CREATE TABLE IF NOT EXISTS tickets_default PARTITION OF tickets DEFAULT;
+CREATE INDEX IF NOT EXISTS ix_ticket_created_shop_status ON tickets (created_at, shop_id, status);
+-- Hot query indexes (ดู alembic/versions/0001_hot_query_indexes.py)
+CREATE INDEX IF NOT EXISTS ix_tickets_user_round_created ON tickets (user_id, round_date, created_at DESC);
+CREATE INDEX IF NOT EXISTS ix_tickets_shop_round_created ON tickets (shop_id, round_date, created_at DESC);
+CREATE INDEX IF NOT EXISTS ix_tickets_lotto_round_active ON tickets (lotto_type_id, round_date) WHERE status <> 'CANCELLED';
+CREATE INDEX IF NOT EXISTS ix_tickets_shop_created_cover ON tickets (shop_id, created_at) INCLUDE (status, total_amount, commission_amount);
+CREATE INDEX IF NOT EXISTS ix_tickets_pending_shop_round ON tickets (shop_id, round_date) INCLUDE (total_amount) WHERE status = 'PENDING';
+-- Keyset Pagination ของหน้าประวัติ (ดู alembic/versions/0004_keyset_history_indexes.py)
+CREATE INDEX IF NOT EXISTS ix_tickets_user_created_id ON tickets (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS ix_tickets_shop_created_id ON tickets (shop_id, created_at DESC, id DESC);
 
--- 4.2 รายการในบิล (Ticket Items)
+-- 4.2 รายการในบิล (Ticket Items) - เก็บ round_date ของบิลแม่ เพื่ออยู่ partition เดือนเดียวกัน
 CREATE TABLE IF NOT EXISTS ticket_items (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    ticket_id UUID NOT NULL REFERENCES tickets(id) ON DELETE CASCADE,
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    ticket_id UUID NOT NULL,
+    round_date DATE NOT NULL,
     
     number TEXT NOT NULL,
     bet_type VARCHAR(20) NOT NULL, -- 2up, 3top, etc.
     amount DECIMAL(15, 2) NOT NULL,
     reward_rate DECIMAL(15, 2) NOT NULL,
     winning_amount DECIMAL(15, 2) DEFAULT 0.00,
-    status VARCHAR(20) DEFAULT 'PENDING'
+    status VARCHAR(20) DEFAULT 'PENDING',
+    PRIMARY KEY (id, round_date),
+    FOREIGN KEY (ticket_id, round_date) REFERENCES tickets (id, round_date) ON DELETE CASCADE
+) PARTITION BY RANGE (round_date);
+CREATE TABLE IF NOT EXISTS ticket_items_default PARTITION OF ticket_items DEFAULT;
+CREATE INDEX IF NOT EXISTS ix_ticket_item_number_status ON ticket_items (number, status);
+CREATE INDEX IF NOT EXISTS ix_ticket_items_ticket_cover ON ticket_items (ticket_id) INCLUDE (status, winning_amount);
+
+-- 4.3 โพยสำเร็จรูป (Bet Templates) - เก็บรายการเลขแบบย่อ [["59","2up","10.00"], ...]
+CREATE TABLE IF NOT EXISTS bet_templates (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    shop_id UUID REFERENCES shops(id) ON DELETE CASCADE,
+    lotto_type_id UUID REFERENCES lotto_types(id) ON DELETE SET NULL,
+    name TEXT NOT NULL,
+    items JSONB NOT NULL DEFAULT '[]',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
 );
+CREATE INDEX IF NOT EXISTS idx_bet_templates_user_id ON bet_templates(user_id);
 
--- 4.3 ผลรางวัล (Results)
+-- 4.4 ผลรางวัล (Results)
 CREATE TABLE IF NOT EXISTS lotto_results (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     lotto_type_id UUID NOT NULL REFERENCES lotto_types(id),
@@ -176,6 +219,65 @@ CREATE TABLE IF NOT EXISTS lotto_results (
     created_at TIMESTAMPTZ DEFAULT NOW(),
     CONSTRAINT unique_result_per_round UNIQUE (lotto_type_id, round_date)
 );
+CREATE INDEX IF NOT EXISTS ix_lotto_results_round_date ON lotto_results (round_date);
+
+-- 4.4.1 ผลรางวัลระดับ Code หวย (1 แถวต่อ Code ต่องวด ทุกร้านใช้ร่วมกัน) - เขียนพร้อม lotto_results ตอนออกผล
+CREATE TABLE IF NOT EXISTS code_results (
+    code VARCHAR(20) NOT NULL,
+    round_date DATE NOT NULL,
+    top_3 VARCHAR(10),
+    bottom_2 VARCHAR(10),
+    reward_data JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (code, round_date)
+);
+CREATE INDEX IF NOT EXISTS ix_code_results_round_date ON code_results (round_date);
+
+-- 4.5 คลังบิลงวดที่ปิดแล้ว (Ticket Archives) - ย้ายมาจาก tickets/ticket_items โดย python archive_rounds.py
+-- items_packed = [[id, number, bet_type, amount, reward_rate, winning_amount, status], ...]
+CREATE TABLE IF NOT EXISTS ticket_archives (
+    id UUID PRIMARY KEY, -- id เดิมของบิล
+    shop_id UUID NOT NULL REFERENCES shops(id),
+    user_id UUID NOT NULL REFERENCES users(id),
+    lotto_type_id UUID REFERENCES lotto_types(id),
+    round_date DATE NOT NULL,
+    note TEXT,
+    total_amount DECIMAL(10, 2) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    winning_amount DECIMAL(10, 2) DEFAULT 0,
+    commission_amount DECIMAL(10, 2) DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL,
+    items_packed JSONB NOT NULL DEFAULT '[]',
+    archived_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS ix_ticket_archives_user_round_created ON ticket_archives (user_id, round_date, created_at DESC);
+CREATE INDEX IF NOT EXISTS ix_ticket_archives_shop_round_created ON ticket_archives (shop_id, round_date, created_at DESC);
+CREATE INDEX IF NOT EXISTS ix_ticket_archives_shop_created ON ticket_archives (shop_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_ticket_archives_lotto_round ON ticket_archives (lotto_type_id, round_date);
+CREATE INDEX IF NOT EXISTS ix_ticket_archives_round_date ON ticket_archives (round_date);
+CREATE INDEX IF NOT EXISTS ix_ticket_archives_user_created_id ON ticket_archives (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS ix_ticket_archives_shop_created_id ON ticket_archives (shop_id, created_at DESC, id DESC);
+
+-- 4.6 ยอดสรุปรายวันสำหรับหน้าสถิติ (Daily Rollups) - อัปเดตโดย app/core/rollups.py
+-- ไม่มี FK (คำนวณใหม่ได้ด้วย python rebuild_rollups.py) stat_date = วันที่กดแทงตามเวลาไทย
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    shop_id UUID NOT NULL,
+    stat_date DATE NOT NULL,
+    user_id UUID NOT NULL,
+    lotto_type_id UUID NOT NULL,
+    round_date DATE NOT NULL,
+    bill_count INTEGER NOT NULL DEFAULT 0,
+    cancelled_count INTEGER NOT NULL DEFAULT 0,
+    sales_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    commission_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    pending_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    cancelled_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    payout_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (shop_id, stat_date, user_id, lotto_type_id, round_date)
+);
+CREATE INDEX IF NOT EXISTS ix_daily_rollups_stat_date ON daily_rollups (stat_date);
 
 /* ==========================================================================
    ส่วนที่ 5: ตั้งค่า Supabase Realtime & Security Policies (RLS)
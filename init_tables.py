@@ -1,14 +1,43 @@
 # backend/init_tables.py
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
 
 from app.db.session import engine
 from app.db.base_class import Base
 from app.models.lotto import NumberRisk # Import เพื่อให้ SQLAlchemy รู้จัก Model นี้
+from app.db.partitions import ensure_month_partitions
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+def _schema_state(conn):
+    """(มี alembic_version แล้วหรือยัง, relkind ของ tickets: 'p' = partition / 'r' = ตารางธรรมดา / None = ยังไม่มี)"""
+    has_version = conn.execute(text("SELECT to_regclass('alembic_version') IS NOT NULL")).scalar()
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('tickets')")).scalar()
+    return has_version, relkind
 
 def init_db():
     print("Creating database tables...")
     # คำสั่งนี้จะสร้างตารางที่ยังไม่มีใน DB (ตารางเดิมจะไม่หาย)
     Base.metadata.create_all(bind=engine)
+    # tickets / ticket_items เป็นตาราง partition ต้องมี partition ของเดือนนี้ก่อนถึงจะรับบิลได้
+    with engine.begin() as conn:
+        ensure_month_partitions(conn)
+        has_version, relkind = _schema_state(conn)
     print("✅ Tables created successfully!")
 
+    if has_version:
+        print("ℹ️ Database อยู่ภายใต้ Alembic แล้ว → อัปเดตด้วย alembic upgrade head")
+    elif relkind == "p":
+        # create_all สร้างตามโครงสร้างล่าสุดครบแล้ว (tickets เป็น partition = ตรงกับ head)
+        # → ตีตรา head ไว้ ไม่งั้น alembic upgrade head จะไปสร้างซ้ำตั้งแต่ 0001 (และ CONCURRENTLY ใช้กับ partition ไม่ได้)
+        command.stamp(Config(ALEMBIC_INI), "head")
+        print("✅ Stamped alembic head")
+    else:
+        # Database เดิมก่อนมี Alembic (tickets ยังไม่ใช่ partition) → ต้องไล่ migration ตั้งแต่ 0001
+        print("⚠️ tickets is not partitioned → run: alembic upgrade head")
+
 if __name__ == "__main__":
     init_db()
\ No newline at end of file
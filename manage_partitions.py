@@ -0,0 +1,67 @@
+# backend/manage_partitions.py
+"""
+จัดการ partition รายเดือนของ tickets / ticket_items
+
+  python manage_partitions.py status             # ดูรายการ partition + จำนวนแถวใน DEFAULT
+  python manage_partitions.py ensure [months]    # สร้าง partition ล่วงหน้า (Default ตาม PARTITION_MONTHS_AHEAD)
+  python manage_partitions.py detach 2025-01     # ถอดเดือนเก่าออก (ข้อมูลยังอยู่ในตาราง tickets_y2025m01)
+
+ใช้กับ Cron ได้ (เช่น ensure ทุกวันที่ 1) นอกเหนือจาก Thread ที่รันใน Server อยู่แล้ว
+"""
+import sys
+import os
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import engine
+from app.db.partitions import (
+    PARTITIONED_TABLES, ensure_month_partitions, detach_month_partition,
+    list_partitions, default_partition_rows, is_partitioned
+)
+
+def show_status():
+    with engine.connect() as conn:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(conn, table):
+                print(f"⚠️ {table} is not partitioned (รัน alembic upgrade head ก่อน)")
+                continue
+            parts = list_partitions(conn, table)
+            print(f"🗂️ {table}: {len(parts)} partitions")
+            for name, bound in parts:
+                print(f"   - {name}: {bound}")
+            stray = default_partition_rows(conn, table)
+            if stray:
+                print(f"   ⚠️ {table}_default has {stray} rows")
+
+def ensure(months_ahead=None):
+    with engine.begin() as conn:
+        created = ensure_month_partitions(conn, months_ahead)
+    print(f"✅ Created: {', '.join(created)}" if created else "✅ All partitions already exist")
+
+def detach(month_str: str):
+    try:
+        month = datetime.strptime(month_str, "%Y-%m").date()
+    except ValueError:
+        print("❌ Month must be YYYY-MM")
+        sys.exit(1)
+
+    with engine.begin() as conn:
+        detached = detach_month_partition(conn, month)
+    if detached:
+        print(f"✅ Detached: {', '.join(detached)} (DROP หรือ pg_dump แยกได้ตามสะดวก)")
+    else:
+        print(f"⚠️ No partition for {month_str}")
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "status":
+        show_status()
+    elif command == "ensure":
+        ensure(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif command == "detach" and len(sys.argv) > 2:
+        detach(sys.argv[2])
+    else:
+        print(__doc__)
+        sys.exit(1)
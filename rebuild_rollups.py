@@ -0,0 +1,60 @@
+# backend/rebuild_rollups.py
+"""
+คำนวณยอดสรุปรายวัน (daily_rollups) ใหม่จาก tickets + ticket_archives
+
+  python rebuild_rollups.py                          # ทั้งหมด
+  python rebuild_rollups.py 2026-10-01 2026-10-31    # เฉพาะช่วงวันที่กดแทง (เวลาไทย)
+  python rebuild_rollups.py verify                   # เทียบ rollup กับยอดจริงโดยไม่แก้อะไร
+
+ใช้หลังแก้ข้อมูลบิลด้วย SQL ตรงๆ หรือถ้าสงสัยว่ายอดหน้าสถิติไม่ตรง
+ระหว่าง rebuild การส่งโพย/ตรวจรางวัลจะรอจน rebuild เสร็จ (ล็อกตาราง daily_rollups)
+"""
+import sys
+import os
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+
+from app.db.session import engine
+from app.core.rollups import rebuild_rollups, KEY_COLUMNS, VALUE_COLUMNS, AGGREGATE_SQL
+
+def rebuild(s_date=None, e_date=None):
+    started = time.time()
+    with engine.begin() as conn:
+        rows = rebuild_rollups(conn, s_date, e_date)
+    scope = f"{s_date} → {e_date}" if s_date else "all dates"
+    print(f"✅ Rebuilt {rows} rollup rows ({scope}) in {time.time() - started:.2f}s")
+
+def verify() -> bool:
+    """เทียบ daily_rollups กับยอดที่คำนวณสดจากบิล คืน True ถ้าตรงกันทุกแถว"""
+    cols = ", ".join(KEY_COLUMNS + VALUE_COLUMNS)
+    with engine.connect() as conn:
+        diff = conn.execute(text(f"""
+            WITH fresh AS ({AGGREGATE_SQL.format(where="WHERE lotto_type_id IS NOT NULL")}),
+                 stored AS (SELECT {cols} FROM daily_rollups WHERE bill_count <> 0)
+            SELECT count(*) FROM (
+                (SELECT {cols} FROM fresh EXCEPT SELECT {cols} FROM stored)
+                UNION ALL
+                (SELECT {cols} FROM stored EXCEPT SELECT {cols} FROM fresh)
+            ) d
+        """)).scalar()
+    if diff:
+        print(f"❌ {diff} rollup rows differ from tickets (รัน python rebuild_rollups.py)")
+        return False
+    print("✅ daily_rollups matches tickets + ticket_archives")
+    return True
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "verify":
+        sys.exit(0 if verify() else 1)
+
+    try:
+        s_date = datetime.strptime(sys.argv[1], "%Y-%m-%d").date() if len(sys.argv) > 1 else None
+        e_date = datetime.strptime(sys.argv[2], "%Y-%m-%d").date() if len(sys.argv) > 2 else s_date
+    except ValueError:
+        print(__doc__)
+        sys.exit(1)
+    rebuild(s_date, e_date)